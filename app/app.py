@@ -73,7 +73,7 @@ st.set_page_config(
 sys.path.append(os.path.dirname(__file__))
 from components.email_viewer import (
     create_email_table_with_viewer,
-    apply_contact_filter,
+    create_paginated_email_table,
     clear_email_selection,
     decode_email_text,
 )
@@ -81,9 +81,10 @@ from components.working_dropdown_filters import create_working_dropdown_filters
 
 from src.data.loading import load_mailboxes
 from src.data.email_analyzer import EmailAnalyzer
+from src.data.rollups import rollups_support
 from src.features.embeddings import generate_embeddings
 from src.visualization.email_network import create_network_graph
-from src.visualization.timeline import create_timeline
+from src.visualization.timeline import create_timeline, create_timeline_from_counts, effective_time_unit
 from src.rag.initialization import initialize_rag_system
 from src.rag.retrieval import get_rag_answer
 from src.features.search import search_emails
@@ -229,7 +230,7 @@ else:
             db_path = os.path.join(project_root, 'data', 'Projects', project_name, f"{project_name}.duckdb")
             if not os.path.exists(db_path):
                 return None
-            analyzer = EmailAnalyzer(db_path=db_path)
+            analyzer = EmailAnalyzer(db_path=db_path, shared=True)
             try:
                 return analyzer.get_selected_topic_level()
             finally:
@@ -244,7 +245,7 @@ else:
             db_path = os.path.join(project_root, 'data', 'Projects', project_name, f"{project_name}.duckdb")
             if not os.path.exists(db_path):
                 return []
-            analyzer = EmailAnalyzer(db_path=db_path)
+            analyzer = EmailAnalyzer(db_path=db_path, shared=True)
             try:
                 return analyzer.get_topic_levels()
             finally:
@@ -260,7 +261,7 @@ else:
         try:
             # Load a small sample to get date range without the full dataset
             db_path = os.path.join(project_root, 'data', 'Projects', project_name, f"{project_name}.duckdb")
-            analyzer = EmailAnalyzer(db_path=db_path)
+            analyzer = EmailAnalyzer(db_path=db_path, shared=True)
 
             # Get min and max dates from database
             conn = analyzer.connect()
@@ -275,7 +276,10 @@ else:
             if mailbox_selection != "All Mailboxes":
                 query += f" WHERE folder = '{mailbox_selection}'"
 
-            result = conn.execute(query).fetchone()
+            try:
+                result = conn.execute(query).fetchone()
+            finally:
+                analyzer.close()
 
             if result and result[0] and result[1]:
                 min_date = pd.to_datetime(result[0]).date()
@@ -338,46 +342,6 @@ else:
         st.session_state.username = ""
         st.rerun()
 
-    # Function to apply date range filter to dataframe
-    def apply_date_filter(df, date_range):
-        """Apply date range filter to a dataframe"""
-        if df.empty:
-            return df
-
-        # Ensure date column exists and is in datetime format
-        if 'date' not in df.columns:
-            return df
-
-        # Convert date column to datetime if it's not already
-        if not pd.api.types.is_datetime64_any_dtype(df['date']):
-            df['date'] = pd.to_datetime(df['date'], errors='coerce')
-
-        # Handle different date_range formats
-        if isinstance(date_range, tuple) and len(date_range) == 2:
-            start_date, end_date = date_range
-        elif isinstance(date_range, list) and len(date_range) == 2:
-            start_date, end_date = date_range[0], date_range[1]
-        else:
-            return df  # No valid date range provided
-
-        # Convert dates to pandas Timestamp for comparison
-        start_date = pd.Timestamp(start_date)
-        end_date = pd.Timestamp(end_date) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)  # End of day
-
-        # Apply filter
-        original_count = len(df)
-        filtered_df = df[(df['date'] >= start_date) & (df['date'] <= end_date)]
-
-        # Store filter info in session state for display
-        st.session_state.filter_info = {
-            'original_count': original_count,
-            'filtered_count': len(filtered_df),
-            'start_date': start_date.date(),
-            'end_date': end_date.date()
-        }
-
-        return filtered_df.reset_index(drop=True)
-
     def parse_search_query(search_term: str):
         """Parse search query to extract from:, to:, and general text search."""
         if not search_term:
@@ -404,6 +368,21 @@ else:
 
         return from_filter, to_filter, general_text
 
+    @st.cache_data
+    def get_fulltext_scores(project_name, text_query):
+        """BM25 score of every email matching a keyword query, by message_id (None if the index is unavailable)"""
+        try:
+            db_path = os.path.join(project_root, 'data', 'Projects', project_name, f"{project_name}.duckdb")
+            analyzer = EmailAnalyzer(db_path=db_path, shared=True)
+            try:
+                hits = analyzer.search_fulltext(text_query)
+            finally:
+                analyzer.close()
+            return hits.drop_duplicates("message_id").set_index("message_id")["score"]
+        except Exception as fulltext_error:
+            print(f"[fulltext] Falling back to a scan of the loaded emails: {fulltext_error}")
+            return None
+
     def show_df_table(df:pd.DataFrame, key_prefix: str, filter_status: bool = True):
         # Use the provided dataframe (which may already be contact-filtered)
         emails_df = df
@@ -411,7 +390,7 @@ else:
         # Email list with advanced search filter
         search_term = st.text_input(
             "Search in emails:",
-            placeholder='Examples: "projet" or from:john@example.com or to:marie@company.fr or from:sender@domain.com to:recipient@domain.com meeting'
+            placeholder='Examples: projet budget or "rapport annuel" or from:john@example.com or to:marie@company.fr or from:sender@domain.com to:recipient@domain.com meeting'
         )
 
         if search_term:
@@ -435,10 +414,18 @@ else:
 
             # Apply general text search if specified
             if general_text:
-                filtered_df = filtered_df[
-                    filtered_df["subject"].str.contains(general_text, case=False, na=False) |
-                    filtered_df["body"].str.contains(general_text, case=False, na=False)
-                ]
+                fulltext_scores = get_fulltext_scores(ACTIVE_PROJECT, general_text)
+                if fulltext_scores is not None and "message_id" in filtered_df.columns:
+                    # Index hits restricted to the loaded emails, best match first
+                    filtered_df = filtered_df[filtered_df["message_id"].isin(fulltext_scores.index)]
+                    filtered_df = filtered_df.assign(
+                        _fulltext_score=filtered_df["message_id"].map(fulltext_scores)
+                    ).sort_values("_fulltext_score", ascending=False).drop(columns="_fulltext_score")
+                else:
+                    filtered_df = filtered_df[
+                        filtered_df["subject"].str.contains(general_text, case=False, na=False) |
+                        filtered_df["body"].str.contains(general_text, case=False, na=False)
+                    ]
 
             # Show what filters are active
             active_filters = []
@@ -466,18 +453,21 @@ else:
 
     # Load data based on selection from DuckDB with enhanced filtering
     @st.cache_data
-    def load_data_with_filters(project_name, mailbox_selection, additional_filters, use_agg_recipients=False, topic_level=None):
-        """Load and cache the selected mailbox data from DuckDB with additional filters applied at database level
+    def load_data_with_filters(project_name, mailbox_selection, additional_filters, use_agg_recipients=False, topic_level=None,
+                               date_range=None, contact_filter=None):
+        """Load and cache the selected mailbox data from DuckDB with every filter applied at database level
 
         Args:
             mailbox_selection: The selected mailbox name
             additional_filters: Dictionary containing additional filter criteria
             use_agg_recipients: If True, uses get_app_dataframe_agg_recipients method
                                instead of get_app_DataFrame
+            date_range: Optional (first day, last day) of the date filter
+            contact_filter: Optional address the emails were sent from or to
         """
         try:
             db_path = os.path.join(project_root, 'data', 'Projects', project_name, f"{project_name}.duckdb")
-            analyzer = EmailAnalyzer(db_path=db_path)
+            analyzer = EmailAnalyzer(db_path=db_path, shared=True)
             try:
                 current_topic_level = topic_level
                 if current_topic_level is None:
@@ -487,7 +477,9 @@ else:
                 df = analyzer.get_app_dataframe_with_filters(
                     mailbox=mailbox_selection,
                     filters=additional_filters,
-                    topic_level=current_topic_level
+                    topic_level=current_topic_level,
+                    date_range=date_range,
+                    contact=contact_filter
                 )
             finally:
                 analyzer.close()
@@ -511,6 +503,80 @@ else:
                 "topic_cluster_id", "topic_cluster_label"
             ])
 
+    @st.cache_data
+    def count_emails_with_filters(project_name, mailbox_selection, additional_filters, topic_level=None,
+                                  date_range=None):
+        """Number of emails matching the filters, counted in DuckDB"""
+        try:
+            db_path = os.path.join(project_root, 'data', 'Projects', project_name, f"{project_name}.duckdb")
+            analyzer = EmailAnalyzer(db_path=db_path, shared=True)
+            try:
+                return analyzer.count_emails_with_filters(
+                    mailbox=mailbox_selection,
+                    filters=additional_filters,
+                    topic_level=topic_level,
+                    date_range=date_range
+                )
+            finally:
+                analyzer.close()
+        except Exception as e:
+            print(f"Error counting emails: {e}")
+            return None
+
+    def record_date_filter(date_range, project_name, mailbox_selection, additional_filters, topic_level=None,
+                           filtered_count=None):
+        """Store the date filter status shown by show_filter_status when the date was filtered in the database
+
+        Args:
+            filtered_count: Emails left by the date filter, counted in the database when not given
+        """
+        if not isinstance(date_range, (tuple, list)) or len(date_range) != 2:
+            return
+        original_count = count_emails_with_filters(project_name, mailbox_selection, additional_filters, topic_level)
+        if filtered_count is None:
+            filtered_count = count_emails_with_filters(project_name, mailbox_selection, additional_filters,
+                                                       topic_level, date_range)
+            if filtered_count is None:
+                return
+        st.session_state.filter_info = {
+            'original_count': original_count if original_count is not None else filtered_count,
+            'filtered_count': filtered_count,
+            'start_date': pd.Timestamp(date_range[0]).date(),
+            'end_date': pd.Timestamp(date_range[1]).date()
+        }
+
+    @st.cache_data
+    def load_activity_rollup(project_name, mailbox_selection, additional_filters, date_range, topic_level=None, time_unit="M"):
+        """Load the dashboard metrics and the timeline counts from the rollup tables
+
+        Args:
+            mailbox_selection: The selected mailbox name
+            additional_filters: Dictionary containing additional filter criteria
+            date_range: (first day, last day) of the date filter
+            time_unit: Time unit of the timeline ('D', 'W' or 'M')
+
+        Returns:
+            Dictionary with the totals, the timeline counts and their time unit, or None when a
+            filter needs the email rows or the rollups cannot be read
+        """
+        if not rollups_support(additional_filters):
+            return None
+        try:
+            db_path = os.path.join(project_root, 'data', 'Projects', project_name, f"{project_name}.duckdb")
+            analyzer = EmailAnalyzer(db_path=db_path, shared=True)
+            try:
+                totals = analyzer.get_activity_totals(mailbox_selection, additional_filters, date_range, topic_level)
+                bounds = analyzer.get_activity_bounds(mailbox_selection, additional_filters, date_range, topic_level)
+                effective_unit = effective_time_unit(*bounds, time_unit) if bounds else time_unit
+                timeline = analyzer.get_activity_counts(effective_unit, mailbox_selection, additional_filters,
+                                                        date_range, topic_level)
+            finally:
+                analyzer.close()
+            return {'totals': totals, 'timeline': timeline, 'time_unit': effective_unit}
+        except Exception as e:
+            print(f"[rollups] Unable to read the activity rollups: {e}")
+            return None
+
     def show_filter_status():
         """Display information about the current date filter"""
         if 'filter_info' in st.session_state:
@@ -593,42 +659,39 @@ else:
 
     # Load data based on selection from DuckDB
     @st.cache_data
-    def load_data(project_name, mailbox_selection, use_agg_recipients=False, topic_level=None):
+    def load_data(project_name, mailbox_selection, use_agg_recipients=False, topic_level=None, date_range=None):
         """Load and cache the selected mailbox data from DuckDB
 
         Args:
             mailbox_selection: The selected mailbox name
             use_agg_recipients: If True, uses get_app_dataframe_agg_recipients method
                                instead of get_app_DataFrame
+            date_range: Optional (first day, last day) of the date filter, applied by DuckDB
         """
         try:
 
             db_path = os.path.join(project_root, 'data', 'Projects', project_name, f"{project_name}.duckdb")
 
             # Get data from DuckDB using EmailAnalyzer
-            analyzer = EmailAnalyzer(db_path=db_path)
+            analyzer = EmailAnalyzer(db_path=db_path, shared=True)
             try:
                 current_topic_level = topic_level
                 if current_topic_level is None:
                     current_topic_level = analyzer.get_selected_topic_level()
 
                 if use_agg_recipients:
-                    df = analyzer.get_app_dataframe_agg_recipients(topic_level=current_topic_level)
+                    df = analyzer.get_app_dataframe_agg_recipients(mailbox=mailbox_selection,
+                                                                   topic_level=current_topic_level,
+                                                                   date_range=date_range)
                     print("Using aggregated recipients method:", df.columns)
                 else:
-                    df = analyzer.get_app_DataFrame(topic_level=current_topic_level)
+                    df = analyzer.get_app_DataFrame(mailbox=mailbox_selection,
+                                                    topic_level=current_topic_level,
+                                                    date_range=date_range)
                     print("Using standard method:", df.columns)
             finally:
                 analyzer.close()
 
-            # Filter based on mailbox selection
-            if mailbox_selection != "All Mailboxes":
-                # Check which column name is available for filtering
-                if 'mailbox_name' in df.columns:
-                    df = df[df['mailbox_name'] == mailbox_selection]
-                elif 'folder' in df.columns:
-                    df = df[df['folder'] == mailbox_selection]
-
             if len(df) == 0:
                 st.sidebar.warning("No emails found in the selected mailbox(es).")
                 # Return empty DataFrame with expected columns
@@ -679,34 +742,32 @@ else:
         if enhanced_filters.get('topic_cluster') and enhanced_filters['topic_cluster'] not in ('Tous', 'All'):
             filter_dict['topic_cluster'] = enhanced_filters['topic_cluster']
 
+        # Check if a contact filter is active
+        contact_filter_key = "dashboard_contact_filter"
+        if contact_filter_key not in st.session_state:
+            st.session_state[contact_filter_key] = None
+        active_contact_filter = enhanced_filters.get('contact_filter') or st.session_state[contact_filter_key]
+
+        # Date range and contact filters are applied by DuckDB with the other filters
+        dashboard_date_range = enhanced_filters.get('date_range') or date_range
         emails_df = load_data_with_filters(
             ACTIVE_PROJECT,
             selected_mailbox_filter,
             filter_dict,
             use_agg_recipients=True,
-            topic_level=selected_topic_level
+            topic_level=selected_topic_level,
+            date_range=dashboard_date_range,
+            contact_filter=active_contact_filter
         )
-
-        # Apply date range filter if specified in enhanced filters
-        if enhanced_filters.get('date_range'):
-            emails_df = apply_date_filter(emails_df, enhanced_filters['date_range'])
-        else:
-            emails_df = apply_date_filter(emails_df, date_range)
+        record_date_filter(dashboard_date_range, ACTIVE_PROJECT, selected_mailbox_filter, filter_dict,
+                           selected_topic_level, filtered_count=None if active_contact_filter else len(emails_df))
 
         metrics_container = st.container()
 
-        # Check if a contact filter is active
-        contact_filter_key = "dashboard_contact_filter"
-        if contact_filter_key not in st.session_state:
-            st.session_state[contact_filter_key] = None
-
-        # Apply contact filter if one is active (from enhanced filters or legacy)
         filtered_emails_df = emails_df.reset_index(drop=True)
-        active_contact_filter = enhanced_filters.get('contact_filter') or st.session_state[contact_filter_key]
 
         contact_filtered_count = None
         if active_contact_filter:
-            filtered_emails_df = apply_contact_filter(emails_df, active_contact_filter).reset_index(drop=True)
             contact_filtered_count = len(filtered_emails_df)
 
             # Display active contact filter info
@@ -723,14 +784,32 @@ else:
                     clear_email_selection("dashboard")  # Clear any selected email
                     st.rerun()
 
+        displayed_count = len(filtered_emails_df)
         filtered_emails_df = show_df_table(filtered_emails_df, key_prefix="dashboard", filter_status=True)
 
+        # Metrics and timeline from the rollup tables, unless the contact filter or the table
+        # search narrowed the emails down
+        activity = None
+        if not active_contact_filter and len(filtered_emails_df) == displayed_count:
+            activity = load_activity_rollup(
+                ACTIVE_PROJECT,
+                selected_mailbox_filter,
+                filter_dict,
+                enhanced_filters.get('date_range') or date_range,
+                topic_level=selected_topic_level
+            )
+
         with metrics_container:
             col1, col2, col3, col4 = st.columns(4)
 
-            total_emails = len(filtered_emails_df)
-            sent_count = len(filtered_emails_df[filtered_emails_df["direction"] == "sent"])
-            received_count = len(filtered_emails_df[filtered_emails_df["direction"] == "received"])
+            if activity:
+                total_emails = activity['totals']['total']
+                sent_count = activity['totals']['sent']
+                received_count = activity['totals']['received']
+            else:
+                total_emails = len(filtered_emails_df)
+                sent_count = len(filtered_emails_df[filtered_emails_df["direction"] == "sent"])
+                received_count = len(filtered_emails_df[filtered_emails_df["direction"] == "received"])
 
             with col1:
                 st.metric("Total Emails", total_emails)
@@ -742,17 +821,20 @@ else:
                 st.metric("Received Emails", received_count)
 
             with col4:
-                unique_senders = set(filtered_emails_df["from"].dropna())
-                unique_recipients = set()
+                if activity:
+                    unique_contacts = activity['totals']['contacts']
+                else:
+                    unique_senders = set(filtered_emails_df["from"].dropna())
+                    unique_recipients = set()
 
-                for recipients in filtered_emails_df["recipient_email"].dropna():
-                    if isinstance(recipients, str) and recipients.strip():
-                        for recipient in recipients.split(','):
-                            recipient = recipient.strip()
-                            if recipient:
-                                unique_recipients.add(recipient)
+                    for recipients in filtered_emails_df["recipient_email"].dropna():
+                        if isinstance(recipients, str) and recipients.strip():
+                            for recipient in recipients.split(','):
+                                recipient = recipient.strip()
+                                if recipient:
+                                    unique_recipients.add(recipient)
 
-                unique_contacts = len(unique_senders.union(unique_recipients))
+                    unique_contacts = len(unique_senders.union(unique_recipients))
                 st.metric("Unique Contacts", unique_contacts)
 
         # Create two columns for the charts
@@ -761,7 +843,11 @@ else:
         with timeline_col1:
             # Timeline chart
             # st.subheader("Email Activity Over Time")
-            st.plotly_chart(create_timeline(filtered_emails_df), use_container_width=True)
+            if activity:
+                timeline_fig = create_timeline_from_counts(activity['timeline'], activity['time_unit'])
+            else:
+                timeline_fig = create_timeline(filtered_emails_df)
+            st.plotly_chart(timeline_fig, use_container_width=True)
 
         if not filtered_emails_df.empty:
             with contacts_col2:
@@ -988,7 +1074,7 @@ else:
 
 
     elif page == "Recherche Sémantique":
-        from src.topic.config import STOPWORDS
+        from src.topic.config import STOPWORDS, SEARCH_MODES, default_search_mode
         from src.topic.data_loader import load_data
         from src.topic.semantic_search import semantic_search
         from src.topic.semantic_utils import (
@@ -1042,16 +1128,16 @@ else:
                     ACTIVE_PROJECT,
                     selected_mailbox_filter,
                     filter_dict,
-                    topic_level=selected_topic_level
+                    topic_level=selected_topic_level,
+                    date_range=enhanced_filters.get('date_range') or date_range
                 )
             except Exception as email_load_error:
                 st.error(f"Erreur lors du chargement des emails associés : {email_load_error}")
                 emails_df = pd.DataFrame()
             else:
-                if enhanced_filters.get('date_range'):
-                    emails_df = apply_date_filter(emails_df, enhanced_filters['date_range'])
-                else:
-                    emails_df = apply_date_filter(emails_df, date_range)
+                record_date_filter(enhanced_filters.get('date_range') or date_range, ACTIVE_PROJECT,
+                                   selected_mailbox_filter, filter_dict, selected_topic_level,
+                                   filtered_count=len(emails_df))
 
             emails_df = emails_df.copy()
             if "message_id" in emails_df.columns:
@@ -1106,6 +1192,14 @@ else:
             st.markdown("### 🧠 t-SNE Clusters + Recherche Sémantique")
 
             query = st.text_input("🔍 Rechercher des documents...", "", key="semantic_query_input")
+            search_mode = st.radio(
+                "Mode de recherche",
+                SEARCH_MODES,
+                index=SEARCH_MODES.index(default_search_mode()),
+                format_func=lambda mode: "Approximative (index ANN)" if mode == "approximate" else "Exacte",
+                horizontal=True,
+                key="semantic_search_mode",
+            )
 
             if st.button("Rechercher", key="semantic_search_button"):
                 if query.strip() == "":
@@ -1119,7 +1213,12 @@ else:
                 else:
                     try:
                         filtered_df, raw_results = perform_semantic_search(
-                            query, embeddings_vis, df_vis, semantic_search
+                            query,
+                            embeddings_vis,
+                            df_vis,
+                            lambda q, emb, top_k: semantic_search(
+                                q, emb, top_k=top_k, mode=search_mode, project=ACTIVE_PROJECT
+                            ),
                         )
                         st.session_state.semantic_filtered_df = filtered_df
                         st.session_state.semantic_raw_results = raw_results
@@ -1362,7 +1461,7 @@ else:
             if st.button("Sauvegarder", key="save_topic_height"):
                 analyzer = None
                 try:
-                    analyzer = EmailAnalyzer(db_path=db_path)
+                    analyzer = EmailAnalyzer(db_path=db_path, shared=True)
                     analyzer.set_selected_topic_level(selected_level_option)
                 except Exception as save_error:
                     st.error(f"Impossible d'enregistrer la hauteur sélectionnée : {save_error}")
@@ -1381,7 +1480,7 @@ else:
             with st.expander("Clusters pour la hauteur sélectionnée", expanded=False):
                 analyzer = None
                 try:
-                    analyzer = EmailAnalyzer(db_path=db_path)
+                    analyzer = EmailAnalyzer(db_path=db_path, shared=True)
                     clusters = analyzer.get_topic_clusters(selected_level_option)
                 except Exception as display_error:
                     st.warning(f"Impossible d'afficher les clusters : {display_error}")
@@ -1533,19 +1632,6 @@ else:
         if enhanced_filters.get('has_attachments'):
             filter_dict['has_attachments'] = True
 
-        emails_df = load_data_with_filters(
-            ACTIVE_PROJECT,
-            selected_mailbox_filter,
-            filter_dict,
-            topic_level=selected_topic_level
-        )
-
-        # Apply date range filter if specified in enhanced filters
-        if enhanced_filters.get('date_range'):
-            emails_df = apply_date_filter(emails_df, enhanced_filters['date_range'])
-        else:
-            emails_df = apply_date_filter(emails_df, date_range)
-
         st.subheader("Email Explorer")
 
         # Show comprehensive filter status (using legacy for now)
@@ -1554,28 +1640,32 @@ else:
         # Email list with filter
         search_term = st.text_input("Search in emails:")
 
-        if search_term:
-            filtered_df = emails_df[
-                emails_df["subject"].str.contains(search_term, case=False, na=False) |
-                emails_df["body"].str.contains(search_term, case=False, na=False)
-            ]
-        else:
-            filtered_df = emails_df
-
-        # Display filtered emails with interactive viewer
-        st.write(f"Showing {len(filtered_df)} emails")
-        create_email_table_with_viewer(filtered_df, key_prefix="explorer")
+        # Pages of the list are read from the database as they are displayed
+        analyzer = EmailAnalyzer(db_path=os.path.join(project_root, 'data', 'Projects', ACTIVE_PROJECT, f"{ACTIVE_PROJECT}.duckdb"), shared=True)
+        try:
+            explorer_query = analyzer.email_list_query(
+                mailbox=selected_mailbox_filter,
+                filters=filter_dict,
+                date_range=enhanced_filters.get('date_range') or date_range,
+                topic_level=selected_topic_level,
+                search=search_term
+            )
+            create_paginated_email_table(analyzer, explorer_query, key_prefix="explorer")
+        except Exception as e:
+            st.error(f"Error loading emails from DuckDB: {e}")
+        finally:
+            analyzer.close()
 
     elif page == "Network Analysis":
         emails_df = load_data_with_filters(
             ACTIVE_PROJECT,
             selected_mailbox,
             additional_filters,
-            topic_level=selected_topic_level
+            topic_level=selected_topic_level,
+            date_range=date_range
         )
-
-        # Apply date range filter
-        emails_df = apply_date_filter(emails_df, date_range)
+        record_date_filter(date_range, ACTIVE_PROJECT, selected_mailbox, additional_filters, selected_topic_level,
+                           filtered_count=len(emails_df))
 
         st.subheader("Email Network Analysis")
 
@@ -1597,52 +1687,71 @@ else:
 
     # Debugging timeline temporary page
     elif page == "Timeline":
-        emails_df = load_data_with_filters(
+        # Counts from the rollup tables, the email rows are only loaded when a filter needs them
+        activity = load_activity_rollup(
             ACTIVE_PROJECT,
             selected_mailbox,
             additional_filters,
-            use_agg_recipients=True,
+            date_range,
             topic_level=selected_topic_level
         )
 
-        # Apply date range filter
-        emails_df = apply_date_filter(emails_df, date_range)
+        if activity:
+            st.subheader("Email Timeline")
 
-        st.subheader("Email Timeline")
+            # Show comprehensive filter status
+            show_comprehensive_filter_status(additional_filters, email_filters)
 
-        # Show comprehensive filter status
-        show_comprehensive_filter_status(additional_filters, email_filters)
+            st.write(f"Total emails: {activity['totals']['total']}")
+            st.plotly_chart(create_timeline_from_counts(activity['timeline'], activity['time_unit']),
+                            use_container_width=True)
+        else:
+            emails_df = load_data_with_filters(
+                ACTIVE_PROJECT,
+                selected_mailbox,
+                additional_filters,
+                use_agg_recipients=True,
+                topic_level=selected_topic_level,
+                date_range=date_range
+            )
+            record_date_filter(date_range, ACTIVE_PROJECT, selected_mailbox, additional_filters,
+                               selected_topic_level, filtered_count=len(emails_df))
 
-        # Print debug information
-        st.write(f"Total emails loaded: {len(emails_df)}")
+            st.subheader("Email Timeline")
 
-        # Check and fix the date column if needed
-        if 'date' in emails_df.columns:
-            # If dates are stored as string representations of Timestamp objects
-            if emails_df['date'].dtype == 'object' and emails_df['date'].astype(str).str.contains('Timestamp').any():
-                # Extract the actual date from the Timestamp string
-                emails_df['date'] = emails_df['date'].astype(str).str.extract(r"Timestamp\('([^']+)'\)")[0]
+            # Show comprehensive filter status
+            show_comprehensive_filter_status(additional_filters, email_filters)
+
+            # Print debug information
+            st.write(f"Total emails loaded: {len(emails_df)}")
+
+            # Check and fix the date column if needed
+            if 'date' in emails_df.columns:
+                # If dates are stored as string representations of Timestamp objects
+                if emails_df['date'].dtype == 'object' and emails_df['date'].astype(str).str.contains('Timestamp').any():
+                    # Extract the actual date from the Timestamp string
+                    emails_df['date'] = emails_df['date'].astype(str).str.extract(r"Timestamp\('([^']+)'\)")[0]
 
-            # Convert to datetime
-            emails_df['date'] = pd.to_datetime(emails_df['date'], errors='coerce')
+                # Convert to datetime
+                emails_df['date'] = pd.to_datetime(emails_df['date'], errors='coerce')
 
-            # Show the date range for debugging
-            if not emails_df['date'].isna().all():
-                st.write(f"Date range: {emails_df['date'].min()} to {emails_df['date'].max()}")
+                # Show the date range for debugging
+                if not emails_df['date'].isna().all():
+                    st.write(f"Date range: {emails_df['date'].min()} to {emails_df['date'].max()}")
 
-        # Check the direction column
-        if 'direction' in emails_df.columns:
-            # Show unique values in the direction column
-            directions = emails_df['direction'].unique()
-            st.write(f"Direction values found: {directions}")
+            # Check the direction column
+            if 'direction' in emails_df.columns:
+                # Show unique values in the direction column
+                directions = emails_df['direction'].unique()
+                st.write(f"Direction values found: {directions}")
 
-            # If needed, normalize direction values (case insensitive match)
-            emails_df['direction'] = emails_df['direction'].str.lower()
-            emails_df.loc[emails_df['direction'].str.contains('sent|outgoing|out'), 'direction'] = 'sent'
-            emails_df.loc[emails_df['direction'].str.contains('received|incoming|in'), 'direction'] = 'received'
+                # If needed, normalize direction values (case insensitive match)
+                emails_df['direction'] = emails_df['direction'].str.lower()
+                emails_df.loc[emails_df['direction'].str.contains('sent|outgoing|out'), 'direction'] = 'sent'
+                emails_df.loc[emails_df['direction'].str.contains('received|incoming|in'), 'direction'] = 'received'
 
-        # Now create the timeline with the fixed dataframe
-        st.plotly_chart(create_timeline(emails_df), use_container_width=True)
+            # Now create the timeline with the fixed dataframe
+            st.plotly_chart(create_timeline(emails_df), use_container_width=True)
 
     elif page == "Recherche Sémantique":
         # Add working dropdown filters to search page
@@ -1674,17 +1783,15 @@ else:
         if enhanced_filters.get('has_attachments'):
             filter_dict['has_attachments'] = True
 
+        page_date_range = enhanced_filters.get('date_range') or date_range
         emails_df = load_data(
             ACTIVE_PROJECT,
             selected_mailbox_filter,
-            topic_level=selected_topic_level
+            topic_level=selected_topic_level,
+            date_range=page_date_range
         )
-
-        # Apply date range filter if specified
-        if enhanced_filters.get('date_range'):
-            emails_df = apply_date_filter(emails_df, enhanced_filters['date_range'])
-        else:
-            emails_df = apply_date_filter(emails_df, date_range)
+        record_date_filter(page_date_range, ACTIVE_PROJECT, selected_mailbox_filter, {}, selected_topic_level,
+                           filtered_count=len(emails_df))
 
         # Initialize Elasticsearch (mock mode)
         st.write("Cette interface vous permet de rechercher dans vos archives d'emails avec des filtres avancés.")
@@ -1812,17 +1919,15 @@ else:
         if enhanced_filters.get('has_attachments'):
             filter_dict['has_attachments'] = True
 
+        page_date_range = enhanced_filters.get('date_range') or date_range
         emails_df = load_data(
             ACTIVE_PROJECT,
             selected_mailbox_filter,
-            topic_level=selected_topic_level
+            topic_level=selected_topic_level,
+            date_range=page_date_range
         )
-
-        # Apply date range filter if specified
-        if enhanced_filters.get('date_range'):
-            emails_df = apply_date_filter(emails_df, enhanced_filters['date_range'])
-        else:
-            emails_df = apply_date_filter(emails_df, date_range)
+        record_date_filter(page_date_range, ACTIVE_PROJECT, selected_mailbox_filter, {}, selected_topic_level,
+                           filtered_count=len(emails_df))
 
         st.session_state.emails_df = emails_df
 
@@ -2151,11 +2256,11 @@ else:
         emails_df = load_data(
             ACTIVE_PROJECT,
             selected_mailbox,
-            topic_level=selected_topic_level
+            topic_level=selected_topic_level,
+            date_range=date_range
         )
-
-        # Apply date range filter
-        emails_df = apply_date_filter(emails_df, date_range)
+        record_date_filter(date_range, ACTIVE_PROJECT, selected_mailbox, {}, selected_topic_level,
+                           filtered_count=len(emails_df))
 
         # Initialize the RAG system (if needed)
         try:
@@ -2258,11 +2363,11 @@ else:
             emails_df = load_data(
                 ACTIVE_PROJECT,
                 selected_mailbox,
-                topic_level=selected_topic_level
+                topic_level=selected_topic_level,
+                date_range=date_range
             )
-
-            # Apply date range filter
-            emails_df = apply_date_filter(emails_df, date_range)
+            record_date_filter(date_range, ACTIVE_PROJECT, selected_mailbox, {}, selected_topic_level,
+                               filtered_count=len(emails_df))
 
             render_colbert_rag_component(emails_df)
         except ImportError as e:
@@ -2336,11 +2441,11 @@ else:
         emails_df = load_data(
             ACTIVE_PROJECT,
             selected_mailbox,
-            topic_level=selected_topic_level
+            topic_level=selected_topic_level,
+            date_range=date_range
         )
-
-        # Apply date range filter
-        emails_df = apply_date_filter(emails_df, date_range)
+        record_date_filter(date_range, ACTIVE_PROJECT, selected_mailbox, {}, selected_topic_level,
+                           filtered_count=len(emails_df))
 
         # Import and render the Chat + RAG component
         try:
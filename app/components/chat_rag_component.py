@@ -25,7 +25,7 @@ from typing import List, Dict, Any, Tuple, Optional
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 # Import required modules from the project
-from src.rag.colbert_rag import search_with_colbert, format_result_preview
+from src.rag.colbert_rag import format_result_preview, index_rag_mode, search_with_colbert
 from src.llm.openrouter import openrouter_llm_api_call, openrouter_llm_api_call_with_historic
 from src.llm.agents import RAGOrchestrator, get_rag_parameters
 import constants
@@ -391,7 +391,9 @@ def render_chat_rag_component(emails_df: pd.DataFrame):
                     query=user_question,
                     path_to_metadata=path_to_metadata,
                     ragatouille_index_path=ragatouille_index_path,
-                    top_k=final_k
+                    top_k=final_k,
+                    project_name=active_project,
+                    rag_mode=index_rag_mode(path_to_metadata)
                 )
                 search_time = time.time() - search_start
                 
@@ -20,7 +20,7 @@ from components.email_viewer import create_email_table_with_viewer
 RAGATOUILLE_AVAILABLE = True
 try:
     from src.rag.colbert_initialization import initialize_colbert_rag_system
-    from src.rag.colbert_rag import colbert_rag_answer, search_with_colbert
+    from src.rag.colbert_rag import colbert_rag_answer, index_rag_mode, search_with_colbert
 import constants
 except ImportError as e:
     print(f"RAGAtouille import failed: {e}")
@@ -128,7 +128,9 @@ def render_colbert_rag_component(emails_df: pd.DataFrame):
                         query=search_query,
                         path_to_metadata=path_to_metadata,
                         ragatouille_index_path=ragatouille_index_path,
-                        top_k=top_k
+                        top_k=top_k,
+                        project_name=active_project,
+                        rag_mode=index_rag_mode(path_to_metadata)
                     )
                     search_time = time.time() - start_time
 
@@ -194,7 +196,9 @@ def render_colbert_rag_component(emails_df: pd.DataFrame):
                             query=user_query,
                             path_to_metadata=path_to_metadata,
                             ragatouille_index_path=ragatouille_index_path,
-                            top_k=3
+                            top_k=3,
+                            project_name=active_project,
+                            rag_mode=index_rag_mode(path_to_metadata)
                         )
                         elapsed_time = time.time() - start_time
 
@@ -10,6 +10,7 @@ from typing import Callable, Dict, Any, List, Optional
 import os
 import sys
 import json
+from dataclasses import replace
 # Using native st.dialog instead of streamlit_modal for better reliability
 from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode, DataReturnMode
 import quopri
@@ -28,6 +29,8 @@ except ImportError:
     # Default for testing
     EMAIL_DISPLAY_TYPE = "MODAL"
 
+from src.data.email_pages import page_cursors
+
 # CSS for the email display - enhanced for better modal appearance
 EMAIL_STYLE_CSS = """
 <style>
@@ -799,139 +802,330 @@ def _create_modal_email_table(
         if 0 <= selected_idx < len(emails_df):
             selected_email = emails_df.iloc[selected_idx]
 
-            # Decode the subject and body
-            decoded_subject = decode_email_text(selected_email['subject'])
-
-            # Use st.dialog for modal display with larger size
-            @st.dialog(f"Email: {decoded_subject[:40] if len(decoded_subject) > 40 else decoded_subject}", width="large")
-            def show_email_dialog():
-                # Email metadata in a styled container
-                decoded_from = decode_email_text(selected_email['from'])
-                decoded_to = decode_email_text(selected_email['recipient_email'])
-
-                # Create a styled metadata section
-                st.markdown(
-                    f"""
-                    <div class="email-metadata">
-                        <div class="email-field"><strong>De:</strong> {decoded_from}</div>
-                        <div class="email-field"><strong>À:</strong> {decoded_to}</div>
-                        <div class="email-field"><strong>Date:</strong> {format_email_date(selected_email['date'])}</div>
-                        {f'<div class="email-field"><strong>Pièces jointes:</strong> {decode_email_text(selected_email["attachments"])}</div>' if selected_email.get('has_attachments') else ''}
-                    </div>
-                    """, 
-                    unsafe_allow_html=True
-                )
-
-                # Email body with thread parsing
-                st.markdown('<div class="email-content">', unsafe_allow_html=True)
+            _show_email_dialog(selected_email, selected_idx)
                 
-                # Decode the email body for proper display
-                decoded_body = decode_email_text(selected_email['body'])
-
-                # Parse the email thread
-                thread_messages = parse_email_thread(decoded_body)
-                thread_messages = [
-                    msg for msg in thread_messages
-                    if msg.get('content', '').strip().lower() not in {'</div>', '<div>', ''}
-                ]
-
-                if len(thread_messages) > 1:
-                    # Display as threaded conversation
-                    st.markdown("### 💬 Conversation Thread")
-                    
-                    for i, message in enumerate(thread_messages):
-                        if message['is_reply']:
-                            # Display as a reply block
-                            with st.container():
-                                # Create metadata string
-                                metadata_parts = []
-                                if message['sender']:
-                                    metadata_parts.append(f"de {message['sender']}")
-                                if message['recipient']:
-                                    metadata_parts.append(f"à {message['recipient']}")
-                                if message['date']:
-                                    metadata_parts.append(f"le {message['date']}")
-                                
-                                metadata_str = ' • '.join(metadata_parts) if metadata_parts else ''
-                                
-                                # Create a visual separator for replies
-                                panel_metadata = escape(metadata_str) if metadata_str else ""
-                                reply_subject = escape(message.get("subject") or "")
-
-                                panel_parts = [
-                                    "<div style='border-left: 3px solid #007bff; margin: 15px 0; "
-                                    "padding: 10px 15px; background-color: #f8f9fa; border-radius: 0 8px 8px 0;'>",
-                                    "<div style='font-size: 0.85rem; color: #6c757d; margin-bottom: 8px;'>"
-                                    "📧 <strong>Message précédent</strong>"
-                                    f"{f' ({panel_metadata})' if panel_metadata else ''}"
-                                    "</div>"
-                                ]
-                                if reply_subject:
-                                    panel_parts.append(
-                                        "<div style='font-size: 0.8rem; color: #495057; margin-bottom: 5px;'>"
-                                        f"<strong>Objet:</strong> {reply_subject}</div>"
-                                    )
-                                panel_parts.append("</div>")
-                                panel_html = "".join(panel_parts)
-
-                                st.markdown(panel_html, unsafe_allow_html=True)
-
-                                reply_content = _clean_html_artifacts(message['content'])
-                                # print("reply_content:", reply_content)
-
-                                # Calculate height for this message
-                                message_height = max(min(len(reply_content.splitlines()) * 16, 250), 100)
-
-                                st.text_area(
-                                    "Message",
-                                    value=reply_content,
-                                    height=message_height,
-                                    disabled=True,
-                                    key=f"thread_message_{selected_idx}_{i}",
-                                    label_visibility="collapsed"
-                                )
-                        else:
-                            # Display as main message
-                            if i == 0:
-                                st.markdown("**📝 Message principal:**")
-
-                            main_content = _clean_html_artifacts(message['content'])
-
-                            # Calculate height for main message
-                            main_height = max(min(len(main_content.splitlines()) * 20, 300), 150)
-
-                            st.text_area(
-                                "Message principal",
-                                value=main_content,
-                                height=main_height,
-                                disabled=True,
-                                key=f"main_message_{selected_idx}_{i}",
-                                label_visibility="collapsed"
+        else:
+            # Invalid index
+            st.session_state[selected_email_key] = None
+
+EXPLORER_SORT_OPTIONS = {
+    'date': "Date",
+    'from': "De",
+    'recipient_email': "À",
+    'subject': "Sujet",
+}
+
+def create_paginated_email_table(analyzer, query, key_prefix: str = "email_table") -> None:
+    """
+    Create an interactive email table reading one page at a time from the database.
+
+    Only the visible page of light columns is loaded (keyset pagination on the sort key
+    and the email id); sorting happens in the database and the body of an email is
+    loaded by primary key when its row is clicked.
+
+    Args:
+        analyzer: EmailAnalyzer of the project database
+        query: EmailListQuery describing the filters and the search
+        key_prefix: Prefix for Streamlit keys to avoid conflicts
+
+    Returns:
+        None
+    """
+    sort_col, order_col = st.columns([3, 1])
+    with sort_col:
+        sort = st.selectbox(
+            "Trier par:",
+            options=list(EXPLORER_SORT_OPTIONS),
+            index=list(EXPLORER_SORT_OPTIONS).index(query.sort),
+            format_func=EXPLORER_SORT_OPTIONS.get,
+            key=f"{key_prefix}_sort"
+        )
+    with order_col:
+        descending = st.selectbox(
+            "Ordre:",
+            options=[True, False],
+            index=0 if query.descending else 1,
+            format_func=lambda value: "Décroissant" if value else "Croissant",
+            key=f"{key_prefix}_order"
+        )
+    query = replace(query, sort=sort, descending=descending)
+
+    # Session state: position in the list, kept while the filters and the order stay the same
+    list_key = f"{key_prefix}_list"
+    page_key = f"{key_prefix}_current_page"
+    anchor_key = f"{key_prefix}_anchor"
+    cursors_key = f"{key_prefix}_cursors"
+    selected_email_key = f"{key_prefix}_selected_id"
+    prev_selection_key = f"{key_prefix}_prev_selection"
+
+    list_signature = f"{query.signature}|{query.sort}|{query.descending}"
+    if st.session_state.get(list_key) != list_signature:
+        st.session_state[list_key] = list_signature
+        st.session_state[page_key] = 1
+        st.session_state[anchor_key] = None
+        st.session_state[cursors_key] = (None, None)
+        st.session_state[selected_email_key] = None
+        st.session_state[prev_selection_key] = None
+
+    total_items = analyzer.count_email_list(query)
+    if total_items == 0:
+        st.info("Aucun email à afficher.")
+        return
+
+    ITEMS_PER_PAGE = 50
+    total_pages = (total_items + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE  # Ceiling division
+    current_page = min(max(st.session_state[page_key], 1), total_pages)
+
+    # Next/previous pages seek from the cursor of the displayed page, jumps go by page number
+    anchor = st.session_state[anchor_key]
+    page_df = None
+    if anchor is not None and anchor[0] == 'after':
+        page_df = analyzer.get_email_page(query, after=anchor[1], limit=ITEMS_PER_PAGE)
+    elif anchor is not None and anchor[0] == 'before':
+        page_df = analyzer.get_email_page(query, before=anchor[1], limit=ITEMS_PER_PAGE)
+    if page_df is None or page_df.empty:
+        page_df = analyzer.get_email_page(query, page=current_page, total=total_items, limit=ITEMS_PER_PAGE)
+    first_cursor, last_cursor = page_cursors(page_df)
+
+    def go_to(page, new_anchor=None):
+        st.session_state[page_key] = page
+        st.session_state[anchor_key] = new_anchor
+        st.session_state[selected_email_key] = None  # Clear selection on page change
+        st.session_state[prev_selection_key] = None  # Clear selection tracking
+        st.rerun()
+
+    start_idx = (current_page - 1) * ITEMS_PER_PAGE
+    end_idx = start_idx + len(page_df)
+
+    # Inject CSS for styling the table and modal
+    st.markdown(EMAIL_STYLE_CSS, unsafe_allow_html=True)
+
+    if total_pages > 1:
+        st.caption(f"Cliquez sur une ligne du tableau pour voir le contenu de l'email | Page {current_page} sur {total_pages} | Affichage des emails {start_idx + 1}-{end_idx} sur {total_items}")
+    else:
+        st.caption(f"Cliquez sur une ligne du tableau pour voir le contenu de l'email | Affichage de {total_items} emails")
+
+    display_df = page_df[['email_id', 'date', 'from', 'recipient_email', 'subject']].copy()
+    display_df['date'] = display_df['date'].apply(format_email_date)
+    for column in ['from', 'recipient_email', 'subject']:
+        display_df[column] = display_df[column].apply(decode_email_text)
+
+    gb = GridOptionsBuilder.from_dataframe(display_df)
+    gb.configure_default_column(sortable=False)  # Sorted by the database
+    gb.configure_selection(
+        selection_mode="single",
+        use_checkbox=False,
+        pre_selected_rows=[],
+        rowMultiSelectWithClick=False,
+        suppressRowClickSelection=False
+    )
+    gb.configure_column("email_id", hide=True)
+    gb.configure_column("date", header_name="Date", width=120)
+    gb.configure_column("from", header_name="De", width=200)
+    gb.configure_column("recipient_email", header_name="À", width=200)
+    gb.configure_column("subject", header_name="Sujet", flex=1)
+    gb.configure_grid_options(
+        onRowClicked="function(params) { params.api.selectNode(params.node, true); }",
+        suppressRowDeselection=True,
+        suppressCellSelection=True,
+        animateRows=False
+    )
+
+    grid_response = AgGrid(
+        display_df,
+        gridOptions=gb.build(),
+        data_return_mode=DataReturnMode.AS_INPUT,
+        update_mode=GridUpdateMode.SELECTION_CHANGED,
+        fit_columns_on_grid_load=True,
+        allow_unsafe_jscode=True,
+        key=f"{key_prefix}_aggrid_{hash(list_signature)}_{first_cursor}",
+        reload_data=False,
+        height=420
+    )
+
+    if total_pages > 1:
+        st.markdown("---")
+        col1, col2, col3, col4, col5, col6, col7 = st.columns([1, 1, 1, 1, 1.5, 1.5, 1])
+
+        with col1:
+            if st.button("⏮️ Premier", key=f"{key_prefix}_first_page", disabled=(current_page == 1)):
+                go_to(1)
+        with col2:
+            if st.button("⏪ Précédent", key=f"{key_prefix}_prev_page", disabled=(current_page == 1)):
+                go_to(current_page - 1, ('before', first_cursor))
+        with col3:
+            if st.button("Suivant ⏩", key=f"{key_prefix}_next_page", disabled=(current_page == total_pages)):
+                go_to(current_page + 1, ('after', last_cursor))
+        with col4:
+            if st.button("⏭️ Dernier", key=f"{key_prefix}_last_page", disabled=(current_page == total_pages)):
+                go_to(total_pages)
+        with col5:
+            st.markdown(f"<div style='text-align: center; padding-top: 8px;'><strong>Page {current_page}/{total_pages}</strong></div>", unsafe_allow_html=True)
+        with col6:
+            target_page = st.number_input(
+                "Aller à la page:",
+                min_value=1,
+                max_value=total_pages,
+                value=current_page,
+                key=f"{key_prefix}_page_input",
+                label_visibility="collapsed"
+            )
+        with col7:
+            if st.button("Aller", key=f"{key_prefix}_go_page"):
+                go_to(int(target_page))
+
+    # The grid returns the hidden email_id of the clicked row
+    selected_rows = grid_response['selected_rows'] if hasattr(grid_response, '__getitem__') else None
+    selected_id = None
+    if selected_rows is not None and len(selected_rows) > 0:
+        selected_row = selected_rows.iloc[0] if hasattr(selected_rows, 'iloc') else selected_rows[0]
+        selected_id = selected_row.get('email_id')
+
+    if selected_id is not None and selected_id != st.session_state[prev_selection_key]:
+        st.session_state[prev_selection_key] = selected_id
+        st.session_state[selected_email_key] = selected_id
+    elif selected_id is None:
+        st.session_state[prev_selection_key] = None
+
+    if st.session_state[selected_email_key] is not None:
+        selected_email = analyzer.get_email_details(st.session_state[selected_email_key])
+        if selected_email is not None:
+            _show_email_dialog(selected_email, st.session_state[selected_email_key])
+        else:
+            st.session_state[selected_email_key] = None
+
+def _show_email_dialog(selected_email, widget_key) -> None:
+    """Open the dialog showing the content of an email (a row or a dictionary of its fields)."""
+    # Decode the subject and body
+    decoded_subject = decode_email_text(selected_email['subject'])
+
+    # Use st.dialog for modal display with larger size
+    @st.dialog(f"Email: {decoded_subject[:40] if len(decoded_subject) > 40 else decoded_subject}", width="large")
+    def show_email_dialog():
+        # Email metadata in a styled container
+        decoded_from = decode_email_text(selected_email['from'])
+        decoded_to = decode_email_text(selected_email['recipient_email'])
+
+        # Create a styled metadata section
+        st.markdown(
+            f"""
+            <div class="email-metadata">
+                <div class="email-field"><strong>De:</strong> {decoded_from}</div>
+                <div class="email-field"><strong>À:</strong> {decoded_to}</div>
+                <div class="email-field"><strong>Date:</strong> {format_email_date(selected_email['date'])}</div>
+                {f'<div class="email-field"><strong>Pièces jointes:</strong> {decode_email_text(selected_email["attachments"])}</div>' if selected_email.get('has_attachments') else ''}
+            </div>
+            """, 
+            unsafe_allow_html=True
+        )
+
+        # Email body with thread parsing
+        st.markdown('<div class="email-content">', unsafe_allow_html=True)
+
+        # Decode the email body for proper display
+        decoded_body = decode_email_text(selected_email['body'])
+
+        # Parse the email thread
+        thread_messages = parse_email_thread(decoded_body)
+        thread_messages = [
+            msg for msg in thread_messages
+            if msg.get('content', '').strip().lower() not in {'</div>', '<div>', ''}
+        ]
+
+        if len(thread_messages) > 1:
+            # Display as threaded conversation
+            st.markdown("### 💬 Conversation Thread")
+
+            for i, message in enumerate(thread_messages):
+                if message['is_reply']:
+                    # Display as a reply block
+                    with st.container():
+                        # Create metadata string
+                        metadata_parts = []
+                        if message['sender']:
+                            metadata_parts.append(f"de {message['sender']}")
+                        if message['recipient']:
+                            metadata_parts.append(f"à {message['recipient']}")
+                        if message['date']:
+                            metadata_parts.append(f"le {message['date']}")
+
+                        metadata_str = ' • '.join(metadata_parts) if metadata_parts else ''
+
+                        # Create a visual separator for replies
+                        panel_metadata = escape(metadata_str) if metadata_str else ""
+                        reply_subject = escape(message.get("subject") or "")
+
+                        panel_parts = [
+                            "<div style='border-left: 3px solid #007bff; margin: 15px 0; "
+                            "padding: 10px 15px; background-color: #f8f9fa; border-radius: 0 8px 8px 0;'>",
+                            "<div style='font-size: 0.85rem; color: #6c757d; margin-bottom: 8px;'>"
+                            "📧 <strong>Message précédent</strong>"
+                            f"{f' ({panel_metadata})' if panel_metadata else ''}"
+                            "</div>"
+                        ]
+                        if reply_subject:
+                            panel_parts.append(
+                                "<div style='font-size: 0.8rem; color: #495057; margin-bottom: 5px;'>"
+                                f"<strong>Objet:</strong> {reply_subject}</div>"
                             )
+                        panel_parts.append("</div>")
+                        panel_html = "".join(panel_parts)
+
+                        st.markdown(panel_html, unsafe_allow_html=True)
+
+                        reply_content = _clean_html_artifacts(message['content'])
+                        # print("reply_content:", reply_content)
+
+                        # Calculate height for this message
+                        message_height = max(min(len(reply_content.splitlines()) * 16, 250), 100)
+
+                        st.text_area(
+                            "Message",
+                            value=reply_content,
+                            height=message_height,
+                            disabled=True,
+                            key=f"thread_message_{widget_key}_{i}",
+                            label_visibility="collapsed"
+                        )
                 else:
-                    # Single message - display normally
-                    cleaned_body = _clean_html_artifacts(decoded_body)
-                    content_height = max(min(len(cleaned_body.splitlines()) * 20, 500), 200)
-                    
+                    # Display as main message
+                    if i == 0:
+                        st.markdown("**📝 Message principal:**")
+
+                    main_content = _clean_html_artifacts(message['content'])
+
+                    # Calculate height for main message
+                    main_height = max(min(len(main_content.splitlines()) * 20, 300), 150)
+
                     st.text_area(
-                        "Contenu de l'email",
-                        value=cleaned_body,
-                        height=content_height,
+                        "Message principal",
+                        value=main_content,
+                        height=main_height,
                         disabled=True,
-                        key=f"dialog_textarea_{selected_idx}",
+                        key=f"main_message_{widget_key}_{i}",
                         label_visibility="collapsed"
                     )
-                
-                st.markdown('</div>', unsafe_allow_html=True)
-
-                # Dialog closes automatically with native Streamlit controls
-            
-            # Show the dialog
-            show_email_dialog()
-                
         else:
-            # Invalid index
-            st.session_state[selected_email_key] = None
+            # Single message - display normally
+            cleaned_body = _clean_html_artifacts(decoded_body)
+            content_height = max(min(len(cleaned_body.splitlines()) * 20, 500), 200)
+
+            st.text_area(
+                "Contenu de l'email",
+                value=cleaned_body,
+                height=content_height,
+                disabled=True,
+                key=f"dialog_textarea_{widget_key}",
+                label_visibility="collapsed"
+            )
+
+        st.markdown('</div>', unsafe_allow_html=True)
+
+        # Dialog closes automatically with native Streamlit controls
+
+    # Show the dialog
+    show_email_dialog()
+
 
 if __name__ == "__main__":
     # Test code - this will run when the module is executed directly
@@ -0,0 +1,178 @@
+"""
+Pipeline job panel for the Olkoa project.
+
+Displays the progress of the background data preparation job of a project (stages,
+timings, errors, log) and refreshes itself while the job runs.
+"""
+
+import os
+import sys
+from datetime import datetime
+from typing import Callable, Optional
+
+import pandas as pd
+import streamlit
+
+# Add the project root to the path so we can import src
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.data.pipeline_jobs import (
+    JOB_COMPLETED,
+    JOB_FAILED,
+    JOB_INTERRUPTED,
+    JOB_RUNNING,
+    STAGE_DONE,
+    STAGE_FAILED,
+    STAGE_RUNNING,
+    in_job_thread,
+    job_progress,
+    load_job,
+    read_job_log,
+)
+
+POLL_SECONDS = 5
+
+STATUS_LABELS = {
+    "pending": "⏳ En attente",
+    JOB_RUNNING: "🔄 En cours",
+    JOB_COMPLETED: "✅ Terminé",
+    JOB_FAILED: "❌ Échec",
+    JOB_INTERRUPTED: "⏸️ Interrompu",
+}
+
+STAGE_LABELS = {
+    "pending": "⏳",
+    STAGE_RUNNING: "🔄",
+    STAGE_DONE: "✅",
+    STAGE_FAILED: "❌",
+}
+
+
+class _Silent:
+    """Absorbs every call, used for spinners and progress widgets inside jobs"""
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+    def __getattr__(self, name):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class JobAwareStreamlit:
+    """The streamlit module, for pages whose helpers also run inside pipeline jobs
+
+    In a job thread there is no browser session: messages (st.info, st.error, ...) are
+    printed, hence written to the job log, and widgets are ignored. Anywhere else every
+    attribute is streamlit's own.
+    """
+
+    MESSAGE_LEVELS = {"info": "INFO", "success": "OK", "warning": "WARNING", "error": "ERROR",
+                      "caption": None, "write": None, "markdown": None, "text": None}
+
+    def __init__(self, module):
+        self._module = module
+
+    def __getattr__(self, name):
+        if in_job_thread():
+            if name in self.MESSAGE_LEVELS:
+                level = self.MESSAGE_LEVELS[name]
+
+                def _log(body="", *args, **kwargs):
+                    print(f"[{level}] {body}" if level else f"{body}")
+                return _log
+            if name in ("spinner", "progress", "empty", "status", "toast", "container"):
+                return _Silent()
+        return getattr(self._module, name)
+
+
+def _format_seconds(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return ""
+    total_seconds = int(round(seconds))
+    hours, remainder = divmod(total_seconds, 3600)
+    minutes, secs = divmod(remainder, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}mn{secs:02d}s"
+    if minutes:
+        return f"{minutes}mn{secs:02d}s"
+    return f"{secs}s"
+
+
+def _stage_table(record) -> pd.DataFrame:
+    rows = []
+    for stage in record.get("stages", []):
+        duration = stage.get("duration_seconds")
+        if stage["status"] == STAGE_RUNNING and stage.get("started_at"):
+            duration = (datetime.now() - datetime.fromisoformat(stage["started_at"])).total_seconds()
+        rows.append({
+            "": STAGE_LABELS.get(stage["status"], stage["status"]),
+            "Étape": stage["label"],
+            "Durée": _format_seconds(duration),
+            "Tentatives": stage.get("attempts", 0),
+            "Erreur": stage.get("error") or "",
+        })
+    return pd.DataFrame(rows)
+
+
+def show_pipeline_job_panel(project_name: str, project_path: str,
+                            on_resume: Callable[[dict, bool], None],
+                            on_abandon: Optional[Callable[[dict], None]] = None) -> None:
+    """Progress panel of the data preparation job of a project
+
+    Args:
+        project_name: Project whose job is shown
+        project_path: Project directory (where the job record lives)
+        on_resume: Called with (record, restart) to resume the job, or restart it from scratch
+        on_abandon: Called with the record to give up a failed project (optional)
+    """
+    st = streamlit
+    record = load_job(project_path)
+    if record is None:
+        return
+
+    running = record["status"] == JOB_RUNNING
+    state_key = f"pipeline_job_running_{project_name}"
+
+    @st.fragment(run_every=POLL_SECONDS if running else None)
+    def _panel():
+        current = load_job(project_path) or record
+        was_running = st.session_state.get(state_key, False)
+        now_running = current["status"] == JOB_RUNNING
+        st.session_state[state_key] = now_running
+        if was_running and not now_running:
+            # Leave polling mode and refresh the project list
+            st.rerun()
+
+        done, total = job_progress(current)
+        st.markdown(f"**{project_name}** — {STATUS_LABELS.get(current['status'], current['status'])}")
+        st.progress(done / total if total else 0.0, text=f"{done}/{total} étapes terminées")
+        if current.get("error"):
+            st.error(current["error"])
+        st.dataframe(_stage_table(current), hide_index=True, use_container_width=True)
+
+        with st.expander("Journal du pipeline"):
+            st.code(read_job_log(project_path) or "(vide)", language=None)
+
+        if current["status"] in (JOB_FAILED, JOB_INTERRUPTED):
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                if st.button("▶️ Reprendre", key=f"resume_job_{project_name}", type="primary"):
+                    on_resume(current, False)
+                    st.rerun()
+            with col2:
+                if st.button("🔁 Tout relancer", key=f"restart_job_{project_name}"):
+                    on_resume(current, True)
+                    st.rerun()
+            with col3:
+                if on_abandon is not None and st.button("🗑️ Abandonner le projet", key=f"abandon_job_{project_name}"):
+                    on_abandon(current)
+                    st.rerun()
+
+    with st.container(border=True):
+        _panel()
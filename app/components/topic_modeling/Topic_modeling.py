@@ -41,6 +41,9 @@ from .kdist import k_distance_plot
 from .data_proc2 import update_df_with_medoid_indices
 from .hierachical_clust import hierarchical_clustering
 from .cluster_tree import build_cluster_tree
+from src.data.rollups import refresh_rollups
+from src.data.snapshots import build_snapshot
+from src.data.topic_settings import clear_topic_selection
 
 
 # Resolve repository root (…/olkoa)
@@ -168,7 +171,8 @@ def _persist_topics_to_db(project_name: str, module_dir: Path):
             print(f"[topics] DuckDB database not found at {db_path}; skipping persistence.")
             return
 
-        with duckdb.connect(str(db_path)) as con:
+        # Written into a new snapshot of the database, published once complete (see snapshots)
+        with build_snapshot(db_path) as snapshot_path, duckdb.connect(str(snapshot_path)) as con:
             con.execute("DROP TABLE IF EXISTS topic_clusters")
             con.execute("DROP TABLE IF EXISTS email_topic_clusters")
             con.execute("DROP TABLE IF EXISTS topic_settings")
@@ -262,18 +266,26 @@ def _persist_topics_to_db(project_name: str, module_dir: Path):
                     [project_name, int(default_level), float(default_height)]
                 )
 
+            try:
+                # Topic counts of the dashboard and the timeline
+                refresh_rollups(con)
+            except Exception as rollup_error:
+                print(f"[topics] Unable to refresh the activity rollups: {rollup_error}")
+
+        # The new tree starts from the default level written above
+        clear_topic_selection(db_path)
         print(f"[topics] Persisted topic data for project {project_name}.")
     except Exception as error:
         print(f"[topics] Unexpected error while persisting topics: {error}")
 
 
-def topic_build(topics_graphs_path: Path | None = None):
-    """Extract EML content for the active project to support topic modeling."""
+def topic_build(topics_graphs_path: Path | None = None, project_name: str | None = None):
+    """Extract EML content for a project (the active one by default) to support topic modeling."""
     nltk.download("stopwords")
 
     load_dotenv()
 
-    ACTIVE_PROJECT = os.getenv("ACTIVE_PROJECT")
+    ACTIVE_PROJECT = project_name or os.getenv("ACTIVE_PROJECT")
 
     if not ACTIVE_PROJECT:
         print("🔁 ACTIVE_PROJECT environment variable is not set; skipping topic_build.")
@@ -292,6 +304,7 @@ def topic_build(topics_graphs_path: Path | None = None):
         EML_FOLDER=str(eml_folder),
         MAILBOX_NAME="Boîte envoyés",
         MAILBOX_PATH=str(eml_folder),
+        db_path=eml_folder / f"{ACTIVE_PROJECT}.duckdb",
     ) # eml_json
 
     bertopic_modeling() # bertopicgpu
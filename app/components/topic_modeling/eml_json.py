@@ -7,6 +7,8 @@ from datetime import datetime
 from bs4 import BeautifulSoup
 from pathlib import Path
 
+from src.data.message_store import has_parsed_messages, iter_parsed_messages
+
 
 def _sanitize_string(value):
     """Return a UTF-8 safe string, replacing any surrogate characters."""
@@ -22,6 +24,48 @@ def _sanitize_string(value):
 # MAILBOX_PATH = "processed/celine.guyon/Boîte de réception"
 
 
+def _select_body(plain_body, html_body):
+    """Plain text body, or the text of the HTML body when there is no plain text"""
+    body = (plain_body or "").strip()
+    if not body and html_body:
+        # Clean HTML body with BeautifulSoup
+        soup = BeautifulSoup(html_body, "html.parser")
+        # remove script and style tags
+        for tag in soup(["script", "style"]):
+            tag.decompose()
+        body = soup.get_text(separator=" ", strip=True)
+    return _sanitize_string(body)
+
+
+def _unix_timestamp(date_hdr):
+    """Convert a Date header to a Unix timestamp"""
+    if not date_hdr:
+        return None
+    try:
+        date_parsed = email.utils.parsedate_to_datetime(str(date_hdr))
+        return int(date_parsed.timestamp())
+    except Exception:
+        return None
+
+
+def email_fields_from_store(row, MAILBOX_NAME, MAILBOX_PATH):
+    """Same fields as extract_email_fields, from a row of the parsed message store."""
+    return {
+        "message_id": _sanitize_string(row["message_id"]),
+        "date": _unix_timestamp(row["date_header"]),
+        "mailbox_name": _sanitize_string(MAILBOX_NAME),
+        "direction": "received",
+        "from": _sanitize_string(row["from_header"]),
+        "to": _sanitize_string(row["to_header"]),
+        "cc": _sanitize_string(row["cc_header"]),
+        "subject": _sanitize_string(row["subject"]),
+        "body": _select_body(row["text_body"], row["html_body"]),
+        "has_attachments": bool(row["attachment_names"]),
+        "mailbox": _sanitize_string(MAILBOX_PATH),
+        "file_name": _sanitize_string(row["file_name"])
+    }
+
+
 def extract_email_fields(eml_path, MAILBOX_NAME,MAILBOX_PATH):
     """Extract all relevant fields from a .eml file."""
     with open(eml_path, "rb") as f:
@@ -47,32 +91,14 @@ def extract_email_fields(eml_path, MAILBOX_NAME,MAILBOX_PATH):
         elif content_type == "text/html":
             html_body += part.get_content()
 
-    # Clean HTML body with BeautifulSoup
-    body = plain_body.strip()
-    if not body and html_body:
-        soup = BeautifulSoup(html_body, "html.parser")
-        # remove script and style tags
-        for tag in soup(["script", "style"]):
-            tag.decompose()
-        body = soup.get_text(separator=" ", strip=True)
-
-    body = _sanitize_string(body)
+    body = _select_body(plain_body, html_body)
 
     # Detect attachments
     has_attachments = any(
         part.get_filename() for part in msg.walk() if part.get_content_disposition() == "attachment"
     )
 
-    # Convert date to Unix timestamp
-    date_hdr = msg.get("Date")
-    if date_hdr:
-        try:
-            date_parsed = email.utils.parsedate_to_datetime(date_hdr)
-            timestamp = int(date_parsed.timestamp())
-        except Exception:
-            timestamp = None
-    else:
-        timestamp = None
+    timestamp = _unix_timestamp(msg.get("Date"))
 
     # Build structured dictionary
     email_data = {
@@ -93,10 +119,27 @@ def extract_email_fields(eml_path, MAILBOX_NAME,MAILBOX_PATH):
     return email_data
 
 
-def run_email_extraction(EML_FOLDER,MAILBOX_NAME,MAILBOX_PATH):
+def run_email_extraction(EML_FOLDER,MAILBOX_NAME,MAILBOX_PATH, db_path=None, output_path=None):
+    """
+    Extract the fields used by topic modeling from every email of a project.
+
+    Args:
+        EML_FOLDER: Folder of the .eml files
+        MAILBOX_NAME: Mailbox name written in every record
+        MAILBOX_PATH: Mailbox path written in every record
+        db_path: Project database; its message store is read instead of the .eml files when complete
+        output_path: JSON output (default: email_output.json next to this module)
+    """
     all_emails = []
 
-    for root, _, files in os.walk(EML_FOLDER):
+    if has_parsed_messages(db_path):
+        for row in iter_parsed_messages(db_path):
+            all_emails.append(email_fields_from_store(row, MAILBOX_NAME, MAILBOX_PATH))
+        emails_walk = []
+    else:
+        emails_walk = os.walk(EML_FOLDER)
+
+    for root, _, files in emails_walk:
         for file in files:
             if file.lower().endswith(".eml"):
                 eml_path = os.path.join(root, file)
@@ -111,7 +154,7 @@ def run_email_extraction(EML_FOLDER,MAILBOX_NAME,MAILBOX_PATH):
                     print(f"⚠️ Error reading {file}: {e}")
 
     # Write all emails to JSON (saved alongside this module)
-    output_path = Path(__file__).resolve().parent / "email_output.json"
+    output_path = Path(output_path) if output_path else Path(__file__).resolve().parent / "email_output.json"
     with output_path.open("w", encoding="utf-8") as f:
         json.dump(all_emails, f, ensure_ascii=False, indent=2)
 
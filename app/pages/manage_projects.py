@@ -24,6 +24,10 @@ import time
 
 from components.logins import make_hashed_password, verify_password, add_user, initialize_users_db
 from components.topic_modeling.Topic_modeling import topic_build
+from components.pipeline_job_panel import JobAwareStreamlit, show_pipeline_job_panel
+
+# The pipeline helpers below also run in background jobs, where messages go to the job log
+st = JobAwareStreamlit(st)
 
 # Add the necessary paths
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
@@ -37,10 +41,13 @@ from dotenv import load_dotenv
 from src.features.pipeline_data_cleaning import prepare_semantic_search
 import constants
 from src.data.s3_utils import S3Handler
-from src.data.mbox_to_eml import convert_folder_mbox_to_eml, mbox_to_eml
+from src.data.eml_shards import extract_shards, find_local_shards
+from src.data.pst_converter import run_pst_conversions
+from src.data.mbox_to_eml import convert_folder_mbox_to_eml, mbox_to_eml, mbox_folder_name
 from src.rag.colbert_initialization import initialize_colbert_rag_system
 from src.data.eml_transformation import generate_duck_db
 from src.data.graph_generation import generate_graphs_for_project
+from src.data.pipeline_jobs import JOB_COMPLETED, PipelineStage, load_job, start_pipeline_job
 
 
 # Page configuration
@@ -142,14 +149,17 @@ else:
             return f"{minutes}mn{seconds:02d}s"
         return f"{seconds}s"
 
-    def timed_step(info_text: str, spinner_text: str, success_text: str, func, *args, **kwargs):
-        st.info(info_text)
+    def timed_step(info_text: str, success_text: str, func, *args, **kwargs):
+        """Run a step of a pipeline stage and time it.
+
+        The stages run in the thread of a background job, without a browser session:
+        progress goes to the job log (and the stage timings to the job record).
+        """
+        print(info_text)
         start = time.perf_counter()
-        result = None
-        with st.spinner(spinner_text):
-            result = func(*args, **kwargs)
+        result = func(*args, **kwargs)
         duration = _format_duration(time.perf_counter() - start)
-        st.success(f"{success_text} en {duration}")
+        print(f"{success_text} en {duration}")
         return result
 
     # Function to find all project config files
@@ -675,11 +685,12 @@ else:
     class PipelineError(Exception):
         """Custom exception for pipeline failures."""
 
-    def start_data_preparation_pipeline(project_name, project_path, mailbox_info):
+    def build_pipeline_stages(project_name, project_path, mailbox_info):
         """
-        Start the complete data preparation pipeline for a newly created project.
-        This function is called after project folders are created and will orchestrate
-        the entire data processing workflow.
+        Stages of the data preparation pipeline of a project, in order.
+
+        Each stage raises PipelineError on failure and may return checkpoint values,
+        handed to the following stages (also when the job is resumed later).
 
         Args:
             project_name (str): Name of the project
@@ -687,81 +698,74 @@ else:
             mailbox_info (list): List of mailbox dictionaries with name, data_source, s3_project_name
 
         Returns:
-            tuple: (success: bool, message: Optional[str])
+            list: PipelineStage objects
         """
-        # TODO: Implement the data preparation pipeline
-        # This function will call other functions to:
-        # 1. 
-        # 2. Process EML files into DuckDB
-        # 3. Generate embeddings and search indexes
-        # 4. Initialize RAG system
-        # 5. Create visualizations and analytics
+        mailbox_names = [mb['name'] for mb in mailbox_info]
+
+        # Separate mailboxes by data source
+        upload_mailboxes = [mb['name'] for mb in mailbox_info if mb['data_source'] == 'upload']
+        s3_mailboxes = [mb for mb in mailbox_info if mb['data_source'] == 's3' and mb['s3_project_name']]
+
+        # For uploaded files: upload to S3 then verify the uploaded objects
+        def upload_stage(context):
+            upload_success = timed_step(
+                "📤 Téléversement des fichiers fournis vers S3...",
+                "Téléversement vers S3 terminé",
+                upload_project_raw_data_to_s3,
+                project_name,
+                project_path,
+                upload_mailboxes,
+            )
+            if not upload_success:
+                raise PipelineError("Échec du téléversement des données brutes vers S3 pour au moins une boîte mail.")
 
-        try:
-            print(f"Starting data preparation pipeline for project: {project_name}")
-            print(f"Project path: {project_path}")
-            print(f"Mailboxes to process: {[mb['name'] for mb in mailbox_info]}")
-
-            mailbox_names = [mb['name'] for mb in mailbox_info]
-
-            if not mailbox_names:
-                raise PipelineError("Aucune boîte mail n'a été fournie pour la création du projet.")
-
-            # Separate mailboxes by data source
-            upload_mailboxes = [mb['name'] for mb in mailbox_info if mb['data_source'] == 'upload']
-            s3_mailboxes = [mb for mb in mailbox_info if mb['data_source'] == 's3' and mb['s3_project_name']]
-
-            # For uploaded files: upload to S3 then download back to verify
-            if upload_mailboxes:
-                upload_success = timed_step(
-                    "📤 Téléversement des fichiers fournis vers S3...",
-                    "Téléversement des fichiers bruts vers S3...",
-                    "Téléversement vers S3 terminé",
-                    upload_project_raw_data_to_s3,
+            # Checksums of the local files against the uploaded objects; the control
+            # download of the whole upload is kept as an option (S3_UPLOAD_VERIFICATION=download)
+            if os.getenv("S3_UPLOAD_VERIFICATION", "checksum") == "download":
+                verify_success = timed_step(
+                    "🔄 Vérification de la synchronisation S3 (téléchargement de contrôle)...",
+                    "Synchronisation S3 confirmée",
+                    download_project_raw_data_from_s3,
                     project_name,
                     project_path,
                     upload_mailboxes,
                 )
-                if not upload_success:
-                    raise PipelineError("Échec du téléversement des données brutes vers S3 pour au moins une boîte mail.")
-
-                download_success = timed_step(
-                    "🔄 Vérification de la synchronisation S3 (téléchargement de contrôle)...",
-                    "Téléchargement de contrôle depuis S3...",
+            else:
+                verify_success = timed_step(
+                    "🔄 Vérification de la synchronisation S3 (sommes de contrôle)...",
                     "Synchronisation S3 confirmée",
-                    download_project_raw_data_from_s3,
+                    verify_project_raw_data_on_s3,
                     project_name,
                     project_path,
                     upload_mailboxes,
                 )
-                if not download_success:
-                    raise PipelineError("La vérification de la synchronisation S3 a échoué pour les boîtes mail téléversées.")
-
-            # For S3 sources: just download from selected projects
-            if s3_mailboxes:
-                def _download_selected_mailboxes():
-                    for mailbox in s3_mailboxes:
-                        download_success = download_project_raw_data_from_s3(
-                            project_name=mailbox['s3_project_name'],
-                            project_path=project_path,
-                            mailbox_names=[mailbox['name']]
+            if not verify_success:
+                raise PipelineError("La vérification de la synchronisation S3 a échoué pour les boîtes mail téléversées.")
+
+        # For S3 sources: just download from selected projects
+        def s3_download_stage(context):
+            def _download_selected_mailboxes():
+                for mailbox in s3_mailboxes:
+                    download_success = download_project_raw_data_from_s3(
+                        project_name=mailbox['s3_project_name'],
+                        project_path=project_path,
+                        mailbox_names=[mailbox['name']]
+                    )
+                    if not download_success:
+                        raise PipelineError(
+                            f"Échec du téléchargement des données S3 pour la boîte mail '{mailbox['name']}'."
                         )
-                        if not download_success:
-                            raise PipelineError(
-                                f"Échec du téléchargement des données S3 pour la boîte mail '{mailbox['name']}'."
-                            )
-                    return True
+                return True
 
-                timed_step(
-                    "📥 Téléchargement des données depuis les projets S3 sélectionnés...",
-                    "Téléchargement des données S3 sélectionnées...",
-                    "Téléchargement des données S3 terminé",
-                    _download_selected_mailboxes,
-                )
+            timed_step(
+                "📥 Téléchargement des données depuis les projets S3 sélectionnés...",
+                "Téléchargement des données S3 terminé",
+                _download_selected_mailboxes,
+            )
 
+        def raw_check_stage(context):
             missing_raw = timed_step(
                 "🔍 Vérification de la présence des données brutes...",
-                "Analyse des dossiers raw...",
                 "Données brutes vérifiées",
                 mailboxes_missing_files,
                 project_path,
@@ -774,11 +778,11 @@ else:
                     ", ".join(missing_raw)
                 )
 
-            # Convert PST/MBOX (included if they are in a zip) files to EML
-            # Unzip if needed
+        # Convert PST/MBOX (included if they are in a zip) files to EML
+        # Unzip if needed
+        def unzip_stage(context):
             unzip_success = timed_step(
                 "🗜️ Extraction des archives ZIP...",
-                "Extraction des archives ZIP...",
                 "Extraction des archives terminée",
                 extract_project_zip_files,
                 project_name,
@@ -788,24 +792,24 @@ else:
             if not unzip_success:
                 raise PipelineError("L'extraction des archives ZIP a échoué.")
 
+        def cleanup_stage(context):
             cleanup_stats = timed_step(
                 "🧹 Nettoyage des artefacts macOS...",
-                "Suppression des artefacts macOS...",
                 "Nettoyage terminé",
                 cleanup_mailbox_raw_artifacts,
                 project_path,
                 mailbox_names,
             )
             if cleanup_stats["removed_directories"] or cleanup_stats["removed_files"]:
-                st.info(
+                print(
                     "Nettoyage des artefacts macOS : suppression de "
                     f"{len(cleanup_stats['removed_directories'])} dossiers et "
                     f"{len(cleanup_stats['removed_files'])} fichiers."
                 )
 
-            # process files into .eml (s)
+        # process files into .eml (s)
+        def conversion_stage(context):
             conversion_success = timed_step(
-                "Conversion des emails en EML...",
                 "Conversion des emails en EML...",
                 "Conversion des emails terminée",
                 convert_project_emails_to_eml,
@@ -827,31 +831,34 @@ else:
             for mailbox in mailbox_names:
                 count = count_processed_eml(mailbox)
                 total_eml += count
-                st.info(f"{mailbox} : {count:,} fichiers .eml dans processed/")
-            st.success(f"Total : {total_eml:,} fichiers .eml générés dans processed/")
+                print(f"{mailbox} : {count:,} fichiers .eml dans processed/")
+            print(f"Total : {total_eml:,} fichiers .eml générés dans processed/")
+            return {"total_eml": total_eml}
 
+        def graphs_stage(context):
             try:
                 graph_index = timed_step(
                     "📈 Préparation des graphes de réseau...",
-                    "Génération des graphes de réseau...",
                     "Graphes générés",
                     generate_graphs_for_project,
                     project_name,
                     Path(project_path),
                     mailbox_names,
                 )
-                st.caption(
+                print(
                     f"{len(graph_index.get('graphs', []))} graphes disponibles dans Graphs/."
                 )
             except Exception as graph_error:
                 raise PipelineError(f"La génération des graphes a échoué : {graph_error}")
-            
-            # Process EML files into DuckDB
+            return {"graph_count": len(graph_index.get('graphs', []))}
+
+        # Process EML files into DuckDB
+        def duckdb_stage(context):
             db_path = timed_step(
                 "🗃️ Génération de la base DuckDB...",
-                "Génération de la base DuckDB...",
                 "Base DuckDB générée",
                 generate_duck_db,
+                project_name=project_name,
             )
             if not db_path or not os.path.exists(db_path):
                 raise PipelineError(
@@ -885,7 +892,6 @@ else:
             try:
                 email_count = timed_step(
                     "🔎 Vérification de la base DuckDB...",
-                    "Analyse de la base DuckDB...",
                     "Base DuckDB vérifiée",
                     _verify_duckdb,
                 )
@@ -893,11 +899,10 @@ else:
                 raise
             except Exception as db_error:
                 raise PipelineError(f"La vérification de la base DuckDB a échoué : {db_error}")
-            st.caption(f"Base DuckDB vérifiée ({email_count:,} enregistrements)")
+            print(f"Base DuckDB vérifiée ({email_count:,} enregistrements)")
 
             missing_processed = timed_step(
                 "🔎 Vérification des emails convertis...",
-                "Analyse des dossiers processed/...",
                 "Emails convertis vérifiés",
                 mailboxes_missing_files,
                 project_path,
@@ -910,23 +915,23 @@ else:
                     "Aucun email converti (.eml) n'a été trouvé pour les boîtes mail suivantes : " +
                     ", ".join(missing_processed)
                 )
-            
+            return {"db_path": str(db_path), "email_count": email_count}
 
+        def semantic_stage(context):
             try:
                 timed_step(
                     "🚀 Initialisation de la recherche sémantique",
-                    "Construction de la recherche sémantique ...",
                     "Recherche sémantique initialisée",
                     prepare_semantic_search,
+                    project_name,
                 )
             except Exception as rag_error:
                 raise PipelineError(f"La construction de la recherche sémantique a échoué: {rag_error}")
-            
-            
+
+        def colbert_stage(context):
             try:
                 index_dir = timed_step(
                     "🚀 Initialisation du système RAG (ColBERT)...",
-                    "Construction du système RAG - cela peut prendre quelques minutes...",
                     "Système RAG initialisé",
                     initialize_colbert_rag_system,
                     project_root=project_root,
@@ -938,34 +943,93 @@ else:
                 print(f"Colbert RAG system initialized with index at {index_dir}")
             except Exception as rag_error:
                 raise PipelineError(f"La construction du système RAG a échoué: {rag_error}")
+            return {"colbert_index_dir": str(index_dir) if index_dir else None}
 
-            st.success(f"Pipeline de préparation terminé pour le projet '{project_name}'")
-            print("Data preparation pipeline completed successfully")
-
-
-            # Building topic models
+        # Building topic models
+        def topics_stage(context):
             try:
                 timed_step(
                     "🧠 Construction des topics",
-                    "Construction des Topics - cela peut prendre quelques heures ...",
                     "Topics générés",
                     topic_build,
+                    project_name=project_name,
                 )
             except Exception as rag_error:
                 raise PipelineError(f"La construction des topics a échoué: {rag_error}")
-            
 
+        stages = []
+        if upload_mailboxes:
+            stages.append(PipelineStage("s3_upload", "Téléversement vers S3", upload_stage))
+        if s3_mailboxes:
+            stages.append(PipelineStage("s3_download", "Téléchargement depuis S3", s3_download_stage))
+        stages.extend([
+            PipelineStage("raw_check", "Vérification des données brutes", raw_check_stage),
+            PipelineStage("unzip", "Extraction des archives ZIP", unzip_stage),
+            PipelineStage("cleanup", "Nettoyage des artefacts macOS", cleanup_stage),
+            PipelineStage("eml_conversion", "Conversion des emails en EML", conversion_stage),
+            PipelineStage("duckdb", "Base DuckDB", duckdb_stage),
+            # Après la base : les graphes lisent le magasin de messages rempli à l'ingestion
+            PipelineStage("graphs", "Graphes de réseau", graphs_stage),
+            PipelineStage("semantic_search", "Recherche sémantique", semantic_stage),
+            PipelineStage("colbert", "Système RAG (ColBERT)", colbert_stage),
+            PipelineStage("topics", "Topics", topics_stage),
+        ])
+        return stages
+
+    def start_data_preparation_pipeline(project_name, project_path, mailbox_info, restart=False):
+        """
+        Start the complete data preparation pipeline for a project in the background.
+
+        The job record (stage status, timings, checkpoints) and its log are kept in the
+        project folder; running it again resumes after the last completed stage unless
+        restart is set. Progress is shown by show_pipeline_job_panel.
+
+        Args:
+            project_name (str): Name of the project
+            project_path (str): Full path to the project directory
+            mailbox_info (list): List of mailbox dictionaries with name, data_source, s3_project_name
+            restart (bool): Run every stage again, even the completed ones
+
+        Returns:
+            tuple: (success: bool, message: Optional[str])
+        """
+        print(f"Starting data preparation pipeline for project: {project_name}")
+        print(f"Project path: {project_path}")
+        print(f"Mailboxes to process: {[mb['name'] for mb in mailbox_info]}")
 
-            return True, None
+        if not mailbox_info:
+            return False, "Aucune boîte mail n'a été fournie pour la création du projet."
 
-        except PipelineError as pipeline_error:
-            error_message = str(pipeline_error)
-            st.error(error_message)
-            return False, error_message
+        try:
+            stages = build_pipeline_stages(project_name, project_path, mailbox_info)
+            return start_pipeline_job(
+                project_name,
+                project_path,
+                stages,
+                params={'mailbox_info': mailbox_info},
+                restart=restart,
+            )
         except Exception as e:
-            error_message = f"Erreur inattendue dans le pipeline: {e}"
-            st.error(error_message)
-            return False, error_message
+            return False, f"Erreur inattendue au lancement du pipeline: {e}"
+
+    def resume_data_preparation_pipeline(record, restart=False):
+        """Resume (or restart) the background pipeline of a project from its job record."""
+        project_name = record['project']
+        project_path = os.path.join(project_root, 'data', 'Projects', project_name)
+        started, message = start_data_preparation_pipeline(
+            project_name,
+            project_path,
+            record.get('params', {}).get('mailbox_info', []),
+            restart=restart,
+        )
+        if not started:
+            st.session_state.project_creation_error = message
+
+    def abandon_failed_project(record):
+        """Delete a project whose data preparation failed."""
+        project_name = record['project']
+        project_path = os.path.join(project_root, 'data', 'Projects', project_name)
+        handle_project_creation_failure(project_name, project_path, record.get('error'))
 
     def upload_project_raw_data_to_s3(project_name, project_path, mailbox_names, bucket_name="olkoa-projects"):
         """
@@ -1018,13 +1082,25 @@ else:
 
                 try:
                     st.info(f"Uploading raw data for mailbox: {mailbox_name}")
-                    s3_handler.upload_directory(
+                    # S3_STORAGE_LAYOUT=packed stores the EML files in tar shards plus an index
+                    stats = s3_handler.upload_directory(
                         local_dir=local_raw_data_dir,
                         bucket_name=bucket_name,
-                        s3_prefix=s3_prefix
+                        s3_prefix=s3_prefix,
+                        packed=os.getenv("S3_STORAGE_LAYOUT", "objects") == "packed"
                     )
-                    st.success(f"Successfully uploaded raw data for mailbox '{mailbox_name}' to S3")
-                    uploaded_any = True
+                    if stats['failed_files'] > 0:
+                        st.error(
+                            f"Failed to upload {stats['failed_files']}/{stats['total_files']} files "
+                            f"for mailbox '{mailbox_name}' (run the upload again to retry them)"
+                        )
+                        upload_success = False
+                    else:
+                        st.success(
+                            f"Successfully uploaded raw data for mailbox '{mailbox_name}' to S3 "
+                            f"({stats['transferred_files']} sent, {stats['skipped_files']} already up to date)"
+                        )
+                        uploaded_any = True
 
                 except Exception as e:
                     st.error(f"Failed to upload raw data for mailbox '{mailbox_name}': {e}")
@@ -1042,6 +1118,54 @@ else:
             st.error(f"Error in S3 upload process: {e}")
             return False
 
+    def verify_project_raw_data_on_s3(project_name, project_path, mailbox_names, bucket_name="olkoa-projects"):
+        """
+        Check that the raw data of the uploaded mailboxes is intact on S3, without downloading it.
+
+        Local checksums are compared with the ETags of the uploaded objects.
+
+        Args:
+            project_name (str): Name of the project
+            project_path (str): Full path to the project directory
+            mailbox_names (list): List of mailbox names that were uploaded
+            bucket_name (str): S3 bucket name (default: "olkoa-projects")
+
+        Returns:
+            bool: True if every file is on S3 with the same content
+        """
+        try:
+            s3_handler = S3Handler()
+            verified = True
+            for mailbox_name in mailbox_names:
+                local_raw_data_dir = os.path.join(project_path, mailbox_name, "raw")
+                if not os.path.exists(local_raw_data_dir):
+                    continue
+
+                stats = s3_handler.verify_directory(
+                    local_dir=local_raw_data_dir,
+                    bucket_name=bucket_name,
+                    s3_prefix=f"{project_name}/{mailbox_name}/raw"
+                )
+                problems = stats['missing_keys'] + stats['mismatched_keys']
+                if problems:
+                    st.error(
+                        f"❌ {len(stats['missing_keys'])} fichiers absents et {len(stats['mismatched_keys'])} "
+                        f"fichiers différents sur S3 pour la boîte mail '{mailbox_name}' : "
+                        + ", ".join(problems[:5]) + (" ..." if len(problems) > 5 else "")
+                    )
+                    verified = False
+                else:
+                    size_mb = stats['total_size'] / (1024 * 1024)
+                    st.info(
+                        f"✅ {stats['verified_files']} fichiers ({size_mb:.2f} MB) vérifiés sur S3 "
+                        f"pour la boîte mail '{mailbox_name}'"
+                    )
+            return verified
+
+        except Exception as e:
+            st.error(f"Erreur lors de la vérification des données sur S3 : {e}")
+            return False
+
     def download_project_raw_data_from_s3(project_name, project_path, mailbox_names, bucket_name="olkoa-projects"):
         """
         Download raw data for all mailboxes in a project from S3.
@@ -1369,6 +1493,18 @@ else:
                         processed_eml_exists = True
                         break
 
+                # EML files downloaded in the packed layout (tar shards plus an index)
+                shards_dir = find_local_shards(raw_folder)
+                if shards_dir and not processed_eml_exists:
+                    try:
+                        extracted = extract_shards(shards_dir, processed_folder)
+                        st.success(
+                            f"Mailbox '{mailbox_name}': {extracted} fichiers EML extraits des archives S3 vers le dossier processed"
+                        )
+                    except Exception as shard_error:
+                        st.error(f"Impossible d'extraire les archives EML de '{shards_dir}': {shard_error}")
+                        conversion_success = False
+
                 if raw_eml_files and not processed_eml_exists:
                     copied = 0
                     for src_path in raw_eml_files:
@@ -1428,23 +1564,25 @@ else:
 
             st.info(f"Converting {len(pst_files)} PST files for mailbox: {mailbox_name}")
 
-            for pst_file in pst_files:
-                try:
-                    # Run readpst to convert PST → EML directly to processed folder
-                    # This creates the natural mailbox structure like:
-                    # processed/username/Boîte de réception/, processed/username/Archive/, etc.
-                    cmd = ["readpst", "-j", "0", "-e", "-o", processed_folder, pst_file]
-
-                    result = subprocess.run(cmd, check=True, capture_output=True, text=True)
-                    st.success(f"Successfully converted PST file: {os.path.basename(pst_file)}")
-                    st.info(f"Natural mailbox structure created in: {processed_folder}")
-
-                except subprocess.CalledProcessError as e:
-                    st.error(f"Failed to convert PST file {os.path.basename(pst_file)}: {e}")
-                    return False
-                except Exception as e:
-                    st.error(f"Error processing PST file {os.path.basename(pst_file)}: {e}")
-                    return False
+            def report_pst(result):
+                pst_name = os.path.basename(result["pst"])
+                if result["status"] == "converted":
+                    st.success(f"Successfully converted PST file: {pst_name} "
+                               f"({result['emails']} emails in {result['duration']:.1f}s)")
+                elif result["status"] == "skipped":
+                    st.info(f"PST file already converted, skipped: {pst_name} ({result['emails']} emails)")
+                else:
+                    st.error(f"Failed to convert PST file {pst_name}: {result['error']}")
+
+            # Several readpst processes at a time, output moved to the processed folder,
+            # creating the natural mailbox structure like:
+            # processed/username/Boîte de réception/, processed/username/Archive/, etc.
+            stats = run_pst_conversions(pst_files, processed_folder, progress_callback=report_pst)
+            st.info(f"Natural mailbox structure created in: {processed_folder} "
+                    f"({stats['converted']} converted, {stats['skipped']} skipped, {stats['failed']} failed "
+                    f"in {stats['duration']:.1f}s)")
+            if stats["failed"]:
+                return False
 
             return True
 
@@ -1477,6 +1615,12 @@ else:
                 st.info(f"No MBOX files found for mailbox '{mailbox_name}'")
                 return True
 
+            # In direct mode the database build reads the messages from the MBOX files themselves
+            if os.getenv("MBOX_INGEST_MODE", "eml") == "direct":
+                st.info(f"Mailbox '{mailbox_name}': {len(mbox_files)} MBOX files will be ingested directly, "
+                        f"no EML files written")
+                return True
+
             st.info(f"Converting {len(mbox_files)} MBOX files for mailbox: {mailbox_name}")
 
             # Create a natural mailbox structure for MBOX files
@@ -1491,17 +1635,7 @@ else:
                     # Create natural structure similar to readpst
                     # If MBOX file is named like "inbox.mbox", create folder "Boîte de réception"
                     # If MBOX file is named like "sent.mbox", create folder "Éléments envoyés"
-                    folder_mapping = {
-                        'inbox': 'Boîte de réception',
-                        'sent': 'Éléments envoyés',
-                        'archive': 'Archive',
-                        'drafts': 'Brouillons',
-                        'trash': 'Éléments supprimés',
-                        'spam': 'Courrier indésirable'
-                    }
-
-                    # Check if mbox filename matches known folder types
-                    folder_name = folder_mapping.get(mbox_filename.lower(), mbox_filename)
+                    folder_name = mbox_folder_name(mbox_file)
 
                     # Create the user folder structure (like readpst does)
                     user_folder = os.path.join(processed_folder, mailbox_name.lower())
@@ -1610,6 +1744,21 @@ else:
             st.rerun()
         st.markdown('</div>', unsafe_allow_html=True)
 
+        # Data preparation jobs still running, failed or interrupted
+        unfinished_jobs = [
+            project for project in projects
+            if (load_job(project['path']) or {}).get('status', JOB_COMPLETED) != JOB_COMPLETED
+        ]
+        if unfinished_jobs:
+            st.subheader("Préparation des données")
+            for project in unfinished_jobs:
+                show_pipeline_job_panel(
+                    project['name'],
+                    project['path'],
+                    on_resume=resume_data_preparation_pipeline,
+                    on_abandon=abandon_failed_project,
+                )
+
         if not projects:
             st.info("No projects found. Create your first project by clicking the 'Créer un Projet' button.")
         else:
@@ -16,6 +16,15 @@ ENABLE_RAG = True  # Set to False to disable RAG features
 # RAG/LLM behaviour
 ALLOW_LLM_UNRELATED_REQUESTS = False
 
+# Shared read-only DuckDB connection of each project database, used by every app session
+# (overridden by the DUCKDB_SHARED_MEMORY_LIMIT and DUCKDB_SHARED_THREADS environment variables)
+DUCKDB_SHARED_MEMORY_LIMIT = "2GB"
+DUCKDB_SHARED_THREADS = 4
+
+# Snapshots of each project database kept by the builds, the current one included
+# (overridden by the DUCKDB_SNAPSHOT_RETENTION environment variable)
+DUCKDB_SNAPSHOT_RETENTION = 3
+
 ###
 ACTIVE_PROJECT = "9_Celine"
 
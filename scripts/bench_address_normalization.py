@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Micro-benchmark of email address normalization, in addresses per second.
+
+"before" replays what models.EmailAddress used to do for every address: an
+email_normalize.Normalizer call driven through the asyncio loop (with its MX lookups).
+"after" runs the offline provider rules of src.models.normalization, cold (empty
+cache) and warm (every address already memoized).
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.data.sample_generator import AGENTS, CONTACTS
+from src.models.normalization import AddressNormalizer
+
+CONSUMER_DOMAINS = ["gmail.com", "googlemail.com", "outlook.com", "hotmail.fr", "icloud.com", "yahoo.fr"]
+
+
+def build_addresses(count, distinct):
+    """Return `count` addresses drawn from `distinct` unique ones, like the senders/recipients of an archive"""
+    known = [person["email"] for person in AGENTS + CONTACTS]
+    unique = list(known)
+    while len(unique) < distinct:
+        first, last = random.choice(known).split("@")[0].split(".")[0], f"user{len(unique)}"
+        local = random.choice([f"{first}.{last}", f"{first}{last}+news", f"{first.title()}.{last}"])
+        unique.append(f"{local}@{random.choice(CONSUMER_DOMAINS)}")
+    return [random.choice(unique) for _ in range(count)]
+
+
+def bench_email_normalize(addresses):
+    import asyncio
+    import nest_asyncio
+    from email_normalize import Normalizer
+
+    nest_asyncio.apply()
+    loop = asyncio.get_event_loop()
+
+    async def normalize(address):
+        return (await Normalizer().normalize(address)).normalized_address
+
+    start = time.perf_counter()
+    for address in addresses:
+        loop.run_until_complete(normalize(address))
+    return len(addresses) / (time.perf_counter() - start)
+
+
+def bench_offline(addresses, normalizer):
+    start = time.perf_counter()
+    for address in addresses:
+        normalizer.normalize(address)
+    return len(addresses) / (time.perf_counter() - start)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark email address normalization")
+    parser.add_argument("--addresses", type=int, default=200_000,
+                        help="Addresses normalized by the offline engine (default: %(default)s)")
+    parser.add_argument("--distinct", type=int, default=5_000,
+                        help="Distinct addresses among them (default: %(default)s)")
+    parser.add_argument("--before-addresses", type=int, default=200,
+                        help="Addresses normalized by the previous async engine (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    addresses = build_addresses(args.addresses, args.distinct)
+
+    try:
+        before = bench_email_normalize(addresses[:args.before_addresses])
+        print(f"before (email_normalize + asyncio): {before:12,.0f} addresses/s")
+    except ImportError as exc:
+        print(f"before (email_normalize + asyncio): skipped ({exc})")
+
+    normalizer = AddressNormalizer()
+    cold = bench_offline(addresses, normalizer)
+    warm = bench_offline(addresses, normalizer)
+    print(f"after, cold cache (offline rules):  {cold:12,.0f} addresses/s")
+    print(f"after, warm cache:                  {warm:12,.0f} addresses/s")
+    print(f"cache: {len(normalizer.cache):,} entries, {normalizer.hits:,} hits, {normalizer.misses:,} misses")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
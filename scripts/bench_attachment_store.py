@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""Attachment storage: content inline in the database vs the content-addressed blob store.
+
+Generates a project whose emails carry realistic attachments: a pool of shared documents
+(logos, signatures, templates, a forwarded report...) attached again and again, plus a
+share of one-off attachments. Then:
+
+    blob store   ingests it, the attachments table keeping only hashes
+    inline       rebuilds the same attachments table with the content inline, as databases
+                 were built before the blob store
+    migrated     migrates that inline database to the blob store and compacts it
+
+and reports the database and blob directory sizes of each, the storage saved by the
+deduplication, and checks that the migrated database references the same blobs as the
+ingested one. Finally the emails of one mailbox are deleted: the reference counts must
+match the attachments left and only the blobs nobody references anymore are removed.
+"""
+
+import argparse
+import contextlib
+import email
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from email import policy
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import duckdb
+import pandas as pd
+
+from scripts.bench_ingest import BENCH_PROJECT, build_config
+from scripts.bench_message_store import build_project
+from src.data.attachment_store import (ATTACHMENT_BLOBS_TABLE, AttachmentStore, collect_garbage, compact_database,
+                                       migrate_inline_attachments, storage_report)
+from src.data.duckdb_utils import setup_database
+from src.data.eml_transformation import delete_ingested_emails, process_eml_to_duckdb
+from src.data.message_store import project_database_path
+
+# (name, MIME type, min KB, max KB) of the kinds of shared documents
+SHARED_KINDS = [
+    ("logo_{}.png", "image/png", 5, 60),
+    ("signature_{}.jpg", "image/jpeg", 10, 80),
+    ("modele_courrier_{}.docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document", 30, 200),
+    ("rapport_annuel_{}.pdf", "application/pdf", 300, 2500),
+    ("ordre_du_jour_{}.pdf", "application/pdf", 40, 300),
+]
+
+
+def make_shared_pool(rng, count):
+    pool = []
+    for idx in range(count):
+        name, mime, min_kb, max_kb = SHARED_KINDS[idx % len(SHARED_KINDS)]
+        pool.append((name.format(idx), mime, rng.randbytes(rng.randint(min_kb, max_kb) * 1024)))
+    return pool
+
+
+def add_attachments(project, rng, attachment_ratio, unique_ratio, shared_docs):
+    """Attach documents to a share of the generated emails, shared ones picked with a skewed popularity"""
+    pool = make_shared_pool(rng, shared_docs)
+    weights = [1 / (rank + 1) for rank in range(len(pool))]
+    for eml_path in sorted(Path(project).rglob("*.eml")):
+        if rng.random() >= attachment_ratio:
+            continue
+        msg = email.message_from_bytes(eml_path.read_bytes(), policy=policy.default)
+        for _ in range(rng.choice((1, 1, 1, 2, 3))):
+            if rng.random() < unique_ratio:
+                filename, mime = f"piece_jointe_{rng.getrandbits(32):08x}.pdf", "application/pdf"
+                content = rng.randbytes(rng.randint(10, 400) * 1024)
+            else:
+                filename, mime, content = rng.choices(pool, weights=weights)[0]
+            maintype, subtype = mime.split("/")
+            msg.add_attachment(content, maintype=maintype, subtype=subtype, filename=filename)
+        eml_path.write_bytes(msg.as_bytes())
+
+
+def rebuild_inline(db_path, store):
+    """Replace the attachments table with the layout of the databases built before the blob store"""
+    conn = duckdb.connect(str(db_path))
+    try:
+        rows = conn.execute(
+            "SELECT id, email_id, filename, content_hash, content_type, size FROM attachments"
+        ).fetchall()
+        conn.execute("DROP TABLE attachments")
+        conn.execute(f"DROP TABLE {ATTACHMENT_BLOBS_TABLE}")
+        conn.execute("""
+        CREATE TABLE attachments (
+            id VARCHAR PRIMARY KEY,
+            email_id VARCHAR,
+            filename VARCHAR,
+            content BLOB,
+            content_type VARCHAR,
+            size INTEGER,
+            FOREIGN KEY (email_id) REFERENCES receiver_emails(id)
+        )
+        """)
+        for start in range(0, len(rows), 500):
+            batch = pd.DataFrame(
+                [(att_id, email_id, filename, store.get(content_hash), content_type, size)
+                 for att_id, email_id, filename, content_hash, content_type, size in rows[start:start + 500]],
+                columns=["id", "email_id", "filename", "content", "content_type", "size"],
+            )
+            conn.register("inline_batch", batch)
+            conn.execute("INSERT INTO attachments SELECT * FROM inline_batch")
+            conn.unregister("inline_batch")
+        conn.execute("CREATE INDEX idx_attachments_email_id ON attachments(email_id)")
+    finally:
+        conn.close()
+
+
+def references(db_path):
+    conn = duckdb.connect(str(db_path), read_only=True)
+    try:
+        return sorted(conn.execute("SELECT id, content_hash FROM attachments").fetchall())
+    finally:
+        conn.close()
+
+
+def check_counts(conn, store):
+    """Reference counts equal to the attachments left, and a blob file for every referenced hash"""
+    mismatches = conn.execute(f"""
+    SELECT COUNT(*) FROM (SELECT * FROM {ATTACHMENT_BLOBS_TABLE} WHERE ref_count > 0) b
+    FULL OUTER JOIN (SELECT content_hash, COUNT(*) AS refs FROM attachments GROUP BY content_hash) a
+        ON a.content_hash = b.content_hash
+    WHERE b.ref_count IS DISTINCT FROM a.refs
+    """).fetchone()[0]
+    hashes = {row[0] for row in conn.execute(
+        f"SELECT content_hash FROM {ATTACHMENT_BLOBS_TABLE} WHERE ref_count > 0"
+    ).fetchall()}
+    stored = set(store.iter_hashes())
+    return mismatches == 0 and hashes == stored
+
+
+def mb(size):
+    return f"{size / 1e6:10,.1f}"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark inline vs content-addressed attachment storage")
+    parser.add_argument("--emails", type=int, default=600,
+                        help="Emails per direction and per mailbox (default: %(default)s)")
+    parser.add_argument("--attachment-ratio", type=float, default=0.4,
+                        help="Share of emails with attachments (default: %(default)s)")
+    parser.add_argument("--unique-ratio", type=float, default=0.25,
+                        help="Share of attachments sent only once (default: %(default)s)")
+    parser.add_argument("--shared-docs", type=int, default=40,
+                        help="Documents attached again and again (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        project, mailbox_names = build_project(tmp, args.emails, 0.0, 0.2)
+        add_attachments(project, rng, args.attachment_ratio, args.unique_ratio, args.shared_docs)
+
+        db_path = project_database_path(project)
+        store = AttachmentStore.for_database(db_path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            conn = setup_database(str(db_path))
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            process_eml_to_duckdb(project, conn, project_name=BENCH_PROJECT, config_file=build_config(),
+                                  workers=args.workers)
+        ingest_time = time.perf_counter() - start
+        report = storage_report(conn, store)
+        conn.close()
+        blob_db_size = db_path.stat().st_size
+        print(f"{report['attachments']:,} attachments, {report['blobs']:,} distinct, "
+              f"ingested in {ingest_time:.1f}s\n")
+
+        inline_dir = Path(tmp) / "inline"
+        inline_dir.mkdir()
+        inline_db = inline_dir / db_path.name
+        shutil.copy(db_path, inline_db)
+        rebuild_inline(inline_db, store)
+        inline_size = inline_db.stat().st_size
+
+        inline_store = AttachmentStore.for_database(inline_db)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            conn = setup_database(str(inline_db))
+        migrated = migrate_inline_attachments(conn, inline_store)
+        conn.close()
+        before, migrated_size = compact_database(inline_db)
+        migrate_time = time.perf_counter() - start
+
+        print(f"{'layout':14} {'database MB':>12} {'blobs MB':>10} {'total MB':>10}")
+        print(f"{'inline':14} {mb(inline_size):>12} {mb(0):>10} {mb(inline_size):>10}")
+        print(f"{'blob store':14} {mb(blob_db_size):>12} {mb(report['stored_bytes']):>10} "
+              f"{mb(blob_db_size + report['stored_bytes']):>10}")
+        print(f"{'migrated':14} {mb(migrated_size):>12} {mb(inline_store.disk_usage()):>10} "
+              f"{mb(migrated_size + inline_store.disk_usage()):>10}  "
+              f"({migrated['attachments']:,} attachments in {migrate_time:.1f}s, compacted from {mb(before).strip()} MB)")
+        saved = inline_size - blob_db_size - report['stored_bytes']
+        print(f"\nattachment bytes: {mb(report['logical_bytes']).strip()} MB referenced, "
+              f"{mb(report['stored_bytes']).strip()} MB stored "
+              f"({report['saved_bytes'] / max(report['logical_bytes'], 1):.0%} deduplicated); "
+              f"{mb(saved).strip()} MB saved on disk overall")
+
+        ok = True
+        same = references(inline_db) == references(db_path)
+        print(f"migration: {'same attachments and blobs as the ingestion' if same else 'REFERENCE MISMATCH'}")
+        ok &= same
+
+        conn = duckdb.connect(str(db_path))
+        counts_ok = check_counts(conn, store)
+        paths = [row[0] for row in conn.execute(
+            "SELECT path FROM ingest_manifest WHERE starts_with(path, ?)", [f"{mailbox_names[0]}/"]
+        ).fetchall()]
+        blobs_before = len(set(store.iter_hashes()))
+        removed = delete_ingested_emails(conn, paths)
+        conn.close()
+        collect_garbage(db_path, store)
+        conn = duckdb.connect(str(db_path))
+        counts_ok &= check_counts(conn, store)
+        blobs_after = len(set(store.iter_hashes()))
+        conn.close()
+        print(f"deleting {mailbox_names[0]}: {removed:,} emails, {blobs_before - blobs_after:,} blobs removed, "
+              f"{'reference counts consistent' if counts_ok else 'REFERENCE COUNT MISMATCH'}")
+        ok &= counts_ok
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""DuckDB write path of the ingestion: pandas DataFrames per batch vs Arrow record batches.
+
+Parses a generated project once and saves the parsed records, then writes them into a fresh
+database with each batch writer (create_batch_writer 'pandas' and 'arrow'), each in its own
+process so that the peak RSS of one does not hide the other's. Only the writer is timed: the
+records are read back one at a time, outside the timing.
+
+Reports rows written per second (all tables), peak RSS above the process baseline and the
+number of commits, and checks that both databases hold the same rows.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import pickle
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import duckdb
+
+from scripts.bench_ingest import BENCH_PROJECT, CONTENT_QUERIES, build_config, content_snapshot
+from scripts.bench_message_store import build_project
+from src.data.duckdb_utils import setup_database
+from src.data.eml_transformation import (DuckDBBatchWriter, _iter_parsed_records_parallel, create_batch_writer,
+                                         find_eml_files)
+
+WRITERS = ("pandas", "arrow")
+
+
+def peak_rss_mb():
+    """Peak RSS of this process (VmHWM: ru_maxrss also counts the process that forked it)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def save_records(project, records_path, workers):
+    """Parse the project once and pickle its records one after the other"""
+    eml_files = find_eml_files(project)
+    records = _iter_parsed_records_parallel(eml_files, project, build_config(), "", BENCH_PROJECT,
+                                            workers=workers, queue_depth=workers * 4, chunk_size=32)
+    count = 0
+    with open(records_path, "wb") as f:
+        for record in records:
+            if record is not None:
+                pickle.dump(record, f, protocol=pickle.HIGHEST_PROTOCOL)
+                count += 1
+    return count
+
+
+def iter_records(records_path):
+    with open(records_path, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def write_records(kind, records_path, db_path, batch_size):
+    """Child process: write every record with one writer, print the measures as JSON"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        conn = setup_database(db_path)
+    writer = create_batch_writer(conn, batch_size=batch_size, kind=kind)
+
+    commits = 0
+    flush = writer.flush
+
+    def counted_flush():
+        nonlocal commits
+        commits += 1
+        flush()
+
+    writer.flush = counted_flush
+
+    baseline = peak_rss_mb()
+    seconds = 0.0
+    for record in iter_records(records_path):
+        start = time.perf_counter()
+        writer.add(record)
+        seconds += time.perf_counter() - start
+    start = time.perf_counter()
+    writer.flush()
+    seconds += time.perf_counter() - start
+
+    rows = sum(conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in DuckDBBatchWriter.TABLES)
+    conn.close()
+    print(json.dumps({"writer": type(writer).__name__, "seconds": seconds, "rows": rows, "commits": commits,
+                      "baseline_mb": baseline, "peak_mb": peak_rss_mb()}))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the pandas and Arrow ingestion write paths")
+    parser.add_argument("--emails", type=int, default=2000,
+                        help="Emails per direction and per mailbox (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Parsing processes")
+    parser.add_argument("--batch-size", type=int, default=100, help="Emails per batch of the pandas writer")
+    parser.add_argument("--flush-mb", type=int, default=None,
+                        help="Flush size of the Arrow writer (default: INGEST_FLUSH_MB or 32)")
+    parser.add_argument("--attachment-ratio", type=float, default=0.1)
+    parser.add_argument("--reply-ratio", type=float, default=0.3)
+    # Child process mode
+    parser.add_argument("--write", choices=WRITERS, help=argparse.SUPPRESS)
+    parser.add_argument("--records", help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.write:
+        write_records(args.write, args.records, args.db, args.batch_size)
+        return 0
+
+    env = dict(os.environ)
+    if args.flush_mb:
+        env["INGEST_FLUSH_MB"] = str(args.flush_mb)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        project, _ = build_project(tmp, args.emails, args.attachment_ratio, args.reply_ratio)
+        records_path = Path(tmp) / "records.pkl"
+        count = save_records(project, records_path, args.workers)
+        print(f"{count:,} parsed records, {records_path.stat().st_size / 1e6:,.1f} MB pickled\n")
+
+        results = {}
+        for kind in WRITERS:
+            db_dir = Path(tmp) / kind
+            db_dir.mkdir()
+            db_path = str(db_dir / f"{kind}.duckdb")
+            output = subprocess.run(
+                [sys.executable, __file__, "--write", kind, "--records", str(records_path), "--db", db_path,
+                 "--batch-size", str(args.batch_size)],
+                check=True, capture_output=True, text=True, env=env,
+            ).stdout
+            results[kind] = json.loads(output.strip().splitlines()[-1])
+            results[kind]["db"] = db_path
+
+        print(f"{'writer':18} {'seconds':>8} {'rows':>10} {'rows/s':>10} {'commits':>8} "
+              f"{'peak RSS MB':>12} {'above base':>11}")
+        for kind in WRITERS:
+            r = results[kind]
+            print(f"{r['writer']:18} {r['seconds']:8.2f} {r['rows']:10,} {r['rows'] / r['seconds']:10,.0f} "
+                  f"{r['commits']:8,} {r['peak_mb']:12.1f} {r['peak_mb'] - r['baseline_mb']:11.1f}")
+
+        snapshots = {kind: content_snapshot(results[kind]["db"]) for kind in WRITERS}
+        mismatches = [name for name in CONTENT_QUERIES if snapshots["pandas"][name] != snapshots["arrow"][name]]
+        rows_differ = results["pandas"]["rows"] != results["arrow"]["rows"]
+
+    if mismatches or rows_differ:
+        print(f"\nRow mismatch between the writers in: {', '.join(mismatches) or 'row counts'}")
+        return 1
+    print(f"\nspeedup: {results['pandas']['seconds'] / results['arrow']['seconds']:.1f}x, "
+          "both databases hold identical rows")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
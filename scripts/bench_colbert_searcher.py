@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Cold vs warm ColBERT query latency on the index of a project.
+
+"per-query reload" replays the previous behaviour of search_with_colbert: load the index
+with RAGPretrainedModel.from_index and unpickle the metadata for every question. "cold"
+is the first query through the searcher registry, "warm" the following ones.
+Requires an index built by the data preparation pipeline (initialize_colbert_rag_system).
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import constants
+from src.rag.colbert_rag import (
+    _load_email_metadata,
+    get_searcher_registry,
+    load_colbert_rag,
+    project_root,
+    search_with_colbert,
+)
+
+DEFAULT_QUERIES = [
+    "Quel mail parle d'Olkoa ?",
+    "Qui a envoyé le rapport annuel ?",
+    "Réunion budget archives",
+    "Demande de consultation de documents",
+]
+
+
+def timed(func):
+    # search_with_colbert logs every step; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark cold vs warm ColBERT searches")
+    parser.add_argument("--project", default=os.getenv("ACTIVE_PROJECT") or getattr(constants, "ACTIVE_PROJECT", "Projet Demo"),
+                        help="Project whose index is queried (default: %(default)s)")
+    parser.add_argument("--rag-mode", default="light", choices=["light", "heavy"])
+    parser.add_argument("--warm-queries", type=int, default=10,
+                        help="Queries run once the searcher is resident (default: %(default)s)")
+    parser.add_argument("--reload-queries", type=int, default=2,
+                        help="Queries run with the previous per-query reload (default: %(default)s)")
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    path_to_metadata = os.path.join(project_root, "data", "Projects", args.project, "colbert_indexes")
+    index_path = os.path.join(project_root, "app", ".ragatouille", "colbert", "indexes",
+                              f"{args.project}_emails_index")
+    if not os.path.isdir(index_path):
+        sys.stderr.write(f"ColBERT index not found: {index_path}\n")
+        return 1
+
+    queries = [DEFAULT_QUERIES[i % len(DEFAULT_QUERIES)] for i in range(args.warm_queries + 1)]
+
+    def reload_and_search(query):
+        model = load_colbert_rag(ragatouille_index_path=index_path)
+        _load_email_metadata(path_to_metadata)
+        model.search(query=query, k=args.top_k, index_name=f"{args.project}_emails_index")
+
+    reload_times = [timed(lambda: reload_and_search(query)) for query in queries[:args.reload_queries]]
+
+    def registry_search(query):
+        search_with_colbert(query, path_to_metadata, index_path, top_k=args.top_k,
+                            project_name=args.project, rag_mode=args.rag_mode)
+
+    get_searcher_registry().invalidate(args.project, args.rag_mode)
+    cold = timed(lambda: registry_search(queries[0]))
+    warm_times = [timed(lambda: registry_search(query)) for query in queries[1:]]
+
+    if reload_times:
+        print(f"per-query reload: {statistics.median(reload_times):8.3f}s median over {len(reload_times)} queries")
+    print(f"cold query:       {cold:8.3f}s")
+    if warm_times:
+        print(f"warm query:       {statistics.median(warm_times):8.3f}s median, "
+              f"{max(warm_times):.3f}s max over {len(warm_times)} queries")
+    for entry in get_searcher_registry().stats():
+        print(f"resident: {entry['project']} ({entry['rag_mode']}) {entry['memory_mb']:.0f} MB, "
+              f"loaded in {entry['load_seconds']:.2f}s, {entry['hits']} warm hits")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Per-query latency of the app DataFrame queries, before and after email_flat.
+
+Builds a synthetic project database (100k emails by default) directly in SQL, then times
+the previous SQL (correlated string_agg subqueries per email) against the EmailAnalyzer
+methods, which now read the pre-joined email_flat table. The refresh of email_flat itself
+is timed too, since it runs at the end of every ingestion.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.data.duckdb_utils import refresh_email_flat
+from src.data.email_analyzer import EmailAnalyzer
+from tests.synthetic_db import build_synthetic_db
+
+# Recipient strings as they were built before email_flat
+LEGACY_RECIPIENTS = """
+    COALESCE(
+        (SELECT string_agg(e.email, ', ') FROM email_recipients_to ert
+         JOIN entities e ON ert.entity_id = e.id WHERE ert.email_id = re.id), ''
+    ) ||
+    CASE WHEN
+        (SELECT string_agg(e.email, ', ') FROM email_recipients_to ert
+         JOIN entities e ON ert.entity_id = e.id WHERE ert.email_id = re.id) IS NOT NULL AND
+        (SELECT string_agg(e.email, ', ') FROM email_recipients_cc ercc
+         JOIN entities e ON ercc.entity_id = e.id WHERE ercc.email_id = re.id) IS NOT NULL
+    THEN ', ' ELSE '' END ||
+    COALESCE(
+        (SELECT string_agg(e.email, ', ') FROM email_recipients_cc ercc
+         JOIN entities e ON ercc.entity_id = e.id WHERE ercc.email_id = re.id), ''
+    ) AS recipient_email
+"""
+
+LEGACY_QUERIES = {
+    "app_dataframe_with_filters": f"""
+        SELECT re.message_id, re.timestamp AS date, sender.email AS "from",
+               {LEGACY_RECIPIENTS},
+               re.subject, re.body,
+               (SELECT string_agg(a.filename, '|') FROM attachments a WHERE a.email_id = re.id) AS attachments,
+               (SELECT COUNT(*) > 0 FROM attachments a WHERE a.email_id = re.id) AS has_attachments,
+               re.direction, COALESCE(re.mailbox_name, re.folder) AS mailbox, re.mailbox_name,
+               re.folder AS folder, ml.email_address AS mailing_list_email
+        FROM receiver_emails re
+        LEFT JOIN entities sender ON re.sender_id = sender.id
+        LEFT JOIN mailing_lists ml ON re.mailing_list_id = ml.id
+        WHERE 1=1 AND re.direction = 'received'
+        ORDER BY re.timestamp DESC LIMIT 50000
+    """,
+    "app_dataframe_agg_recipients": f"""
+        SELECT re.message_id, re.timestamp AS date, sender.email AS "from",
+               {LEGACY_RECIPIENTS},
+               re.subject, re.body,
+               (SELECT string_agg(a.filename, '|') FROM attachments a WHERE a.email_id = re.id) AS attachments,
+               (SELECT COUNT(*) > 0 FROM attachments a WHERE a.email_id = re.id) AS has_attachments,
+               re.direction, COALESCE(re.mailbox_name, re.folder) AS mailbox, re.mailbox_name
+        FROM receiver_emails re
+        LEFT JOIN entities sender ON re.sender_id = sender.id
+        ORDER BY re.timestamp DESC LIMIT 50000
+    """,
+    "rag_email_dataset": """
+        SELECT re.id AS email_id, re.timestamp AS date, re.subject, re.body, sender.email AS "from",
+               (SELECT string_agg(e.email, ', ') FROM email_recipients_to ert
+                JOIN entities e ON ert.entity_id = e.id WHERE ert.email_id = re.id) AS to_recipients,
+               (SELECT string_agg(e.email, ', ') FROM email_recipients_cc ercc
+                JOIN entities e ON ercc.entity_id = e.id WHERE ercc.email_id = re.id) AS cc_recipients,
+               (SELECT string_agg(e.email, ', ') FROM email_recipients_bcc erbcc
+                JOIN entities e ON erbcc.entity_id = e.id WHERE erbcc.email_id = re.id) AS bcc_recipients
+        FROM receiver_emails re
+        LEFT JOIN entities sender ON re.sender_id = sender.id
+        ORDER BY re.timestamp DESC
+    """,
+    "search_emails": """
+        SELECT re.message_id, re.subject, sender.name AS "from",
+               (SELECT string_agg(e.name, ', ') FROM email_recipients_to ert
+                JOIN entities e ON ert.entity_id = e.id WHERE ert.email_id = re.id) AS "to",
+               re.timestamp AS date, re.folder
+        FROM receiver_emails re
+        JOIN entities sender ON re.sender_id = sender.id
+        WHERE re.body LIKE '%budget%'
+        ORDER BY re.timestamp DESC LIMIT 100
+    """,
+}
+
+ANALYZER_CALLS = {
+    "app_dataframe_with_filters": lambda analyzer: analyzer.get_app_dataframe_with_filters(
+        filters={"direction": "received"}, limit=50000, topic_level=-1),
+    "app_dataframe_agg_recipients": lambda analyzer: analyzer.get_app_dataframe_agg_recipients(
+        limit=50000, topic_level=-1),
+    "rag_email_dataset": lambda analyzer: analyzer.get_rag_email_dataset(),
+    "search_emails": lambda analyzer: analyzer.search_emails("budget", limit=100),
+}
+
+
+def time_call(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        # The analyzer reports the missing topic tables of the synthetic database on stdout
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the app queries against email_flat")
+    parser.add_argument("--emails", type=int, default=100_000,
+                        help="Emails in the synthetic database (default: %(default)s)")
+    parser.add_argument("--entities", type=int, default=5_000,
+                        help="Distinct senders/recipients (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Runs per query, the median is reported (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "bench_flat.duckdb")
+        print(f"Building a synthetic database with {args.emails:,} emails...")
+        build_synthetic_db(db_path, args.emails, args.entities, args.seed)
+
+        analyzer = EmailAnalyzer(db_path)
+        conn = analyzer.connect()
+
+        start = time.perf_counter()
+        refresh_email_flat(conn)
+        print(f"email_flat refresh: {time.perf_counter() - start:8.3f}s")
+
+        print(f"{'query':32} {'legacy SQL':>12} {'email_flat':>12} {'speedup':>8}")
+        for name, sql in LEGACY_QUERIES.items():
+            legacy = time_call(lambda: conn.execute(sql).df(), args.repeat)
+            flat = time_call(lambda: ANALYZER_CALLS[name](analyzer), args.repeat)
+            print(f"{name:32} {legacy:11.3f}s {flat:11.3f}s {legacy / flat:7.1f}x")
+
+        analyzer.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
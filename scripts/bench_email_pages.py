@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Email Explorer first render: the full filtered DataFrame vs keyset pages.
+
+Builds synthetic project databases of increasing size (see tests/synthetic_db.py), then times
+what the Explorer reads before it can draw its table:
+
+    full frame   get_app_dataframe_with_filters (up to 50,000 rows, bodies included),
+                 as the page did before
+    pages        count_email_list and the first page from get_email_page
+
+plus the next page (keyset), a jump to the middle page, the last page and the details of
+one email. The memory column is the deep size of the DataFrame held by the page. The
+pages of a smaller list are also walked end to end, both ways, and compared with a plain
+ORDER BY to check that the keyset sees every email once.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tests.synthetic_db import build_synthetic_db
+from src.data.duckdb_utils import refresh_email_flat
+from src.data.email_analyzer import EmailAnalyzer
+from src.data.email_pages import SORT_KEYS, page_cursors
+
+PAGE = 50
+
+
+def median_time(func, repeat):
+    times, result = [], None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = func()
+            times.append(time.perf_counter() - start)
+    return statistics.median(times), result
+
+
+def frame_mb(df):
+    return df.memory_usage(deep=True).sum() / 1e6
+
+
+def check_walk(analyzer, sort, descending, filters):
+    """Every page forwards then backwards, against the full ORDER BY"""
+    query = analyzer.email_list_query(filters=filters, sort=sort, descending=descending)
+    direction = 'DESC' if descending else 'ASC'
+    where, params = query.where()
+    expected = [row[0] for row in analyzer.connect_flat().execute(f"""
+        SELECT ef.email_id FROM email_flat ef WHERE {where}
+        ORDER BY {SORT_KEYS[sort]} {direction}, ef.email_id {direction}
+    """, params).fetchall()]
+
+    forward, pages, cursor = [], [], None
+    while True:
+        page = analyzer.get_email_page(query, after=cursor, limit=PAGE)
+        if page.empty:
+            break
+        pages.append(list(page['email_id']))
+        forward.extend(page['email_id'])
+        cursor = page_cursors(page)[1]
+
+    backward_pages, cursor = [], page_cursors(analyzer.get_email_page(query, page=len(pages), total=len(expected),
+                                                                      limit=PAGE))[0]
+    backward_pages.append(pages[-1] if pages else [])
+    while cursor is not None:
+        page = analyzer.get_email_page(query, before=cursor, limit=PAGE)
+        if page.empty:
+            break
+        backward_pages.append(list(page['email_id']))
+        cursor = page_cursors(page)[0]
+    return forward == expected and backward_pages[::-1] == pages
+
+
+def bench_size(emails, args, tmp):
+    db_path = str(Path(tmp) / f"pages_{emails}.duckdb")
+    with contextlib.redirect_stdout(io.StringIO()):
+        build_synthetic_db(db_path, emails, args.entities, args.seed)
+    analyzer = EmailAnalyzer(db_path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        refresh_email_flat(analyzer.connect())
+
+    frame_seconds, frame = median_time(
+        lambda: analyzer.get_app_dataframe_with_filters(filters={}, topic_level=None), args.repeat)
+    query = analyzer.email_list_query()
+
+    def first_render():
+        total = analyzer.count_email_list(query)
+        return total, analyzer.get_email_page(query, page=1, total=total, limit=PAGE)
+
+    first_seconds, (total, first_page) = median_time(first_render, args.repeat)
+    last_cursor = page_cursors(first_page)[1]
+    next_seconds, _ = median_time(lambda: analyzer.get_email_page(query, after=last_cursor, limit=PAGE), args.repeat)
+    pages = (total + PAGE - 1) // PAGE
+    middle_seconds, _ = median_time(
+        lambda: analyzer.get_email_page(query, page=pages // 2, total=total, limit=PAGE), args.repeat)
+    last_seconds, _ = median_time(
+        lambda: analyzer.get_email_page(query, page=pages, total=total, limit=PAGE), args.repeat)
+    email_id = first_page['email_id'].iloc[0]
+    details_seconds, _ = median_time(lambda: analyzer.get_email_details(email_id), args.repeat)
+    search_query = analyzer.email_list_query(search="budget", sort='subject', descending=False)
+    median_time(lambda: analyzer.count_email_list(search_query), 1)  # builds the full-text index
+    search_seconds, _ = median_time(
+        lambda: (analyzer.count_email_list(search_query), analyzer.get_email_page(search_query, limit=PAGE)),
+        args.repeat)
+
+    print(f"{emails:>10,} {frame_seconds:9.3f}s {frame_mb(frame):8.1f}MB {first_seconds:9.4f}s "
+          f"{frame_mb(first_page):7.3f}MB {next_seconds:8.4f}s {middle_seconds:8.4f}s {last_seconds:8.4f}s "
+          f"{details_seconds:8.4f}s {search_seconds:8.4f}s")
+
+    ok = True
+    if emails <= args.walk_limit:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for sort, descending, filters in (('date', True, {}), ('subject', False, {'direction': 'sent'}),
+                                              ('from', True, {'folder': 'folder_3'}),
+                                              ('recipient_email', False, {})):
+                ok &= check_walk(analyzer, sort, descending, filters)
+    analyzer.close()
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the Email Explorer keyset pages")
+    parser.add_argument("--emails", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="Emails per synthetic database (default: %(default)s)")
+    parser.add_argument("--entities", type=int, default=5_000)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measure, the median is reported")
+    parser.add_argument("--walk-limit", type=int, default=20_000,
+                        help="Walk every page of databases up to this size (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'emails':>10} {'full frame':>10} {'memory':>10} {'1st page':>10} {'memory':>9} "
+          f"{'next':>9} {'middle':>9} {'last':>9} {'details':>9} {'search':>9}")
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        for emails in args.emails:
+            ok &= bench_size(emails, args, tmp)
+    print(f"\n{'keyset pages match the ORDER BY' if ok else 'MISMATCH between the pages and the ORDER BY'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Keyword search latency: LIKE scans vs the full-text index.
+
+Builds a synthetic project database (200k emails by default) whose bodies are drawn from
+a skewed 20k-word vocabulary, with a known phrase planted in 1% of them, then times the
+previous search_emails SQL (body LIKE '%query%') against EmailAnalyzer.search_emails,
+which now ranks full-text index hits with BM25. The index build is timed too, since it
+runs at the end of every ingestion.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.data.duckdb_utils import refresh_email_flat, setup_database
+from src.data.email_analyzer import EmailAnalyzer
+from src.data.fulltext_index import refresh_fulltext_index
+
+LEGACY_SEARCH = """
+    SELECT re.message_id, re.subject, sender.name AS "from",
+           (SELECT string_agg(e.name, ', ') FROM email_recipients_to ert
+            JOIN entities e ON ert.entity_id = e.id WHERE ert.email_id = re.id) AS "to",
+           re.timestamp AS date, re.folder
+    FROM receiver_emails re
+    JOIN entities sender ON re.sender_id = sender.id
+    WHERE re.body LIKE ?
+    ORDER BY re.timestamp DESC LIMIT 100
+"""
+
+# (label, LIKE pattern, full-text query)
+QUERIES = [
+    ("frequent term", "% w3 %", "w3"),
+    ("rare term", "% w19000 %", "w19000"),
+    ("two terms", None, "w10 w250"),
+    ("phrase", "%rapport annuel%", '"rapport annuel"'),
+]
+
+
+def build_synthetic_db(db_path, emails, words, seed):
+    """Fill a fresh project database with random emails over a skewed vocabulary"""
+    conn = setup_database(db_path)
+    conn.execute(f"SELECT setseed({seed / 1000})")
+    conn.execute("""
+        INSERT INTO entities
+        SELECT 'entity-' || i, 'Person ' || i, 'person' || i || '@example.org', NULL, NULL, true
+        FROM range(1000) t(i)
+    """)
+    conn.execute(f"""
+        CREATE TEMP TABLE synthetic AS
+        SELECT i,
+               'entity-' || (i % 1000) AS sender_id,
+               TIMESTAMP '2015-01-01' + to_seconds(CAST(floor(random() * 3e8) AS BIGINT)) AS ts,
+               array_to_string(list_transform(range(6),
+                   x -> 'w' || CAST(floor(pow(random(), 3) * {words}) AS INTEGER)), ' ') AS subject,
+               array_to_string(list_transform(range(150),
+                   x -> 'w' || CAST(floor(pow(random(), 3) * {words}) AS INTEGER)), ' ')
+                   || CASE WHEN i % 100 = 0 THEN ' le rapport annuel est joint' ELSE '' END AS body
+        FROM range({emails}) t(i)
+    """)
+    conn.execute("INSERT INTO sender_emails SELECT 'sender-' || i, sender_id, body, ts FROM synthetic")
+    conn.execute("""
+        INSERT INTO receiver_emails
+        SELECT 'email-' || i, 'sender-' || i, sender_id, NULL, 'mailbox', 'received', ts,
+               subject, ' ' || body || ' ', false, 'folder', false, NULL, 0, NULL,
+               '<' || i || '@example.org>', NULL, NULL
+        FROM synthetic
+    """)
+    conn.execute("""
+        INSERT INTO email_recipients_to
+        SELECT 'email-' || i, 'entity-' || ((i * 7) % 1000) FROM synthetic
+    """)
+    conn.execute("DROP TABLE synthetic")
+    return conn
+
+
+def time_call(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark LIKE scans against the full-text index")
+    parser.add_argument("--emails", type=int, default=200_000,
+                        help="Emails in the synthetic database (default: %(default)s)")
+    parser.add_argument("--words", type=int, default=20_000,
+                        help="Vocabulary size (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Runs per query, the median is reported (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "bench_fulltext.duckdb")
+        print(f"Building a synthetic database with {args.emails:,} emails...")
+        with contextlib.redirect_stdout(io.StringIO()):
+            conn = build_synthetic_db(db_path, args.emails, args.words, args.seed)
+        refresh_email_flat(conn)
+
+        start = time.perf_counter()
+        refresh_fulltext_index(conn)
+        print(f"full-text index build: {time.perf_counter() - start:8.3f}s")
+        postings = conn.execute("SELECT COUNT(*) FROM fulltext_postings").fetchone()[0]
+        print(f"postings: {postings:,}, terms: {conn.execute('SELECT COUNT(*) FROM fulltext_terms').fetchone()[0]:,}")
+        conn.close()
+
+        analyzer = EmailAnalyzer(db_path)
+        conn = analyzer.connect_fulltext()
+
+        print(f"{'query':16} {'hits':>8} {'LIKE scan':>11} {'full-text':>11} {'speedup':>8}")
+        for label, like_pattern, fulltext_query in QUERIES:
+            hits = len(analyzer.search_fulltext(fulltext_query))
+            flat = time_call(lambda: analyzer.search_emails(fulltext_query, limit=100), args.repeat)
+            if like_pattern is None:
+                print(f"{label:16} {hits:8,} {'n/a':>11} {flat:10.3f}s {'':>8}")
+                continue
+            legacy = time_call(lambda: conn.execute(LEGACY_SEARCH, [like_pattern]).fetchall(), args.repeat)
+            print(f"{label:16} {hits:8,} {legacy:10.3f}s {flat:10.3f}s {legacy / flat:7.1f}x")
+
+        analyzer.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
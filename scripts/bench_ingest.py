@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""Compare the serial and parallel EML ingestion paths on a synthetic corpus.
+
+Generates sample mailboxes with src.data.sample_generator, ingests them once with a
+single process and once with a worker pool, reports the timings and checks that both
+databases hold the same rows, ids included since they are derived from the content.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import duckdb
+
+from src.data.duckdb_utils import setup_database
+from src.data.eml_transformation import process_eml_to_duckdb
+from src.data.sample_generator import AGENTS, generate_test_mailboxes
+
+BENCH_PROJECT = "bench_project"
+
+# Content-level view of a database: every foreign key is replaced by the value it points to
+CONTENT_QUERIES = {
+    "receiver_emails": """
+        SELECT re.id, re.mailbox_name, re.folder, re.direction, re.timestamp, re.subject, re.body,
+               re.message_id, re.in_reply_to, re."references", sender.email, reply_to.email
+        FROM receiver_emails re
+        LEFT JOIN entities sender ON re.sender_id = sender.id
+        LEFT JOIN entities reply_to ON re.reply_to_id = reply_to.id
+    """,
+    "sender_emails": """
+        SELECT se.id, e.email, se.body, se.timestamp
+        FROM sender_emails se LEFT JOIN entities e ON se.sender_id = e.id
+    """,
+    "entities": "SELECT id, name, email, alias_names, alias_emails, is_physical_person FROM entities",
+    "recipients": """
+        SELECT 'to', re.message_id, e.email FROM email_recipients_to r
+        JOIN receiver_emails re ON r.email_id = re.id JOIN entities e ON r.entity_id = e.id
+        UNION ALL
+        SELECT 'cc', re.message_id, e.email FROM email_recipients_cc r
+        JOIN receiver_emails re ON r.email_id = re.id JOIN entities e ON r.entity_id = e.id
+        UNION ALL
+        SELECT 'bcc', re.message_id, e.email FROM email_recipients_bcc r
+        JOIN receiver_emails re ON r.email_id = re.id JOIN entities e ON r.entity_id = e.id
+    """,
+    "attachments": """
+        SELECT a.id, re.message_id, a.filename, a.content_type, a.size, a.content_hash
+        FROM attachments a JOIN receiver_emails re ON a.email_id = re.id
+    """,
+}
+
+
+def build_config():
+    """Project config matching the mailboxes produced by generate_test_mailboxes."""
+    mailboxes = {}
+    for idx, agent in enumerate(AGENTS):
+        mailboxes[f"mailbox_{idx + 1}"] = {
+            "Positions": {},
+            "Entity": {
+                "name": agent["name"],
+                "alias_names": [],
+                "is_physical_person": True,
+                "email_adress": agent["email"],
+                "email_adress_aliases": [],
+            },
+            "Organisation": {"name": agent["department"], "description": agent["role"]},
+        }
+    return {BENCH_PROJECT: {"mailboxs": mailboxes}}
+
+
+def ingest(corpus_dir, db_path, config, workers, queue_depth):
+    conn = setup_database(db_path)
+    start = time.perf_counter()
+    process_eml_to_duckdb(
+        corpus_dir,
+        conn,
+        project_name=BENCH_PROJECT,
+        config_file=config,
+        workers=workers,
+        queue_depth=queue_depth,
+    )
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return elapsed
+
+
+def content_snapshot(db_path):
+    conn = duckdb.connect(db_path, read_only=True)
+    try:
+        return {
+            name: sorted(conn.execute(query).fetchall(), key=repr)
+            for name, query in CONTENT_QUERIES.items()
+        }
+    finally:
+        conn.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark serial vs parallel EML ingestion")
+    parser.add_argument("--emails", type=int, default=500,
+                        help="Emails per direction and per mailbox (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2,
+                        help="Worker processes for the parallel run (default: %(default)s)")
+    parser.add_argument("--queue-depth", type=int, default=None,
+                        help="Parsed chunks allowed in flight (default: 4 per worker)")
+    args = parser.parse_args()
+
+    config = build_config()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus_dir = Path(tmp) / "corpus"
+        generate_test_mailboxes(str(corpus_dir), num_sent=args.emails,
+                                num_received=args.emails, format_type="eml")
+
+        serial_db = str(Path(tmp) / "serial.duckdb")
+        parallel_db = str(Path(tmp) / "parallel.duckdb")
+
+        serial_time = ingest(corpus_dir, serial_db, config, 1, None)
+        parallel_time = ingest(corpus_dir, parallel_db, config, args.workers, args.queue_depth)
+
+        serial_rows = content_snapshot(serial_db)
+        parallel_rows = content_snapshot(parallel_db)
+
+    total = len(serial_rows["receiver_emails"])
+    print(f"Emails ingested: {total}")
+    print(f"Serial:   {serial_time:8.2f}s ({total / serial_time:8.1f} emails/s)")
+    print(f"Parallel: {parallel_time:8.2f}s ({total / parallel_time:8.1f} emails/s) with {args.workers} workers")
+
+    mismatches = [name for name in CONTENT_QUERIES if serial_rows[name] != parallel_rows[name]]
+    if mismatches:
+        print(f"Row mismatch between serial and parallel databases in: {', '.join(mismatches)}")
+        return 1
+
+    print("Serial and parallel databases hold identical rows")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
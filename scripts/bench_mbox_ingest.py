@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""MBOX ingestion: conversion to .eml files then ingestion, vs reading the MBOX files in place.
+
+Generates sample mailboxes stored as MBOX files under <mailbox>/raw/ (inbox.mbox and
+sent.mbox, as a project upload would), then builds a database:
+
+1. the two-step way: every message written to an .eml file in the processed tree, the way
+   the project page converts MBOX files, then process_eml_to_duckdb over those files;
+2. the direct way: process_eml_to_duckdb with include_mbox, the messages read from the
+   MBOX files by byte offset.
+
+Reports the timings and the files written, checks that both databases hold the same rows,
+ids included, then checks the incremental runs of the direct path: nothing to ingest on an
+unchanged MBOX, only the appended messages after an append.
+"""
+
+import argparse
+import mailbox
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytz
+
+from scripts.bench_ingest import BENCH_PROJECT, CONTENT_QUERIES, build_config, content_snapshot
+from src.data.duckdb_utils import setup_database
+from src.data.eml_transformation import find_eml_files, process_eml_to_duckdb
+from src.data.mbox_to_eml import mbox_folder_name, mbox_to_eml
+from src.data.sample_generator import AGENTS, generate_mailbox
+
+
+def build_corpus(corpus_dir, emails, attachment_ratio, reply_ratio):
+    """MBOX files of each sample mailbox, split by direction"""
+    total = 0
+    for idx, agent in enumerate(AGENTS):
+        raw_dir = Path(corpus_dir) / f"mailbox_{idx + 1}" / "raw"
+        raw_dir.mkdir(parents=True)
+        messages = generate_mailbox(agent, num_sent=emails, num_received=emails,
+                                    start_date=datetime(2023, 1, 1, tzinfo=pytz.UTC),
+                                    end_date=datetime(2023, 12, 31, tzinfo=pytz.UTC),
+                                    reply_ratio=reply_ratio, attachment_ratio=attachment_ratio)
+        for direction, name in (("received", "inbox"), ("sent", "sent")):
+            mbox = mailbox.mbox(str(raw_dir / f"{name}.mbox"))
+            for msg, msg_direction in messages:
+                if msg_direction == direction:
+                    mbox.add(msg)
+                    total += 1
+            mbox.close()
+    return total
+
+
+def convert(corpus_dir):
+    """The project page's MBOX conversion: one .eml file per message in the processed tree"""
+    for mailbox_dir in sorted(Path(corpus_dir).iterdir()):
+        for mbox_file in sorted((mailbox_dir / "raw").glob("*.mbox")):
+            output_dir = mailbox_dir / "processed" / mailbox_dir.name.lower() / mbox_folder_name(str(mbox_file))
+            os.makedirs(output_dir, exist_ok=True)
+            mbox_to_eml(str(mbox_file), str(output_dir))
+
+
+def ingest(corpus_dir, db_path, config, workers, include_mbox):
+    conn = setup_database(db_path)
+    start = time.perf_counter()
+    process_eml_to_duckdb(corpus_dir, conn, project_name=BENCH_PROJECT, config_file=config,
+                          workers=workers, include_mbox=include_mbox)
+    elapsed = time.perf_counter() - start
+    manifest_entries = conn.execute("SELECT COUNT(*) FROM ingest_manifest").fetchone()[0]
+    conn.close()
+    return elapsed, manifest_entries
+
+
+def dir_size(path):
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark two-step vs direct MBOX ingestion")
+    parser.add_argument("--emails", type=int, default=2000,
+                        help="Emails per direction and per mailbox (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2,
+                        help="Parsing processes (default: %(default)s)")
+    parser.add_argument("--attachment-ratio", type=float, default=0.1)
+    parser.add_argument("--reply-ratio", type=float, default=0.2)
+    parser.add_argument("--append", type=int, default=25,
+                        help="Messages appended to an MBOX file for the incremental check (default: %(default)s)")
+    args = parser.parse_args()
+
+    config = build_config()
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "source"
+        total = build_corpus(source, args.emails, args.attachment_ratio, args.reply_ratio)
+        print(f"{total:,} messages in {len(list(source.rglob('*.mbox')))} MBOX files, "
+              f"{dir_size(source) / 1e6:.1f} MB")
+
+        two_step_dir = Path(tmp) / "two_step"
+        direct_dir = Path(tmp) / "direct"
+        shutil.copytree(source, two_step_dir)
+        shutil.copytree(source, direct_dir)
+
+        start = time.perf_counter()
+        convert(two_step_dir)
+        convert_time = time.perf_counter() - start
+        eml_files = find_eml_files(two_step_dir)
+        eml_bytes = sum(path.stat().st_size for path in eml_files)
+        two_step_db = str(Path(tmp) / "two_step.duckdb")
+        ingest_time, _ = ingest(two_step_dir, two_step_db, config, args.workers, include_mbox=False)
+
+        direct_db = str(Path(tmp) / "direct.duckdb")
+        direct_time, _ = ingest(direct_dir, direct_db, config, args.workers, include_mbox=True)
+        written = len(find_eml_files(direct_dir))
+
+        two_step_rows = content_snapshot(two_step_db)
+        direct_rows = content_snapshot(direct_db)
+
+        # Incremental runs: unchanged, then a few messages appended to one MBOX file
+        rerun_time, _ = ingest(direct_dir, direct_db, config, args.workers, include_mbox=True)
+        inbox = mailbox.mbox(str(direct_dir / "mailbox_1" / "raw" / "inbox.mbox"))
+        extra = generate_mailbox(AGENTS[0], num_sent=0, num_received=args.append)
+        for msg, _ in extra:
+            inbox.add(msg)
+        inbox.close()
+        append_time, manifest_entries = ingest(direct_dir, direct_db, config, args.workers, include_mbox=True)
+
+    emails = len(two_step_rows["receiver_emails"])
+    print(f"\n{'path':34} {'seconds':>9} {'emails/s':>9} {'files written':>14}")
+    print(f"{'two-step: convert to .eml':34} {convert_time:9.2f} {total / convert_time:9.1f} "
+          f"{len(eml_files):14,}   ({eml_bytes / 1e6:.1f} MB)")
+    print(f"{'two-step: ingest .eml files':34} {ingest_time:9.2f} {total / ingest_time:9.1f}")
+    two_step_time = convert_time + ingest_time
+    print(f"{'two-step: total':34} {two_step_time:9.2f} {total / two_step_time:9.1f}")
+    print(f"{'direct: ingest MBOX in place':34} {direct_time:9.2f} {total / direct_time:9.1f} {written:14,}")
+    print(f"{'direct: re-run (unchanged)':34} {rerun_time:9.2f}")
+    print(f"{f'direct: after appending {args.append}':34} {append_time:9.2f}   "
+          f"({manifest_entries - total:,} new manifest entries)")
+
+    status = 0
+    mismatches = [name for name in CONTENT_QUERIES if two_step_rows[name] != direct_rows[name]]
+    if mismatches:
+        print(f"\nRow mismatch between the two-step and direct databases in: {', '.join(mismatches)}")
+        status = 1
+    else:
+        print(f"\nTwo-step and direct databases hold identical rows ({emails:,} emails)")
+    if manifest_entries - total != args.append:
+        print(f"Expected {args.append} new manifest entries after the append, got {manifest_entries - total}")
+        status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""Downstream stages reading the .eml tree vs reading the parsed message store.
+
+Generates sample mailboxes laid out as a project (<mailbox>/processed/<direction>/*.eml),
+ingests them (which fills the parsed_messages table), then times every downstream stage
+that used to parse the .eml files itself, once from the files and once from the store:
+
+    topics     run_email_extraction (topic modeling input)
+    graphs     generate_graphs_for_project
+    semantic   automate_cleaning (semantic search preparation)
+
+and checks that both runs give the same output. A stage whose dependencies are not
+installed (streamlit for the .eml path of the graphs, the NLP stack for the cleaning) is
+reported as skipped.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import duckdb
+
+from scripts.bench_ingest import BENCH_PROJECT, build_config
+from src.data.duckdb_utils import setup_database
+from src.data.eml_transformation import process_eml_to_duckdb
+from src.data.message_store import PARSED_MESSAGES_TABLE, project_database_path
+from src.data.sample_generator import generate_test_mailboxes
+
+
+def build_project(root, emails, attachment_ratio, reply_ratio):
+    """Sample mailboxes moved into the processed/ folders of a project"""
+    project = Path(root) / BENCH_PROJECT
+    with contextlib.redirect_stdout(io.StringIO()):
+        generate_test_mailboxes(str(project), num_sent=emails, num_received=emails, format_type="eml",
+                                reply_ratio=reply_ratio, attachment_ratio=attachment_ratio)
+    mailbox_names = []
+    for mailbox_dir in sorted(project.iterdir()):
+        (mailbox_dir / "eml").rename(mailbox_dir / "processed")
+        (mailbox_dir / "metadata.json").unlink()
+        mailbox_names.append(mailbox_dir.name)
+    return project, mailbox_names
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def row(stage, source, seconds, emails, note=""):
+    print(f"{stage:10} {source:14} {seconds:9.2f} {emails / seconds if seconds else 0:10.1f}  {note}")
+
+
+def bench_topics(project, db_path, emails, tmp):
+    from app.components.topic_modeling.eml_json import run_email_extraction
+
+    outputs = {}
+    for source, store_db in (("eml files", None), ("message store", db_path)):
+        output = Path(tmp) / f"topics_{'store' if store_db else 'eml'}.json"
+        seconds, _ = timed(run_email_extraction, str(project), "bench", str(project),
+                           db_path=store_db, output_path=output)
+        records = json.loads(output.read_text(encoding="utf-8"))
+        outputs[source] = sorted(records, key=lambda record: (record["file_name"], record["message_id"] or ""))
+        row("topics", source, seconds, emails)
+    return outputs["eml files"] == outputs["message store"]
+
+
+def bench_graphs(project, db_path, mailbox_names, emails):
+    from src.data.graph_generation import generate_graphs_for_project
+
+    seconds, store_index = timed(generate_graphs_for_project, BENCH_PROJECT, project, mailbox_names, db_path=db_path)
+    store_graphs = _graph_summary(project)
+    try:
+        import streamlit  # noqa: F401  (the .eml path reads bodies with decodeml)
+    except ImportError:
+        row("graphs", "message store", seconds, emails, f"{len(store_index['graphs'])} graphs")
+        print(f"{'graphs':10} {'eml files':14}   skipped: streamlit is not installed")
+        return None
+
+    eml_seconds, _ = timed(generate_graphs_for_project, BENCH_PROJECT, project, mailbox_names,
+                           db_path=Path(project) / "missing.duckdb")
+    eml_graphs = _graph_summary(project)
+    row("graphs", "eml files", eml_seconds, emails)
+    row("graphs", "message store", seconds, emails, f"{len(store_index['graphs'])} graphs")
+    return eml_graphs == store_graphs
+
+
+def _graph_summary(project):
+    """Nodes and edge interaction counts of every generated graph"""
+    summary = {}
+    index = json.loads((Path(project) / "Graphs" / "index.json").read_text(encoding="utf-8"))
+    for entry in index["graphs"]:
+        graph = json.loads((Path(project) / "Graphs" / entry["graph_json"]).read_text(encoding="utf-8"))
+        summary[(entry["mailbox"], entry["relative_display"], entry["eml_count"])] = (
+            sorted(node["id"] for node in graph["nodes"]),
+            sorted((edge["id"], len(edge["interactions"])) for edge in graph["edges"]),
+        )
+    return summary
+
+
+def bench_semantic(project, db_path, emails, tmp):
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            from src.features.pipeline_data_cleaning import automate_cleaning
+    except Exception as e:
+        print(f"{'semantic':10} {'':14}   skipped: {e}")
+        return None
+
+    outputs = {}
+    for source, store_db in (("eml files", None), ("message store", db_path)):
+        output = Path(tmp) / f"cleaned_{'store' if store_db else 'eml'}.json"
+        seconds, _ = timed(automate_cleaning, project, output, force=True, db_path=store_db)
+        outputs[source] = json.loads(output.read_text(encoding="utf-8"))
+        row("semantic", source, seconds, emails)
+    key = lambda mail: (mail["folder"], mail["file"])
+    return sorted(outputs["eml files"], key=key) == sorted(outputs["message store"], key=key)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the parsed message store against .eml re-parsing")
+    parser.add_argument("--emails", type=int, default=1000,
+                        help="Emails per direction and per mailbox (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--attachment-ratio", type=float, default=0.1)
+    parser.add_argument("--reply-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        project, mailbox_names = build_project(tmp, args.emails, args.attachment_ratio, args.reply_ratio)
+        db_path = project_database_path(project)
+
+        conn = setup_database(str(db_path))
+        seconds, _ = timed(process_eml_to_duckdb, project, conn, project_name=BENCH_PROJECT,
+                           config_file=build_config(), workers=args.workers)
+        emails = conn.execute(f"SELECT COUNT(*) FROM {PARSED_MESSAGES_TABLE}").fetchone()[0]
+        conn.close()
+
+        print(f"{'stage':10} {'source':14} {'seconds':>9} {'emails/s':>10}")
+        row("ingest", "eml files", seconds, emails, f"{emails:,} messages in the store")
+
+        checks = {
+            "topics": bench_topics(project, db_path, emails, tmp),
+            "graphs": bench_graphs(project, db_path, mailbox_names, emails),
+            "semantic": bench_semantic(project, db_path, emails, tmp),
+        }
+        shutil.rmtree(project / "Graphs", ignore_errors=True)
+
+    print()
+    status = 0
+    for stage, same in checks.items():
+        if same is None:
+            continue
+        print(f"{stage}: {'same output from the files and from the store' if same else 'OUTPUT MISMATCH'}")
+        status |= 0 if same else 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""PST conversion: one readpst process at a time vs the bounded parallel scheduler.
+
+Converts a set of PST files with run_pst_conversions using 1 worker, then --workers
+workers, then runs it again (every file already converted, all skipped) and once more
+after one PST file changed (only that one converted again). Every run checks that the
+output folder holds exactly the messages of every PST file, none overwritten by another
+file's messages of the same name.
+
+With --pst-dir and a readpst on the PATH, real PST files are converted. Otherwise a
+stand-in for readpst is used on generated placeholder files: a small script that writes
+as many .eml files as a real conversion would in the same folders ("Boîte de réception",
+"Éléments envoyés"...), taking --seconds-per-gb per GB of PST, as readpst does mostly
+waiting on the disk.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import stat
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.data.pst_converter import PST_STATE_FILENAME, run_pst_conversions
+
+# Messages written per MB of placeholder PST
+EMAILS_PER_MB = 20
+
+FAKE_READPST = '''#!{python}
+import os, sys, time
+args = sys.argv[1:]
+output_dir = args[args.index("-o") + 1]
+pst_file = args[-1]
+size = os.path.getsize(pst_file)
+time.sleep(size / 1e9 * {seconds_per_gb})
+emails = max(1, size // (1024 * 1024) * {emails_per_mb})
+folders = ["Boîte de réception", "Éléments envoyés", "Archive"]
+for idx in range(emails):
+    folder = os.path.join(output_dir, "Dossiers personnels", folders[idx % len(folders)])
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, f"{{idx // len(folders) + 1}}.eml"), "w") as f:
+        f.write(f"Subject: {{os.path.basename(pst_file)}} {{idx}}\\n\\nbody\\n")
+'''
+
+
+def make_fake_readpst(directory, seconds_per_gb):
+    path = Path(directory) / "readpst"
+    path.write_text(FAKE_READPST.format(python=sys.executable, seconds_per_gb=seconds_per_gb,
+                                        emails_per_mb=EMAILS_PER_MB))
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return str(path)
+
+
+def make_placeholder_psts(directory, count, min_mb, max_mb, seed):
+    """Sparse files of random sizes: the stand-in only looks at their size"""
+    rng = random.Random(seed)
+    paths = []
+    for idx in range(count):
+        path = Path(directory) / f"archive_{idx:02d}.pst"
+        with open(path, "wb") as f:
+            f.truncate(rng.randint(min_mb, max_mb) * 1024 * 1024)
+        paths.append(str(path))
+    return paths
+
+
+def count_emails(output_dir):
+    return sum(1 for _ in Path(output_dir).rglob("*.eml"))
+
+
+def report(label, stats, output_dir, expected):
+    emails = count_emails(output_dir)
+    check = "" if expected is None else ("ok" if emails == expected else f"MISMATCH, expected {expected}")
+    print(f"{label:28} {stats['duration']:9.2f} {stats['converted']:10} {stats['skipped']:8} "
+          f"{stats['failed']:7} {emails:9,}  {check}")
+    return expected is None or emails == expected
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark serial vs parallel PST conversion")
+    parser.add_argument("--pst-dir", default=None, help="Folder of real PST files (needs readpst)")
+    parser.add_argument("--files", type=int, default=24, help="Placeholder PST files (default: %(default)s)")
+    parser.add_argument("--min-mb", type=int, default=20)
+    parser.add_argument("--max-mb", type=int, default=400)
+    parser.add_argument("--seconds-per-gb", type=float, default=4.0,
+                        help="Conversion time of the readpst stand-in (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2,
+                        help="Concurrent readpst processes (default: %(default)s)")
+    parser.add_argument("--disk-budget-mb", type=int, default=None,
+                        help="PST megabytes converted at once (default: PST_CONVERT_DISK_BUDGET_MB or 8 GB)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    budget = args.disk_budget_mb * 1024 * 1024 if args.disk_budget_mb else None
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.pst_dir:
+            if shutil.which("readpst") is None:
+                print("readpst not found. Install pst-utils (Linux) or libpst (macOS)")
+                return 1
+            readpst_cmd = "readpst"
+            pst_files = sorted(str(path) for path in Path(args.pst_dir).rglob("*.pst"))
+            expected = None
+        else:
+            readpst_cmd = make_fake_readpst(tmp, args.seconds_per_gb)
+            pst_files = make_placeholder_psts(tmp, args.files, args.min_mb, args.max_mb, args.seed)
+            expected = sum(max(1, os.path.getsize(path) // (1024 * 1024) * EMAILS_PER_MB) for path in pst_files)
+
+        total_mb = sum(os.path.getsize(path) for path in pst_files) / 1e6
+        print(f"{len(pst_files)} PST files, {total_mb:,.0f} MB")
+        print(f"\n{'run':28} {'seconds':>9} {'converted':>10} {'skipped':>8} {'failed':>7} {'emails':>9}")
+
+        ok = True
+        serial_time = None
+        for workers in dict.fromkeys([1, args.workers]):
+            output_dir = Path(tmp) / f"processed_{workers}"
+            stats = run_pst_conversions(pst_files, str(output_dir), workers=workers,
+                                        disk_budget_bytes=budget, readpst_cmd=readpst_cmd)
+            ok &= report(f"{workers} workers", stats, output_dir, expected)
+            serial_time = serial_time or stats["duration"]
+        parallel_stats = stats
+
+        stats = run_pst_conversions(pst_files, str(output_dir), workers=args.workers,
+                                    disk_budget_bytes=budget, readpst_cmd=readpst_cmd)
+        ok &= report("again (all complete)", stats, output_dir, expected)
+
+        os.utime(pst_files[0], (time.time(), time.time()))
+        stats = run_pst_conversions(pst_files, str(output_dir), workers=args.workers,
+                                    disk_budget_bytes=budget, readpst_cmd=readpst_cmd)
+        ok &= report("after touching one PST", stats, output_dir, expected)
+
+        print(f"\nspeedup with {args.workers} workers: {serial_time / parallel_stats['duration']:.1f}x, "
+              f"per file results kept in {PST_STATE_FILENAME}; slowest files:")
+        for result in sorted(parallel_stats["results"], key=lambda result: -result["duration"])[:3]:
+            print(f"  {os.path.basename(result['pst']):24} {result['duration']:6.2f}s {result['emails']:8,} emails")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
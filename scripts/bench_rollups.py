@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""Dashboard metrics and timeline: email rows vs the activity rollups.
+
+Generates sample projects of increasing size, ingests them, gives every email a random topic
+cluster at two levels (as a topic build would) and builds the rollups. Then, for a set of
+dashboard filter combinations, renders the metrics (total, sent, received, unique contacts)
+and the timeline figure both ways:
+
+    email rows   get_app_dataframe_with_filters, the date filter, the Python contact loop
+                 and create_timeline, as the dashboard did
+    rollups      get_activity_totals, get_activity_bounds and get_activity_counts, then
+                 create_timeline_from_counts
+
+and reports the median time of each, checking that both give the same metrics and the same
+timeline points. The rollup time should stay flat while the email rows time grows with
+the archive.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pandas as pd
+
+from scripts.bench_ingest import BENCH_PROJECT, build_config
+from scripts.bench_message_store import build_project
+from src.data.duckdb_utils import refresh_email_flat, setup_database
+from src.data.email_analyzer import EmailAnalyzer
+from src.data.eml_transformation import process_eml_to_duckdb
+from src.data.message_store import project_database_path
+from src.data.rollups import refresh_rollups
+from src.visualization.timeline import create_timeline, create_timeline_from_counts, effective_time_unit
+
+TOPIC_LEVELS = (1, 2)
+
+
+def add_topic_clusters(conn, rng):
+    """Random clusters at every topic level, in the layout written by the topic build"""
+    message_ids = [row[0] for row in conn.execute("SELECT DISTINCT message_id FROM receiver_emails").fetchall()]
+    rows = [(BENCH_PROJECT, message_id, 0, level, float(level), rng.randrange(4 * level), "")
+            for message_id in message_ids for level in TOPIC_LEVELS]
+    conn.execute("""
+    CREATE OR REPLACE TABLE email_topic_clusters (
+        project_name TEXT, message_id TEXT, topic_id INTEGER, level INTEGER, height DOUBLE,
+        cluster_id INTEGER, summary TEXT
+    )
+    """)
+    conn.executemany("INSERT INTO email_topic_clusters VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+
+def scenarios(conn, mailbox_names):
+    """(name, mailbox, filters, date range) combinations of the dashboard filters"""
+    first, last = [pd.Timestamp(value).date() for value in
+                   conn.execute("SELECT MIN(timestamp), MAX(timestamp) FROM receiver_emails").fetchone()]
+    span = last - first
+    folder = conn.execute("SELECT folder FROM receiver_emails WHERE folder <> '' LIMIT 1").fetchone()[0]
+    middle = first + span / 2
+    return [
+        ("all emails", "All Mailboxes", {}, (first, last)),
+        ("sent", "All Mailboxes", {"direction": "Envoyé"}, (first, last)),
+        ("one mailbox", mailbox_names[0], {}, (first, last)),
+        ("one folder", "All Mailboxes", {"folder": folder}, (first, last)),
+        ("topic cluster", "All Mailboxes", {"topic_cluster": "1"}, (first, last)),
+        ("partial months", "All Mailboxes", {"direction": "received"},
+         (first + span / 5, last - span / 7)),
+        ("three weeks", "All Mailboxes", {}, (middle, middle + pd.Timedelta(days=20).to_pytimedelta())),
+    ]
+
+
+def date_filtered(df, date_range):
+    """The date filter of the app (apply_date_filter)"""
+    start = pd.Timestamp(date_range[0])
+    end = pd.Timestamp(date_range[1]) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+    return df[(df['date'] >= start) & (df['date'] <= end)].reset_index(drop=True)
+
+
+def render_from_rows(analyzer, mailbox, filters, date_range, topic_level):
+    df = analyzer.get_app_dataframe_with_filters(mailbox=mailbox, filters=filters, limit=None,
+                                                 topic_level=topic_level)
+    df = date_filtered(df, date_range)
+    unique_recipients = set()
+    for recipients in df["recipient_email"].dropna():
+        if isinstance(recipients, str) and recipients.strip():
+            for recipient in recipients.split(','):
+                recipient = recipient.strip()
+                if recipient:
+                    unique_recipients.add(recipient)
+    totals = {
+        "total": len(df),
+        "sent": len(df[df["direction"] == "sent"]),
+        "received": len(df[df["direction"] == "received"]),
+        "contacts": len(set(df["from"].dropna()).union(unique_recipients)),
+    }
+    return totals, create_timeline(df)
+
+
+def render_from_rollups(analyzer, mailbox, filters, date_range, topic_level):
+    totals = analyzer.get_activity_totals(mailbox, filters, date_range, topic_level)
+    bounds = analyzer.get_activity_bounds(mailbox, filters, date_range, topic_level)
+    unit = effective_time_unit(*bounds, "M") if bounds else "M"
+    counts = analyzer.get_activity_counts(unit, mailbox, filters, date_range, topic_level)
+    return totals, create_timeline_from_counts(counts, unit)
+
+
+def figure_points(fig):
+    return [(trace.name, [pd.Timestamp(x) for x in trace.x], [int(y) for y in trace.y]) for trace in fig.data], \
+        fig.layout.title.text
+
+
+def median_time(func, repeat):
+    times, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), result
+
+
+def bench_size(emails, args, tmp):
+    root = os.path.join(tmp, str(emails))
+    project, mailbox_names = build_project(root, emails, 0.0, args.reply_ratio)
+    db_path = project_database_path(project)
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        conn = setup_database(str(db_path))
+        process_eml_to_duckdb(project, conn, project_name=BENCH_PROJECT, config_file=build_config(),
+                              workers=args.workers)
+        refresh_email_flat(conn)
+    add_topic_clusters(conn, random.Random(args.seed))
+    start = time.perf_counter()
+    rollup_rows = refresh_rollups(conn)
+    refresh_seconds = time.perf_counter() - start
+    messages = conn.execute("SELECT COUNT(*) FROM receiver_emails").fetchone()[0]
+    cases = scenarios(conn, mailbox_names)
+    conn.close()
+    print(f"\n{messages:,} emails: rollups rebuilt in {refresh_seconds:.2f}s ({rollup_rows:,} activity rows)")
+
+    analyzer = EmailAnalyzer(str(db_path))
+    ok = True
+    for name, mailbox, filters, date_range in cases:
+        with contextlib.redirect_stdout(io.StringIO()):
+            rows_seconds, (rows_totals, rows_fig) = median_time(
+                lambda: render_from_rows(analyzer, mailbox, filters, date_range, TOPIC_LEVELS[0]), args.repeat)
+            rollup_seconds, (rollup_totals, rollup_fig) = median_time(
+                lambda: render_from_rollups(analyzer, mailbox, filters, date_range, TOPIC_LEVELS[0]), args.repeat)
+        same = rows_totals == rollup_totals and figure_points(rows_fig) == figure_points(rollup_fig)
+        ok &= same
+        print(f"  {name:16} {rows_totals['total']:>8,} {rows_seconds:10.3f} {rollup_seconds:10.4f} "
+              f"{rows_seconds / rollup_seconds:8.1f}x  {'same' if same else 'MISMATCH'}")
+        if not same:
+            print(f"    email rows {rows_totals}, rollups {rollup_totals}")
+    analyzer.close()
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard metrics and timeline on the rollups")
+    parser.add_argument("--emails", type=int, nargs="+", default=[500, 2000, 8000],
+                        help="Emails per direction and per mailbox, one project per value (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--reply-ratio", type=float, default=0.2)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per scenario (median)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        for emails in args.emails:
+            print(f"{'scenario':18} {'emails':>8} {'rows s':>10} {'rollups s':>10} {'speedup':>9}")
+            ok &= bench_size(emails, args, tmp)
+    print(f"\n{'both paths give the same metrics and timelines' if ok else 'MISMATCH between the paths'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
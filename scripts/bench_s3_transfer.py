@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""Directory upload/download throughput of S3Handler, serial vs concurrent transfers.
+
+Creates a tree of small EML-sized files (plus a few multipart-sized ones) and times
+upload_directory and download_directory with 1 worker and with --workers workers, the
+re-run of the upload, which only compares checksums and sends nothing, and finally the
+packed layout (EML files in tar shards) with one message read back by a ranged GET.
+
+Without --endpoint-url the bucket lives in moto's in-process S3 mock, with --latency-ms
+of simulated round trip added to every request (a mock answers instantly, which would
+hide the per-request latency the concurrent transfers are about). With --endpoint-url
+(e.g. a local MinIO container) the real endpoint is used, credentials coming from the
+usual environment variables.
+"""
+
+import argparse
+import contextlib
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.data.s3_utils import S3Handler
+
+
+def build_tree(root, files, min_size, max_size, large_files, seed):
+    rng = random.Random(seed)
+    total = 0
+    for idx in range(files):
+        folder = os.path.join(root, f"folder_{idx % 50:02d}")
+        os.makedirs(folder, exist_ok=True)
+        data = rng.randbytes(rng.randint(min_size, max_size))
+        with open(os.path.join(folder, f"{idx:07d}.eml"), "wb") as f:
+            f.write(data)
+        total += len(data)
+    for idx in range(large_files):
+        data = rng.randbytes(20 * 1024 * 1024 + idx)
+        with open(os.path.join(root, f"archive_{idx}.pst"), "wb") as f:
+            f.write(data)
+        total += len(data)
+    return total
+
+
+def add_latency(handler, latency_ms):
+    """Sleep before every request sent by the handler's clients"""
+    def _sleep(**kwargs):
+        time.sleep(latency_ms / 1000)
+    for client in (handler.client, handler.s3.meta.client):
+        client.meta.events.register("before-send.s3", _sleep)
+
+
+def make_handler(args, workers):
+    handler = S3Handler(endpoint_url=args.endpoint_url, region_name=args.region, max_workers=workers)
+    if not args.endpoint_url and args.latency_ms:
+        add_latency(handler, args.latency_ms)
+    return handler
+
+
+def run(args, tree, total_bytes):
+    print(f"{'run':28} {'seconds':>9} {'files/s':>9} {'MB/s':>8}")
+    for workers in dict.fromkeys([1, args.workers]):
+        handler = make_handler(args, workers)
+        prefix = f"bench/{workers}-workers"
+        files = args.files + args.large_files
+
+        start = time.perf_counter()
+        stats = handler.upload_directory(tree, args.bucket, prefix, show_progress=False)
+        elapsed = time.perf_counter() - start
+        assert stats["failed_files"] == 0, stats["failed_paths"][:5]
+        print(f"{f'upload, {workers} workers':28} {elapsed:9.2f} {files / elapsed:9.1f} {total_bytes / 1e6 / elapsed:8.1f}")
+
+        target = tempfile.mkdtemp()
+        start = time.perf_counter()
+        stats = handler.download_directory(args.bucket, prefix, target)
+        elapsed = time.perf_counter() - start
+        assert stats["failed_files"] == 0, stats["failed_paths"][:5]
+        print(f"{f'download, {workers} workers':28} {elapsed:9.2f} {files / elapsed:9.1f} {total_bytes / 1e6 / elapsed:8.1f}")
+        shutil.rmtree(target)
+
+    start = time.perf_counter()
+    stats = handler.upload_directory(tree, args.bucket, prefix, show_progress=False)
+    elapsed = time.perf_counter() - start
+    print(f"{'upload again (unchanged)':28} {elapsed:9.2f}   ({stats['skipped_files']} skipped)")
+
+    # Packed layout: EML files in tar shards, one object per shard
+    prefix = f"bench/{args.workers}-workers-packed"
+    start = time.perf_counter()
+    stats = handler.upload_directory(tree, args.bucket, prefix, show_progress=False, packed=True)
+    elapsed = time.perf_counter() - start
+    print(f"{f'upload packed, {args.workers} workers':28} {elapsed:9.2f} {files / elapsed:9.1f} "
+          f"{total_bytes / 1e6 / elapsed:8.1f}   ({stats['total_files']} objects)")
+
+    target = tempfile.mkdtemp()
+    start = time.perf_counter()
+    handler.download_directory(args.bucket, prefix, target)
+    elapsed = time.perf_counter() - start
+    print(f"{f'download packed, {args.workers} workers':28} {elapsed:9.2f} {files / elapsed:9.1f} "
+          f"{total_bytes / 1e6 / elapsed:8.1f}")
+    shutil.rmtree(target)
+
+    start = time.perf_counter()
+    handler.get_packed_object(args.bucket, prefix, "folder_07/0000007.eml")
+    print(f"{'single message (ranged GET)':28} {time.perf_counter() - start:9.3f}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark S3Handler directory transfers")
+    parser.add_argument("--files", type=int, default=2000, help="Small files (default: %(default)s)")
+    parser.add_argument("--min-size", type=int, default=2_000)
+    parser.add_argument("--max-size", type=int, default=60_000)
+    parser.add_argument("--large-files", type=int, default=2,
+                        help="20 MB files, sent in parts (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=16, help="Concurrent transfers (default: %(default)s)")
+    parser.add_argument("--endpoint-url", default=None, help="S3-compatible endpoint (default: moto mock)")
+    parser.add_argument("--region", default="us-east-1")
+    parser.add_argument("--bucket", default="olkoa-bench-transfer")
+    parser.add_argument("--latency-ms", type=float, default=20.0,
+                        help="Simulated round trip per request on the moto mock (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    mock = contextlib.nullcontext()
+    if not args.endpoint_url:
+        from moto import mock_aws
+        os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+        os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+        mock = mock_aws()
+
+    with tempfile.TemporaryDirectory() as tree, mock:
+        total_bytes = build_tree(tree, args.files, args.min_size, args.max_size, args.large_files, args.seed)
+        print(f"{args.files:,} files + {args.large_files} large, {total_bytes / 1e6:.1f} MB")
+        handler = make_handler(args, 1)
+        if args.bucket not in handler.list_buckets():
+            handler.create_bucket(args.bucket)
+        run(args, tree, total_bytes)
+        if not args.endpoint_url:
+            handler.delete_bucket(args.bucket, force=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
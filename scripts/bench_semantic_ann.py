@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Recall and latency of the HNSW index against the exact semantic search.
+
+Generates clustered random vectors shaped like the chunk embeddings (384 dimensions for
+paraphrase-multilingual-MiniLM-L12-v2), builds the same index as compute_embeddings and
+compares, per query, the exact top-k (ann_index.exact_search) with the HNSW top-k at
+several efSearch values. recall@k is the share of the exact top-k found by the index.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.topic.ann_index import ann_search, build_hnsw_index, exact_search, normalize_rows
+
+
+def clustered_vectors(count, dim, clusters, rng):
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    assignment = rng.integers(0, clusters, size=count)
+    return centers[assignment] + 0.6 * rng.normal(size=(count, dim)).astype(np.float32)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark exact vs HNSW semantic search")
+    parser.add_argument("--vectors", type=int, default=100_000,
+                        help="Indexed vectors (default: %(default)s)")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=200,
+                        help="Results per query, as requested by the semantic page (default: %(default)s)")
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[128, 256, 512, 1024])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    embeddings = clustered_vectors(args.vectors, args.dim, args.clusters, rng)
+    queries = normalize_rows(clustered_vectors(args.queries, args.dim, args.clusters, rng))
+    embeddings_norm = normalize_rows(embeddings)
+
+    start = time.perf_counter()
+    index = build_hnsw_index(embeddings)
+    print(f"HNSW build: {time.perf_counter() - start:.1f}s for {args.vectors:,} x {args.dim} vectors")
+
+    exact_ids, exact_times = [], []
+    for query in queries:
+        start = time.perf_counter()
+        ids, _ = exact_search(query, embeddings_norm, args.top_k)
+        exact_times.append(time.perf_counter() - start)
+        exact_ids.append(set(ids.tolist()))
+
+    print(f"{'search':18} {'recall@k':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    exact_p95 = sorted(exact_times)[int(0.95 * (len(exact_times) - 1))]
+    print(f"{'exact':18} {1.0:9.4f} {statistics.median(exact_times) * 1000:9.2f} {exact_p95 * 1000:9.2f}")
+
+    # ann_search never goes below 2 * top_k, so smaller values collapse into one run
+    for ef_search in sorted({max(ef, 2 * args.top_k) for ef in args.ef_search}):
+        recalls, times = [], []
+        for query, expected in zip(queries, exact_ids):
+            start = time.perf_counter()
+            ids, _ = ann_search(index, query, args.top_k, ef_search=ef_search)
+            times.append(time.perf_counter() - start)
+            recalls.append(len(expected.intersection(ids.tolist())) / len(expected))
+        p95 = sorted(times)[int(0.95 * (len(times) - 1))]
+        label = f"hnsw ef={ef_search}"
+        print(f"{label:18} {statistics.mean(recalls):9.4f} {statistics.median(times) * 1000:9.2f} {p95 * 1000:9.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
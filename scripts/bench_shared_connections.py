@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Concurrent sessions: private analyzer connections vs the shared read-only connection.
+
+Builds a synthetic project database (see tests/synthetic_db.py), then runs a number of threads
+standing for Streamlit sessions. Each one loads pages as the app does: it creates an
+EmailAnalyzer, counts the filtered emails, reads the first page of the Email Explorer and
+closes the analyzer. The same workload runs with private connections (each analyzer opens
+the database) and with shared analyzers (cursors of the process-wide connection), and the
+median page load and the total time are reported for each.
+
+Then the database file is replaced by a smaller one, as a rebuild would, to check that a
+new shared analyzer reads the new file while one opened before keeps reading the old one.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tests.synthetic_db import build_synthetic_db
+from src.data.connection_pool import configure_shared_connections
+from src.data.duckdb_utils import refresh_email_flat
+from src.data.email_analyzer import EmailAnalyzer
+
+FILTERS = ({}, {"direction": "sent"}, {"folder": "folder_3"}, {"direction": "received", "folder": "folder_5"})
+
+
+def build(db_path, emails, args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        build_synthetic_db(db_path, emails, args.entities, args.seed)
+        analyzer = EmailAnalyzer(db_path)
+        refresh_email_flat(analyzer.connect())
+        analyzer.close()
+
+
+def page_load(db_path, shared, filters):
+    analyzer = EmailAnalyzer(db_path, shared=shared)
+    try:
+        query = analyzer.email_list_query(filters=filters)
+        total = analyzer.count_email_list(query)
+        analyzer.get_email_page(query, page=1, total=total)
+    finally:
+        analyzer.close()
+
+
+def run_sessions(db_path, shared, args):
+    """Median page load and wall time of every session loading its pages at once"""
+    timings, errors = [], []
+    lock = threading.Lock()
+
+    def session(number):
+        for i in range(args.loads):
+            start = time.perf_counter()
+            try:
+                page_load(db_path, shared, FILTERS[(number + i) % len(FILTERS)])
+            except Exception as e:
+                with lock:
+                    errors.append(e)
+                continue
+            with lock:
+                timings.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=session, args=(number,)) for number in range(args.sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return statistics.median(timings) if timings else float("nan"), time.perf_counter() - start, errors
+
+
+def check_replacement(db_path, args, tmp):
+    """A new shared analyzer reads a replaced file, one opened before keeps the previous file"""
+    before = EmailAnalyzer(db_path, shared=True)
+    old_count = before.count_email_list(before.email_list_query())
+    replacement = str(Path(tmp) / "replacement.duckdb")
+    build(replacement, args.emails // 2, args)
+    os.replace(replacement, db_path)
+
+    after = EmailAnalyzer(db_path, shared=True)
+    new_count = after.count_email_list(after.email_list_query())
+    still_old = before.count_email_list(before.email_list_query())
+    after.close()
+    before.close()
+    print(f"\nfile replaced: {old_count:,} emails before, {new_count:,} after, "
+          f"{still_old:,} for the analyzer opened before")
+    return old_count == args.emails and new_count == args.emails // 2 and still_old == old_count
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark concurrent sessions on the shared connection")
+    parser.add_argument("--emails", type=int, default=200_000)
+    parser.add_argument("--entities", type=int, default=5_000)
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent sessions (default: %(default)s)")
+    parser.add_argument("--loads", type=int, default=20, help="Page loads per session (default: %(default)s)")
+    parser.add_argument("--memory-limit", default="2GB", help="Of the shared connection (default: %(default)s)")
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 4,
+                        help="Of the shared connection (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    configure_shared_connections(args.memory_limit, args.threads)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "sessions.duckdb")
+        build(db_path, args.emails, args)
+        print(f"{args.sessions} sessions x {args.loads} page loads, {args.emails:,} emails")
+        print(f"{'connections':12} {'page load':>10} {'total':>9} {'errors':>7}")
+        for label, shared in (("private", False), ("shared", True)):
+            median, total, errors = run_sessions(db_path, shared, args)
+            print(f"{label:12} {median:9.4f}s {total:8.2f}s {len(errors):7}")
+            if errors:
+                print(f"  first error: {errors[0]}")
+        ok = check_replacement(db_path, args, tmp)
+    print("shared connection reopened on replacement" if ok else "MISMATCH after the replacement")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
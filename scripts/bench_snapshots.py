@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Reads during a rebuild: writing the database in place vs publishing a snapshot.
+
+Builds a synthetic project database (see tests/synthetic_db.py), then runs threads standing for
+app sessions: each one loads Email Explorer pages through shared analyzers in a loop. While
+they read, another process rebuilds the database (email_flat refreshed, some emails
+removed, then a pause standing for a long build), either:
+
+    in place    on <project>.duckdb, as the builds did
+    snapshot    into a new snapshot published at the end (build_snapshot)
+
+For each, the page loads that failed, the slowest one, and the email counts the sessions
+saw are reported. The snapshot rebuild is then repeated to check that only the configured
+number of snapshots is kept.
+"""
+
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import duckdb
+
+from tests.synthetic_db import build_synthetic_db
+from src.data.duckdb_utils import refresh_email_flat
+from src.data.email_analyzer import EmailAnalyzer
+from src.data.snapshots import build_snapshot, current_database, list_snapshots
+
+
+def rebuild(db_path, mode, removed, pause):
+    """Rebuild run in its own process, as the ingestion pipeline"""
+    def write(conn):
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            refresh_email_flat(conn)
+        conn.execute("DELETE FROM email_flat WHERE email_id IN (SELECT email_id FROM email_flat LIMIT ?)", [removed])
+        conn.execute("CHECKPOINT")
+        time.sleep(pause)
+
+    if mode == "in place":
+        with duckdb.connect(db_path) as conn:
+            write(conn)
+    else:
+        with build_snapshot(db_path) as snapshot_path, duckdb.connect(str(snapshot_path)) as conn:
+            write(conn)
+
+
+def page_load(db_path):
+    analyzer = EmailAnalyzer(db_path, shared=True)
+    try:
+        query = analyzer.email_list_query()
+        total = analyzer.count_email_list(query)
+        analyzer.get_email_page(query, page=1, total=total)
+        return total
+    finally:
+        analyzer.close()
+
+
+def read_during_rebuild(db_path, mode, args):
+    stop = threading.Event()
+    timings, errors, totals = [], [], set()
+    lock = threading.Lock()
+
+    def session():
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                total = page_load(db_path)
+            except Exception as e:
+                with lock:
+                    errors.append(str(e).splitlines()[0])
+                time.sleep(0.05)
+                continue
+            with lock:
+                timings.append(time.perf_counter() - start)
+                totals.add(total)
+
+    threads = [threading.Thread(target=session) for _ in range(args.sessions)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.5)
+    builder = multiprocessing.get_context("spawn").Process(target=rebuild,
+                                                           args=(db_path, mode, args.removed, args.pause))
+    start = time.perf_counter()
+    builder.start()
+    builder.join()
+    build_seconds = time.perf_counter() - start
+    time.sleep(0.5)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    slowest = max(timings) if timings else float("nan")
+    median = statistics.median(timings) if timings else float("nan")
+    print(f"{mode:10} {'ok' if builder.exitcode == 0 else 'FAILED':>7} {build_seconds:7.1f}s {len(timings):7,} "
+          f"{len(errors):7,} {median:8.3f}s {slowest:8.3f}s  {', '.join(f'{total:,}' for total in sorted(totals))}")
+    if errors:
+        print(f"           first error: {errors[0][:120]}")
+    return builder.exitcode == 0 and not errors
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the reads of the app during a database rebuild")
+    parser.add_argument("--emails", type=int, default=100_000)
+    parser.add_argument("--entities", type=int, default=5_000)
+    parser.add_argument("--sessions", type=int, default=4, help="Concurrent reading sessions (default: %(default)s)")
+    parser.add_argument("--removed", type=int, default=1_000, help="Emails removed by each rebuild")
+    parser.add_argument("--pause", type=float, default=3.0, help="Seconds a rebuild keeps the database open")
+    parser.add_argument("--retention", type=int, default=3, help="Snapshots kept (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    os.environ["DUCKDB_SNAPSHOT_RETENTION"] = str(args.retention)
+
+    ok = True
+    print(f"{'rebuild':10} {'build':>7} {'time':>8} {'loads':>7} {'failed':>7} {'median':>9} {'slowest':>9}  "
+          f"emails seen")
+    for mode in ("in place", "snapshot"):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = str(Path(tmp) / "Bench" / "Bench.duckdb")
+            Path(db_path).parent.mkdir()
+            with contextlib.redirect_stdout(io.StringIO()):
+                build_synthetic_db(db_path, args.emails, args.entities, args.seed)
+                with duckdb.connect(db_path) as conn:
+                    refresh_email_flat(conn)
+            succeeded = read_during_rebuild(db_path, mode, args)
+            if mode == "snapshot":
+                ok &= succeeded
+                for _ in range(args.retention + 1):
+                    rebuild(db_path, mode, args.removed, 0)
+                snapshots = list_snapshots(db_path)
+                # email_flat is rebuilt from the emails at each rebuild, so each one removes the same number
+                expected = args.emails - args.removed
+                kept = len(snapshots) == args.retention and snapshots[-1] == current_database(db_path)
+                counted = page_load(db_path) == expected
+                print(f"\n{args.retention + 2} snapshot rebuilds: {len(snapshots)} snapshots kept, "
+                      f"current is the newest: {kept}, {expected:,} emails read: {counted}")
+                ok &= kept and counted
+    print("snapshot publishing served every read" if ok else "FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
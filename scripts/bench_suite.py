@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""Benchmark suite of the ingestion and query hot paths at several corpus sizes.
+
+For every scale (10k, 100k and 1M messages by default) a corpus is generated with
+src.data.sample_generator over the three sample mailboxes, with reply threads and
+attachments, laid out as a project (<mailbox>/processed/<direction>/*.eml). Then the
+following stages are timed:
+
+    generate   corpus generation (reused from --corpus-dir when already there)
+    parse      serial parse_eml_file over a sample of the files
+    ingest     process_eml_to_duckdb into a fresh database
+    email_flat refresh of the pre-joined email_flat table
+    fulltext   build of the full-text index
+    threads    set-based thread reconstruction (threads and email_children tables)
+    queries    EmailAnalyzer app queries (median of --repeat runs)
+    semantic   exact search over random vectors, one per message
+    ann        HNSW build, latency and recall@10 over the same vectors (needs faiss)
+    graphs     generate_graphs_for_project
+
+Results are written as JSON (one record per scale/stage/name). --compare prints the
+ratio of every timing against a previous results file.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scripts.bench_ingest import BENCH_PROJECT, build_config
+from src.data.duckdb_utils import refresh_email_flat, setup_database
+from src.data.email_analyzer import EmailAnalyzer
+from src.data.eml_transformation import find_eml_files, parse_eml_file, process_eml_to_duckdb
+from src.data.fulltext_index import refresh_fulltext_index
+from src.data.thread_index import refresh_threads
+from src.data.sample_generator import AGENTS, iter_mailbox_emails
+from src.topic.ann_index import ann_search, build_hnsw_index, exact_search, normalize_rows
+
+RESULTS_SCHEMA = 1
+STAGES = ("generate", "parse", "ingest", "email_flat", "fulltext", "threads", "queries", "semantic", "ann", "graphs")
+
+# Name -> call on an EmailAnalyzer, the same calls the app makes
+QUERY_CALLS = {
+    "app_dataframe_with_filters": lambda analyzer, sample: analyzer.get_app_dataframe_with_filters(
+        filters={"direction": "received"}, limit=50000, topic_level=-1),
+    "app_dataframe_agg_recipients": lambda analyzer, sample: analyzer.get_app_dataframe_agg_recipients(
+        limit=50000, topic_level=-1),
+    "rag_email_dataset": lambda analyzer, sample: analyzer.get_rag_email_dataset(),
+    "search_emails": lambda analyzer, sample: analyzer.search_emails("archives numérisation", limit=100),
+    "email_content": lambda analyzer, sample: analyzer.get_email_content(sample["message_id"]),
+    "conversation_thread": lambda analyzer, sample: analyzer.get_conversation_thread(sample["reply_message_id"]),
+}
+
+
+def parse_scale(value):
+    value = value.strip().lower()
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(value[-1], 1)
+    return int(float(value.rstrip("km")) * multiplier)
+
+
+def scale_label(messages):
+    if messages % 1_000_000 == 0:
+        return f"{messages // 1_000_000}m"
+    if messages % 1_000 == 0:
+        return f"{messages // 1_000}k"
+    return str(messages)
+
+
+def _write_mailbox(task):
+    """Write the emails of one mailbox as <root>/<mailbox>/processed/<direction>/<n>.eml"""
+    root, mailbox_idx, num_sent, num_received, reply_ratio, attachment_ratio, seed = task
+    random.seed(seed + mailbox_idx)
+    processed = Path(root) / f"mailbox_{mailbox_idx + 1}" / "processed"
+    for direction in ("sent", "received"):
+        (processed / direction).mkdir(parents=True, exist_ok=True)
+    count = 0
+    for idx, (msg, direction) in enumerate(iter_mailbox_emails(
+            AGENTS[mailbox_idx], num_sent=num_sent, num_received=num_received,
+            reply_ratio=reply_ratio, attachment_ratio=attachment_ratio)):
+        with open(processed / direction / f"{idx:07d}.eml", "wb") as f:
+            f.write(msg.as_bytes())
+        count += 1
+    return count
+
+
+def generate_corpus(root, messages, reply_ratio, attachment_ratio, seed):
+    """Generate (or reuse) a corpus of `messages` emails split over the sample mailboxes
+
+    Returns:
+        (seconds spent generating, whether the corpus was reused)
+    """
+    marker = Path(root) / ".complete"
+    if marker.exists():
+        return 0.0, True
+    if Path(root).exists():
+        shutil.rmtree(root)
+
+    per_mailbox = [messages // len(AGENTS)] * len(AGENTS)
+    per_mailbox[-1] += messages - sum(per_mailbox)
+    tasks = [(str(root), idx, count // 2, count - count // 2, reply_ratio, attachment_ratio, seed)
+             for idx, count in enumerate(per_mailbox)]
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=len(tasks)) as pool:
+        written = sum(pool.map(_write_mailbox, tasks))
+    elapsed = time.perf_counter() - start
+    if written != messages:
+        raise RuntimeError(f"Generated {written} emails instead of {messages}")
+    marker.write_text(json.dumps({"messages": messages, "reply_ratio": reply_ratio,
+                                  "attachment_ratio": attachment_ratio, "seed": seed}))
+    return elapsed, False
+
+
+def quiet(func, *args, **kwargs):
+    """Call func with its stdout discarded (the pipeline functions log every step)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = quiet(func, *args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def median_time(func, repeat):
+    return statistics.median(timed(func)[0] for _ in range(repeat))
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[int(fraction * (len(ordered) - 1))]
+
+
+class Results:
+    def __init__(self):
+        self.records = []
+
+    def add(self, messages, stage, name, seconds, items=None, **extra):
+        record = {"scale": messages, "stage": stage, "name": name, "seconds": round(seconds, 6)}
+        if items is not None:
+            record["items"] = items
+            record["items_per_second"] = round(items / seconds, 3) if seconds > 0 else None
+        if extra:
+            record["extra"] = extra
+        self.records.append(record)
+        rate = f" ({record['items_per_second']:,.1f}/s)" if record.get("items_per_second") else ""
+        print(f"  {stage:10} {name:30} {seconds:10.3f}s{rate}")
+
+
+def bench_scale(messages, args, workdir, results):
+    label = scale_label(messages)
+    print(f"\n=== {label} messages ===")
+    corpus_root = Path(args.corpus_dir or workdir) / f"corpus_{label}"
+    mailbox_names = [f"mailbox_{idx + 1}" for idx in range(len(AGENTS))]
+    config = build_config()
+    run = lambda stage: stage in args.stages
+
+    seconds, reused = generate_corpus(corpus_root, messages, args.reply_ratio, args.attachment_ratio, args.seed)
+    if run("generate") and not reused:
+        results.add(messages, "generate", "sample_generator", seconds, items=messages)
+    eml_files = find_eml_files(corpus_root)
+
+    if run("parse"):
+        sample = eml_files[:args.parse_sample]
+        seconds, _ = timed(lambda: [parse_eml_file(path, corpus_root, config, "bench", BENCH_PROJECT)
+                                    for path in sample])
+        results.add(messages, "parse", "parse_eml_file", seconds, items=len(sample))
+
+    db_path = str(Path(workdir) / f"bench_{label}.duckdb")
+    if any(run(stage) for stage in ("ingest", "email_flat", "fulltext", "threads", "queries")):
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        conn = quiet(setup_database, db_path)
+        seconds, _ = timed(process_eml_to_duckdb, corpus_root, conn, project_name=BENCH_PROJECT,
+                           config_file=config, workers=args.workers, incremental=False)
+        ingested = conn.execute("SELECT COUNT(*) FROM receiver_emails").fetchone()[0]
+        if run("ingest"):
+            results.add(messages, "ingest", "process_eml_to_duckdb", seconds, items=ingested,
+                        workers=args.workers)
+
+        seconds, _ = timed(refresh_email_flat, conn)
+        if run("email_flat"):
+            results.add(messages, "email_flat", "refresh_email_flat", seconds, items=ingested)
+        seconds, _ = timed(refresh_fulltext_index, conn)
+        if run("fulltext"):
+            results.add(messages, "fulltext", "refresh_fulltext_index", seconds, items=ingested)
+        seconds, thread_count = timed(refresh_threads, conn)
+        if run("threads"):
+            results.add(messages, "threads", "refresh_threads", seconds, items=ingested, threads=thread_count)
+        # Child counts of email_flat come from the email_children rows rebuilt with the threads
+        refresh_email_flat(conn)
+
+        sample = {
+            "message_id": conn.execute("SELECT message_id FROM receiver_emails LIMIT 1").fetchone()[0],
+            "reply_message_id": (conn.execute(
+                "SELECT message_id FROM receiver_emails WHERE in_reply_to <> '' LIMIT 1"
+            ).fetchone() or conn.execute("SELECT message_id FROM receiver_emails LIMIT 1").fetchone())[0],
+        }
+        conn.close()
+
+        if run("queries"):
+            analyzer = EmailAnalyzer(db_path)
+            quiet(analyzer.connect_fulltext)
+            for name, call in QUERY_CALLS.items():
+                seconds = median_time(lambda: call(analyzer, sample), args.repeat)
+                results.add(messages, "queries", name, seconds, repeat=args.repeat)
+            analyzer.close()
+
+    if run("semantic") or run("ann"):
+        rng = np.random.default_rng(args.seed)
+        centers = rng.normal(size=(200, args.dim)).astype(np.float32)
+        vectors = centers[rng.integers(0, 200, size=messages)]
+        vectors += 0.6 * rng.normal(size=vectors.shape).astype(np.float32)
+        queries = normalize_rows(centers[rng.integers(0, 200, size=args.queries)]
+                                 + 0.6 * rng.normal(size=(args.queries, args.dim)).astype(np.float32))
+        embeddings_norm = normalize_rows(vectors)
+
+        exact_hits, exact_times = [], []
+        for query in queries:
+            seconds, (ids, _) = timed(exact_search, query, embeddings_norm, 10)
+            exact_times.append(seconds)
+            exact_hits.append(set(ids.tolist()))
+        if run("semantic"):
+            results.add(messages, "semantic", "exact_search_top10", statistics.median(exact_times),
+                        p95_seconds=percentile(exact_times, 0.95), vectors=messages, dim=args.dim)
+
+        if run("ann"):
+            try:
+                seconds, index = timed(build_hnsw_index, vectors)
+            except ImportError as e:
+                print(f"  ann        skipped: {e}")
+            else:
+                results.add(messages, "ann", "build_hnsw_index", seconds, items=messages)
+                ann_times, recalls = [], []
+                for query, expected in zip(queries, exact_hits):
+                    seconds, (ids, _) = timed(ann_search, index, query, 10)
+                    ann_times.append(seconds)
+                    recalls.append(len(expected.intersection(ids.tolist())) / len(expected))
+                results.add(messages, "ann", "ann_search_top10", statistics.median(ann_times),
+                            p95_seconds=percentile(ann_times, 0.95), recall_at_10=statistics.mean(recalls))
+        del vectors, embeddings_norm
+
+    if run("graphs"):
+        try:
+            # Pulls the email decoding helpers of the app (streamlit)
+            from src.data.graph_generation import generate_graphs_for_project
+        except ImportError as e:
+            print(f"  graphs     skipped: {e}")
+            return
+        seconds, graph_index = timed(generate_graphs_for_project, BENCH_PROJECT, corpus_root, mailbox_names)
+        results.add(messages, "graphs", "generate_graphs_for_project", seconds, items=messages,
+                    graphs=len(graph_index.get("graphs", [])))
+        shutil.rmtree(corpus_root / "Graphs", ignore_errors=True)
+
+
+def environment_info():
+    def git(*cmd):
+        try:
+            return subprocess.run(["git", *cmd], capture_output=True, text=True, check=True,
+                                  cwd=os.path.dirname(__file__)).stdout.strip()
+        except Exception:
+            return None
+
+    info = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "git_commit": git("rev-parse", "HEAD"),
+        "git_describe": git("describe", "--tags", "--always", "--dirty"),
+    }
+    try:
+        import psutil
+        info["memory_bytes"] = psutil.virtual_memory().total
+    except ImportError:
+        pass
+    return info
+
+
+def compare(previous_path, records):
+    with open(previous_path, "r", encoding="utf-8") as f:
+        previous = {(r["scale"], r["stage"], r["name"]): r for r in json.load(f)["results"]}
+    print(f"\n=== Compared with {previous_path} (ratio > 1 is slower) ===")
+    for record in records:
+        old = previous.get((record["scale"], record["stage"], record["name"]))
+        if old and old["seconds"]:
+            ratio = record["seconds"] / old["seconds"]
+            flag = "  <-- slower" if ratio > 1.2 else ""
+            print(f"  {scale_label(record['scale']):>5} {record['stage']:10} {record['name']:30} "
+                  f"{old['seconds']:10.3f}s -> {record['seconds']:10.3f}s  x{ratio:5.2f}{flag}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark ingestion and queries at several corpus sizes")
+    parser.add_argument("--scales", nargs="+", default=["10k", "100k", "1m"],
+                        help="Corpus sizes in messages, e.g. 10k 100k 1m (default: %(default)s)")
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=STAGES,
+                        help="Stages to time (default: all)")
+    parser.add_argument("--output", default=None,
+                        help="Results file (default: bench_results/bench-<timestamp>.json)")
+    parser.add_argument("--compare", default=None, help="Previous results file to compare with")
+    parser.add_argument("--corpus-dir", default=None,
+                        help="Keep generated corpora here and reuse them in later runs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2,
+                        help="Ingestion worker processes (default: %(default)s)")
+    parser.add_argument("--parse-sample", type=int, default=5000,
+                        help="Files parsed serially in the parse stage (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per query (default: %(default)s)")
+    parser.add_argument("--dim", type=int, default=384, help="Vector size of the semantic stages")
+    parser.add_argument("--queries", type=int, default=50, help="Semantic queries (default: %(default)s)")
+    parser.add_argument("--reply-ratio", type=float, default=0.3)
+    parser.add_argument("--attachment-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    scales = [parse_scale(value) for value in args.scales]
+    output = Path(args.output or Path("bench_results") / f"bench-{datetime.now():%Y%m%d-%H%M%S}.json")
+    results = Results()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for messages in scales:
+            bench_scale(messages, args, workdir, results)
+
+    report = {
+        "schema": RESULTS_SCHEMA,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "environment": environment_info(),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "results": results.records,
+    }
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(args.compare, results.records)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""State tracking cost of the upload_emls CLI: JSON list state vs the upload journal.
+
+Creates a tree of small EML files (500k by default), then:
+
+1. times the state bookkeeping alone, per uploaded file: the previous JSON state (a
+   list scanned with `in` and the whole file rewritten after every upload, measured on
+   --legacy-sample files since it is quadratic) against UploadJournal over every file;
+2. runs upload_eml_to_s3 end to end against moto's in-process S3 mock, then again
+   (everything already uploaded), then once more after cutting the journal in half
+   mid-line, as a crash would, to check that only the lost entries are sent again.
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.data.upload_emls import UploadJournal, upload_eml_to_s3
+
+BUCKET = "olkoa-bench-upload-emls"
+EML_TEMPLATE = "From: a@example.org\nTo: b@example.org\nSubject: message {idx}\n\nBody of message {idx}\n"
+
+
+def build_tree(root, files):
+    for idx in range(files):
+        folder = Path(root) / f"folder_{idx // 1000:04d}"
+        if idx % 1000 == 0:
+            folder.mkdir(parents=True, exist_ok=True)
+        (folder / f"{idx:07d}.eml").write_text(EML_TEMPLATE.format(idx=idx))
+    return sorted(str(path) for path in Path(root).glob("**/*.eml"))
+
+
+def legacy_bookkeeping(paths, state_file):
+    """The previous state handling of upload_eml_to_s3, without the uploads"""
+    state = {"last_zip_processed": None, "processed_emls": [], "last_run": None}
+    for path in paths:
+        if path in state["processed_emls"]:
+            continue
+        state["processed_emls"].append(path)
+        with open(state_file, "w") as f:
+            json.dump(state, f, indent=2)
+
+
+def journal_bookkeeping(paths, state_file, sync_every):
+    with UploadJournal(state_file, sync_every=sync_every) as journal:
+        for path in paths:
+            if path in journal:
+                continue
+            journal.add(path)
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def count_lines(path):
+    with open(path, "rb") as f:
+        return sum(1 for _ in f)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the upload_emls state store")
+    parser.add_argument("--files", type=int, default=500_000, help="EML files (default: %(default)s)")
+    parser.add_argument("--legacy-sample", type=int, default=5_000,
+                        help="Files run through the previous JSON state (default: %(default)s)")
+    parser.add_argument("--sync-every", type=int, default=1000)
+    parser.add_argument("--skip-upload", action="store_true", help="Only time the state bookkeeping")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "source"
+        print(f"Creating {args.files:,} EML files...")
+        paths = build_tree(source, args.files)
+
+        sample = paths[:args.legacy_sample]
+        legacy = timed(legacy_bookkeeping, sample, str(Path(tmp) / "legacy_state.json"))
+        journal = timed(journal_bookkeeping, paths, str(Path(tmp) / "journal_state.json"), args.sync_every)
+        resume = timed(journal_bookkeeping, paths, str(Path(tmp) / "journal_state.json"), args.sync_every)
+        print(f"\n{'state bookkeeping':34} {'files':>9} {'seconds':>9} {'us/file':>9}")
+        print(f"{'JSON list state (previous)':34} {len(sample):9,} {legacy:9.2f} {legacy / len(sample) * 1e6:9.1f}")
+        print(f"{'journal':34} {len(paths):9,} {journal:9.2f} {journal / len(paths) * 1e6:9.1f}")
+        print(f"{'journal, resume (all known)':34} {len(paths):9,} {resume:9.2f} {resume / len(paths) * 1e6:9.1f}")
+
+        if args.skip_upload:
+            return 0
+
+        from moto import mock_aws
+        import boto3
+
+        state_file = str(Path(tmp) / "upload_state.json")
+        upload = lambda: upload_eml_to_s3(str(source), BUCKET, state_file,
+                                          aws_access_key_id="bench", aws_secret_access_key="bench",
+                                          region_name="us-east-1", sync_every=args.sync_every)
+        with mock_aws(), contextlib.redirect_stderr(open(os.devnull, "w")):
+            boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=BUCKET)
+            first = timed(upload)
+            second = timed(upload)
+
+            # Crash in the middle of a journal write: half the entries and a partial line
+            journal_path = f"{state_file}.journal"
+            with open(journal_path, "rb") as f:
+                data = f.read()
+            with open(journal_path, "wb") as f:
+                f.write(data[:len(data) // 2])
+            kept = count_lines(journal_path) - 1
+            third = timed(upload)
+            objects = sum(page.get("KeyCount", 0) for page in boto3.client("s3", region_name="us-east-1")
+                          .get_paginator("list_objects_v2").paginate(Bucket=BUCKET))
+
+        print(f"\n{'upload_eml_to_s3 (moto)':34} {'seconds':>9} {'files/s':>9}")
+        print(f"{'first run':34} {first:9.2f} {len(paths) / first:9.1f}")
+        print(f"{'second run (nothing to send)':34} {second:9.2f} {len(paths) / second:9.1f}")
+        print(f"{'after a crash, half the journal':34} {third:9.2f}   "
+              f"({len(paths) - kept:,} sent again, {kept:,} kept)")
+        journal_ok = count_lines(journal_path) == len(paths)
+        print(f"objects in bucket: {objects:,}, journal entries: {count_lines(journal_path):,} "
+              f"({'ok' if objects == len(paths) and journal_ok else 'MISMATCH'})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,480 @@
+"""Content-addressed attachment storage, outside the project database.
+
+Attachment bytes used to be stored inline in the attachments table, once per email: the
+same logo, signature image or forwarded PDF was stored again in every message carrying it,
+and the database file grew with every copy. The bytes now live in a blob directory next to
+the database (data/Projects/<project>/attachment_blobs/), one file per distinct content,
+named after its SHA-256. The attachments table only keeps the hash, size and MIME type.
+
+The attachment_blobs table counts the attachments referencing each blob. The writer adds
+references for the rows it actually inserts and deleting emails releases theirs. The blob
+directory is shared by every snapshot of the database: collect_garbage removes the blobs
+none of the snapshots kept references anymore, when old snapshots are pruned.
+
+Databases built with inline content are migrated by migrate_inline_attachments (run by the
+next ingestion, or from the command line with compaction of the database file):
+
+    python -m src.data.attachment_store migrate data/Projects/<project>/<project>.duckdb --compact
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import duckdb
+import pandas as pd
+
+from src.data.duckdb_utils import setup_database, table_exists
+from src.data.snapshots import build_snapshot, current_database, list_snapshots, project_folder, snapshot_lock
+
+ATTACHMENT_BLOBS_DIRNAME = "attachment_blobs"
+ATTACHMENT_BLOBS_TABLE = "attachment_blobs"
+
+
+def attachment_hash(content: Optional[bytes]) -> str:
+    """SHA-256 of an attachment content, the name of its blob"""
+    return hashlib.sha256(content or b"").hexdigest()
+
+
+class AttachmentStore:
+    """Directory of attachment blobs, each stored once under <root>/<hash[:2]>/<hash>"""
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+
+    @classmethod
+    def for_database(cls, db_path: Union[str, Path]) -> 'AttachmentStore':
+        """Blob directory of a project database, in the project folder (shared by its snapshots)"""
+        return cls(project_folder(db_path) / ATTACHMENT_BLOBS_DIRNAME)
+
+    @classmethod
+    def for_connection(cls, conn: duckdb.DuckDBPyConnection) -> 'AttachmentStore':
+        """Blob directory of the database a connection is attached to"""
+        db_path = database_file(conn)
+        if not db_path:
+            raise ValueError("An in-memory database has no attachment store, pass one explicitly")
+        return cls.for_database(db_path)
+
+    def path(self, content_hash: str) -> Path:
+        return self.root / content_hash[:2] / content_hash
+
+    def exists(self, content_hash: str) -> bool:
+        return self.path(content_hash).exists()
+
+    def put(self, content: Optional[bytes], content_hash: Optional[str] = None) -> Tuple[str, bool]:
+        """
+        Store an attachment content, unless a blob with the same content is already there.
+
+        The blob is written to a temporary file then renamed, so a blob present under its
+        hash is always complete, even after an interrupted ingestion.
+
+        Args:
+            content: Attachment bytes
+            content_hash: Hash of the content, when the caller already computed it
+
+        Returns:
+            (hash, written), written being False when the blob already existed
+        """
+        content = content or b""
+        content_hash = content_hash or attachment_hash(content)
+        path = self.path(content_hash)
+        if path.exists():
+            return content_hash, False
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.parent / f".{content_hash}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        return content_hash, True
+
+    def get(self, content_hash: str) -> bytes:
+        with open(self.path(content_hash), "rb") as f:
+            return f.read()
+
+    def delete(self, content_hash: str) -> int:
+        """Remove a blob, returning the number of bytes freed (0 if it was not there)"""
+        path = self.path(content_hash)
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            return 0
+        return size
+
+    def iter_hashes(self) -> Iterator[str]:
+        if not self.root.is_dir():
+            return
+        for prefix_dir in self.root.iterdir():
+            if prefix_dir.is_dir():
+                for blob in prefix_dir.iterdir():
+                    if not blob.name.startswith("."):
+                        yield blob.name
+
+    def disk_usage(self) -> int:
+        """Total size of the stored blobs, in bytes"""
+        return sum(self.path(content_hash).stat().st_size for content_hash in self.iter_hashes())
+
+
+def database_file(conn: duckdb.DuckDBPyConnection) -> Optional[str]:
+    """Path of the database file behind a connection (None for an in-memory database)"""
+    row = conn.execute(
+        "SELECT path FROM duckdb_databases() WHERE database_name = current_database()"
+    ).fetchone()
+    return row[0] if row and row[0] else None
+
+
+def _attachment_columns(conn: duckdb.DuckDBPyConnection) -> List[str]:
+    return [row[0] for row in conn.execute(
+        "SELECT column_name FROM information_schema.columns WHERE table_name = 'attachments'"
+    ).fetchall()]
+
+
+def add_references(conn: duckdb.DuckDBPyConnection, inserted: pd.DataFrame) -> None:
+    """
+    Count one more reference per inserted attachment row.
+
+    Args:
+        conn: DuckDB connection
+        inserted: content_hash, size and content_type of the attachment rows just inserted
+            (rows ignored as already present must not be counted again)
+    """
+    if inserted.empty:
+        return
+    conn.register('inserted_attachments', inserted)
+    try:
+        conn.execute(f"""
+        INSERT INTO {ATTACHMENT_BLOBS_TABLE}
+        SELECT content_hash, any_value(size), any_value(content_type), COUNT(*)
+        FROM inserted_attachments
+        WHERE content_hash IS NOT NULL
+        GROUP BY content_hash
+        ON CONFLICT (content_hash) DO UPDATE SET ref_count = ref_count + excluded.ref_count
+        """)
+    finally:
+        conn.unregister('inserted_attachments')
+
+
+def release_references(conn: duckdb.DuckDBPyConnection, content_hashes: List[Optional[str]]) -> None:
+    """Count one reference less per deleted attachment row (blobs reaching 0 are left to collect_garbage)"""
+    content_hashes = [content_hash for content_hash in content_hashes if content_hash]
+    if not content_hashes:
+        return
+    conn.register('released_hashes', pd.DataFrame({'content_hash': content_hashes}))
+    try:
+        conn.execute(f"""
+        UPDATE {ATTACHMENT_BLOBS_TABLE} AS b
+        SET ref_count = b.ref_count - r.released
+        FROM (SELECT content_hash, COUNT(*) AS released FROM released_hashes GROUP BY content_hash) AS r
+        WHERE b.content_hash = r.content_hash
+        """)
+    finally:
+        conn.unregister('released_hashes')
+
+
+def recount_references(conn: duckdb.DuckDBPyConnection) -> None:
+    """Rebuild the reference counts from the attachments table"""
+    conn.execute(f"DELETE FROM {ATTACHMENT_BLOBS_TABLE}")
+    conn.execute(f"""
+    INSERT INTO {ATTACHMENT_BLOBS_TABLE}
+    SELECT content_hash, any_value(size), any_value(content_type), COUNT(*)
+    FROM attachments
+    WHERE content_hash IS NOT NULL
+    GROUP BY content_hash
+    """)
+
+
+def _counted_blobs(db_file: Path) -> Tuple[set, set]:
+    """
+    Blobs counted in the attachment_blobs table of a database file.
+
+    The file is attached read-only to an in-memory instance, as the shared connections do,
+    so that a snapshot the app reads is not opened a second time with another configuration.
+
+    Returns:
+        (referenced, released) hashes, released ones having no reference left
+    """
+    conn = duckdb.connect()
+    try:
+        quoted_path = str(db_file).replace("'", "''")
+        conn.execute(f"ATTACH '{quoted_path}' AS counted (READ_ONLY)")
+        if not conn.execute(
+            "SELECT COUNT(*) FROM duckdb_tables() WHERE database_name = 'counted' AND table_name = ?",
+            [ATTACHMENT_BLOBS_TABLE],
+        ).fetchone()[0]:
+            return set(), set()
+        rows = conn.execute(f"SELECT content_hash, ref_count > 0 FROM counted.{ATTACHMENT_BLOBS_TABLE}").fetchall()
+    finally:
+        conn.close()
+    return ({content_hash for content_hash, referenced in rows if referenced},
+            {content_hash for content_hash, referenced in rows if not referenced})
+
+
+def collect_garbage(db_path: Union[str, Path],
+                    store: Optional[AttachmentStore] = None,
+                    sweep: bool = False,
+                    dropped: Iterable[Union[str, Path]] = ()) -> Dict[str, int]:
+    """
+    Remove the blobs no snapshot of a database references anymore.
+
+    Every snapshot of a database shares its blob directory but keeps its own reference
+    counts: a blob the current snapshot released may still be read from an older one. A blob
+    is removed once it is counted in none of the snapshots kept, which prune_snapshots checks
+    when it deletes old snapshots. No snapshot is written, their counts are only read.
+
+    The build lock of the database must be held (see snapshots.snapshot_lock): the blobs of a
+    build in progress are counted in no published snapshot yet.
+
+    Args:
+        db_path: Path of the database (<project>.duckdb)
+        store: Blob directory (default: the one of the database)
+        sweep: Also remove the blob files counted nowhere, left by an ingestion interrupted
+            between writing a blob and committing its rows
+        dropped: Snapshots about to be deleted, whose blobs are removed unless a snapshot
+            kept references them
+
+    Returns:
+        Dictionary with the number of 'blobs' removed and the 'bytes' freed
+    """
+    store = store or AttachmentStore.for_database(db_path)
+    if not store.root.is_dir():
+        return {'blobs': 0, 'bytes': 0}
+    dropped = {current_database(snapshot) for snapshot in dropped}
+    kept = [current_database(snapshot) for snapshot in list_snapshots(db_path)] or [current_database(db_path)]
+    kept = [snapshot for snapshot in kept if snapshot not in dropped and snapshot.exists()]
+
+    referenced, candidates = set(), set()
+    for snapshot in kept:
+        try:
+            snapshot_referenced, released = _counted_blobs(snapshot)
+        except duckdb.Error as e:
+            # Its references are unknown, nothing can be removed safely
+            print(f"Attachment blobs not collected, {snapshot.name} could not be read: {e}")
+            return {'blobs': 0, 'bytes': 0}
+        referenced |= snapshot_referenced
+        candidates |= released
+    for snapshot in dropped:
+        try:
+            candidates |= set.union(*_counted_blobs(snapshot))
+        except duckdb.Error:
+            # Its blobs are left as orphan files, for a sweep
+            pass
+    if sweep:
+        candidates |= set(store.iter_hashes())
+
+    unreferenced = candidates - referenced
+    freed = sum(store.delete(content_hash) for content_hash in unreferenced)
+    return {'blobs': len(unreferenced), 'bytes': freed}
+
+
+def read_attachment(conn: duckdb.DuckDBPyConnection,
+                    attachment_id: str,
+                    store: Optional[AttachmentStore] = None) -> Optional[bytes]:
+    """
+    Content of an attachment, read from its blob (or inline, in a database not migrated yet).
+
+    Returns:
+        The attachment bytes, None if there is no such attachment
+    """
+    inline = "content" in _attachment_columns(conn)
+    row = conn.execute(
+        f"SELECT content_hash{', content' if inline else ''} FROM attachments WHERE id = ?",
+        [attachment_id],
+    ).fetchone()
+    if row is None:
+        return None
+    if inline and row[1] is not None:
+        return row[1]
+    store = store or AttachmentStore.for_connection(conn)
+    return store.get(row[0])
+
+
+def has_inline_attachments(conn: duckdb.DuckDBPyConnection) -> bool:
+    """Whether the attachments table still has the inline content column of older databases"""
+    return "content" in _attachment_columns(conn)
+
+
+def migrate_inline_attachments(conn: duckdb.DuckDBPyConnection,
+                               store: Optional[AttachmentStore] = None,
+                               batch_size: int = 500) -> Dict[str, int]:
+    """
+    Move the inline attachment content of an older database into the blob directory.
+
+    Each content is written once to the store, its hash set on the attachment row, then
+    the content column is dropped and the reference counts rebuilt. An interrupted
+    migration resumes where it stopped. Dropping the column frees the space inside the
+    database file, which keeps its size until it is rewritten (see compact_database).
+
+    Args:
+        conn: Connection opened by setup_database, which adds the content_hash column and
+            the attachment_blobs table to an older schema
+        store: Blob directory (default: the one next to the database)
+        batch_size: Attachment rows read at a time
+
+    Returns:
+        Dictionary with the number of 'attachments' migrated, of 'blobs' written and the
+        'bytes' of inline content moved out
+    """
+    stats = {'attachments': 0, 'blobs': 0, 'bytes': 0}
+    if not has_inline_attachments(conn):
+        return stats
+    store = store or AttachmentStore.for_connection(conn)
+
+    while True:
+        rows = conn.execute("""
+        SELECT id, content FROM attachments
+        WHERE content_hash IS NULL AND content IS NOT NULL
+        LIMIT ?
+        """, [batch_size]).fetchall()
+        if not rows:
+            break
+        updates = []
+        for attachment_id, content in rows:
+            content_hash, written = store.put(content)
+            stats['blobs'] += written
+            stats['bytes'] += len(content)
+            updates.append((content_hash, attachment_id))
+        conn.register('migrated_attachments', pd.DataFrame(updates, columns=['content_hash', 'id']))
+        try:
+            conn.execute("""
+            UPDATE attachments SET content_hash = m.content_hash
+            FROM migrated_attachments AS m
+            WHERE attachments.id = m.id
+            """)
+        finally:
+            conn.unregister('migrated_attachments')
+        conn.commit()
+        stats['attachments'] += len(rows)
+
+    # DuckDB refuses to alter a table that has indexes: they are dropped and created again
+    indexes = conn.execute(
+        "SELECT index_name, sql FROM duckdb_indexes() WHERE table_name = 'attachments'"
+    ).fetchall()
+    for index_name, _ in indexes:
+        conn.execute(f"DROP INDEX {index_name}")
+    conn.execute("ALTER TABLE attachments DROP COLUMN content")
+    for _, sql in indexes:
+        conn.execute(sql)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_attachments_content_hash ON attachments(content_hash)")
+    recount_references(conn)
+    conn.commit()
+    return stats
+
+
+def compact_database(db_path: Union[str, Path]) -> Tuple[int, int]:
+    """
+    Rewrite a database file to give back the space freed inside it.
+
+    DuckDB reuses freed blocks but does not shrink its file: the database is exported then
+    imported into a new snapshot, which replaces the current one (see snapshots). No
+    read-write connection may be open on it.
+
+    Returns:
+        (size before, size after) of the database file, in bytes
+    """
+    db_path = Path(db_path)
+    size_before = current_database(db_path).stat().st_size
+    export_dir = tempfile.mkdtemp(prefix="export_", dir=project_folder(db_path))
+    try:
+        with build_snapshot(db_path, copy_current=False) as snapshot_path:
+            source = duckdb.connect(str(current_database(db_path)), read_only=True)
+            try:
+                source.execute(f"EXPORT DATABASE '{export_dir}' (FORMAT parquet)")
+            finally:
+                source.close()
+            target = duckdb.connect(str(snapshot_path))
+            try:
+                target.execute(f"IMPORT DATABASE '{export_dir}'")
+                target.execute("CHECKPOINT")
+            finally:
+                target.close()
+    finally:
+        shutil.rmtree(export_dir, ignore_errors=True)
+    return size_before, current_database(db_path).stat().st_size
+
+
+def storage_report(conn: duckdb.DuckDBPyConnection, store: Optional[AttachmentStore] = None) -> Dict[str, Any]:
+    """
+    Space the deduplication saves.
+
+    Returns:
+        Dictionary with the number of 'attachments' and distinct 'blobs', the 'logical_bytes'
+        one copy per attachment would take, the 'stored_bytes' of the blob directory and the
+        'saved_bytes' between the two
+    """
+    store = store or AttachmentStore.for_connection(conn)
+    attachments, logical_bytes = conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM attachments WHERE content_hash IS NOT NULL"
+    ).fetchone()
+    blobs = conn.execute(f"SELECT COUNT(*) FROM {ATTACHMENT_BLOBS_TABLE} WHERE ref_count > 0").fetchone()[0]
+    stored_bytes = store.disk_usage()
+    return {
+        'attachments': attachments,
+        'blobs': blobs,
+        'logical_bytes': int(logical_bytes),
+        'stored_bytes': stored_bytes,
+        'saved_bytes': int(logical_bytes) - stored_bytes,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Maintain the attachment blobs of a project database")
+    parser.add_argument("command", choices=["migrate", "gc", "report"],
+                        help="migrate: move inline content to the blob directory, "
+                             "gc: remove unreferenced blobs, report: space saved")
+    parser.add_argument("db_path", help="Project database (data/Projects/<project>/<project>.duckdb)")
+    parser.add_argument("--compact", action="store_true", help="After migrate, rewrite the database file")
+    parser.add_argument("--sweep", action="store_true",
+                        help="gc: also remove blob files counted in no snapshot")
+    args = parser.parse_args()
+
+    if not Path(args.db_path).exists():
+        print(f"Database not found: {args.db_path}")
+        return 1
+
+    store = AttachmentStore.for_database(args.db_path)
+    if args.command == "gc":
+        # Waits for a build in progress, whose blobs are not counted yet
+        with snapshot_lock(args.db_path):
+            stats = collect_garbage(args.db_path, store, sweep=args.sweep)
+        print(f"{stats['blobs']} blobs removed, {stats['bytes'] / 1e6:,.1f} MB freed")
+        return 0
+
+    if args.command == "report":
+        conn = duckdb.connect(str(current_database(args.db_path)), read_only=True)
+        try:
+            if not table_exists(conn, ATTACHMENT_BLOBS_TABLE) or has_inline_attachments(conn):
+                print("Attachments still stored inline, run the migrate command first")
+                return 1
+            report = storage_report(conn, store)
+        finally:
+            conn.close()
+        print(f"{report['attachments']} attachments, {report['blobs']} distinct blobs: "
+              f"{report['stored_bytes'] / 1e6:,.1f} MB stored for {report['logical_bytes'] / 1e6:,.1f} MB, "
+              f"{report['saved_bytes'] / 1e6:,.1f} MB saved")
+        return 0
+
+    # Migrated into a new snapshot, published once complete (see snapshots)
+    with build_snapshot(args.db_path) as snapshot_path:
+        conn = setup_database(str(snapshot_path))
+        try:
+            stats = migrate_inline_attachments(conn, store)
+        finally:
+            conn.close()
+    print(f"{stats['attachments']} attachments migrated, {stats['blobs']} blobs written, "
+          f"{stats['bytes'] / 1e6:,.1f} MB moved out of the database")
+
+    if args.compact:
+        before, after = compact_database(args.db_path)
+        print(f"Database file: {before / 1e6:,.1f} MB -> {after / 1e6:,.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""Read-only DuckDB connections shared by every session of the app process.
+
+The pages create EmailAnalyzer objects freely, and each one used to open a private
+connection: every page load paid the connection setup, every session kept its own buffer
+pool, and the open read-write handles got in the way of the ingestion pipeline. A shared
+analyzer instead checks out a cursor from the one read-only connection this module keeps
+per project database, and returns it when it is closed.
+
+The connection is an in-memory DuckDB instance with the project database ATTACHed
+READ_ONLY, so the memory limit and the thread count (DUCKDB_SHARED_MEMORY_LIMIT and
+DUCKDB_SHARED_THREADS in constants.py, or the environment variables of the same names)
+bound all the sessions together. The database file and its WAL are checked at each
+checkout: when they changed on disk (a new snapshot published, see snapshots, or the file
+written in place), new cursors come from a fresh connection, and the previous one is closed
+once its last cursor is back. Cursors checked out before the change keep reading the file
+they opened.
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import duckdb
+
+import constants
+from src.data.snapshots import current_database
+
+DATABASE_ALIAS = "project"
+
+
+def _file_identity(db_file: str) -> Tuple:
+    """What changes when the database file is replaced or written"""
+    stat = os.stat(db_file)
+    identity = (db_file, stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    try:
+        wal = os.stat(db_file + ".wal")
+        return identity + (wal.st_size, wal.st_mtime_ns)
+    except FileNotFoundError:
+        return identity
+
+
+@dataclass
+class _SharedConnection:
+    conn: duckdb.DuckDBPyConnection
+    identity: Tuple
+    cursors: int = 0
+    retired: bool = False
+
+
+class SharedConnectionPool:
+    """One read-only connection per database file, handing out cursors"""
+
+    def __init__(self, memory_limit: Optional[str] = None, threads: Optional[int] = None):
+        self.memory_limit = memory_limit or os.getenv("DUCKDB_SHARED_MEMORY_LIMIT") or \
+            getattr(constants, "DUCKDB_SHARED_MEMORY_LIMIT", "2GB")
+        self.threads = int(threads or os.getenv("DUCKDB_SHARED_THREADS") or
+                           getattr(constants, "DUCKDB_SHARED_THREADS", 4))
+        self._lock = threading.Lock()
+        self._current: Dict[str, _SharedConnection] = {}
+        self._checked_out: Dict[int, _SharedConnection] = {}
+
+    def _open(self, db_file: str, identity: Tuple) -> _SharedConnection:
+        conn = duckdb.connect(":memory:", config={"memory_limit": self.memory_limit, "threads": self.threads})
+        try:
+            quoted_path = db_file.replace("'", "''")
+            conn.execute(f"ATTACH '{quoted_path}' AS {DATABASE_ALIAS} (READ_ONLY)")
+        except Exception:
+            conn.close()
+            raise
+        return _SharedConnection(conn, identity)
+
+    def _close_if_unused(self, shared: _SharedConnection):
+        if shared.retired and shared.cursors == 0:
+            shared.conn.close()
+
+    def checkout(self, db_path: str) -> duckdb.DuckDBPyConnection:
+        """A cursor on the shared connection of a database, reading its tables unqualified"""
+        key = os.path.abspath(db_path)
+        with self._lock:
+            # The current snapshot when the database is a link to one
+            db_file = str(current_database(key))
+            identity = _file_identity(db_file)
+            shared = self._current.get(key)
+            if shared is not None and shared.identity != identity:
+                shared.retired = True
+                self._close_if_unused(shared)
+                shared = None
+            if shared is None:
+                shared = self._current[key] = self._open(db_file, identity)
+            cursor = shared.conn.cursor()
+            shared.cursors += 1
+            self._checked_out[id(cursor)] = shared
+        cursor.execute(f"USE {DATABASE_ALIAS}")
+        return cursor
+
+    def checkin(self, cursor: duckdb.DuckDBPyConnection):
+        """Give back a cursor from checkout"""
+        with self._lock:
+            shared = self._checked_out.pop(id(cursor), None)
+            cursor.close()
+            if shared is not None:
+                shared.cursors -= 1
+                self._close_if_unused(shared)
+
+    def invalidate(self, db_path: str):
+        """Open the database again at the next checkout, whether or not its file changed"""
+        with self._lock:
+            shared = self._current.pop(os.path.abspath(db_path), None)
+            if shared is not None:
+                shared.retired = True
+                self._close_if_unused(shared)
+
+    def close(self):
+        """Close the connections without cursors out, the others as their cursors come back"""
+        with self._lock:
+            for shared in self._current.values():
+                shared.retired = True
+                self._close_if_unused(shared)
+            self._current.clear()
+
+
+_pool: Optional[SharedConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def shared_connection_pool() -> SharedConnectionPool:
+    """The connection pool of the process, created with the configured settings on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SharedConnectionPool()
+        return _pool
+
+
+def configure_shared_connections(memory_limit: Optional[str] = None, threads: Optional[int] = None):
+    """Change the settings of the shared connections; the open ones are replaced as they free up"""
+    global _pool
+    with _pool_lock:
+        previous, _pool = _pool, SharedConnectionPool(memory_limit, threads)
+    if previous is not None:
+        previous.close()
@@ -0,0 +1,85 @@
+"""
+Deterministic, content derived identifiers for the ingested rows.
+
+Every id is a name based UUID (uuid5) computed from stable content, so ingesting the same
+message twice, in any order or in parallel, always yields the same ids: INSERT OR IGNORE
+then keeps a single row, and artifacts built from the database (chunk metadata, topic
+assignments, ColBERT metadata...) can be joined across rebuilds.
+"""
+
+import hashlib
+import uuid
+from typing import Iterable, Optional
+
+# Never change: every id of every existing database derives from it
+ID_NAMESPACE = uuid.UUID("6f1c2b0e-4d3a-5e8b-9c7f-0a1b2c3d4e5f")
+
+# Headers hashed, with the body, when a message has no Message-ID
+FALLBACK_HEADERS = ('from', 'to', 'cc', 'date', 'subject')
+
+
+def _derive_id(kind: str, *parts: Optional[str]) -> str:
+    """uuid5 of a kind prefix and its parts, NUL separated so that parts cannot run into each other"""
+    name = "\x00".join([kind] + ["" if part is None else str(part) for part in parts])
+    return str(uuid.uuid5(ID_NAMESPACE, name))
+
+
+def normalize_message_id(message_id: Optional[str]) -> str:
+    """Strip the whitespace and angle brackets around a Message-ID header"""
+    return (message_id or "").strip().strip("<>").strip()
+
+
+def message_fingerprint(headers: Iterable[Optional[str]], body: Optional[str]) -> str:
+    """Hash of a message's headers and body, used in place of a missing Message-ID"""
+    digest = hashlib.sha256()
+    for value in list(headers) + [body]:
+        digest.update((value or "").encode("utf-8", errors="replace"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def email_id(mailbox_name: str, message_id: Optional[str], fingerprint: Optional[str] = None) -> str:
+    """
+    Id of a received/sent email.
+
+    The mailbox is part of the key: the copy of a message sent from one project mailbox to
+    another is a distinct row in each of them, while copies within a mailbox collapse.
+
+    Args:
+        mailbox_name: Mailbox the email was ingested into
+        message_id: Message-ID header (may be empty)
+        fingerprint: message_fingerprint of the email, used when there is no Message-ID
+
+    Returns:
+        The email id
+    """
+    message_id = normalize_message_id(message_id)
+    if message_id:
+        return _derive_id("email", mailbox_name, message_id)
+    return _derive_id("email-content", mailbox_name, fingerprint)
+
+
+def sender_email_id(email_id_: str) -> str:
+    """Id of the sender_emails row of an email (one per email)"""
+    return _derive_id("sender_email", email_id_)
+
+
+def entity_id(normalized_address: str) -> str:
+    """Id of an entity, from its normalized email address"""
+    return _derive_id("entity", normalized_address)
+
+
+def alias_email_id(entity_id_: str, alias_address: str) -> str:
+    """Id of an entity_alias_emails row"""
+    return _derive_id("entity_alias_email", entity_id_, alias_address)
+
+
+def mailing_list_id(list_name: str, list_address: str) -> str:
+    """Id of a mailing list, from its List-Id name and address"""
+    return _derive_id("mailing_list", list_name, list_address)
+
+
+def attachment_id(email_id_: str, position: int, filename: str, content: Optional[bytes]) -> str:
+    """Id of an attachment, from its email, position in the email, name and content"""
+    content_hash = hashlib.sha256(content or b"").hexdigest()
+    return _derive_id("attachment", email_id_, str(position), filename, content_hash)
@@ -157,18 +157,30 @@ def setup_database(db_path: Union[str, Path]) -> duckdb.DuckDBPyConnection:
     )
     """)
 
-    # Attachments table
+    # Attachments table, the content is stored once per hash outside the database (see attachment_store)
     conn.execute("""
     CREATE TABLE IF NOT EXISTS attachments (
         id VARCHAR PRIMARY KEY,
         email_id VARCHAR,
         filename VARCHAR,
-        content BLOB,
+        content_hash VARCHAR,
         content_type VARCHAR,
         size INTEGER,
         FOREIGN KEY (email_id) REFERENCES receiver_emails(id)
     )
     """)
+    # Databases created with inline content, until migrate_inline_attachments moves it out
+    conn.execute("ALTER TABLE attachments ADD COLUMN IF NOT EXISTS content_hash VARCHAR")
+
+    # Reference counts of the attachment blobs
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS attachment_blobs (
+        content_hash VARCHAR PRIMARY KEY,
+        size BIGINT,
+        content_type VARCHAR,
+        ref_count INTEGER
+    )
+    """)
 
     # Create child email relationships table
     conn.execute("""
@@ -181,6 +193,39 @@ def setup_database(db_path: Union[str, Path]) -> duckdb.DuckDBPyConnection:
     )
     """)
 
+    # Ingestion manifest: one row per ingested source file, used by incremental re-runs
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS ingest_manifest (
+        path VARCHAR PRIMARY KEY,
+        size BIGINT,
+        mtime DOUBLE,
+        content_hash VARCHAR,
+        email_id VARCHAR,
+        ingested_at TIMESTAMP
+    )
+    """)
+
+    # Canonical parsed messages, one row per ingested source file (see message_store)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS parsed_messages (
+        source_path VARCHAR PRIMARY KEY,
+        email_id VARCHAR,
+        mailbox_name VARCHAR,
+        folder VARCHAR,
+        source_dir VARCHAR,
+        file_name VARCHAR,
+        message_id VARCHAR,
+        date_header VARCHAR,
+        from_header VARCHAR,
+        to_header VARCHAR,
+        cc_header VARCHAR,
+        subject VARCHAR,
+        text_body VARCHAR,
+        html_body VARCHAR,
+        attachment_names VARCHAR
+    )
+    """)
+
     # Create indexes
     conn.execute('CREATE INDEX IF NOT EXISTS idx_receiver_emails_timestamp ON receiver_emails(timestamp)')
     conn.execute('CREATE INDEX IF NOT EXISTS idx_receiver_emails_folder ON receiver_emails(folder)')
@@ -188,9 +233,108 @@ def setup_database(db_path: Union[str, Path]) -> duckdb.DuckDBPyConnection:
     conn.execute('CREATE INDEX IF NOT EXISTS idx_receiver_emails_message_id ON receiver_emails(message_id)')
     conn.execute('CREATE INDEX IF NOT EXISTS idx_entities_email ON entities(email)')
     conn.execute('CREATE INDEX IF NOT EXISTS idx_attachments_email_id ON attachments(email_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_attachments_content_hash ON attachments(content_hash)')
 
     return conn
 
+
+# One row per email with everything the app shows next to it, pre-joined and pre-aggregated.
+# Bodies stay in receiver_emails (joined on the primary key when needed) to keep the table small.
+EMAIL_FLAT_QUERY = """
+CREATE OR REPLACE TABLE email_flat AS
+WITH to_agg AS (
+    SELECT r.email_id, string_agg(e.name, ', ') AS names, string_agg(e.email, ', ') AS emails
+    FROM email_recipients_to r JOIN entities e ON r.entity_id = e.id
+    GROUP BY r.email_id
+),
+cc_agg AS (
+    SELECT r.email_id, string_agg(e.name, ', ') AS names, string_agg(e.email, ', ') AS emails
+    FROM email_recipients_cc r JOIN entities e ON r.entity_id = e.id
+    GROUP BY r.email_id
+),
+bcc_agg AS (
+    SELECT r.email_id, string_agg(e.name, ', ') AS names, string_agg(e.email, ', ') AS emails
+    FROM email_recipients_bcc r JOIN entities e ON r.entity_id = e.id
+    GROUP BY r.email_id
+),
+attachment_agg AS (
+    SELECT email_id, COUNT(*) AS attachment_count, list(filename) AS attachment_names,
+           SUM(size) AS total_attachment_size
+    FROM attachments
+    GROUP BY email_id
+),
+children_agg AS (
+    SELECT parent_id, COUNT(*) AS child_email_count
+    FROM email_children
+    GROUP BY parent_id
+)
+SELECT
+    re.id AS email_id,
+    re.message_id,
+    re.timestamp,
+    re.mailbox_name,
+    re.folder,
+    re.direction,
+    re.subject,
+    re.sender_id,
+    sender.name AS sender_name,
+    sender.email AS sender_email,
+    sender.is_physical_person AS sender_is_person,
+    re.reply_to_id,
+    reply_to.name AS reply_to_name,
+    reply_to.email AS reply_to_email,
+    re.mailing_list_id,
+    ml.name AS mailing_list_name,
+    ml.email_address AS mailing_list_email,
+    to_agg.names AS to_names,
+    to_agg.emails AS to_emails,
+    cc_agg.names AS cc_names,
+    cc_agg.emails AS cc_emails,
+    bcc_agg.names AS bcc_names,
+    bcc_agg.emails AS bcc_emails,
+    -- "to" and "cc" addresses in a single string, as displayed by the app
+    CASE
+        WHEN to_agg.emails IS NOT NULL AND cc_agg.emails IS NOT NULL THEN to_agg.emails || ', ' || cc_agg.emails
+        ELSE COALESCE(to_agg.emails, cc_agg.emails, '')
+    END AS recipient_emails,
+    COALESCE(attachment_agg.attachment_count, 0) AS attachment_count,
+    attachment_agg.attachment_names,
+    attachment_agg.total_attachment_size,
+    COALESCE(children_agg.child_email_count, 0) AS child_email_count
+FROM receiver_emails re
+LEFT JOIN entities sender ON re.sender_id = sender.id
+LEFT JOIN entities reply_to ON re.reply_to_id = reply_to.id
+LEFT JOIN mailing_lists ml ON re.mailing_list_id = ml.id
+LEFT JOIN to_agg ON to_agg.email_id = re.id
+LEFT JOIN cc_agg ON cc_agg.email_id = re.id
+LEFT JOIN bcc_agg ON bcc_agg.email_id = re.id
+LEFT JOIN attachment_agg ON attachment_agg.email_id = re.id
+LEFT JOIN children_agg ON children_agg.parent_id = re.id
+"""
+
+
+def refresh_email_flat(conn: duckdb.DuckDBPyConnection) -> int:
+    """Rebuild the email_flat table from the normalized tables
+
+    Args:
+        conn: Read-write connection to the project database
+
+    Returns:
+        Number of emails in email_flat
+    """
+    conn.execute(EMAIL_FLAT_QUERY)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_email_flat_email_id ON email_flat(email_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_email_flat_message_id ON email_flat(message_id)')
+    return conn.execute("SELECT COUNT(*) FROM email_flat").fetchone()[0]
+
+
+def table_exists(conn: duckdb.DuckDBPyConnection, table_name: str) -> bool:
+    """Whether a table exists in the main schema"""
+    return conn.execute(
+        "SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = 'main' AND table_name = ?",
+        [table_name],
+    ).fetchone()[0] > 0
+
 def find_email_references(db_path: Union[str, Path], email_id: str) -> dict:
     """
     Find all references to a specific email ID across all tables in the database.
@@ -1,26 +1,141 @@
 import duckdb
 import pandas as pd
-import re
 from pathlib import Path
 
+from src.data.connection_pool import shared_connection_pool
+from src.data.duckdb_utils import refresh_email_flat, table_exists
+from src.data.filter_sql import EmailFilterState
+from src.data.email_pages import (PAGE_SIZE, EmailListQuery, count_emails, fetch_email_details, fetch_email_page,
+                                  fetch_page_number)
+from src.data.fulltext_index import fulltext_hits_query, fulltext_index_exists, refresh_fulltext_index
+from src.data.rollups import (TIME_UNIT_GRANULARITIES, activity_bounds, activity_counts, activity_totals,
+                              refresh_rollups, rollups_exist)
+from src.data.snapshots import build_snapshot, current_database
+from src.data.thread_index import refresh_threads, threads_exist
+from src.data.topic_settings import read_topic_selection, write_topic_selection
+
 class EmailAnalyzer:
     """Class for analyzing the email database using DuckDB"""
 
-    def __init__(self, db_path):
+    def __init__(self, db_path, shared=False):
+        """
+        Args:
+            db_path: Path of the project database
+            shared: Read through a cursor of the read-only connection shared by the whole
+                process (see connection_pool) instead of a private read-write connection; its
+                writes go into a new snapshot of the database (see _write)
+        """
         self.db_path = db_path
+        self.shared = shared
         self.conn = None
+        self._pool = None
         self.project_name = Path(db_path).stem
+        self._email_flat_ready = False
+        self._fulltext_ready = False
+        self._threads_ready = False
+        self._rollups_ready = False
 
     def connect(self):
         """Connect to the database"""
         if not self.conn:
-            self.conn = duckdb.connect(self.db_path)
+            if self.shared:
+                self._pool = shared_connection_pool()
+                self.conn = self._pool.checkout(self.db_path)
+            else:
+                self.conn = duckdb.connect(str(current_database(self.db_path)))
         return self.conn
 
+    def _write(self, write):
+        """Run write(conn) on a read-write connection and return the connection to read from
+
+        Shared analyzers never write into the database the app sessions read: the write goes
+        into a new snapshot (see snapshots), published once it is done, and the shared
+        connection moves to it. The ingestion builds every derived table, so this only
+        happens for databases built before one of them existed.
+        """
+        if not self.shared:
+            conn = self.connect()
+            write(conn)
+            return conn
+        self.close()
+        with build_snapshot(self.db_path) as snapshot_path:
+            with duckdb.connect(str(snapshot_path)) as conn:
+                write(conn)
+        shared_connection_pool().invalidate(self.db_path)
+        return self.connect()
+
+    def connect_flat(self):
+        """Connect to the database, building email_flat first if it is missing (databases ingested before it existed)"""
+        conn = self.connect()
+        if not self._email_flat_ready:
+            if not table_exists(conn, 'email_flat'):
+                print("[email_flat] Table missing, building it")
+                conn = self._write(refresh_email_flat)
+            self._email_flat_ready = True
+        return conn
+
+    def connect_fulltext(self):
+        """Connect to the database, building email_flat and the full-text index first if they are missing"""
+        conn = self.connect_flat()
+        if not self._fulltext_ready:
+            if not fulltext_index_exists(conn):
+                print("[fulltext] Index missing, building it")
+                conn = self._write(refresh_fulltext_index)
+            self._fulltext_ready = True
+        return conn
+
+    def connect_threads(self):
+        """Connect to the database, building email_flat and the threads table first if they are missing"""
+        conn = self.connect_flat()
+        if not self._threads_ready:
+            if not threads_exist(conn):
+                print("[threads] Table missing, building it")
+                # Child counts come from the email_children rows rebuilt with the threads
+                conn = self._write(lambda write_conn: (refresh_threads(write_conn), refresh_email_flat(write_conn)))
+            self._threads_ready = True
+        return conn
+
+    def connect_rollups(self):
+        """Connect to the database, building email_flat and the rollup tables first if they are missing"""
+        conn = self.connect_flat()
+        if not self._rollups_ready:
+            if not rollups_exist(conn):
+                print("[rollups] Tables missing, building them")
+                conn = self._write(refresh_rollups)
+            self._rollups_ready = True
+        return conn
+
+    def search_fulltext(self, query, limit=None, fields=None):
+        """Full-text search over subjects, bodies and attachment names
+
+        Args:
+            query: Terms (all required) and "quoted phrases"
+            limit: Maximum number of results
+            fields: Restrict to some of 'subject', 'body', 'attachments'
+
+        Returns:
+            DataFrame with email_id, message_id and BM25 score, best match first
+        """
+        conn = self.connect_fulltext()
+        hits_sql, params = fulltext_hits_query(query, fields=fields, limit=limit)
+        if hits_sql is None:
+            return pd.DataFrame(columns=["email_id", "message_id", "score"])
+        return conn.execute(f"""
+            WITH hits AS ({hits_sql})
+            SELECT hits.email_id, ef.message_id, hits.score
+            FROM hits
+            JOIN email_flat ef ON ef.email_id = hits.email_id
+            ORDER BY hits.score DESC, ef.timestamp DESC
+        """, params).df()
+
     def close(self):
-        """Close the database connection"""
+        """Close the database connection (give the cursor back for a shared analyzer)"""
         if self.conn:
-            self.conn.close()
+            if self._pool is not None:
+                self._pool.checkin(self.conn)
+                self._pool = None
+            else:
+                self.conn.close()
             self.conn = None
 
     def get_topic_levels(self):
@@ -36,6 +151,10 @@ class EmailAnalyzer:
             return []
 
     def get_selected_topic_level(self):
+        # The level saved from the app, else the default written by the topic persistence
+        selection = read_topic_selection(self.db_path)
+        if selection is not None:
+            return int(selection['level'])
         conn = self.connect()
         try:
             row = conn.execute(
@@ -57,12 +176,11 @@ class EmailAnalyzer:
                 [self.project_name, level]
             ).fetchone()
             height = float(level_row[0]) if level_row and level_row[0] is not None else None
+            if self.get_selected_topic_level() == level:
+                return
 
-            conn.execute(
-                "INSERT INTO topic_settings (project_name, selected_level, selected_height) VALUES (?, ?, ?) "
-                "ON CONFLICT(project_name) DO UPDATE SET selected_level = excluded.selected_level, selected_height = excluded.selected_height",
-                [self.project_name, level, height]
-            )
+            # A UI setting, kept out of the database (see topic_settings)
+            write_topic_selection(self.db_path, level, height)
         except Exception as e:
             print(f"[topics] Unable to set selected topic level: {e}")
 
@@ -207,50 +325,42 @@ class EmailAnalyzer:
 
 
     def search_emails(self, query, limit=100):
-        """Search emails by text content"""
-        conn = self.connect()
+        """Search emails by text content (full-text index, best match first)"""
+        conn = self.connect_fulltext()
 
-        # In the receiver_emails table, we use body field
-        search_column = 'body'
+        hits_sql, params = fulltext_hits_query(query)
+        if hits_sql is None:
+            return []
 
         # Perform the search
         result = conn.execute(f"""
-            SELECT re.message_id, re.subject,
-                   sender.name AS "from",
-                   (SELECT string_agg(e.name, ', ')
-                    FROM email_recipients_to ert
-                    JOIN entities e ON ert.entity_id = e.id
-                    WHERE ert.email_id = re.id) AS "to",
-                   re.timestamp AS date, re.folder
-            FROM receiver_emails re
-            JOIN entities sender ON re.sender_id = sender.id
-            WHERE re.body LIKE ?
-            ORDER BY re.timestamp DESC
+            WITH hits AS ({hits_sql})
+            SELECT ef.message_id, ef.subject,
+                   ef.sender_name AS "from",
+                   ef.to_names AS "to",
+                   ef.timestamp AS date, ef.folder
+            FROM hits
+            JOIN email_flat ef ON ef.email_id = hits.email_id
+            ORDER BY hits.score DESC, ef.timestamp DESC
             LIMIT ?
-        """, (f'%{query}%', limit)).fetchall()
+        """, params + [limit]).fetchall()
 
         return [self._row_to_dict(row, ["message_id", "subject", "from", "to", "date", "folder"])
                 for row in result]
 
     def get_email_content(self, message_id):
         """Get full content of a specific email by message_id"""
-        conn = self.connect()
+        conn = self.connect_flat()
 
         query = """
             SELECT re.*,
-                sender.name AS sender_name,
-                sender.email AS sender_email,
-                (SELECT string_agg(e.name, ', ')
-                FROM email_recipients_to ert
-                JOIN entities e ON ert.entity_id = e.id
-                WHERE ert.email_id = re.id) AS to_recipients,
-                (SELECT string_agg(e.name, ', ')
-                FROM email_recipients_cc ercc
-                JOIN entities e ON ercc.entity_id = e.id
-                WHERE ercc.email_id = re.id) AS cc_recipients,
-                body AS content
+                ef.sender_name,
+                ef.sender_email,
+                ef.to_names AS to_recipients,
+                ef.cc_names AS cc_recipients,
+                re.body AS content
             FROM receiver_emails re
-            JOIN entities sender ON re.sender_id = sender.id
+            JOIN email_flat ef ON ef.email_id = re.id
             WHERE re.message_id = ?
         """
 
@@ -265,87 +375,34 @@ class EmailAnalyzer:
         return None
 
     def get_conversation_thread(self, message_id):
-        """Get all emails in the same conversation thread"""
-        conn = self.connect()
+        """Get all emails in the same conversation thread, in thread order (see thread_index)"""
+        conn = self.connect_threads()
 
-        # First get the current email to find its references or in-reply-to
         result = conn.execute("""
-            SELECT message_id, "references", in_reply_to, subject
-            FROM receiver_emails
-            WHERE message_id = ?
-        """, (message_id,)).fetchone()
-
-        if not result:
-            return []
-
-        email = self._row_to_dict(result, ["message_id", "references", "in_reply_to", "subject"])
-
-        # Find related messages by references, in-reply-to, or subject thread
-        message_ids = set()
-
-        # Add current message
-        message_ids.add(email['message_id'])
-
-        # Add messages this email is replying to
-        if email['in_reply_to']:
-            message_ids.add(email['in_reply_to'])
-
-        # Add messages referenced
-        if email['references']:
-            ref_ids = re.findall(r'<([^>]+)>', email['references'])
-            message_ids.update(ref_ids)
-
-        # Find messages that reply to this one
-        result = conn.execute("""
-            SELECT message_id
-            FROM receiver_emails
-            WHERE in_reply_to = ?
-        """, (email['message_id'],)).fetchall()
-
-        for row in result:
-            message_ids.add(row[0])
-
-        # Also find messages with the same subject (ignoring Re:, Fwd:, etc.)
-        if email['subject']:
-            clean_subject = re.sub(r'^(Re|Fwd|Fw|TR)(\[\d+\])?:\s*', '', email['subject'], flags=re.IGNORECASE)
-            if clean_subject:
-                result = conn.execute("""
-                    SELECT message_id
-                    FROM receiver_emails
-                    WHERE subject LIKE ? AND message_id != ?
-                """, (f'%{clean_subject}%', email['message_id'])).fetchall()
-
-                for row in result:
-                    message_ids.add(row[0])
-
-        # Now get all the emails in the thread
-        if message_ids:
-            placeholders = ', '.join(['?'] * len(message_ids))
-            result = conn.execute(f"""
-                SELECT re.message_id, re.subject,
-                       sender.name AS "from",
-                       re.timestamp AS date,
-                       (SELECT string_agg(e.name, ', ')
-                        FROM email_recipients_to ert
-                        JOIN entities e ON ert.entity_id = e.id
-                        WHERE ert.email_id = re.id) AS "to",
-                       (SELECT string_agg(e.name, ', ')
-                        FROM email_recipients_cc ercc
-                        JOIN entities e ON ercc.entity_id = e.id
-                        WHERE ercc.email_id = re.id) AS cc
-                FROM receiver_emails re
-                JOIN entities sender ON re.sender_id = sender.id
-                WHERE re.message_id IN ({placeholders})
-                ORDER BY re.timestamp
-            """, list(message_ids)).fetchall()
+            SELECT ef.message_id, ef.subject,
+                   ef.sender_name AS "from",
+                   ef.timestamp AS date,
+                   ef.to_names AS "to",
+                   ef.cc_names AS cc,
+                   t.depth
+            FROM threads t
+            JOIN email_flat ef ON ef.email_id = t.email_id
+            WHERE t.thread_id = (
+                SELECT th.thread_id
+                FROM email_flat e
+                JOIN threads th ON th.email_id = e.email_id
+                WHERE e.message_id = ?
+                LIMIT 1
+            )
+            ORDER BY t.position
+        """, (message_id,)).fetchall()
 
-            column_names = ["message_id", "subject", "from", "date", "to", "cc"]
-            return [self._row_to_dict(row, column_names) for row in result]
-        return []
+        column_names = ["message_id", "subject", "from", "date", "to", "cc", "depth"]
+        return [self._row_to_dict(row, column_names) for row in result]
 
     def export_to_dataframe(self, query=None, limit=None):
         """Export emails to a pandas DataFrame for analysis"""
-        conn = self.connect()
+        conn = self.connect_flat()
 
         if query:
             sql = f"{query}"
@@ -356,19 +413,16 @@ class EmailAnalyzer:
         else:
             # Default query to get important fields
             sql = """
-                SELECT re.message_id, re.subject, re.mailbox_name, re.direction,
-                       sender.name AS "from",
-                       (SELECT string_agg(e.name, ', ')
-                        FROM email_recipients_to ert
-                        JOIN entities e ON ert.entity_id = e.id
-                        WHERE ert.email_id = re.id) AS "to",
-                       re.timestamp AS date,
-                       re.folder,
-                       (SELECT COUNT(*) FROM attachments a WHERE a.email_id = re.id) AS attachment_count,
+                SELECT ef.message_id, ef.subject, ef.mailbox_name, ef.direction,
+                       ef.sender_name AS "from",
+                       ef.to_names AS "to",
+                       ef.timestamp AS date,
+                       ef.folder,
+                       ef.attachment_count,
                        re.body
-                FROM receiver_emails re
-                JOIN entities sender ON re.sender_id = sender.id
-                ORDER BY re.timestamp DESC
+                FROM email_flat ef
+                JOIN receiver_emails re ON re.id = ef.email_id
+                ORDER BY ef.timestamp DESC
             """
             if limit:
                 sql += f" LIMIT {limit}"
@@ -396,19 +450,19 @@ class EmailAnalyzer:
         Returns:
             pandas DataFrame with comprehensive email data
         """
-        conn = self.connect()
+        conn = self.connect_threads()
 
         query = """
         SELECT
             -- Email core data
-            re.id AS email_id,
-            re.message_id,
-            re.mailbox_name,
-            re.direction,
-            re.timestamp,
-            re.subject,
+            ef.email_id,
+            ef.message_id,
+            ef.mailbox_name,
+            ef.direction,
+            ef.timestamp,
+            ef.subject,
             re.body,
-            re.folder,
+            ef.folder,
             re.is_deleted,
             re.is_spam,
             re.importance_score,
@@ -416,70 +470,45 @@ class EmailAnalyzer:
             re."references",
 
             -- Sender information
-            sender.id AS sender_id,
-            sender.name AS sender_name,
-            sender.email AS sender_email,
-            sender.is_physical_person AS sender_is_person,
+            ef.sender_id,
+            ef.sender_name,
+            ef.sender_email,
+            ef.sender_is_person,
 
             -- Reply-to information
-            reply_to.id AS reply_to_id,
-            reply_to.name AS reply_to_name,
-            reply_to.email AS reply_to_email,
-
-            -- Recipients (aggregated)
-            (SELECT string_agg(e.name, ', ')
-            FROM email_recipients_to ert
-            JOIN entities e ON ert.entity_id = e.id
-            WHERE ert.email_id = re.id) AS to_recipients,
-
-            (SELECT string_agg(e.email, ', ')
-            FROM email_recipients_to ert
-            JOIN entities e ON ert.entity_id = e.id
-            WHERE ert.email_id = re.id) AS to_emails,
-
-            (SELECT string_agg(e.name, ', ')
-            FROM email_recipients_cc ercc
-            JOIN entities e ON ercc.entity_id = e.id
-            WHERE ercc.email_id = re.id) AS cc_recipients,
-
-            (SELECT string_agg(e.email, ', ')
-            FROM email_recipients_cc ercc
-            JOIN entities e ON ercc.entity_id = e.id
-            WHERE ercc.email_id = re.id) AS cc_emails,
-
-            (SELECT string_agg(e.name, ', ')
-            FROM email_recipients_bcc erbcc
-            JOIN entities e ON erbcc.entity_id = e.id
-            WHERE erbcc.email_id = re.id) AS bcc_recipients,
-
-            (SELECT string_agg(e.email, ', ')
-            FROM email_recipients_bcc erbcc
-            JOIN entities e ON erbcc.entity_id = e.id
-            WHERE erbcc.email_id = re.id) AS bcc_emails,
+            ef.reply_to_id,
+            ef.reply_to_name,
+            ef.reply_to_email,
+
+            -- Recipients (pre-aggregated in email_flat)
+            ef.to_names AS to_recipients,
+            ef.to_emails,
+            ef.cc_names AS cc_recipients,
+            ef.cc_emails,
+            ef.bcc_names AS bcc_recipients,
+            ef.bcc_emails,
 
             -- Mailing list information
-            ml.id AS mailing_list_id,
-            ml.name AS mailing_list_name,
-            ml.email_address AS mailing_list_email,
+            ef.mailing_list_id,
+            ef.mailing_list_name,
+            ef.mailing_list_email,
 
             -- Attachment information (counts and aggregate info)
-            (SELECT COUNT(*) FROM attachments a WHERE a.email_id = re.id) AS attachment_count,
-            (SELECT string_agg(a.filename, ', ') FROM attachments a WHERE a.email_id = re.id) AS attachment_filenames,
-            (SELECT SUM(a.size) FROM attachments a WHERE a.email_id = re.id) AS total_attachment_size,
+            ef.attachment_count,
+            array_to_string(ef.attachment_names, ', ') AS attachment_filenames,
+            ef.total_attachment_size,
 
             -- Thread information
-            (SELECT COUNT(*) FROM email_children ec WHERE ec.parent_id = re.id) AS child_email_count,
-            re.mother_email_id
+            ef.child_email_count,
+            th.parent_id AS mother_email_id
         FROM
-            receiver_emails re
-        LEFT JOIN
-            entities sender ON re.sender_id = sender.id
-        LEFT JOIN
-            entities reply_to ON re.reply_to_id = reply_to.id
+            email_flat ef
+        JOIN
+            receiver_emails re ON re.id = ef.email_id
         LEFT JOIN
-            mailing_lists ml ON re.mailing_list_id = ml.id
+            threads th ON th.email_id = ef.email_id
         ORDER BY
-            re.timestamp DESC
+            ef.timestamp DESC
         """
 
         if limit:
@@ -505,20 +534,20 @@ class EmailAnalyzer:
         Returns:
             pandas DataFrame with comprehensive email data and one row per recipient
         """
-        conn = self.connect()
+        conn = self.connect_threads()
 
         # First get the core email data without recipient aggregation
         core_query = """
         SELECT
             -- Email core data
-            re.id AS email_id,
-            re.message_id,
-            re.mailbox_name,
-            re.direction,
-            re.timestamp,
-            re.subject,
+            ef.email_id,
+            ef.message_id,
+            ef.mailbox_name,
+            ef.direction,
+            ef.timestamp,
+            ef.subject,
             re.body,
-            re.folder,
+            ef.folder,
             re.is_deleted,
             re.is_spam,
             re.importance_score,
@@ -526,39 +555,37 @@ class EmailAnalyzer:
             re."references",
 
             -- Sender information
-            sender.id AS sender_id,
-            sender.name AS sender_name,
-            sender.email AS sender_email,
-            sender.is_physical_person AS sender_is_person,
+            ef.sender_id,
+            ef.sender_name,
+            ef.sender_email,
+            ef.sender_is_person,
 
             -- Reply-to information
-            reply_to.id AS reply_to_id,
-            reply_to.name AS reply_to_name,
-            reply_to.email AS reply_to_email,
+            ef.reply_to_id,
+            ef.reply_to_name,
+            ef.reply_to_email,
 
             -- Mailing list information
-            ml.id AS mailing_list_id,
-            ml.name AS mailing_list_name,
-            ml.email_address AS mailing_list_email,
+            ef.mailing_list_id,
+            ef.mailing_list_name,
+            ef.mailing_list_email,
 
             -- Attachment information (counts and aggregate info)
-            (SELECT COUNT(*) FROM attachments a WHERE a.email_id = re.id) AS attachment_count,
-            (SELECT string_agg(a.filename, ', ') FROM attachments a WHERE a.email_id = re.id) AS attachment_filenames,
-            (SELECT SUM(a.size) FROM attachments a WHERE a.email_id = re.id) AS total_attachment_size,
+            ef.attachment_count,
+            array_to_string(ef.attachment_names, ', ') AS attachment_filenames,
+            ef.total_attachment_size,
 
             -- Thread information
-            (SELECT COUNT(*) FROM email_children ec WHERE ec.parent_id = re.id) AS child_email_count,
-            re.mother_email_id
+            ef.child_email_count,
+            th.parent_id AS mother_email_id
         FROM
-            receiver_emails re
-        LEFT JOIN
-            entities sender ON re.sender_id = sender.id
-        LEFT JOIN
-            entities reply_to ON re.reply_to_id = reply_to.id
+            email_flat ef
+        JOIN
+            receiver_emails re ON re.id = ef.email_id
         LEFT JOIN
-            mailing_lists ml ON re.mailing_list_id = ml.id
+            threads th ON th.email_id = ef.email_id
         ORDER BY
-            re.timestamp DESC
+            ef.timestamp DESC
         """
 
         if limit:
@@ -647,7 +674,7 @@ class EmailAnalyzer:
 
         return merged_df
 
-    def get_app_DataFrame(self, mailbox=None, limit=None, topic_level=None):
+    def get_app_DataFrame(self, mailbox=None, limit=None, topic_level=None, date_range=None):
         """
         Get a dataframe with specific columns needed for the application,
         creating one row per recipient rather than one per email.
@@ -656,141 +683,58 @@ class EmailAnalyzer:
             mailbox: Optional filter for specific mailbox
             limit: Optional limit on the number of rows returned
             topic_level: Optional topic clustering level to join against
+            date_range: Optional (first day, last day) tuple
 
         Returns:
             pandas DataFrame with columns: message_id, date, from, recipient_email,
             recipient_type, subject, body, attachments, has_attachments,
             direction, mailbox
         """
-        conn = self.connect()
+        conn = self.connect_flat()
+        where, params = EmailFilterState.build(mailbox=mailbox, date_range=date_range).where()
 
         # Get core email data first
-        core_query = """
+        core_query = f"""
         SELECT
-            re.id AS email_id,
-            re.message_id,
-            re.timestamp AS date,
-            re.mailbox_name,
-            re.direction,
-            sender.email AS "from",
-            re.subject,
+            ef.email_id,
+            ef.message_id,
+            ef.timestamp AS date,
+            ef.mailbox_name,
+            ef.direction,
+            ef.sender_email AS "from",
+            ef.subject,
             re.body,
-            (SELECT string_agg(a.filename, '|')
-            FROM attachments a
-            WHERE a.email_id = re.id) AS attachments,
-            (SELECT COUNT(*) > 0
-            FROM attachments a
-            WHERE a.email_id = re.id) AS has_attachments,
-            re.folder AS mailbox
+            array_to_string(ef.attachment_names, '|') AS attachments,
+            ef.attachment_count > 0 AS has_attachments,
+            ef.folder AS mailbox
         FROM
-            receiver_emails re
-        LEFT JOIN
-            entities sender ON re.sender_id = sender.id
+            email_flat ef
+        JOIN
+            receiver_emails re ON re.id = ef.email_id
+        WHERE {where}
+        ORDER BY ef.timestamp DESC
         """
 
-        # Add mailbox filter if specified
-        if mailbox:
-            core_query += f" WHERE re.folder = '{mailbox}'"
-        
-        # Add ORDER BY to sort by date descending (newest first)
-        core_query += " ORDER BY re.timestamp DESC"
-
         # Add limit if specified
+        core_params = list(params)
         if limit:
-            core_query += f" LIMIT {limit}"
+            core_query += " LIMIT ?"
+            core_params.append(int(limit))
 
         # Execute the core query and convert to DataFrame
-        core_df = conn.execute(core_query).df()
-
-        # Now get "to" recipients as separate rows
-        to_query = """
-        SELECT
-            re.id AS email_id,
-            e.email AS recipient_email,
-            'to' AS recipient_type
-        FROM
-            receiver_emails re
-        JOIN
-            email_recipients_to ert ON re.id = ert.email_id
-        JOIN
-            entities e ON ert.entity_id = e.id
-        """
-
-        if mailbox:
-            to_query += f" WHERE re.folder = '{mailbox}'"
-
-        if limit:
-            limit_clause = f" re.id IN (SELECT id FROM receiver_emails"
-            if mailbox:
-                limit_clause += f" WHERE folder = '{mailbox}'"
-            limit_clause += f" LIMIT {limit})"
-
-            if mailbox:
-                to_query += f" AND {limit_clause}"
-            else:
-                to_query += f" WHERE {limit_clause}"
-
-        to_df = conn.execute(to_query).df()
-
-        # Get CC recipients
-        cc_query = """
-        SELECT
-            re.id AS email_id,
-            e.email AS recipient_email,
-            'cc' AS recipient_type
-        FROM
-            receiver_emails re
-        JOIN
-            email_recipients_cc ercc ON re.id = ercc.email_id
-        JOIN
-            entities e ON ercc.entity_id = e.id
-        """
-
-        if mailbox:
-            cc_query += f" WHERE re.folder = '{mailbox}'"
-
-        if limit:
-            limit_clause = f" re.id IN (SELECT id FROM receiver_emails"
-            if mailbox:
-                limit_clause += f" WHERE folder = '{mailbox}'"
-            limit_clause += f" LIMIT {limit})"
-
-            if mailbox:
-                cc_query += f" AND {limit_clause}"
-            else:
-                cc_query += f" WHERE {limit_clause}"
-
-        cc_df = conn.execute(cc_query).df()
-
-        # Get BCC recipients
-        bcc_query = """
-        SELECT
-            re.id AS email_id,
-            e.email AS recipient_email,
-            'bcc' AS recipient_type
-        FROM
-            receiver_emails re
-        JOIN
-            email_recipients_bcc erbcc ON re.id = erbcc.email_id
-        JOIN
-            entities e ON erbcc.entity_id = e.id
-        """
-
-        if mailbox:
-            bcc_query += f" WHERE re.folder = '{mailbox}'"
-
-        if limit:
-            limit_clause = f" re.id IN (SELECT id FROM receiver_emails"
-            if mailbox:
-                limit_clause += f" WHERE folder = '{mailbox}'"
-            limit_clause += f" LIMIT {limit})"
-
-            if mailbox:
-                bcc_query += f" AND {limit_clause}"
-            else:
-                bcc_query += f" WHERE {limit_clause}"
-
-        bcc_df = conn.execute(bcc_query).df()
+        core_df = conn.execute(core_query, core_params).df()
+
+        # Then the "to", "cc" and "bcc" recipients of the same emails, one row each
+        recipient_queries = []
+        for recipient_type in ('to', 'cc', 'bcc'):
+            recipient_queries.append(f"""
+            SELECT r.email_id, e.email AS recipient_email, '{recipient_type}' AS recipient_type
+            FROM email_recipients_{recipient_type} r
+            JOIN entities e ON r.entity_id = e.id
+            WHERE r.email_id IN (SELECT ef.email_id FROM email_flat ef WHERE {where})
+            """)
+        to_df, cc_df, bcc_df = [conn.execute(recipient_query, params).df()
+                                for recipient_query in recipient_queries]
 
         # Combine all recipients
         all_recipients = pd.concat([to_df, cc_df, bcc_df])
@@ -851,7 +795,7 @@ class EmailAnalyzer:
         return merged_df
 
 
-    def get_app_dataframe_agg_recipients(self, mailbox=None, limit=50000, topic_level=None):
+    def get_app_dataframe_agg_recipients(self, mailbox=None, limit=50000, topic_level=None, date_range=None):
         """
         Get a dataframe with specific columns needed for the application,
         creating one row per email with aggregated recipient information.
@@ -863,72 +807,45 @@ class EmailAnalyzer:
             mailbox: Optional filter for specific mailbox
             limit: Optional limit on the number of rows returned
             topic_level: Optional topic clustering level to join against
+            date_range: Optional (first day, last day) tuple
 
         Returns:
             pandas DataFrame with columns compatible with app expectations:
             message_id, date, from, recipient_email, subject, body, attachments,
             has_attachments, direction, mailbox
         """
-        conn = self.connect()
+        conn = self.connect_flat()
+        where, params = EmailFilterState.build(mailbox=mailbox, date_range=date_range).where()
 
-        query = """
+        query = f"""
         SELECT
-            re.message_id,
-            re.timestamp AS date,
-            sender.email AS "from",
-            -- Aggregate all recipients into a single string
-            COALESCE(
-                (SELECT string_agg(e.email, ', ')
-                 FROM email_recipients_to ert
-                 JOIN entities e ON ert.entity_id = e.id
-                 WHERE ert.email_id = re.id), ''
-            ) ||
-            CASE WHEN
-                (SELECT string_agg(e.email, ', ')
-                 FROM email_recipients_to ert
-                 JOIN entities e ON ert.entity_id = e.id
-                 WHERE ert.email_id = re.id) IS NOT NULL AND
-                (SELECT string_agg(e.email, ', ')
-                 FROM email_recipients_cc ercc
-                 JOIN entities e ON ercc.entity_id = e.id
-                 WHERE ercc.email_id = re.id) IS NOT NULL
-            THEN ', ' ELSE '' END ||
-            COALESCE(
-                (SELECT string_agg(e.email, ', ')
-                 FROM email_recipients_cc ercc
-                 JOIN entities e ON ercc.entity_id = e.id
-                 WHERE ercc.email_id = re.id), ''
-            ) AS recipient_email,
-            re.subject,
+            ef.message_id,
+            ef.timestamp AS date,
+            ef.sender_email AS "from",
+            -- "to" and "cc" recipients, pre-aggregated in email_flat
+            ef.recipient_emails AS recipient_email,
+            ef.subject,
             re.body,
-            (SELECT string_agg(a.filename, '|')
-             FROM attachments a
-             WHERE a.email_id = re.id) AS attachments,
-            (SELECT COUNT(*) > 0
-             FROM attachments a
-             WHERE a.email_id = re.id) AS has_attachments,
-            re.direction,
-            COALESCE(re.mailbox_name, re.folder) AS mailbox,
-            re.mailbox_name
+            array_to_string(ef.attachment_names, '|') AS attachments,
+            ef.attachment_count > 0 AS has_attachments,
+            ef.direction,
+            COALESCE(ef.mailbox_name, ef.folder) AS mailbox,
+            ef.mailbox_name
         FROM
-            receiver_emails re
-        LEFT JOIN
-            entities sender ON re.sender_id = sender.id
+            email_flat ef
+        JOIN
+            receiver_emails re ON re.id = ef.email_id
+        WHERE {where}
+        ORDER BY ef.timestamp DESC
         """
 
-        # Add mailbox filter if specified
-        if mailbox:
-            query += f" WHERE COALESCE(re.mailbox_name, re.folder) = '{mailbox}'"
-        
-        # Add ORDER BY to sort by date descending (newest first)
-        query += " ORDER BY re.timestamp DESC"
-
         # Add limit if specified
         if limit:
-            query += f" LIMIT {limit}"
+            query += " LIMIT ?"
+            params.append(int(limit))
 
         # Execute the query and convert to DataFrame
-        df = conn.execute(query).df()
+        df = conn.execute(query, params).df()
 
         # Convert timestamps to proper datetime format
         if 'date' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['date']):
@@ -978,130 +895,84 @@ class EmailAnalyzer:
 
         return df
 
-    def get_app_dataframe_with_filters(self, mailbox=None, filters=None, limit=50000, topic_level=None):
+    def get_app_dataframe_with_filters(self, mailbox=None, filters=None, limit=50000, topic_level=None,
+                                       date_range=None, contact=None, search=None):
         """
         Get a dataframe with specific columns needed for the application,
-        with support for additional filters including mailing lists.
+        with every filter applied in the database (see filter_sql).
 
         Args:
             mailbox: Optional filter for specific mailbox
             filters: Dictionary containing filter criteria
             limit: Optional limit on the number of rows returned
             topic_level: Optional topic clustering level to join against
+            date_range: Optional (first day, last day) tuple
+            contact: Optional address the emails were sent from or to
+            search: Optional full-text query over subjects, bodies and attachment names
 
         Returns:
             pandas DataFrame with columns compatible with app expectations
         """
-        conn = self.connect()
+        conn = self.connect_fulltext() if search else self.connect_flat()
 
-        # Base query with all necessary joins
-        query = """
+        if topic_level is None:
+            topic_level = self.get_selected_topic_level()
+        topics_available = topic_level is not None and table_exists(conn, 'email_topic_clusters')
+
+        state = EmailFilterState.build(mailbox=mailbox, filters=filters, date_range=date_range,
+                                       topic_level=topic_level, contact=contact, search=search,
+                                       project_name=self.project_name)
+        where, params = state.where(topics_available=topics_available)
+
+        if topics_available:
+            topic_columns = """
+                tc.cluster_id AS topic_cluster_id,
+                tc.summary AS topic_cluster_label,
+                tc.level AS topic_cluster_level,
+                tc.height AS topic_cluster_height"""
+            topic_join = """
+            LEFT JOIN email_topic_clusters tc
+                ON tc.message_id = ef.message_id AND tc.project_name = ? AND tc.level = ?"""
+            params = [self.project_name, int(topic_level)] + params
+        else:
+            topic_columns = """
+                CAST(NULL AS INTEGER) AS topic_cluster_id,
+                CAST(NULL AS VARCHAR) AS topic_cluster_label,
+                CAST(NULL AS INTEGER) AS topic_cluster_level,
+                CAST(NULL AS DOUBLE) AS topic_cluster_height"""
+            topic_join = ""
+
+        query = f"""
         SELECT
-            re.message_id,
-            re.timestamp AS date,
-            sender.email AS "from",
-            -- Aggregate all recipients into a single string
-            COALESCE(
-                (SELECT string_agg(e.email, ', ')
-                 FROM email_recipients_to ert
-                 JOIN entities e ON ert.entity_id = e.id
-                 WHERE ert.email_id = re.id), ''
-            ) ||
-            CASE WHEN
-                (SELECT string_agg(e.email, ', ')
-                 FROM email_recipients_to ert
-                 JOIN entities e ON ert.entity_id = e.id
-                 WHERE ert.email_id = re.id) IS NOT NULL AND
-                (SELECT string_agg(e.email, ', ')
-                 FROM email_recipients_cc ercc
-                 JOIN entities e ON ercc.entity_id = e.id
-                 WHERE ercc.email_id = re.id) IS NOT NULL
-            THEN ', ' ELSE '' END ||
-            COALESCE(
-                (SELECT string_agg(e.email, ', ')
-                 FROM email_recipients_cc ercc
-                 JOIN entities e ON ercc.entity_id = e.id
-                 WHERE ercc.email_id = re.id), ''
-            ) AS recipient_email,
-            re.subject,
+            ef.message_id,
+            ef.timestamp AS date,
+            ef.sender_email AS "from",
+            -- "to" and "cc" recipients, pre-aggregated in email_flat
+            ef.recipient_emails AS recipient_email,
+            ef.subject,
             re.body,
-            (SELECT string_agg(a.filename, '|')
-             FROM attachments a
-             WHERE a.email_id = re.id) AS attachments,
-            (SELECT COUNT(*) > 0
-             FROM attachments a
-             WHERE a.email_id = re.id) AS has_attachments,
-            re.direction,
-            COALESCE(re.mailbox_name, re.folder) AS mailbox,
-            re.mailbox_name,
-            re.folder AS folder,
-            ml.email_address AS mailing_list_email
+            array_to_string(ef.attachment_names, '|') AS attachments,
+            ef.attachment_count > 0 AS has_attachments,
+            ef.direction,
+            COALESCE(ef.mailbox_name, ef.folder) AS mailbox,
+            ef.mailbox_name,
+            ef.folder AS folder,
+            ef.mailing_list_email,{topic_columns}
         FROM
-            receiver_emails re
-        LEFT JOIN
-            entities sender ON re.sender_id = sender.id
-        LEFT JOIN
-            mailing_lists ml ON re.mailing_list_id = ml.id
-        WHERE 1=1
+            email_flat ef
+        JOIN
+            receiver_emails re ON re.id = ef.email_id{topic_join}
+        WHERE {where}
+        ORDER BY ef.timestamp DESC
         """
 
-        # Add filters
-        filter_conditions = []
-
-        # Mailbox filter
-        if mailbox and mailbox != "All Mailboxes":
-            filter_conditions.append(f"COALESCE(re.mailbox_name, re.folder) = '{mailbox}'")
-
-        # Additional filters
-        if filters:
-            # Mailing list filter
-            mailing_list_value = filters.get('mailing_list_email')
-            if mailing_list_value:
-                if mailing_list_value == 'None':
-                    filter_conditions.append("ml.email_address IS NULL")
-                elif mailing_list_value != 'All':
-                    filter_conditions.append(f"ml.email_address = '{mailing_list_value}'")
-
-            # Direction filter
-            direction_value = filters.get('direction')
-            if direction_value:
-                direction_str = str(direction_value)
-                normalized_direction = direction_str.strip().casefold()
-                # Treat "All"/"Tous" (and similar) as no filter
-                if normalized_direction not in {'all', 'tous', 'toutes'}:
-                    if normalized_direction in {'envoyé', 'envoyes', 'envoyés', 'envoye', 'sent'}:
-                        resolved_direction = 'sent'
-                    elif normalized_direction in {'reçu', 'reçus', 'recus', 'recu', 'received'}:
-                        resolved_direction = 'received'
-                    else:
-                        resolved_direction = direction_str  # fall back to raw value
-                    filter_conditions.append(f"re.direction = '{resolved_direction}'")
-
-            # Folder filter (additional to mailbox)
-            folder_value = filters.get('folder')
-            if folder_value and folder_value not in ('All', 'Tous'):
-                folder_part = folder_value
-                if isinstance(folder_value, str) and '→' in folder_value:
-                    mailbox_part, folder_part = [part.strip() for part in folder_value.split('→', 1)]
-                    filter_conditions.append(f"COALESCE(re.mailbox_name, re.folder) = '{mailbox_part}'")
-                if folder_part == 'Racine':
-                    filter_conditions.append("(re.folder IS NULL OR re.folder = '' OR lower(re.folder) = 'root')")
-                else:
-                    filter_conditions.append(f"re.folder = '{folder_part}'")
-
-        # Add filter conditions to query
-        if filter_conditions:
-            query += " AND " + " AND ".join(filter_conditions)
-        
-        # Add ORDER BY to sort by date descending (newest first)
-        query += " ORDER BY re.timestamp DESC"
-
         # Add limit if specified
         if limit:
-            query += f" LIMIT {limit}"
+            query += " LIMIT ?"
+            params.append(int(limit))
 
         # Execute the query and convert to DataFrame
-        df = conn.execute(query).df()
+        df = conn.execute(query, params).df()
 
         # Convert timestamps to proper datetime format
         if 'date' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['date']):
@@ -1119,49 +990,123 @@ class EmailAnalyzer:
                 lambda x: x.strip(', ') if isinstance(x, str) else x
             )
 
+        return df
+
+    def count_emails_with_filters(self, mailbox=None, filters=None, topic_level=None, date_range=None,
+                                  contact=None, search=None):
+        """Get the number of emails get_app_dataframe_with_filters would return without a limit"""
+        conn = self.connect_fulltext() if search else self.connect_flat()
         if topic_level is None:
             topic_level = self.get_selected_topic_level()
+        state = EmailFilterState.build(mailbox=mailbox, filters=filters, date_range=date_range,
+                                       topic_level=topic_level, contact=contact, search=search,
+                                       project_name=self.project_name)
+        where, params = state.where(topics_available=table_exists(conn, 'email_topic_clusters'))
+        return conn.execute(f"SELECT COUNT(*) FROM email_flat ef WHERE {where}", params).fetchone()[0]
 
-        if topic_level is not None:
-            try:
-                topic_df = conn.execute(
-                    """
-                    SELECT message_id,
-                           cluster_id AS topic_cluster_id,
-                           summary AS topic_cluster_label,
-                           level AS topic_cluster_level,
-                           height AS topic_cluster_height
-                    FROM email_topic_clusters
-                    WHERE project_name = ? AND level = ?
-                    """,
-                    [self.project_name, int(topic_level)]
-                ).df()
-                df = df.merge(topic_df, on='message_id', how='left')
-            except Exception as topic_error:
-                print(f"[topics] Unable to join topic clusters (filters): {topic_error}")
-                df['topic_cluster_id'] = pd.NA
-                df['topic_cluster_label'] = pd.NA
-                df['topic_cluster_level'] = pd.NA
-                df['topic_cluster_height'] = pd.NA
-        else:
-            df['topic_cluster_id'] = pd.NA
-            df['topic_cluster_label'] = pd.NA
-            df['topic_cluster_level'] = pd.NA
-            df['topic_cluster_height'] = pd.NA
+    def get_activity_counts(self, time_unit="M", mailbox=None, filters=None, date_range=None, topic_level=None):
+        """
+        Get the number of emails per period and direction from the rollup tables.
 
-        if filters and 'topic_cluster_id' in df.columns:
-            topic_cluster_value = filters.get('topic_cluster')
-            if topic_cluster_value:
-                if isinstance(topic_cluster_value, str) and topic_cluster_value.strip().casefold() in {'tous', 'all'}:
-                    pass
-                else:
-                    try:
-                        desired_cluster = int(topic_cluster_value)
-                        df = df[df['topic_cluster_id'] == desired_cluster]
-                    except (ValueError, TypeError):
-                        pass
+        Args:
+            time_unit: 'D' for daily, 'W' for weekly, 'M' for monthly periods
+            mailbox: Optional filter for specific mailbox
+            filters: Dictionary of direction, folder and topic_cluster filters
+            date_range: Optional (first day, last day) tuple
+            topic_level: Topic clustering level of the topic_cluster filter
 
-        return df
+        Returns:
+            pandas DataFrame with columns date, direction and emails
+        """
+        conn = self.connect_rollups()
+        if topic_level is None:
+            topic_level = self.get_selected_topic_level()
+        return activity_counts(conn, TIME_UNIT_GRANULARITIES[time_unit], mailbox, filters, date_range, topic_level)
+
+    def get_activity_bounds(self, mailbox=None, filters=None, date_range=None, topic_level=None):
+        """
+        Get the first and last day with emails from the rollup tables.
+
+        Returns:
+            (first day, last day) tuple, or None when no email matches the filters
+        """
+        conn = self.connect_rollups()
+        if topic_level is None:
+            topic_level = self.get_selected_topic_level()
+        return activity_bounds(conn, mailbox, filters, date_range, topic_level)
+
+    def get_activity_totals(self, mailbox=None, filters=None, date_range=None, topic_level=None):
+        """
+        Get the dashboard metrics from the rollup tables.
+
+        Returns:
+            Dictionary with the total, sent, received and unique contacts counts
+        """
+        conn = self.connect_rollups()
+        if topic_level is None:
+            topic_level = self.get_selected_topic_level()
+        return activity_totals(conn, mailbox, filters, date_range, topic_level)
+
+    def email_list_query(self, mailbox=None, filters=None, date_range=None, topic_level=None, search=None,
+                         sort='date', descending=True, contact=None):
+        """
+        Describe a filtered, sorted email list for get_email_page and count_email_list.
+
+        Args:
+            mailbox: Optional filter for specific mailbox
+            filters: Dictionary containing filter criteria (as get_app_dataframe_with_filters)
+            date_range: Optional (first day, last day) tuple
+            topic_level: Topic clustering level of the topic_cluster filter (default: the selected one)
+            search: Optional full-text query over subjects, bodies and attachment names
+            sort: Sort column, one of 'date', 'from', 'recipient_email', 'subject'
+            descending: Sort order
+            contact: Optional address the emails were sent from or to
+
+        Returns:
+            EmailListQuery
+        """
+        if topic_level is None and filters and filters.get('topic_cluster') is not None:
+            topic_level = self.get_selected_topic_level()
+        return EmailListQuery.build(mailbox=mailbox, filters=filters, date_range=date_range, topic_level=topic_level,
+                                    contact=contact, search=search, project_name=self.project_name, sort=sort,
+                                    descending=descending)
+
+    def _list_connection(self, query):
+        return self.connect_fulltext() if query.search else self.connect_flat()
+
+    def count_email_list(self, query):
+        """Get the number of emails of an email list query"""
+        return count_emails(self._list_connection(query), query)
+
+    def get_email_page(self, query, after=None, before=None, page=None, total=None, limit=PAGE_SIZE):
+        """
+        Get one page of an email list, without bodies, using keyset pagination.
+
+        Args:
+            query: EmailListQuery from email_list_query
+            after: (sort key, email_id) of the last row of the previous page
+            before: (sort key, email_id) of the first row of the next page
+            page: Page number to jump to (from 1), requires total
+            total: Number of emails of the query (count_email_list)
+            limit: Page size
+
+        Returns:
+            pandas DataFrame with email_id, message_id, date, from, recipient_email, subject,
+            has_attachments, direction, mailbox and _sort_key columns
+        """
+        conn = self._list_connection(query)
+        if page is not None:
+            return fetch_page_number(conn, query, page, total, limit)
+        return fetch_email_page(conn, query, after=after, before=before, limit=limit)
+
+    def get_email_details(self, email_id):
+        """
+        Get the fields shown by the email viewer, body and attachment names included.
+
+        Returns:
+            Dictionary of the email fields, or None if the email does not exist
+        """
+        return fetch_email_details(self.connect_flat(), email_id)
 
     def get_rag_email_dataset(self, limit=None):
         """
@@ -1175,41 +1120,30 @@ class EmailAnalyzer:
             pandas DataFrame with columns: email_id, from, to_recipients, cc_recipients,
             bcc_recipients, date, subject, body
         """
-        conn = self.connect()
+        conn = self.connect_flat()
 
         query = """
         SELECT
             -- Email core data
-            re.id AS email_id,
-            re.timestamp AS date,
-            re.subject,
+            ef.email_id,
+            ef.timestamp AS date,
+            ef.subject,
             re.body,
 
             -- Sender information
-            sender.email AS "from",
-
-            -- Recipients (aggregated)
-            (SELECT string_agg(e.email, ', ')
-            FROM email_recipients_to ert
-            JOIN entities e ON ert.entity_id = e.id
-            WHERE ert.email_id = re.id) AS to_recipients,
-
-            (SELECT string_agg(e.email, ', ')
-            FROM email_recipients_cc ercc
-            JOIN entities e ON ercc.entity_id = e.id
-            WHERE ercc.email_id = re.id) AS cc_recipients,
+            ef.sender_email AS "from",
 
-            (SELECT string_agg(e.email, ', ')
-            FROM email_recipients_bcc erbcc
-            JOIN entities e ON erbcc.entity_id = e.id
-            WHERE erbcc.email_id = re.id) AS bcc_recipients
+            -- Recipients (pre-aggregated in email_flat)
+            ef.to_emails AS to_recipients,
+            ef.cc_emails AS cc_recipients,
+            ef.bcc_emails AS bcc_recipients
 
         FROM
-            receiver_emails re
-        LEFT JOIN
-            entities sender ON re.sender_id = sender.id
+            email_flat ef
+        JOIN
+            receiver_emails re ON re.id = ef.email_id
         ORDER BY
-            re.timestamp DESC
+            ef.timestamp DESC
         """
 
         if limit:
@@ -0,0 +1,171 @@
+"""Pages of the email list read from email_flat with keyset pagination.
+
+The Email Explorer table only ever holds one page of light columns (no body, no
+attachment names). A page is located by the sort key and email_id of the row before
+(or after) it rather than by an OFFSET, so the next and previous pages cost the same
+at any depth of a large archive. Sorting runs in DuckDB, as the filters and the text
+search (see filter_sql); the body of an email is read by primary key when its row is opened.
+
+A jump to an arbitrary page uses an OFFSET from whichever end of the list is closer.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import duckdb
+import pandas as pd
+
+from src.data.duckdb_utils import table_exists
+from src.data.filter_sql import EmailFilterState
+
+PAGE_SIZE = 50
+
+# Sort key of every sortable column; NULLs get the lowest value so that keys always compare
+SORT_KEYS = {
+    'date': "COALESCE(ef.timestamp, TIMESTAMP '0001-01-01 00:00:00')",
+    'from': "COALESCE(ef.sender_email, '')",
+    'recipient_email': "COALESCE(ef.recipient_emails, '')",
+    'subject': "COALESCE(ef.subject, '')",
+}
+
+PAGE_COLUMNS = """
+    ef.email_id,
+    ef.message_id,
+    ef.timestamp AS date,
+    ef.sender_email AS "from",
+    ef.recipient_emails AS recipient_email,
+    ef.subject,
+    ef.attachment_count > 0 AS has_attachments,
+    ef.direction,
+    COALESCE(ef.mailbox_name, ef.folder) AS mailbox
+"""
+
+DETAIL_QUERY = """
+SELECT
+    ef.email_id,
+    ef.message_id,
+    ef.timestamp AS date,
+    ef.sender_email AS "from",
+    ef.recipient_emails AS recipient_email,
+    ef.subject,
+    re.body,
+    array_to_string(ef.attachment_names, '|') AS attachments,
+    ef.attachment_count > 0 AS has_attachments,
+    ef.direction,
+    COALESCE(ef.mailbox_name, ef.folder) AS mailbox,
+    ef.folder
+FROM email_flat ef
+JOIN receiver_emails re ON re.id = ef.email_id
+WHERE ef.email_id = ?
+"""
+
+# Position of a row in the list: (sort key, email_id)
+Cursor = Tuple[Any, str]
+
+
+@dataclass(frozen=True)
+class EmailListQuery(EmailFilterState):
+    """Filter state of the email list plus its sort order"""
+    sort: str = 'date'
+    descending: bool = True
+
+    @classmethod
+    def build(cls, mailbox=None, filters: Optional[Dict[str, Any]] = None, date_range=None, topic_level=None,
+              contact=None, search=None, project_name=None, sort='date', descending=True):
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort column: {sort}")
+        return super().build(mailbox, filters, date_range, topic_level, contact, search, project_name,
+                             sort=sort, descending=bool(descending))
+
+
+def _where(conn: duckdb.DuckDBPyConnection, query: EmailListQuery) -> Tuple[str, list]:
+    return query.where(topics_available=table_exists(conn, 'email_topic_clusters'))
+
+
+def count_emails(conn: duckdb.DuckDBPyConnection, query: EmailListQuery) -> int:
+    """Number of emails matching the filters and the search of a query"""
+    where, params = _where(conn, query)
+    return conn.execute(f"SELECT COUNT(*) FROM email_flat ef WHERE {where}", params).fetchone()[0]
+
+
+def fetch_email_page(conn: duckdb.DuckDBPyConnection,
+                     query: EmailListQuery,
+                     after: Optional[Cursor] = None,
+                     before: Optional[Cursor] = None,
+                     offset: Optional[int] = None,
+                     from_end: bool = False,
+                     limit: int = PAGE_SIZE) -> pd.DataFrame:
+    """One page of the email list, light columns only
+
+    Args:
+        conn: Connection to the project database
+        query: Filters, search and sort order
+        after: Cursor of the row just before the page (next page)
+        before: Cursor of the row just after the page (previous page)
+        offset: Rows to skip, counted from the end of the list when from_end is set
+        from_end: Read the list backwards (last pages)
+        limit: Maximum number of rows
+
+    Returns:
+        DataFrame with the PAGE_COLUMNS plus _sort_key, in list order
+    """
+    sort_key = SORT_KEYS[query.sort]
+    where, params = _where(conn, query)
+    backwards = from_end or before is not None
+    descending = query.descending != backwards
+    cursor = before if before is not None else after
+    if cursor is not None:
+        comparison = '<' if descending else '>'
+        where += f" AND ({sort_key} {comparison} ? OR ({sort_key} = ? AND ef.email_id {comparison} ?))"
+        params = params + [cursor[0], cursor[0], cursor[1]]
+
+    direction = 'DESC' if descending else 'ASC'
+    sql = f"""
+    SELECT {PAGE_COLUMNS}, {sort_key} AS _sort_key
+    FROM email_flat ef
+    WHERE {where}
+    ORDER BY _sort_key {direction}, ef.email_id {direction}
+    LIMIT ?
+    """
+    params.append(int(limit))
+    if offset:
+        sql += " OFFSET ?"
+        params.append(int(offset))
+    df = conn.execute(sql, params).df()
+    if backwards:
+        df = df.iloc[::-1].reset_index(drop=True)
+    return df
+
+
+def fetch_page_number(conn: duckdb.DuckDBPyConnection,
+                      query: EmailListQuery,
+                      page: int,
+                      total: int,
+                      page_size: int = PAGE_SIZE) -> pd.DataFrame:
+    """Page number `page` (from 1) of a list of `total` emails, read from its closer end"""
+    start = (page - 1) * page_size
+    end = min(start + page_size, total)
+    if start >= total:
+        return fetch_email_page(conn, query, limit=0)
+    if start <= total - end:
+        return fetch_email_page(conn, query, offset=start, limit=end - start)
+    return fetch_email_page(conn, query, offset=total - end, from_end=True, limit=end - start)
+
+
+def page_cursors(page_df: pd.DataFrame) -> Tuple[Optional[Cursor], Optional[Cursor]]:
+    """Cursors of the first and last rows of a page"""
+    if page_df.empty:
+        return None, None
+    first, last = page_df.iloc[0], page_df.iloc[-1]
+    return (first['_sort_key'], first['email_id']), (last['_sort_key'], last['email_id'])
+
+
+def fetch_email_details(conn: duckdb.DuckDBPyConnection, email_id: str) -> Optional[Dict[str, Any]]:
+    """Everything the email viewer shows for one email, body included"""
+    df = conn.execute(DETAIL_QUERY, [email_id]).df()
+    if df.empty:
+        return None
+    details = df.iloc[0].to_dict()
+    attachments = details.get('attachments')
+    details['attachments'] = attachments.split('|') if isinstance(attachments, str) and attachments else []
+    return details
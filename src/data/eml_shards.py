@@ -0,0 +1,167 @@
+"""Packed storage of EML files: size-bounded tar shards plus an index.
+
+A directory holding hundreds of thousands of small .eml files costs as many requests to
+list, upload or download when each file is its own object. In the packed layout the EML
+files of a directory are written into uncompressed tar shards of at most
+DEFAULT_SHARD_BYTES, stored under <prefix>/_shards/ with an index that maps every
+relative path to (shard, data offset, size, md5). Any other file (PST, MBOX, ZIP...)
+stays a plain object.
+
+The index is enough to read a single message with one ranged GET, to verify a local
+copy without downloading anything, and to unpack the whole set from downloaded shards.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tarfile
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+SHARDS_DIRNAME = "_shards"
+SHARD_INDEX_FILENAME = "index.json.gz"
+SHARD_INDEX_VERSION = 1
+DEFAULT_SHARD_BYTES = 256 * 1024 * 1024
+
+# Positions in an index member entry
+MEMBER_SHARD, MEMBER_OFFSET, MEMBER_SIZE, MEMBER_MD5 = range(4)
+
+
+def is_packable(path: str) -> bool:
+    """Files that go into shards (every other file stays a plain object)"""
+    return path.lower().endswith('.eml')
+
+
+def shard_name(shard_no: int) -> str:
+    return f"shard-{shard_no:05d}.tar"
+
+
+def file_md5(path: str) -> str:
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def pack_directory(local_dir: str, output_dir: str, relative_paths: Iterable[str],
+                   max_shard_bytes: int = DEFAULT_SHARD_BYTES,
+                   shard_checksum: Optional[Callable[[str], str]] = None) -> Dict[str, Any]:
+    """
+    Write files of a directory into tar shards and build their index.
+
+    Files are packed in sorted path order with their own mtime and no owner, so packing
+    the same tree again gives byte-identical shards (and unchanged shards are not sent
+    again by the S3 upload).
+
+    Args:
+        local_dir: Directory the relative paths are resolved from
+        output_dir: Where the shards and the index are written
+        relative_paths: Files to pack, relative to local_dir ('/' separated)
+        max_shard_bytes: A new shard is started once a shard reaches this size
+        shard_checksum: Called with the path of each finished shard, its result is
+            stored as the shard "etag" (e.g. s3_utils.expected_etag)
+
+    Returns:
+        The index, also written to output_dir/SHARD_INDEX_FILENAME
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    shards: List[Dict[str, Any]] = []
+    members: Dict[str, List[Any]] = {}
+    tar = None
+
+    def _close_shard():
+        tar.close()
+        path = os.path.join(output_dir, shards[-1]["name"])
+        shards[-1]["size"] = os.path.getsize(path)
+        if shard_checksum is not None:
+            shards[-1]["etag"] = shard_checksum(path)
+
+    for rel_path in sorted(relative_paths):
+        if tar is None or tar.fileobj.tell() >= max_shard_bytes:
+            if tar is not None:
+                _close_shard()
+            shards.append({"name": shard_name(len(shards))})
+            tar = tarfile.open(os.path.join(output_dir, shards[-1]["name"]), "w", format=tarfile.PAX_FORMAT)
+
+        file_path = os.path.join(local_dir, rel_path)
+        info = tar.gettarinfo(file_path, arcname=rel_path)
+        info.uid = info.gid = 0
+        info.uname = info.gname = ""
+        with open(file_path, "rb") as f:
+            tar.addfile(info, f)
+        # addfile does not set info.offset_data; the data is followed by its 512-byte padding
+        data_offset = tar.offset - ((info.size + tarfile.BLOCKSIZE - 1) // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+        members[rel_path] = [len(shards) - 1, data_offset, info.size, file_md5(file_path)]
+
+    if tar is not None:
+        _close_shard()
+
+    index = {
+        "version": SHARD_INDEX_VERSION,
+        "layout": "tar-shards",
+        "shards": shards,
+        "members": members,
+    }
+    data = json.dumps(index, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    # mtime=0: the same index gives the same bytes
+    with gzip.GzipFile(os.path.join(output_dir, SHARD_INDEX_FILENAME), "wb", mtime=0) as f:
+        f.write(data)
+    return index
+
+
+def load_shard_index(source) -> Dict[str, Any]:
+    """
+    Read a shard index.
+
+    Args:
+        source: Path of the index file, or its (gzipped) bytes
+
+    Returns:
+        The index dictionary
+    """
+    if isinstance(source, (bytes, bytearray)):
+        data = gzip.decompress(source)
+    else:
+        with open(source, "rb") as f:
+            data = gzip.decompress(f.read())
+    index = json.loads(data.decode("utf-8"))
+    if index.get("version") != SHARD_INDEX_VERSION:
+        raise ValueError(f"Unsupported shard index version: {index.get('version')}")
+    return index
+
+
+def member_range(index: Dict[str, Any], rel_path: str) -> Optional[Tuple[str, int, int]]:
+    """(shard name, first byte, last byte) of a packed file, None if it is not in the index"""
+    entry = index["members"].get(rel_path)
+    if entry is None:
+        return None
+    start = entry[MEMBER_OFFSET]
+    return index["shards"][entry[MEMBER_SHARD]]["name"], start, start + entry[MEMBER_SIZE] - 1
+
+
+def find_local_shards(directory: str) -> Optional[str]:
+    """Directory holding downloaded shards and their index under directory, None if there is none"""
+    shards_dir = os.path.join(directory, SHARDS_DIRNAME)
+    return shards_dir if os.path.isfile(os.path.join(shards_dir, SHARD_INDEX_FILENAME)) else None
+
+
+def extract_shards(shards_dir: str, dest_dir: str) -> int:
+    """
+    Unpack every file of the downloaded shards into dest_dir, keeping their relative paths.
+
+    Args:
+        shards_dir: Directory holding the shards and their index
+        dest_dir: Destination directory
+
+    Returns:
+        Number of files extracted
+    """
+    index = load_shard_index(os.path.join(shards_dir, SHARD_INDEX_FILENAME))
+    extracted = 0
+    for shard in index["shards"]:
+        with tarfile.open(os.path.join(shards_dir, shard["name"]), "r:") as tar:
+            members = [member for member in tar.getmembers() if member.isfile()]
+            tar.extractall(dest_dir, members=members, filter="data")
+            extracted += len(members)
+    return extracted
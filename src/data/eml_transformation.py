@@ -8,14 +8,17 @@ import re
 import html
 import logging
 from email.header import decode_header
-import uuid
 import datetime
 import email.utils
+import hashlib
 from pathlib import Path
 from tqdm import tqdm
 from email import policy
 from bs4 import BeautifulSoup
 import json
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import duckdb
 import pandas as pd
 from dotenv import load_dotenv
 
@@ -28,7 +31,19 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 
 from src.models.models import EmailAddress, MailingList, Entity, Attachment, ReceiverEmail, SenderEmail
-from src.data.duckdb_utils import setup_database
+from src.models.normalization import AddressNormalizer, project_cache_path, set_normalizer, get_normalizer
+from src.data.duckdb_utils import setup_database, refresh_email_flat, table_exists
+from src.data.fulltext_index import drop_fulltext_documents, refresh_fulltext_index
+from src.data.thread_index import refresh_threads
+from src.data.rollups import refresh_rollups
+from src.data import content_ids
+from src.data.attachment_store import (AttachmentStore, add_references, attachment_hash,
+                                       has_inline_attachments, migrate_inline_attachments, release_references)
+from src.data.message_store import extract_canonical_fields
+from src.data.snapshots import build_snapshot, current_database
+from src.data.mbox_ingest import (MBOX_KEY_SEPARATOR, MboxMessage, find_mbox_files, is_mbox_manifest_key,
+                                  iter_mbox_messages, mbox_manifest_key, mbox_manifest_prefix,
+                                  read_mbox_message)
 
 import constants
 
@@ -421,9 +436,6 @@ def extract_message_data(message, folder_name, config_file, mailbox_name="Boîte
     if project_name is None:
         project_name = os.getenv("ACTIVE_PROJECT") or getattr(constants, "ACTIVE_PROJECT", "Projet Demo")
     """Extract comprehensive email data to match Pydantic models"""
-    # Generate a unique ID
-    email_id = str(uuid.uuid4())
-
     # Extract basic headers
     subject = decode_str(message.get('subject') or "")
     from_str = decode_str(message.get('from') or "")
@@ -480,6 +492,15 @@ def extract_message_data(message, folder_name, config_file, mailbox_name="Boîte
         print(f"Error extracting body: {e}")
         body_content = {"text": ""},
 
+    # Content derived id: re-ingesting the same message yields the same row
+    email_id = content_ids.email_id(
+        mailbox_name,
+        message_id,
+        content_ids.message_fingerprint(
+            (decode_str(message.get(header) or "") for header in content_ids.FALLBACK_HEADERS),
+            body_content["text"],
+        ),
+    )
 
     # Get attachment info with careful error handling
     attachments = []
@@ -535,7 +556,7 @@ def extract_message_data(message, folder_name, config_file, mailbox_name="Boîte
                 list_email = list_email_match.group(1)
 
             mailing_list = MailingList(
-                id=str(uuid.uuid4()),
+                id=content_ids.mailing_list_id(list_name, list_email),
                 name=list_name,
                 description=f"Mailing list extracted from {list_id}",
                 email_address=EmailAddress(email=list_email)
@@ -544,7 +565,7 @@ def extract_message_data(message, folder_name, config_file, mailbox_name="Boîte
             print(f"Error creating mailing list: {e}")
 
     # Create a SenderEmail object
-    sender_email_id = str(uuid.uuid4())
+    sender_email_id = content_ids.sender_email_id(email_id)
     sender_email = SenderEmail(
         id=sender_email_id,
         sender=sender_entity,
@@ -773,409 +794,1128 @@ def determine_email_direction(message, config_file, project_name: str, mailbox_n
 #### Main process
 
 
-def process_eml_to_duckdb(directory: Union[str, Path],
-                          conn: 'duckdb.DuckDBPyConnection',
-                          batch_size: int = 100,
-                          mailbox_name: str = "Boîte mail de Céline",
-                          project_name: Optional[str] = None,
-                          entity_cache: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+def resolve_mailbox_and_folder(rel_path: Path,
+                               mailbox_name: Optional[str],
+                               mailbox_configs: Dict[str, Any]) -> tuple:
     """
-    Recursively process all .eml files in a directory and its subdirectories directly to DuckDB in batches
+    Infer the mailbox and the folder of an .eml file from its path relative to the project root.
 
     Args:
-        directory: Root directory to search for .eml files
-        conn: DuckDB connection
-        batch_size: Number of records to process before committing to the database
-        entity_cache: Cache to store entities we've already seen
+        rel_path: Path of the .eml file relative to the directory being ingested
+        mailbox_name: Mailbox name requested by the caller
+        mailbox_configs: The "mailboxs" section of the project config file
 
     Returns:
-        Updated entity cache after processing
+        Tuple (mailbox_name, folder_name)
     """
+    parts = list(rel_path.parts)
 
-    project_name = project_name or os.getenv("ACTIVE_PROJECT") or getattr(constants, "ACTIVE_PROJECT", "Projet Demo")
+    inferred_mailbox = mailbox_name
+    if inferred_mailbox == "Boîte mail de Céline":
+        inferred_mailbox = None
 
-    config_path = Path(project_root) / "data" / "Projects" / project_name / "project_config_file.json"
-    with open(config_path, "r", encoding="utf-8") as f:
-        config_file = json.load(f)
+    if parts:
+        for part in parts:
+            if part in mailbox_configs:
+                inferred_mailbox = part
+                break
 
-    if entity_cache is None:
-        entity_cache = {}  # Cache to store entities we've already seen
+    if inferred_mailbox is None:
+        if mailbox_configs:
+            inferred_mailbox = next(iter(mailbox_configs.keys()))
+        else:
+            inferred_mailbox = mailbox_name or 'default_mailbox'
 
-    directory = Path(directory)  # Convert to Path object if it's a string
+    folder_parts = list(parts)
+    if inferred_mailbox in folder_parts:
+        idx = folder_parts.index(inferred_mailbox)
+        folder_parts = folder_parts[idx + 1:]
 
-    # Find all .eml files recursively
-    eml_files = []
-    for root, _, files in os.walk(directory):
-        for file in files:
-            if file.endswith('.eml'):
-                eml_files.append(Path(root) / file)
+    if folder_parts and folder_parts[0].lower() == inferred_mailbox.lower():
+        folder_parts = folder_parts[1:]
+
+    if folder_parts and folder_parts[0].lower() in {"processed", "raw"}:
+        folder_parts = folder_parts[1:]
+
+    if folder_parts:
+        last_part = Path(folder_parts[-1])
+        if last_part.suffix:
+            folder_parts = folder_parts[:-1]
+
+    folder_name = str(Path(*folder_parts)) if folder_parts else 'root'
+
+    return inferred_mailbox, folder_name
+
+
+def _entity_record(entity: Entity) -> Dict[str, Any]:
+    """Flatten an Entity into plain values that can cross process boundaries"""
+    return {
+        'name': entity.name,
+        'email': entity.email.email,
+        'alias_names': list(entity.alias_names) if entity.alias_names else None,
+        'alias_emails': [alias.email for alias in entity.alias_emails] if entity.alias_emails else None,
+        'is_physical_person': entity.is_physical_person
+    }
+
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 of a source file, as stored in the ingestion manifest"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def manifest_key(eml_path: Union[str, Path], directory: Union[str, Path]) -> str:
+    """Manifest key of a source file: its POSIX path relative to the ingested directory"""
+    return Path(eml_path).relative_to(directory).as_posix()
 
-    print(f"Found {len(eml_files)} .eml files to process")
-
-    # Process in batches for each table
-    entity_batch = []
-    entity_alias_emails_batch = []
-    mailing_list_batch = []
-    sender_email_batch = []
-    receiver_email_batch = []
-    to_recipients_batch = []
-    cc_recipients_batch = []
-    bcc_recipients_batch = []
-    attachments_batch = []
-
-    # Process each .eml file
-    mailbox_configs = {}
+
+def source_key(source: Union[Path, MboxMessage], directory: Union[str, Path]) -> str:
+    """Manifest key of an .eml file or of a message read in place from an MBOX file"""
+    if isinstance(source, MboxMessage):
+        return mbox_manifest_key(source, directory)
+    return manifest_key(source, directory)
+
+
+def parse_eml_file(eml_path: Union[str, Path],
+                   directory: Union[str, Path],
+                   config_file: Dict[str, Any],
+                   mailbox_name: str,
+                   project_name: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse and normalize a single .eml file into a plain message record.
+
+    The record only holds picklable values (no database ids for entities), so it can be
+    produced in a worker process and consumed by the single DuckDB writer.
+
+    Args:
+        eml_path: Path to the .eml file
+        directory: Root directory being ingested (used to infer mailbox and folder)
+        config_file: Loaded project config file
+        mailbox_name: Mailbox name requested by the caller
+        project_name: Name of the project in the config file
+
+    Returns:
+        Message record dictionary, or None if the file could not be parsed
+    """
+    eml_path = Path(eml_path)
     try:
-        mailbox_configs = config_file[project_name]["mailboxs"]
-    except Exception:
-        mailbox_configs = {}
+        stat = eml_path.stat()
+        with open(eml_path, 'rb') as f:
+            raw_message = f.read()
+    except Exception as e:
+        print(f"Error processing email {eml_path}: {e}")
+        return None
+
+    manifest = {
+        'path': manifest_key(eml_path, directory),
+        'size': stat.st_size,
+        'mtime': stat.st_mtime,
+        'content_hash': content_hash(raw_message)
+    }
+    return parse_message_bytes(raw_message, eml_path.relative_to(directory), str(eml_path), manifest,
+                               config_file, mailbox_name, project_name)
 
-    for i, eml_path in enumerate(tqdm(eml_files, desc="Processing emails")):
-        # Determine folder structure relative to the root directory
-        rel_path = eml_path.relative_to(directory)
-        parts = list(rel_path.parts)
 
-        inferred_mailbox = mailbox_name
-        if inferred_mailbox == "Boîte mail de Céline":
-            inferred_mailbox = None
+def parse_mbox_message(message: MboxMessage,
+                       directory: Union[str, Path],
+                       config_file: Dict[str, Any],
+                       mailbox_name: str,
+                       project_name: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse a message read in place from an MBOX file into a plain message record.
 
-        if parts:
-            for part in parts:
-                if part in mailbox_configs:
-                    inferred_mailbox = part
-                    break
+    The mailbox and folder are inferred from the path the message would have had once
+    converted to an .eml file, so the record is the one parse_eml_file gives for that file
+    (only its manifest entry differs).
 
-        if inferred_mailbox is None:
-            if mailbox_configs:
-                inferred_mailbox = next(iter(mailbox_configs.keys()))
-            else:
-                inferred_mailbox = mailbox_name or 'default_mailbox'
+    Args:
+        message: Message located by mbox_ingest.iter_mbox_messages
+        directory: Root directory being ingested
+        config_file: Loaded project config file
+        mailbox_name: Mailbox name requested by the caller
+        project_name: Name of the project in the config file
 
-        folder_parts = list(parts)
-        if inferred_mailbox in folder_parts:
-            idx = folder_parts.index(inferred_mailbox)
-            folder_parts = folder_parts[idx + 1:]
+    Returns:
+        Message record dictionary, or None if the message could not be parsed
+    """
+    source = f"{message.mbox_path}{MBOX_KEY_SEPARATOR}{message.number}"
+    try:
+        raw_message = read_mbox_message(message)
+        mtime = message.mbox_path.stat().st_mtime
+    except Exception as e:
+        print(f"Error processing email {source}: {e}")
+        return None
+
+    manifest = {
+        'path': mbox_manifest_key(message, directory),
+        'size': len(raw_message),
+        'mtime': mtime,
+        'content_hash': content_hash(raw_message)
+    }
+    return parse_message_bytes(raw_message, message.virtual_path, source, manifest,
+                               config_file, mailbox_name, project_name)
 
-        if folder_parts and folder_parts[0].lower() == inferred_mailbox.lower():
-            folder_parts = folder_parts[1:]
 
-        if folder_parts and folder_parts[0].lower() in {"processed", "raw"}:
-            folder_parts = folder_parts[1:]
+def parse_message_bytes(raw_message: bytes,
+                        rel_path: Path,
+                        source: str,
+                        manifest: Dict[str, Any],
+                        config_file: Dict[str, Any],
+                        mailbox_name: str,
+                        project_name: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse and normalize the bytes of a message into a plain message record.
 
-        if folder_parts:
-            last_part = Path(folder_parts[-1])
-            if last_part.suffix:
-                folder_parts = folder_parts[:-1]
+    Args:
+        raw_message: The message, as stored in an .eml file
+        rel_path: Path of its .eml file relative to the ingested directory (used to infer
+            mailbox and folder)
+        source: Where the message was read from, for the record and error messages
+        manifest: Ingestion manifest entry of the message
+        config_file: Loaded project config file
+        mailbox_name: Mailbox name requested by the caller
+        project_name: Name of the project in the config file
 
-        folder_name = str(Path(*folder_parts)) if folder_parts else 'root'
+    Returns:
+        Message record dictionary, or None if the message could not be parsed
+    """
+    try:
+        mailbox_configs = config_file[project_name]["mailboxs"]
+    except Exception:
+        mailbox_configs = {}
 
-        try:
-            # Parse the email file
-            with open(eml_path, 'rb') as f:
-                message = email.message_from_binary_file(f, policy=policy.default)
-            email_data, receiver_email = extract_message_data(
-                message,
-                folder_name,
-                config_file,
-                mailbox_name=inferred_mailbox,
-                project_name=project_name,
-            )
+    inferred_mailbox, folder_name = resolve_mailbox_and_folder(
+        Path(rel_path), mailbox_name, mailbox_configs
+    )
 
-            # Process sender entity
-            sender = receiver_email.sender
-
-            if sender.email.email not in entity_cache:
-                entity_id = str(uuid.uuid4())
-                entity_cache[sender.email.email] = entity_id
-
-                # Add to entities batch
-                entity_batch.append({
-                    'id': entity_id,
-                    'name': sender.name,
-                    'email': sender.email.email,
-                    'alias_names': json.dumps(sender.alias_names) if sender.alias_names else None,
-                    'alias_emails': json.dumps(sender.alias_emails) if sender.alias_names else None,
-                    'is_physical_person': sender.is_physical_person
-                })
+    try:
+        message = email.message_from_bytes(raw_message, policy=policy.default)
+        email_data, receiver_email = extract_message_data(
+            message,
+            folder_name,
+            config_file,
+            mailbox_name=inferred_mailbox,
+            project_name=project_name,
+        )
 
-                # Process alias emails if any
-                if sender.alias_emails:
-                    for alias_email in sender.alias_emails:
-                        entity_alias_emails_batch.append({
-                            'id': str(uuid.uuid4()),
-                            'entity_id': entity_id,
-                            'email': alias_email.email
-                        })
-            else:
-                # Get cached entity ID
-                entity_id = entity_cache[sender.email.email]
-
-            # Process sender email
-            sender_email = receiver_email.sender_email
-            sender_email_batch.append({
-                'id': sender_email.id,
-                'sender_id': entity_id,  # Use cached or new entity ID
-                'body': sender_email.body,
-                'timestamp': sender_email.timestamp
+        mailing_list = None
+        if receiver_email.mailing_list:
+            mailing_list = {
+                'id': receiver_email.mailing_list.id,
+                'name': receiver_email.mailing_list.name,
+                'description': receiver_email.mailing_list.description,
+                'email_address': receiver_email.mailing_list.email_address.email
+            }
+
+        attachments = []
+        for attachment in receiver_email.attachments or []:
+            attachments.append({
+                'filename': attachment.filename,
+                'content': attachment.content,
+                'content_type': getattr(attachment, 'content_type', 'application/octet-stream'),
+                'size': getattr(attachment, 'size', len(attachment.content) if attachment.content else 0)
             })
 
-            # Process receiver email
-            reply_to_id = None
-            if receiver_email.reply_to:
-                reply_to_email = receiver_email.reply_to.email.email
-                if reply_to_email not in entity_cache:
-                    reply_to_id = str(uuid.uuid4())
-                    entity_cache[reply_to_email] = reply_to_id
-
-                    entity_batch.append({
-                        'id': reply_to_id,
-                        'name': receiver_email.reply_to.name,
-                        'email': reply_to_email,
-                        'alias_names': None,
-                        'alias_emails': None,
-                        'is_physical_person': True # can be changed later based on if list diffusion or not
-                    })
-                else:
-                    reply_to_id = entity_cache[reply_to_email]
-
-            # Add mailing list if present
-            mailing_list_id = None
-            if receiver_email.mailing_list:
-                mailing_list_id = receiver_email.mailing_list.id
-                mailing_list_batch.append({
-                    'id': mailing_list_id,
-                    'name': receiver_email.mailing_list.name,
-                    'description': receiver_email.mailing_list.description,
-                    'email_address': receiver_email.mailing_list.email_address.email
-                })
-
-            # Add receiver email
-            receiver_email_batch.append({
+        parsed = extract_canonical_fields(message, rel_path)
+
+        return {
+            'file_path': source,
+            'manifest': manifest,
+            'parsed': parsed,
+            'mailbox_name': inferred_mailbox,
+            'folder': folder_name,
+            'sender': _entity_record(receiver_email.sender),
+            'reply_to': _entity_record(receiver_email.reply_to) if receiver_email.reply_to else None,
+            'to': [_entity_record(entity) for entity in receiver_email.to or []],
+            'cc': [_entity_record(entity) for entity in receiver_email.cc or []],
+            'bcc': [_entity_record(entity) for entity in receiver_email.bcc or []],
+            'mailing_list': mailing_list,
+            'sender_email': {
+                'id': receiver_email.sender_email.id,
+                'body': receiver_email.sender_email.body,
+                'timestamp': receiver_email.sender_email.timestamp
+            },
+            'receiver_email': {
                 'id': receiver_email.id,
-                'sender_email_id': sender_email.id,
-                'sender_id': entity_id,
-                'reply_to_id': reply_to_id,
-                'mailbox_name': inferred_mailbox,
                 'direction': receiver_email.direction,
-                'timestamp':receiver_email.timestamp.strftime('%Y-%m-%d %H:%M:%S'), # 'timestamp': receiver_email.timestamp,
+                'timestamp': receiver_email.timestamp,
                 'subject': receiver_email.subject,
                 'body': receiver_email.body,
                 'is_deleted': receiver_email.is_deleted,
-                'folder': folder_name,  # Using the relative folder path as folder name
                 'is_spam': receiver_email.is_spam,
-                'mailing_list_id': mailing_list_id,
                 'importance_score': receiver_email.importance_score,
-                'mother_email_id': None,  # Will be updated later
                 'message_id': email_data.get('message_id'),
                 'references': email_data.get('references'),
                 'in_reply_to': email_data.get('in_reply_to')
+            },
+            'attachments': attachments
+        }
+    except Exception as e:
+        print(f"Error processing email {source}: {e}")
+        return None
+
+
+class DuckDBBatchWriter:
+    """
+    Single writer that turns message records into rows of the normalized tables
+    and streams them into DuckDB in batches.
+
+    Attachment bytes go to the content-addressed blob store as the records arrive, the
+    attachments table only receiving their hash (see attachment_store).
+
+    Entity ids are resolved here (and only here) through the shared entity cache,
+    so records can be produced in any process as long as they are written in order.
+    All ids are content derived (see content_ids), so rows already in the database
+    are ignored rather than duplicated.
+    """
+
+    # Insertion order matters for the foreign keys between tables
+    TABLES = [
+        'entities',
+        'entity_alias_emails',
+        'mailing_lists',
+        'sender_emails',
+        'receiver_emails',
+        'email_recipients_to',
+        'email_recipients_cc',
+        'email_recipients_bcc',
+        'attachments',
+        'ingest_manifest',
+        'parsed_messages',
+    ]
+
+    # Tables whose rows replace the existing ones instead of being ignored
+    UPSERT_TABLES = {'ingest_manifest', 'parsed_messages'}
+
+    def __init__(self, conn: 'duckdb.DuckDBPyConnection', batch_size: int = 100,
+                 entity_cache: Optional[Dict[str, str]] = None,
+                 attachment_store: Optional[AttachmentStore] = None):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.entity_cache = entity_cache if entity_cache is not None else {}
+        self._attachment_store = attachment_store
+        self.batches = {table: [] for table in self.TABLES}
+        # Addresses cached since the last flush, forgotten if their rows are not inserted
+        self._unflushed_entities: List[str] = []
+
+    def _resolve_entity(self, entity: Dict[str, Any], keep_aliases: bool = True) -> str:
+        """Return the id of an entity, queueing it for insertion the first time it is seen"""
+        address = entity['email']
+        if address in self.entity_cache:
+            return self.entity_cache[address]
+
+        entity_id = content_ids.entity_id(address)
+        self.entity_cache[address] = entity_id
+        self._unflushed_entities.append(address)
+
+        self._queue('entities', {
+            'id': entity_id,
+            'name': entity['name'],
+            'email': address,
+            'alias_names': json.dumps(entity['alias_names']) if keep_aliases and entity['alias_names'] else None,
+            'alias_emails': json.dumps(entity['alias_emails']) if keep_aliases and entity['alias_emails'] else None,
+            'is_physical_person': entity['is_physical_person'] if keep_aliases else True
+        })
+
+        # Process alias emails if any
+        if keep_aliases and entity['alias_emails']:
+            for alias_email in entity['alias_emails']:
+                self._queue('entity_alias_emails', {
+                    'id': content_ids.alias_email_id(entity_id, alias_email),
+                    'entity_id': entity_id,
+                    'email': alias_email
+                })
+
+        return entity_id
+
+    @property
+    def attachment_store(self) -> AttachmentStore:
+        """Blob store next to the database, resolved on the first attachment"""
+        if self._attachment_store is None:
+            self._attachment_store = AttachmentStore.for_connection(self.conn)
+        return self._attachment_store
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """Queue the rows of one message record, flushing when the batch is full"""
+        sender_id = self._resolve_entity(record['sender'])
+
+        reply_to_id = None
+        if record['reply_to']:
+            # can be changed later based on if list diffusion or not
+            reply_to_id = self._resolve_entity(record['reply_to'], keep_aliases=False)
+
+        mailing_list_id = None
+        if record['mailing_list']:
+            mailing_list_id = record['mailing_list']['id']
+            self._queue('mailing_lists', dict(record['mailing_list']))
+
+        sender_email = record['sender_email']
+        self._queue('sender_emails', {
+            'id': sender_email['id'],
+            'sender_id': sender_id,
+            'body': sender_email['body'],
+            'timestamp': self._timestamp(sender_email['timestamp'])
+        })
+
+        receiver_email = record['receiver_email']
+        self._queue('receiver_emails', {
+            'id': receiver_email['id'],
+            'sender_email_id': sender_email['id'],
+            'sender_id': sender_id,
+            'reply_to_id': reply_to_id,
+            'mailbox_name': record['mailbox_name'],
+            'direction': receiver_email['direction'],
+            'timestamp': self._timestamp(receiver_email['timestamp']),
+            'subject': receiver_email['subject'],
+            'body': receiver_email['body'],
+            'is_deleted': receiver_email['is_deleted'],
+            'folder': record['folder'],  # Using the relative folder path as folder name
+            'is_spam': receiver_email['is_spam'],
+            'mailing_list_id': mailing_list_id,
+            'importance_score': receiver_email['importance_score'],
+            'mother_email_id': None,  # Parent kept in the threads table (see thread_index)
+            'message_id': receiver_email['message_id'],
+            'references': receiver_email['references'],
+            'in_reply_to': receiver_email['in_reply_to']
+        })
+
+        # Process recipients (to, cc, bcc)
+        for recipient_type in ('to', 'cc', 'bcc'):
+            for entity in record[recipient_type]:
+                entity_id = self._resolve_entity(entity)
+                self._queue(f'email_recipients_{recipient_type}', {
+                    'email_id': receiver_email['id'],
+                    'entity_id': entity_id
+                })
+
+        for position, attachment in enumerate(record['attachments']):
+            # Written before the rows are committed: an interrupted run leaves at most an
+            # unreferenced blob, removed by collect_garbage(sweep=True) outside any build
+            blob_hash, _ = self.attachment_store.put(attachment['content'], attachment_hash(attachment['content']))
+            self._queue('attachments', {
+                'id': content_ids.attachment_id(
+                    receiver_email['id'], position, attachment['filename'], attachment['content']
+                ),
+                'email_id': receiver_email['id'],
+                'filename': attachment['filename'],
+                'content_hash': blob_hash,
+                'content_type': attachment['content_type'],
+                'size': attachment['size']
             })
 
-            # Process recipients (to, cc, bcc) #
-            if receiver_email.to:
-                for entity in receiver_email.to:
-                    if entity.email.email not in entity_cache:
-                        to_entity_id = str(uuid.uuid4())
-                        entity_cache[entity.email.email] = to_entity_id
-
-                        entity_batch.append({
-                            'id': to_entity_id,
-                            'name': entity.name,
-                            'email': entity.email.email,
-                            'alias_names': json.dumps(entity.alias_names) if entity.alias_names else None,
-                            'alias_emails': json.dumps(sender.alias_emails) if sender.alias_names else None,
-                            'is_physical_person': entity.is_physical_person
-                        })
+        # Recorded in the same batch as the rows, so a file is only marked as ingested once committed
+        if record.get('manifest'):
+            self._queue('ingest_manifest', {
+                **record['manifest'],
+                'email_id': receiver_email['id'],
+                'ingested_at': datetime.datetime.now()
+            })
+            if record.get('parsed'):
+                self._queue('parsed_messages', {
+                    'source_path': record['manifest']['path'],
+                    'email_id': receiver_email['id'],
+                    'mailbox_name': record['mailbox_name'],
+                    'folder': record['folder'],
+                    **record['parsed']
+                })
 
-                        # Process alias emails
-                        if entity.alias_emails:
-                            for alias_email in entity.alias_emails:
-                                entity_alias_emails_batch.append({
-                                    'id': str(uuid.uuid4()),
-                                    'entity_id': to_entity_id,
-                                    'email': alias_email.email
-                                })
-                    else:
-                        to_entity_id = entity_cache[entity.email.email]
-
-                    # Add to recipients relationship
-                    to_recipients_batch.append({
-                        'email_id': receiver_email.id,
-                        'entity_id': to_entity_id
-                    })
-
-            # Process CC recipients
-            if receiver_email.cc:
-                for entity in receiver_email.cc:
-                    if entity.email.email not in entity_cache:
-                        cc_entity_id = str(uuid.uuid4())
-                        entity_cache[entity.email.email] = cc_entity_id
-
-                        entity_batch.append({
-                            'id': cc_entity_id,
-                            'name': entity.name,
-                            'email': entity.email.email,
-                            'alias_names': json.dumps(entity.alias_names) if entity.alias_names else None,
-                            'alias_emails': json.dumps(sender.alias_emails) if sender.alias_names else None,
-                            'is_physical_person': entity.is_physical_person
-                        })
-                    else:
-                        cc_entity_id = entity_cache[entity.email.email]
-
-                    # Add cc recipients relationship
-                    cc_recipients_batch.append({
-                        'email_id': receiver_email.id,
-                        'entity_id': cc_entity_id
-                    })
-
-            # Process BCC recipients
-            if receiver_email.bcc:
-                for entity in receiver_email.bcc:
-                    if entity.email.email not in entity_cache:
-                        bcc_entity_id = str(uuid.uuid4())
-                        entity_cache[entity.email.email] = bcc_entity_id
-
-                        entity_batch.append({
-                            'id': bcc_entity_id,
-                            'name': entity.name,
-                            'email': entity.email.email,
-                            'alias_names': json.dumps(entity.alias_names) if entity.alias_names else None,
-                            'alias_emails': json.dumps(sender.alias_emails) if sender.alias_names else None,
-                            'is_physical_person': entity.is_physical_person
-                        })
-                    else:
-                        bcc_entity_id = entity_cache[entity.email.email]
-
-                    # Add bcc recipients relationship
-                    bcc_recipients_batch.append({
-                        'email_id': receiver_email.id,
-                        'entity_id': bcc_entity_id
-                    })
-
-            # Process attachments
-            if receiver_email.attachments:
-                for attachment in receiver_email.attachments:
-                    content_type = getattr(attachment, 'content_type', 'application/octet-stream')
-                    size = getattr(attachment, 'size', len(attachment.content) if attachment.content else 0)
-
-                    attachments_batch.append({
-                        'id': str(uuid.uuid4()),
-                        'email_id': receiver_email.id,
-                        'filename': attachment.filename,
-                        'content': attachment.content,
-                        'content_type': content_type,
-                        'size': size
-                    })
-        except Exception as e:
-            print(f"Error processing email {eml_path}: {e}")
+        if self._batch_full():
+            self.flush()
+
+    def _queue(self, table: str, row: Dict[str, Any]) -> None:
+        self.batches[table].append(row)
+
+    def _batch_full(self) -> bool:
+        return len(self.batches['receiver_emails']) >= self.batch_size
+
+    def _timestamp(self, timestamp: datetime.datetime) -> Any:
+        return timestamp.strftime('%Y-%m-%d %H:%M:%S')
+
+    def _insert_batch(self, table: str, source: str) -> None:
+        """Insert the rows of a registered relation into a table"""
+        conflict = "REPLACE" if table in self.UPSERT_TABLES else "IGNORE"
+        if table == 'attachments':
+            # Only the rows actually inserted reference their blob once more
+            inserted = self.conn.execute(
+                f"INSERT OR {conflict} INTO {table} BY NAME SELECT * FROM {source} "
+                "RETURNING content_hash, size, content_type"
+            ).df()
+            add_references(self.conn, inserted)
+        else:
+            self.conn.execute(f"INSERT OR {conflict} INTO {table} BY NAME SELECT * FROM {source}")
+
+    def _flushed(self, inserted: bool) -> None:
+        """Forget the entities of a batch that failed, so that no later row references them"""
+        if not inserted:
+            for address in self._unflushed_entities:
+                self.entity_cache.pop(address, None)
+        self._unflushed_entities = []
+
+    def flush(self) -> None:
+        """Insert every pending batch in a single transaction (a failure is raised)"""
+        inserted = False
+        try:
+            self.conn.begin()
+            for table in self.TABLES:
+                rows = self.batches[table]
+                if not rows:
+                    continue
+                batch_df = pd.DataFrame(rows)
+                self.conn.register('batch_df', batch_df)
+                try:
+                    self._insert_batch(table, 'batch_df')
+                finally:
+                    self.conn.unregister('batch_df')
+
+            # Commit to save progress
+            self.conn.commit()
+            inserted = True
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            self._flushed(inserted)
+            self.batches = {table: [] for table in self.TABLES}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        return None
+    return pyarrow
+
+
+class ArrowBatchWriter(DuckDBBatchWriter):
+    """
+    Columnar variant of DuckDBBatchWriter.
+
+    Rows are appended to per-table column buffers, sealed every SEAL_ROWS rows into Arrow
+    record batches typed after the table columns (timestamps stay timestamps), and all the
+    tables are written in one transaction once the sealed batches reach flush_bytes, instead
+    of every batch_size emails. DuckDB reads the Arrow batches without conversion.
+    """
+
+    # Rows buffered as Python values before being sealed into a record batch
+    SEAL_ROWS = 512
+
+    # DuckDB column types and their Arrow type (other types are sent as strings)
+    ARROW_TYPES = {
+        'BOOLEAN': 'bool_',
+        'TINYINT': 'int8',
+        'SMALLINT': 'int16',
+        'INTEGER': 'int32',
+        'BIGINT': 'int64',
+        'FLOAT': 'float32',
+        'DOUBLE': 'float64',
+        'TIMESTAMP': 'timestamp',
+        'BLOB': 'binary',
+    }
+
+    def __init__(self, conn: 'duckdb.DuckDBPyConnection', flush_bytes: Optional[int] = None,
+                 entity_cache: Optional[Dict[str, str]] = None,
+                 attachment_store: Optional[AttachmentStore] = None):
+        super().__init__(conn, entity_cache=entity_cache, attachment_store=attachment_store)
+        self.pa = _pyarrow()
+        if self.pa is None:
+            raise ImportError("pyarrow is required by the columnar ingestion writer")
+        if flush_bytes is None:
+            flush_bytes = int(os.getenv("INGEST_FLUSH_MB", "32")) * 1024 * 1024
+        self.flush_bytes = flush_bytes
+        self._column_types = {table: self._table_types(table) for table in self.TABLES}
+        self._reset_buffers()
+
+    def _reset_buffers(self) -> None:
+        self._columns: Dict[str, Dict[str, list]] = {table: {} for table in self.TABLES}
+        self._sealed: Dict[str, list] = {table: [] for table in self.TABLES}
+        self._sealed_bytes = 0
+
+    def _table_types(self, table: str) -> Dict[str, Any]:
+        """Arrow type of every column of a table"""
+        types = {}
+        for column, data_type in self.conn.execute(
+            "SELECT column_name, data_type FROM information_schema.columns WHERE table_name = ?", [table]
+        ).fetchall():
+            arrow_type = self.ARROW_TYPES.get(data_type)
+            if arrow_type == 'timestamp':
+                types[column] = self.pa.timestamp('us')
+            else:
+                types[column] = getattr(self.pa, arrow_type)() if arrow_type else self.pa.string()
+        return types
+
+    def _queue(self, table: str, row: Dict[str, Any]) -> None:
+        columns = self._columns[table]
+        if not columns:
+            columns.update((name, []) for name in row)
+        for name, values in columns.items():
+            values.append(row.get(name))
+        if len(next(iter(columns.values()))) >= self.SEAL_ROWS:
+            self._seal(table)
+
+    def _seal(self, table: str) -> None:
+        """Convert the buffered rows of a table into a typed record batch"""
+        columns = self._columns[table]
+        if not columns or not next(iter(columns.values())):
+            return
+        types = self._column_types[table]
+        batch = self.pa.RecordBatch.from_arrays(
+            [self.pa.array(values, type=types[name]) for name, values in columns.items()],
+            names=list(columns),
+        )
+        self._sealed[table].append(batch)
+        self._sealed_bytes += batch.nbytes
+        self._columns[table] = {}
+
+    def _batch_full(self) -> bool:
+        return self._sealed_bytes >= self.flush_bytes
+
+    def _timestamp(self, timestamp: datetime.datetime) -> Any:
+        # Wall clock time of the Date header, as the string path stores it
+        return timestamp.replace(tzinfo=None)
+
+    def flush(self) -> None:
+        """Insert every pending batch in a single transaction (a failure is raised)"""
+        for table in self.TABLES:
+            self._seal(table)
+        if not any(self._sealed.values()):
+            return
+        inserted = False
+        try:
+            self.conn.begin()
+            for table in self.TABLES:
+                if not self._sealed[table]:
+                    continue
+                batch_arrow = self.pa.Table.from_batches(self._sealed[table])
+                self.conn.register('batch_arrow', batch_arrow)
+                try:
+                    self._insert_batch(table, 'batch_arrow')
+                finally:
+                    self.conn.unregister('batch_arrow')
+            self.conn.commit()
+            inserted = True
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            self._flushed(inserted)
+            self._reset_buffers()
+
+
+def create_batch_writer(conn: 'duckdb.DuckDBPyConnection',
+                        batch_size: int = 100,
+                        entity_cache: Optional[Dict[str, str]] = None,
+                        kind: Optional[str] = None) -> DuckDBBatchWriter:
+    """
+    Writer used by the ingestion.
+
+    Args:
+        conn: DuckDB connection
+        batch_size: Emails per batch of the pandas writer
+        entity_cache: Cache of the entity ids already written
+        kind: 'arrow' (columnar, the default when pyarrow is installed) or 'pandas'
+            (default: INGEST_WRITER env var)
+
+    Returns:
+        The batch writer
+    """
+    kind = (kind or os.getenv("INGEST_WRITER") or "arrow").lower()
+    if kind == "arrow" and _pyarrow() is not None:
+        return ArrowBatchWriter(conn, entity_cache=entity_cache)
+    return DuckDBBatchWriter(conn, batch_size=batch_size, entity_cache=entity_cache)
+
+
+# Per-process state of the parallel ingestion workers
+_worker_context: Dict[str, Any] = {}
+
+
+def _init_parse_worker(directory: Path, config_file: Dict[str, Any], mailbox_name: str, project_name: str,
+                       normalization_cache: Optional[Path] = None) -> None:
+    """Store the ingestion context once per worker process instead of once per task"""
+    set_normalizer(AddressNormalizer(normalization_cache))
+    _worker_context.update(
+        directory=directory,
+        config_file=config_file,
+        mailbox_name=mailbox_name,
+        project_name=project_name,
+    )
+
+
+def _parse_source(source: Union[Path, MboxMessage],
+                  directory: Union[str, Path],
+                  config_file: Dict[str, Any],
+                  mailbox_name: str,
+                  project_name: str) -> Optional[Dict[str, Any]]:
+    """Parse an .eml file or a message of an MBOX file"""
+    if isinstance(source, MboxMessage):
+        return parse_mbox_message(source, directory, config_file, mailbox_name, project_name)
+    return parse_eml_file(source, directory, config_file, mailbox_name, project_name)
+
+
+def _parse_eml_chunk(eml_paths: List[Union[Path, MboxMessage]]) -> tuple:
+    """
+    Parse a chunk of .eml files (or MBOX messages) inside a worker process.
+
+    Returns the records along with the addresses the worker normalized for the first
+    time, so the parent process can persist them in the project cache.
+    """
+    records = [
+        _parse_source(
+            eml_path,
+            _worker_context['directory'],
+            _worker_context['config_file'],
+            _worker_context['mailbox_name'],
+            _worker_context['project_name'],
+        )
+        for eml_path in eml_paths
+    ]
+    return records, get_normalizer().drain_new_entries()
+
+
+def _iter_parsed_records_parallel(eml_files: List[Path],
+                                  directory: Path,
+                                  config_file: Dict[str, Any],
+                                  mailbox_name: str,
+                                  project_name: str,
+                                  workers: int,
+                                  queue_depth: int,
+                                  chunk_size: int,
+                                  normalization_cache: Optional[Path] = None):
+    """
+    Parse .eml files in a pool of worker processes and yield the records in file order.
+
+    At most `queue_depth` chunks are in flight at any time, which bounds the memory held
+    by parsed-but-not-yet-written messages. Results are consumed in submission order so
+    the writer sees exactly the same sequence as the serial path.
+    """
+    chunks = [eml_files[i:i + chunk_size] for i in range(0, len(eml_files), chunk_size)]
+    pending = deque()
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_parse_worker,
+        initargs=(directory, config_file, mailbox_name, project_name, normalization_cache),
+    ) as executor:
+        chunk_iter = iter(chunks)
+        for chunk in chunk_iter:
+            pending.append(executor.submit(_parse_eml_chunk, chunk))
+            if len(pending) >= queue_depth:
+                break
+
+        while pending:
+            records, new_addresses = pending.popleft().result()
+            get_normalizer().update(new_addresses)
+            next_chunk = next(chunk_iter, None)
+            if next_chunk is not None:
+                pending.append(executor.submit(_parse_eml_chunk, next_chunk))
+            for record in records:
+                yield record
+
+
+def load_project_config(project_name: str) -> Dict[str, Any]:
+    """Load the project_config_file.json of a project"""
+    config_path = Path(project_root) / "data" / "Projects" / project_name / "project_config_file.json"
+    with open(config_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def find_eml_files(directory: Union[str, Path]) -> List[Path]:
+    """Return every .eml file below a directory"""
+    eml_files = []
+    for root, _, files in os.walk(directory):
+        for file in files:
+            if file.endswith('.eml'):
+                eml_files.append(Path(root) / file)
+    return eml_files
+
+
+def plan_eml_ingest(directory: Union[str, Path],
+                    conn: 'duckdb.DuckDBPyConnection',
+                    eml_files: Optional[List[Path]] = None,
+                    include_mbox: bool = False) -> Dict[str, Any]:
+    """
+    Compare the .eml files of a directory with the ingestion manifest, without writing anything.
+
+    Files whose size and mtime match the manifest are not read. The others are hashed, so a
+    file that was only touched (copied, re-downloaded...) is not considered changed.
+
+    With include_mbox, the messages of the .mbox files are planned as well (see
+    _plan_mbox_messages). Without it, the manifest entries of MBOX messages are left out of
+    the plan, never reported as deleted.
+
+    Args:
+        directory: Root directory of the .eml files
+        conn: DuckDB connection holding the ingest_manifest table (none yet: nothing was ingested)
+        eml_files: Files to consider (default: every .eml file below the directory)
+        include_mbox: Also read the messages of the .mbox files in place
+
+    Returns:
+        Dictionary with the 'new' and 'changed' files (or MBOX messages) to ingest, the
+        'deleted' manifest paths with no source anymore, the 'unchanged' count and the
+        'touched' (path, size, mtime) entries whose stat changed but not their content
+    """
+    directory = Path(directory)
+    if eml_files is None:
+        eml_files = find_eml_files(directory)
+
+    manifest = {
+        path: (size, mtime, digest)
+        for path, size, mtime, digest in conn.execute(
+            "SELECT path, size, mtime, content_hash FROM ingest_manifest"
+        ).fetchall()
+    } if table_exists(conn, 'ingest_manifest') else {}
+
+    plan = {'new': [], 'changed': [], 'deleted': [], 'unchanged': 0, 'touched': []}
+    seen = set()
+    for eml_path in eml_files:
+        key = manifest_key(eml_path, directory)
+        seen.add(key)
+        entry = manifest.get(key)
+        if entry is None:
+            plan['new'].append(eml_path)
             continue
 
-        # Process batch when it reaches the batch size or on the last file
-        if len(receiver_email_batch) >= batch_size or i == len(eml_files) - 1:
-            try:
-                # Insert entities
-                if entity_batch:
-                    entities_df = pd.DataFrame(entity_batch)
-                    conn.execute("""
-                    INSERT OR IGNORE INTO entities
-                    SELECT * FROM entities_df
-                    """)
-                    entity_batch = []
-
-                # Insert entity alias emails
-                if entity_alias_emails_batch:
-                    alias_emails_df = pd.DataFrame(entity_alias_emails_batch)
-                    conn.execute("""
-                    INSERT OR IGNORE INTO entity_alias_emails
-                    SELECT * FROM alias_emails_df
-                    """)
-                    entity_alias_emails_batch = []
-
-                # Insert mailing lists
-                if mailing_list_batch:
-                    mailing_lists_df = pd.DataFrame(mailing_list_batch)
-                    conn.execute("""
-                    INSERT OR IGNORE INTO mailing_lists
-                    SELECT * FROM mailing_lists_df
-                    """)
-                    mailing_list_batch = []
-
-                # Insert sender emails
-                if sender_email_batch:
-                    sender_emails_df = pd.DataFrame(sender_email_batch)
-                    conn.execute("""
-                    INSERT OR IGNORE INTO sender_emails
-                    SELECT * FROM sender_emails_df
-                    """)
-                    sender_email_batch = []
-
-                # Insert receiver emails
-                if receiver_email_batch:
-                    receiver_emails_df = pd.DataFrame(receiver_email_batch)
-                    conn.execute("""
-                    INSERT OR IGNORE INTO receiver_emails
-                    SELECT * FROM receiver_emails_df
-                    """)
-                    receiver_email_batch = []
-
-                # Insert recipient relationships
-                if to_recipients_batch:
-                    to_recipients_df = pd.DataFrame(to_recipients_batch)
-                    conn.execute("""
-                    INSERT OR IGNORE INTO email_recipients_to
-                    SELECT * FROM to_recipients_df
-                    """)
-                    to_recipients_batch = []
-
-                if cc_recipients_batch:
-                    cc_recipients_df = pd.DataFrame(cc_recipients_batch)
-                    conn.execute("""
-                    INSERT OR IGNORE INTO email_recipients_cc
-                    SELECT * FROM cc_recipients_df
-                    """)
-                    cc_recipients_batch = []
-
-                if bcc_recipients_batch:
-                    bcc_recipients_df = pd.DataFrame(bcc_recipients_batch)
-                    conn.execute("""
-                    INSERT OR IGNORE INTO email_recipients_bcc
-                    SELECT * FROM bcc_recipients_df
-                    """)
-                    bcc_recipients_batch = []
-
-                # Insert attachments
-                if attachments_batch:
-                    attachments_df = pd.DataFrame(attachments_batch)
-                    conn.execute("""
-                    INSERT OR IGNORE INTO attachments
-                    SELECT * FROM attachments_df
-                    """)
-                    attachments_batch = []
-
-                # Commit to save progress
-                conn.commit()
-            except Exception as e:
-                print(f"Error inserting batch into database: {e}")
-                # Continue processing even if one batch fails
-                entity_batch = []
-                entity_alias_emails_batch = []
-                mailing_list_batch = []
-                sender_email_batch = []
-                receiver_email_batch = []
-                to_recipients_batch = []
-                cc_recipients_batch = []
-                bcc_recipients_batch = []
-                attachments_batch = []
+        stat = eml_path.stat()
+        if entry[0] == stat.st_size and entry[1] == stat.st_mtime:
+            plan['unchanged'] += 1
+            continue
+
+        with open(eml_path, 'rb') as f:
+            digest = content_hash(f.read())
+        if digest == entry[2]:
+            plan['unchanged'] += 1
+            plan['touched'].append((key, stat.st_size, stat.st_mtime))
+        else:
+            plan['changed'].append(eml_path)
+
+    if include_mbox:
+        _plan_mbox_messages(directory, manifest, plan, seen)
+
+    plan['deleted'] = sorted(
+        path for path in manifest
+        if path not in seen and (include_mbox or not is_mbox_manifest_key(path))
+    )
+    return plan
+
+
+def _plan_mbox_messages(directory: Path,
+                        manifest: Dict[str, tuple],
+                        plan: Dict[str, Any],
+                        seen: set) -> None:
+    """
+    Add the messages of the .mbox files of a directory to an ingestion plan.
+
+    An MBOX file whose mtime is the one of all its manifest entries is not read at all.
+    Otherwise its messages are located and hashed one by one: appending to an MBOX file only
+    makes its new messages 'new', and a message whose content is unchanged is only 'touched'.
+    """
+    entries_by_mbox: Dict[str, List[str]] = {}
+    for path in manifest:
+        if is_mbox_manifest_key(path):
+            prefix = path.rpartition(MBOX_KEY_SEPARATOR)[0] + MBOX_KEY_SEPARATOR
+            entries_by_mbox.setdefault(prefix, []).append(path)
+
+    for mbox_path in find_mbox_files(directory):
+        prefix = mbox_manifest_prefix(mbox_path, directory)
+        known = entries_by_mbox.get(prefix, [])
+        mtime = mbox_path.stat().st_mtime
+        if known and all(manifest[key][1] == mtime for key in known):
+            seen.update(known)
+            plan['unchanged'] += len(known)
+            continue
+
+        for message in iter_mbox_messages(mbox_path, directory):
+            key = mbox_manifest_key(message, directory)
+            seen.add(key)
+            entry = manifest.get(key)
+            if entry is None:
+                plan['new'].append(message)
+                continue
+
+            raw_message = read_mbox_message(message)
+            if content_hash(raw_message) == entry[2]:
+                plan['unchanged'] += 1
+                plan['touched'].append((key, len(raw_message), mtime))
+            else:
+                plan['changed'].append(message)
+
+
+def _sources_missing_from_store(directory: Path,
+                                conn: 'duckdb.DuckDBPyConnection',
+                                include_mbox: bool,
+                                exclude: set) -> List[Union[Path, MboxMessage]]:
+    """Ingested sources that still exist but have no row in the message store"""
+    keys = [
+        path for (path,) in conn.execute("""
+            SELECT path FROM ingest_manifest
+            WHERE path NOT IN (SELECT source_path FROM parsed_messages)
+            ORDER BY path
+        """).fetchall()
+        if path not in exclude
+    ]
+    if not keys:
+        return []
+
+    sources: List[Union[Path, MboxMessage]] = []
+    numbers_by_mbox: Dict[str, set] = {}
+    for key in keys:
+        if is_mbox_manifest_key(key):
+            mbox_rel, _, number = key.rpartition(MBOX_KEY_SEPARATOR)
+            numbers_by_mbox.setdefault(mbox_rel, set()).add(int(number))
+        elif (directory / key).is_file():
+            sources.append(directory / key)
+
+    if include_mbox:
+        for mbox_rel, numbers in numbers_by_mbox.items():
+            if (directory / mbox_rel).is_file():
+                sources.extend(message for message in iter_mbox_messages(directory / mbox_rel, directory)
+                               if message.number in numbers)
+    return sources
+
+
+def format_ingest_plan(plan: Dict[str, Any], directory: Union[str, Path], details: bool = True) -> str:
+    """Human readable summary of plan_eml_ingest, listing every file unless details is False"""
+    lines = [
+        f"Ingestion plan for {directory}:",
+        f"  new:       {len(plan['new'])}",
+        f"  changed:   {len(plan['changed'])}",
+        f"  deleted:   {len(plan['deleted'])}",
+        f"  unchanged: {plan['unchanged']}",
+    ]
+    if not details:
+        return "\n".join(lines)
+    for label in ('new', 'changed'):
+        for eml_path in plan[label]:
+            lines.append(f"  [{label}] {source_key(eml_path, directory)}")
+    for path in plan['deleted']:
+        lines.append(f"  [deleted] {path}")
+    return "\n".join(lines)
+
+
+def delete_ingested_emails(conn: 'duckdb.DuckDBPyConnection', paths: List[str]) -> int:
+    """
+    Remove the rows ingested from the given source files, along with their manifest entries.
+
+    Entities and mailing lists are kept since other emails may reference them. The emails
+    are dropped from the full-text index. The attachments release their blobs, whose files
+    stay in the blob store while an older snapshot references them (see collect_garbage).
+
+    Args:
+        conn: DuckDB connection
+        paths: Manifest paths of the files whose emails should be removed
+
+    Returns:
+        Number of emails removed
+    """
+    if not paths:
+        return 0
+
+    conn.register('stale_paths', pd.DataFrame({'path': list(paths)}))
+    try:
+        conn.execute("""
+        CREATE OR REPLACE TEMP TABLE stale_emails AS
+        SELECT re.id, re.sender_email_id
+        FROM ingest_manifest m
+        JOIN receiver_emails re ON re.id = m.email_id
+        WHERE m.path IN (SELECT path FROM stale_paths)
+        -- Copies of the same message share their id: keep it while another file holds it
+        AND re.id NOT IN (
+            SELECT email_id FROM ingest_manifest
+            WHERE path NOT IN (SELECT path FROM stale_paths) AND email_id IS NOT NULL
+        )
+        """)
+        removed = conn.execute("SELECT COUNT(*) FROM stale_emails").fetchone()[0]
+
+        # Children first, for the foreign keys
+        conn.execute("""
+        DELETE FROM email_children
+        WHERE parent_id IN (SELECT id FROM stale_emails) OR child_id IN (SELECT id FROM stale_emails)
+        """)
+        for table in ('email_recipients_to', 'email_recipients_cc', 'email_recipients_bcc'):
+            conn.execute(f"DELETE FROM {table} WHERE email_id IN (SELECT id FROM stale_emails)")
+        released = conn.execute(
+            "DELETE FROM attachments WHERE email_id IN (SELECT id FROM stale_emails) RETURNING content_hash"
+        ).fetchall()
+        release_references(conn, [row[0] for row in released])
+        conn.execute("""
+        UPDATE receiver_emails SET mother_email_id = NULL
+        WHERE mother_email_id IN (SELECT id FROM stale_emails)
+        """)
+        # Indexed again with their new content if the same ids are ingested again
+        drop_fulltext_documents(conn, "SELECT id FROM stale_emails")
+        conn.execute("DELETE FROM receiver_emails WHERE id IN (SELECT id FROM stale_emails)")
+        conn.execute("DELETE FROM sender_emails WHERE id IN (SELECT sender_email_id FROM stale_emails)")
+        conn.execute("DELETE FROM ingest_manifest WHERE path IN (SELECT path FROM stale_paths)")
+        conn.execute("DELETE FROM parsed_messages WHERE source_path IN (SELECT path FROM stale_paths)")
+        conn.execute("DROP TABLE stale_emails")
+        conn.commit()
+    finally:
+        conn.unregister('stale_paths')
+
+    return removed
+
+
+def process_eml_to_duckdb(directory: Union[str, Path],
+                          conn: 'duckdb.DuckDBPyConnection',
+                          batch_size: int = 100,
+                          mailbox_name: str = "Boîte mail de Céline",
+                          project_name: Optional[str] = None,
+                          entity_cache: Optional[Dict[str, str]] = None,
+                          workers: int = 1,
+                          queue_depth: Optional[int] = None,
+                          chunk_size: int = 32,
+                          config_file: Optional[Dict[str, Any]] = None,
+                          incremental: bool = True,
+                          prune_deleted: bool = False,
+                          include_mbox: bool = False,
+                          batch_writer: Optional[str] = None) -> Dict[str, str]:
+    """
+    Recursively process all .eml files in a directory and its subdirectories directly to DuckDB in batches
+
+    With workers > 1, parsing and normalization run in a pool of worker processes while this
+    process acts as the single DuckDB writer. Both modes write the same rows.
+
+    In incremental mode only the files missing from the ingestion manifest, or whose content
+    changed since they were ingested, are parsed. The rows of changed files are replaced, the
+    rows of every other ingested file are left untouched.
+
+    With include_mbox, the messages of the .mbox files are read in place from the MBOX files
+    and ingested exactly as their .eml conversion would be, without writing any .eml file.
+
+    Args:
+        directory: Root directory to search for .eml files
+        conn: DuckDB connection
+        batch_size: Number of records to process before committing to the database (pandas writer;
+            the Arrow writer commits every INGEST_FLUSH_MB megabytes of rows)
+        entity_cache: Cache to store entities we've already seen
+        workers: Number of parsing processes (1 keeps everything in the current process)
+        queue_depth: Maximum number of parsed chunks waiting for the writer (default: 4 per worker)
+        chunk_size: Number of .eml files handed to a worker at once
+        config_file: Already loaded project config (read from the project folder if None)
+        incremental: Skip the files already ingested with the same content
+        prune_deleted: In incremental mode, also remove the emails of files that no longer exist
+        include_mbox: Also ingest the messages of the .mbox files, read in place
+        batch_writer: 'arrow' or 'pandas' (see create_batch_writer)
+
+    Returns:
+        Updated entity cache after processing
+    """
+
+    project_name = project_name or os.getenv("ACTIVE_PROJECT") or getattr(constants, "ACTIVE_PROJECT", "Projet Demo")
+
+    if config_file is None:
+        config_file = load_project_config(project_name)
+
+    directory = Path(directory)  # Convert to Path object if it's a string
+
+    # Find all .eml files recursively
+    eml_files = find_eml_files(directory)
+
+    print(f"Found {len(eml_files)} .eml files")
+    if include_mbox:
+        mbox_files = find_mbox_files(directory)
+        print(f"Found {len(mbox_files)} .mbox files, read in place")
+
+    if entity_cache is None:
+        entity_cache = {}
+
+    # Databases built with the attachment content inline are moved to the blob store once
+    if has_inline_attachments(conn):
+        migrated = migrate_inline_attachments(conn)
+        print(f"{migrated['attachments']} attachments moved to the blob store "
+              f"({migrated['bytes'] / 1e6:,.1f} MB out of the database)")
+
+    if incremental:
+        already_ingested = conn.execute("SELECT COUNT(*) FROM ingest_manifest").fetchone()[0]
+        if not already_ingested and conn.execute("SELECT COUNT(*) FROM receiver_emails").fetchone()[0]:
+            print("Warning: this database was built without an ingestion manifest, "
+                  "every file will be ingested again (rebuild it to avoid duplicates)")
+
+        plan = plan_eml_ingest(directory, conn, eml_files, include_mbox=include_mbox)
+        print(format_ingest_plan(plan, directory, details=False))
+
+        stale_paths = [source_key(eml_path, directory) for eml_path in plan['changed']]
+        if prune_deleted:
+            stale_paths += plan['deleted']
+        removed = delete_ingested_emails(conn, stale_paths)
+        if removed:
+            print(f"Removed {removed} emails of changed or deleted files")
+
+        if plan['touched']:
+            conn.executemany(
+                "UPDATE ingest_manifest SET size = ?, mtime = ? WHERE path = ?",
+                [(size, mtime, key) for key, size, mtime in plan['touched']],
+            )
+            conn.commit()
+
+        eml_files = plan['new'] + plan['changed']
+
+        # Files ingested before the message store existed are parsed once more to fill it
+        unstored = _sources_missing_from_store(directory, conn, include_mbox,
+                                               exclude={source_key(source, directory) for source in eml_files})
+        if unstored:
+            print(f"{len(unstored)} already ingested files parsed again to fill the message store")
+            eml_files += unstored
+
+        # Reuse the ids of the entities already in the database
+        for address, entity_id in conn.execute("SELECT email, id FROM entities").fetchall():
+            entity_cache.setdefault(address, entity_id)
+    elif include_mbox:
+        for mbox_path in mbox_files:
+            eml_files.extend(iter_mbox_messages(mbox_path, directory))
+
+    print(f"{len(eml_files)} .eml files to process")
+
+    # Normalized addresses are memoized in a per-project cache reused across runs
+    project_dir = Path(project_root) / "data" / "Projects" / project_name
+    normalization_cache = project_cache_path(project_dir) if project_dir.is_dir() else None
+    normalizer = AddressNormalizer(normalization_cache)
+    previous_normalizer = set_normalizer(normalizer)
+
+    writer = create_batch_writer(conn, batch_size=batch_size, entity_cache=entity_cache, kind=batch_writer)
+
+    if workers > 1 and len(eml_files) > chunk_size:
+        records = _iter_parsed_records_parallel(
+            eml_files,
+            directory,
+            config_file,
+            mailbox_name,
+            project_name,
+            workers=workers,
+            queue_depth=queue_depth or workers * 4,
+            chunk_size=chunk_size,
+            normalization_cache=normalization_cache,
+        )
+    else:
+        records = (
+            _parse_source(eml_path, directory, config_file, mailbox_name, project_name)
+            for eml_path in eml_files
+        )
+
+    try:
+        for record in tqdm(records, total=len(eml_files), desc="Processing emails"):
+            if record is not None:
+                writer.add(record)
+
+        writer.flush()
+    finally:
+        normalizer.save()
+        set_normalizer(previous_normalizer)
 
     print(f"Completed processing {len(eml_files)} .eml files")
 
-    return entity_cache
+    return writer.entity_cache
 
 
 
 
 def process_eml_files(directory: Union[str, Path],
-                     output_path: Optional[str] = None) -> None:
+                     output_path: Optional[str] = None,
+                     workers: int = 1,
+                     queue_depth: Optional[int] = None,
+                     incremental: bool = True,
+                     prune_deleted: bool = False,
+                     dry_run: bool = False,
+                     include_mbox: bool = False,
+                     project_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
     """
     Recursively process .eml files from a directory and its subdirectories and save to DuckDB format
     with normalized tables
@@ -1183,6 +1923,16 @@ def process_eml_files(directory: Union[str, Path],
     Args:
         directory: Directory containing .eml files (may be nested in subdirectories)
         output_path: Output file path (default: emails.duckdb)
+        workers: Number of parsing processes (see process_eml_to_duckdb)
+        queue_depth: Maximum number of parsed chunks waiting for the writer
+        incremental: Only ingest new or changed files (see process_eml_to_duckdb)
+        prune_deleted: Remove the emails of files that no longer exist
+        dry_run: Only report the new, changed and deleted files, without ingesting anything
+        include_mbox: Also ingest the messages of the .mbox files, read in place
+        project_name: Project of the emails, for its config (default: ACTIVE_PROJECT)
+
+    Returns:
+        The ingestion plan when dry_run is set, None otherwise
     """
     # Set default output path if not provided
     if output_path is None:
@@ -1190,85 +1940,136 @@ def process_eml_files(directory: Union[str, Path],
     elif not output_path.endswith('.duckdb'):
         output_path = f"{output_path}.duckdb"
 
-    # Setup database
-    conn = setup_database(output_path)
-
     # Convert directory to Path if it's a string
     directory = Path(directory)
 
+    if dry_run:
+        # Only read: the database may be the snapshot the app is serving, or not exist yet
+        conn = duckdb.connect(output_path, read_only=True) if os.path.exists(output_path) else duckdb.connect()
+        try:
+            plan = plan_eml_ingest(directory, conn, include_mbox=include_mbox)
+            print(format_ingest_plan(plan, directory))
+            return plan
+        finally:
+            conn.close()
+
+    # Setup database
+    conn = setup_database(output_path)
+
     # Entity cache to avoid duplicates across files
     entity_cache = {}
 
+    # Any failure is raised: a build that stops half way must not be published (see generate_duck_db)
     try:
         # Process all .eml files in the directory and subdirectories
         print(f"Processing .eml files in {directory} and subdirectories...")
-        entity_cache = process_eml_to_duckdb(directory, conn, entity_cache=entity_cache)
-    except Exception as e:
-        print(f"Error processing directory {directory}: {e}")
-
-    try:
-        # Create relationships between emails (mother/child relationships)
-        print("Creating email thread relationships...")
-        conn.execute("""
-        UPDATE receiver_emails
-        SET mother_email_id = (
-            SELECT r2.id
-            FROM receiver_emails r2
-            WHERE r2.message_id = receiver_emails.in_reply_to
-            LIMIT 1
+        entity_cache = process_eml_to_duckdb(
+            directory,
+            conn,
+            entity_cache=entity_cache,
+            workers=workers,
+            queue_depth=queue_depth,
+            incremental=incremental,
+            prune_deleted=prune_deleted,
+            include_mbox=include_mbox,
+            project_name=project_name,
         )
-        WHERE in_reply_to IS NOT NULL
-        """)
 
-        # Populate the children relationships table
-        print("Populating child email relationships...")
-        conn.execute("""
-        INSERT INTO email_children (parent_id, child_id)
-        SELECT mother_email_id, id
-        FROM receiver_emails
-        WHERE mother_email_id IS NOT NULL
-        AND mother_email_id IN (SELECT id FROM receiver_emails)
-        AND id != mother_email_id  -- Prevent self-references
-        """)
-    except Exception as e:
-        print(f"Warning: Error in relationship creation: {e}")
-        print("Continuing with database optimization...")
+        # Conversation threads and the parent/child relationships, rebuilt with set-based joins
+        print("Creating email thread relationships...")
+        thread_count = refresh_threads(conn)
+        print(f"{thread_count} conversation threads")
+
+        # Pre-joined view of every email read by the app
+        print("Refreshing the email_flat table...")
+        flat_count = refresh_email_flat(conn)
+        print(f"email_flat holds {flat_count} emails")
+
+        # Daily, weekly and monthly counts read by the dashboard and the timeline
+        print("Refreshing the activity rollups...")
+        rollup_count = refresh_rollups(conn)
+        print(f"Activity rollups: {rollup_count} rows")
+
+        # Keyword search index over subjects, bodies and attachment names
+        print("Updating the full-text index...")
+        indexed_count = refresh_fulltext_index(conn)
+        print(f"Full-text index: {indexed_count} emails indexed")
+
+        # Final optimization and cleanup
+        print("Optimizing database...")
+        conn.execute("PRAGMA enable_optimizer") # conn.execute("PRAGMA optimize_database")
+    finally:
+        conn.close()
 
-    # Final optimization and cleanup
-    print("Optimizing database...")
+    print(f"DuckDB database saved to {output_path}")
 
+def generate_duck_db(workers: Optional[int] = None, queue_depth: Optional[int] = None,
+                     incremental: bool = True, prune_deleted: bool = False,
+                     dry_run: bool = False, include_mbox: Optional[bool] = None,
+                     project_name: Optional[str] = None) -> str:
+    """
+    Build (or update) the DuckDB database of a project (the active one by default) from its .eml files.
 
-    conn.execute("PRAGMA enable_optimizer") # conn.execute("PRAGMA optimize_database")
-    conn.close()
+    The build writes into a new snapshot of the database, a copy of the current one, which
+    replaces it only when the build is over (see snapshots): the app keeps reading the
+    previous snapshot in the meantime. A build that fails is discarded, the current database
+    is left as it was and the error is raised.
 
-    print(f"DuckDB database saved to {output_path}")
+    Args:
+        workers: Number of parsing processes (default: EML_INGEST_WORKERS env var, else the CPU count)
+        queue_depth: Maximum number of parsed chunks waiting for the writer
+        incremental: Only ingest the files that are new or changed since the last run
+        prune_deleted: Remove the emails of files that no longer exist
+        dry_run: Only print the ingestion plan
+        include_mbox: Read the messages of the .mbox files in place instead of relying on their
+            .eml conversion (default: MBOX_INGEST_MODE env var set to "direct")
+        project_name: Project to build (default: ACTIVE_PROJECT)
 
-def generate_duck_db() -> str | bool:
-    active_project = os.getenv("ACTIVE_PROJECT") or getattr(constants, "ACTIVE_PROJECT", "Projet Demo")
+    Returns:
+        Path to the database
+    """
+    active_project = project_name or os.getenv("ACTIVE_PROJECT") or getattr(constants, "ACTIVE_PROJECT", "Projet Demo")
     db_path = os.path.join(project_root, "data", "Projects", active_project, f"{active_project}.duckdb")
     eml_folder_path = os.path.join(project_root, "data", "Projects", active_project)
 
-    try:
-        setup_database(db_path) # duckdb_conn =
-        process_eml_files(eml_folder_path, db_path)
+    if workers is None:
+        workers = int(os.getenv("EML_INGEST_WORKERS") or os.cpu_count() or 1)
+
+    if include_mbox is None:
+        include_mbox = os.getenv("MBOX_INGEST_MODE", "eml") == "direct"
+
+    if dry_run:
+        process_eml_files(eml_folder_path, str(current_database(db_path)), workers=workers,
+                          queue_depth=queue_depth, incremental=incremental, prune_deleted=prune_deleted,
+                          dry_run=True, include_mbox=include_mbox, project_name=active_project)
         return db_path
-    except Exception as e:
-        print(f"Error generating DuckDB: {e}")
-        return False
+    with build_snapshot(db_path) as snapshot_path:
+        setup_database(str(snapshot_path)).close()
+        process_eml_files(eml_folder_path, str(snapshot_path), workers=workers, queue_depth=queue_depth,
+                          incremental=incremental, prune_deleted=prune_deleted, include_mbox=include_mbox,
+                          project_name=active_project)
+    return db_path
 
 
 
 if __name__ == "__main__":
-    generate_duck_db()
-    ## Set up argument parser
-    # parser = argparse.ArgumentParser(description='Process EML files into a DuckDB database')
-    # parser.add_argument('path_to_eml', nargs='?', default="data/processed/celine_readpst_with_S",
-    #                     help='Path to the directory containing EML files')
-    # parser.add_argument('path_for_db', nargs='?', default="data/Projects/Boîte mail de Céline/celine.duckdb",
-    #                     help='Path where the DuckDB file should be created')
-
-    # # Parse arguments
-    # args = parser.parse_args()
-
-    # # Process the files using the provided arguments
-    # process_eml_files(args.path_to_eml, args.path_for_db)
+    parser = argparse.ArgumentParser(description="Ingest the .eml files of the active project into its DuckDB database")
+    parser.add_argument("--plan", action="store_true",
+                        help="Only report the new, changed and deleted files, without ingesting anything")
+    parser.add_argument("--full", action="store_true",
+                        help="Ingest every file, ignoring the ingestion manifest")
+    parser.add_argument("--prune-deleted", action="store_true",
+                        help="Remove the emails of files that no longer exist")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of parsing processes")
+    parser.add_argument("--mbox-direct", action="store_true", default=None,
+                        help="Read the messages of the .mbox files in place (default: MBOX_INGEST_MODE env var)")
+    args = parser.parse_args()
+
+    generate_duck_db(
+        workers=args.workers,
+        incremental=not args.full,
+        prune_deleted=args.prune_deleted,
+        dry_run=args.plan,
+        include_mbox=args.mbox_direct,
+    )
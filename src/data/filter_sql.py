@@ -0,0 +1,183 @@
+"""The filter state of the app compiled to parameterized WHERE conditions on email_flat.
+
+Every filter of the Streamlit pages (mailbox, direction, folder, mailing list, sender,
+recipient, attachments, topic cluster, date range, contact and the full-text search) is
+answered in DuckDB: recipients through the email_recipients_to/cc junction tables, topic
+clusters through email_topic_clusters, text through the full-text index. The queries
+reading email_flat (alias ef) add the conditions to their WHERE clause, so no unfiltered
+row reaches pandas.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from src.data.fulltext_index import fulltext_hits_query
+
+INACTIVE_FILTER_VALUES = {'all', 'tous', 'toutes'}
+SENT_DIRECTIONS = {'envoyé', 'envoyes', 'envoyés', 'envoye', 'sent'}
+RECEIVED_DIRECTIONS = {'reçu', 'reçus', 'recus', 'recu', 'received'}
+
+# Emails with an address among their "to" and "cc" recipients
+RECIPIENT_CONDITION = """ef.email_id IN (
+    SELECT r.email_id FROM email_recipients_to r JOIN entities e ON e.id = r.entity_id
+    WHERE lower(e.email) = lower(?)
+    UNION
+    SELECT r.email_id FROM email_recipients_cc r JOIN entities e ON e.id = r.entity_id
+    WHERE lower(e.email) = lower(?)
+)"""
+
+TOPIC_CLUSTER_CONDITION = """ef.message_id IN (
+    SELECT message_id FROM email_topic_clusters
+    WHERE project_name = ? AND level = ? AND cluster_id = ?
+)"""
+
+
+def is_active_filter(value: Any) -> bool:
+    """Whether a filter value restricts the emails ("Tous", "All", empty values do not)"""
+    if value is None or value is False or value == '' or value == [] or value == ():
+        return False
+    return not (isinstance(value, str) and value.strip().casefold() in INACTIVE_FILTER_VALUES)
+
+
+def resolve_direction(value: Any) -> Optional[str]:
+    """Direction stored in the database for a filter value ("Envoyé", "Reçus", "sent"...)"""
+    if not is_active_filter(value):
+        return None
+    normalized = str(value).strip().casefold()
+    if normalized in SENT_DIRECTIONS:
+        return 'sent'
+    if normalized in RECEIVED_DIRECTIONS:
+        return 'received'
+    return str(value)
+
+
+def date_bounds(date_range: Any) -> Optional[Tuple[pd.Timestamp, pd.Timestamp]]:
+    """First and last instants of a (first day, last day) range, as apply_date_filter"""
+    if not isinstance(date_range, (tuple, list)) or len(date_range) != 2:
+        return None
+    start = pd.Timestamp(date_range[0]).normalize()
+    end = pd.Timestamp(date_range[1]).normalize() + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+    return start, end
+
+
+@dataclass(frozen=True)
+class EmailFilterState:
+    """Everything that restricts the emails shown by a page
+
+    filters holds the active (key, value) pairs of the filter dictionary of the app
+    (direction, folder, mailing_list_email, sender, recipient, has_attachments,
+    topic_cluster), as a tuple so that states can key caches and the session state.
+    """
+    mailbox: Optional[str] = None
+    filters: Tuple[Tuple[str, Any], ...] = ()
+    date_range: Optional[Tuple[Any, Any]] = None
+    topic_level: Optional[int] = None
+    contact: Optional[str] = None
+    search: Optional[str] = None
+    project_name: Optional[str] = field(default=None, compare=False)
+
+    @classmethod
+    def build(cls, mailbox=None, filters: Optional[Dict[str, Any]] = None, date_range=None, topic_level=None,
+              contact=None, search=None, project_name=None, **extra):
+        if isinstance(date_range, (tuple, list)) and len(date_range) == 2:
+            date_range = (pd.Timestamp(date_range[0]).date(), pd.Timestamp(date_range[1]).date())
+        else:
+            date_range = None
+        active = tuple(sorted((key, value) for key, value in (filters or {}).items()
+                              if is_active_filter(value) and isinstance(value, (str, int, float, bool))))
+        return cls(mailbox=mailbox, filters=active, date_range=date_range,
+                   topic_level=None if topic_level is None else int(topic_level),
+                   contact=(contact or '').strip() or None, search=(search or '').strip() or None,
+                   project_name=project_name, **extra)
+
+    @property
+    def signature(self) -> str:
+        """Identity of the filtered emails"""
+        return repr((self.mailbox, self.filters, self.date_range, self.topic_level, self.contact, self.search))
+
+    def conditions(self, topics_available: bool = True) -> Tuple[List[str], list]:
+        """WHERE conditions on email_flat (alias ef) and their parameters
+
+        Args:
+            topics_available: False when email_topic_clusters does not exist, in which case a
+                topic cluster filter matches no email
+        """
+        conditions, params = [], []
+        if self.mailbox and self.mailbox != "All Mailboxes":
+            conditions.append("COALESCE(ef.mailbox_name, ef.folder) = ?")
+            params.append(self.mailbox)
+
+        filters = dict(self.filters)
+        mailing_list = filters.get('mailing_list_email')
+        if mailing_list == 'None':
+            conditions.append("ef.mailing_list_email IS NULL")
+        elif mailing_list:
+            conditions.append("ef.mailing_list_email = ?")
+            params.append(mailing_list)
+
+        direction = resolve_direction(filters.get('direction'))
+        if direction:
+            conditions.append("ef.direction = ?")
+            params.append(direction)
+
+        folder = filters.get('folder')
+        if folder:
+            folder_part = folder
+            if isinstance(folder, str) and '→' in folder:
+                mailbox_part, folder_part = [part.strip() for part in folder.split('→', 1)]
+                conditions.append("COALESCE(ef.mailbox_name, ef.folder) = ?")
+                params.append(mailbox_part)
+            if folder_part == 'Racine':
+                conditions.append("(ef.folder IS NULL OR ef.folder = '' OR lower(ef.folder) = 'root')")
+            else:
+                conditions.append("ef.folder = ?")
+                params.append(folder_part)
+
+        sender = filters.get('sender')
+        if sender:
+            conditions.append("lower(ef.sender_email) = lower(?)")
+            params.append(str(sender).strip())
+
+        recipient = filters.get('recipient')
+        if recipient:
+            conditions.append(RECIPIENT_CONDITION)
+            params.extend([str(recipient).strip()] * 2)
+
+        if filters.get('has_attachments'):
+            conditions.append("ef.attachment_count > 0")
+
+        topic_cluster = filters.get('topic_cluster')
+        if topic_cluster:
+            try:
+                cluster_id = int(topic_cluster)
+            except (ValueError, TypeError):
+                cluster_id = None
+            if cluster_id is not None:
+                if self.topic_level is None or not topics_available:
+                    conditions.append("FALSE")
+                else:
+                    conditions.append(TOPIC_CLUSTER_CONDITION)
+                    params.extend([self.project_name, self.topic_level, cluster_id])
+
+        bounds = date_bounds(self.date_range)
+        if bounds:
+            conditions.append("ef.timestamp BETWEEN ? AND ?")
+            params.extend(bound.to_pydatetime() for bound in bounds)
+
+        if self.contact:
+            conditions.append(f"(lower(ef.sender_email) = lower(?) OR {RECIPIENT_CONDITION})")
+            params.extend([self.contact] * 3)
+
+        if self.search:
+            hits_sql, hits_params = fulltext_hits_query(self.search)
+            if hits_sql is not None:
+                conditions.append(f"ef.email_id IN (SELECT email_id FROM ({hits_sql}))")
+                params.extend(hits_params)
+        return conditions, params
+
+    def where(self, topics_available: bool = True) -> Tuple[str, list]:
+        """The conditions joined into one WHERE expression"""
+        conditions, params = self.conditions(topics_available)
+        return (' AND '.join(conditions) if conditions else 'TRUE'), params
@@ -0,0 +1,312 @@
+"""Positional inverted index over email subjects, bodies and attachment filenames.
+
+The index lives in the project database (fulltext_documents, fulltext_postings and
+fulltext_terms) and is built with set-based SQL at the end of every ingestion, for the
+emails that are not indexed yet. Queries are ranked with BM25; terms are ANDed and
+"quoted text" must appear as a phrase within one field.
+
+Tokens are the [a-z0-9]+ runs of the lowercased, accent-stripped text, computed by
+DuckDB at build time and by tokenize() at query time (both give the same tokens).
+"""
+
+import re
+import unicodedata
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import duckdb
+
+from src.data.duckdb_utils import table_exists
+
+FULLTEXT_FIELDS = {'subject': 0, 'body': 1, 'attachments': 2}
+
+# Longer runs are base64/uuencoded leftovers, never searched for
+MAX_TERM_LENGTH = 64
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+_PHRASE_RE = re.compile(r'"([^"]*)"')
+
+FULLTEXT_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS fulltext_documents (
+        email_id VARCHAR PRIMARY KEY,
+        doc_length INTEGER
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS fulltext_postings (
+        term VARCHAR,
+        email_id VARCHAR,
+        field TINYINT,
+        tf INTEGER,
+        positions INTEGER[]
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS fulltext_terms (
+        term VARCHAR PRIMARY KEY,
+        df INTEGER
+    )
+    """,
+]
+
+# Tokens of the pending emails, one row per (email, field, position)
+TOKENIZE_PENDING_QUERY = f"""
+CREATE OR REPLACE TEMP TABLE fulltext_tokens AS
+WITH texts AS (
+    SELECT re.id AS email_id, 0 AS field, re.subject AS txt
+    FROM receiver_emails re JOIN fulltext_batch b ON b.email_id = re.id
+    UNION ALL
+    SELECT re.id, 1, re.body
+    FROM receiver_emails re JOIN fulltext_batch b ON b.email_id = re.id
+    UNION ALL
+    SELECT a.email_id, 2, string_agg(a.filename, ' ')
+    FROM attachments a JOIN fulltext_batch b ON b.email_id = a.email_id
+    GROUP BY a.email_id
+),
+token_lists AS (
+    SELECT email_id, field,
+           regexp_extract_all(lower(strip_accents(COALESCE(txt, ''))), '[a-z0-9]+') AS tokens
+    FROM texts
+),
+tokens AS (
+    SELECT email_id, field, unnest(tokens) AS term, generate_subscripts(tokens, 1) AS position
+    FROM token_lists
+)
+SELECT * FROM tokens WHERE length(term) <= {MAX_TERM_LENGTH}
+"""
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into index tokens, exactly as the SQL build does"""
+    if not text:
+        return []
+    stripped = ''.join(ch for ch in unicodedata.normalize('NFKD', text) if not unicodedata.combining(ch))
+    return [token for token in _TOKEN_RE.findall(stripped.lower()) if len(token) <= MAX_TERM_LENGTH]
+
+
+def parse_fulltext_query(query: str) -> Tuple[List[str], List[List[str]]]:
+    """Split a query into single terms and "quoted phrases"
+
+    Returns:
+        (terms, phrases): every term must match, every phrase must appear as consecutive tokens
+    """
+    phrases = []
+    for phrase_text in _PHRASE_RE.findall(query or ''):
+        tokens = tokenize(phrase_text)
+        if tokens:
+            phrases.append(tokens)
+    terms = tokenize(_PHRASE_RE.sub(' ', query or '').replace('"', ' '))
+
+    # A one-word phrase is just a term
+    terms.extend(phrase[0] for phrase in phrases if len(phrase) == 1)
+    phrases = [phrase for phrase in phrases if len(phrase) > 1]
+    return list(dict.fromkeys(terms)), phrases
+
+
+def fulltext_index_exists(conn: duckdb.DuckDBPyConnection) -> bool:
+    """Whether the full-text tables were created in this database"""
+    return all(table_exists(conn, name) for name in ('fulltext_documents', 'fulltext_postings', 'fulltext_terms'))
+
+
+def drop_fulltext_documents(conn: duckdb.DuckDBPyConnection, email_ids_query: str) -> int:
+    """Remove emails from the index, so they are indexed again if they are still in receiver_emails
+
+    Args:
+        conn: Connection to the project database
+        email_ids_query: SQL selecting the ids of the emails to remove
+
+    Returns:
+        Number of documents removed
+    """
+    if not fulltext_index_exists(conn):
+        return 0
+    conn.execute(f"""
+        CREATE OR REPLACE TEMP TABLE fulltext_dropped AS
+        SELECT email_id FROM fulltext_documents WHERE email_id IN ({email_ids_query})
+    """)
+    dropped = conn.execute("SELECT COUNT(*) FROM fulltext_dropped").fetchone()[0]
+    if dropped:
+        conn.execute("""
+            UPDATE fulltext_terms SET df = fulltext_terms.df - d.df
+            FROM (
+                SELECT term, COUNT(DISTINCT email_id) AS df
+                FROM fulltext_postings
+                WHERE email_id IN (SELECT email_id FROM fulltext_dropped)
+                GROUP BY term
+            ) d
+            WHERE fulltext_terms.term = d.term
+        """)
+        conn.execute("DELETE FROM fulltext_terms WHERE df <= 0")
+        conn.execute("DELETE FROM fulltext_postings WHERE email_id IN (SELECT email_id FROM fulltext_dropped)")
+        conn.execute("DELETE FROM fulltext_documents WHERE email_id IN (SELECT email_id FROM fulltext_dropped)")
+    conn.execute("DROP TABLE fulltext_dropped")
+    return dropped
+
+
+def refresh_fulltext_index(conn: duckdb.DuckDBPyConnection, rebuild: bool = False,
+                           batch_size: int = 50_000) -> int:
+    """Index the emails that are not indexed yet and drop the deleted ones
+
+    An email changed in place keeps its id (ids come from the Message-ID when there is
+    one): the ingestion drops its documents when it removes the old rows (see
+    drop_fulltext_documents), so it is indexed again here. Each batch of postings is
+    written sorted by term, so a term lookup only reads the row groups whose min/max
+    cover it.
+
+    Args:
+        conn: Connection to the project database
+        rebuild: Drop the index and rebuild it from scratch
+        batch_size: Emails tokenized per pass, bounds the memory of the build
+
+    Returns:
+        Number of emails indexed by this call
+    """
+    if rebuild:
+        for name in ('fulltext_documents', 'fulltext_postings', 'fulltext_terms'):
+            conn.execute(f"DROP TABLE IF EXISTS {name}")
+    for statement in FULLTEXT_SCHEMA:
+        conn.execute(statement)
+
+    drop_fulltext_documents(conn, "SELECT email_id FROM fulltext_documents "
+                                  "WHERE email_id NOT IN (SELECT id FROM receiver_emails)")
+
+    conn.execute("""
+        CREATE OR REPLACE TEMP TABLE fulltext_pending AS
+        SELECT id AS email_id, row_number() OVER (ORDER BY id) AS rn
+        FROM receiver_emails
+        WHERE id NOT IN (SELECT email_id FROM fulltext_documents)
+    """)
+    pending = conn.execute("SELECT COUNT(*) FROM fulltext_pending").fetchone()[0]
+
+    for start in range(0, pending, batch_size):
+        conn.execute(f"""
+            CREATE OR REPLACE TEMP TABLE fulltext_batch AS
+            SELECT email_id FROM fulltext_pending WHERE rn > {start} AND rn <= {start + batch_size}
+        """)
+        conn.execute(TOKENIZE_PENDING_QUERY)
+        conn.execute("""
+            INSERT INTO fulltext_postings
+            SELECT term, email_id, field, COUNT(*), list(position ORDER BY position)
+            FROM fulltext_tokens
+            GROUP BY term, email_id, field
+            ORDER BY term, email_id
+        """)
+        conn.execute("""
+            INSERT INTO fulltext_documents
+            SELECT b.email_id, COALESCE(t.doc_length, 0)
+            FROM fulltext_batch b
+            LEFT JOIN (SELECT email_id, COUNT(*) AS doc_length FROM fulltext_tokens GROUP BY email_id) t
+                ON t.email_id = b.email_id
+        """)
+
+    if pending or rebuild or conn.execute("SELECT COUNT(*) FROM fulltext_terms").fetchone()[0] == 0:
+        conn.execute("""
+            CREATE OR REPLACE TABLE fulltext_terms AS
+            SELECT term, COUNT(DISTINCT email_id)::INTEGER AS df
+            FROM fulltext_postings
+            GROUP BY term
+        """)
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_fulltext_terms ON fulltext_terms(term)")
+
+    for name in ('fulltext_tokens', 'fulltext_batch', 'fulltext_pending'):
+        conn.execute(f"DROP TABLE IF EXISTS {name}")
+    return pending
+
+
+def fulltext_hits_query(query: str, fields: Optional[Iterable[str]] = None,
+                        limit: Optional[int] = None) -> Tuple[Optional[str], list]:
+    """SQL returning (email_id, score) for a query, best BM25 score first
+
+    Args:
+        query: Terms and "quoted phrases"
+        fields: Restrict the match to some of FULLTEXT_FIELDS (default: all)
+        limit: Maximum number of hits
+
+    Returns:
+        (sql, params), or (None, []) when the query has no searchable token
+    """
+    terms, phrases = parse_fulltext_query(query)
+    all_terms = list(dict.fromkeys(terms + [token for phrase in phrases for token in phrase]))
+    if not all_terms:
+        return None, []
+
+    field_clause = ''
+    if fields is not None:
+        field_ids = sorted({FULLTEXT_FIELDS[name] for name in fields})
+        field_clause = f"AND field IN ({', '.join(str(field_id) for field_id in field_ids)})"
+
+    term_list = ', '.join(['?'] * len(all_terms))
+    params: list = []
+    ctes = [
+        f"""matches AS (
+            SELECT email_id, term, SUM(tf) AS tf
+            FROM fulltext_postings
+            WHERE term IN ({term_list}) {field_clause}
+            GROUP BY email_id, term
+        )""",
+        f"""candidates AS (
+            SELECT email_id FROM matches GROUP BY email_id HAVING COUNT(*) = {len(all_terms)}
+        )""",
+        f"""idf AS (
+            SELECT term, ln(1 + ((SELECT COUNT(*) FROM fulltext_documents) - df + 0.5) / (df + 0.5)) AS idf
+            FROM fulltext_terms
+            WHERE term IN ({term_list})
+        )""",
+    ]
+    params.extend(all_terms)
+    params.extend(all_terms)
+
+    phrase_joins = []
+    for phrase_no, phrase in enumerate(phrases):
+        # One row per occurrence of each phrase token, restricted to the candidates
+        parts = []
+        for token_no, token in enumerate(phrase):
+            parts.append(f"""(
+                SELECT email_id, field, unnest(positions) AS pos
+                FROM fulltext_postings
+                WHERE term = ? {field_clause} AND email_id IN (SELECT email_id FROM candidates)
+            ) p{token_no}""")
+            params.append(token)
+        joins = parts[0] + ''.join(
+            f"\n JOIN {part} ON p{token_no}.email_id = p0.email_id AND p{token_no}.field = p0.field"
+            f" AND p{token_no}.pos = p0.pos + {token_no}"
+            for token_no, part in enumerate(parts) if token_no > 0
+        )
+        ctes.append(f"phrase_{phrase_no} AS (SELECT DISTINCT p0.email_id FROM {joins})")
+        phrase_joins.append(f"JOIN phrase_{phrase_no} USING (email_id)")
+
+    sql = f"""
+        WITH {', '.join(ctes)}
+        SELECT m.email_id,
+               SUM(
+                   idf.idf * m.tf * {BM25_K1 + 1}
+                   / (m.tf + {BM25_K1} * (1 - {BM25_B} + {BM25_B} * d.doc_length / (
+                       SELECT GREATEST(AVG(doc_length), 1) FROM fulltext_documents)))
+               ) AS score
+        FROM matches m
+        JOIN candidates USING (email_id)
+        {' '.join(phrase_joins)}
+        JOIN idf ON idf.term = m.term
+        JOIN fulltext_documents d ON d.email_id = m.email_id
+        GROUP BY m.email_id
+        ORDER BY score DESC, m.email_id
+    """
+    if limit is not None:
+        sql += f" LIMIT {int(limit)}"
+    return sql, params
+
+
+def search_fulltext(conn: duckdb.DuckDBPyConnection, query: str, fields: Optional[Sequence[str]] = None,
+                    limit: Optional[int] = None) -> List[Tuple[str, float]]:
+    """Run a full-text query, best BM25 score first
+
+    Returns:
+        List of (email_id, score)
+    """
+    sql, params = fulltext_hits_query(query, fields=fields, limit=limit)
+    if sql is None:
+        return []
+    return conn.execute(sql, params).fetchall()
@@ -2,6 +2,7 @@
 """Utilities for pre-generating mailbox graphs."""
 from __future__ import annotations
 
+import codecs
 import json
 import os
 import shutil
@@ -14,7 +15,7 @@ from typing import Dict, Iterable, List, Optional
 from bs4 import BeautifulSoup
 from email.policy import default as default_policy
 
-from src.features.decodeml import decode_unicode_escape, getBody
+from src.data.message_store import has_parsed_messages, iter_parsed_messages, project_database_path
 
 
 LOGGER = logging.getLogger(__name__)
@@ -79,7 +80,43 @@ def _list_processed_folders(project_path: Path, mailbox_names: Iterable[str]) ->
     return folders
 
 
+def _graph_entries(sender_raw: str, receivers: List[str], subject_raw: str, date: str,
+                   body_source: Optional[str]) -> List[Dict[str, str]]:
+    """One graph entry per receiver of a message"""
+    sender = email.utils.parseaddr(sender_raw or "")[1]
+    sender = _decode_email_text(sender)
+    receiver_list = email.utils.getaddresses(receivers)
+    subject = _decode_email_text(subject_raw or "")
+
+    try:
+        soup = BeautifulSoup(body_source, "html.parser")
+        body_text = soup.get_text()
+        # decodeml.decode_unicode_escape
+        body_text = codecs.decode(body_text, "unicode_escape")
+        body_text = _decode_email_text(body_text)
+    except Exception:
+        body_text = ""
+
+    entries = []
+    for _, addr in receiver_list:
+        normalized_addr = _decode_email_text(addr)
+        if not normalized_addr:
+            continue
+        entries.append(
+            {
+                "sender": sender or "unknown",
+                "receiver": normalized_addr,
+                "subject": subject,
+                "date": date or "",
+                "body": body_text,
+            }
+        )
+    return entries
+
+
 def _extract_emails_from_folder(folder: Path) -> List[Dict[str, str]]:
+    from src.features.decodeml import getBody
+
     emails: List[Dict[str, str]] = []
     for entry in folder.iterdir():
         if entry.is_file() and entry.suffix.lower() == ".eml":
@@ -87,43 +124,56 @@ def _extract_emails_from_folder(folder: Path) -> List[Dict[str, str]]:
                 with entry.open("r", encoding="utf-8", errors="ignore") as handle:
                     msg = email.message_from_file(handle, policy=default_policy)
 
-                sender_raw = msg.get("From", "")
-                sender = email.utils.parseaddr(sender_raw)[1]
-                sender = _decode_email_text(sender)
-
-                receivers = msg.get_all("To", [])
-                receiver_list = email.utils.getaddresses(receivers)
-
-                subject = _decode_email_text(msg.get("Subject", ""))
-                date = msg.get("Date", "")
-
                 try:
                     html_body = getBody(msg)
-                    soup = BeautifulSoup(html_body, "html.parser")
-                    body_text = soup.get_text()
-                    body_text = decode_unicode_escape(body_text)
-                    body_text = _decode_email_text(body_text)
                 except Exception:
-                    body_text = ""
-
-                for _, addr in receiver_list:
-                    normalized_addr = _decode_email_text(addr)
-                    if not normalized_addr:
-                        continue
-                    emails.append(
-                        {
-                            "sender": sender or "unknown",
-                            "receiver": normalized_addr,
-                            "subject": subject,
-                            "date": date,
-                            "body": body_text,
-                        }
-                    )
+                    html_body = None
+
+                emails.extend(
+                    _graph_entries(msg.get("From", ""), msg.get_all("To", []), msg.get("Subject", ""),
+                                   msg.get("Date", ""), html_body)
+                )
             except Exception as exc:
                 LOGGER.warning("Failed to parse %s: %s", entry, exc)
     return emails
 
 
+def _emails_by_folder_from_store(db_path: Path, project_path: Path,
+                                 mailbox_names: Iterable[str]) -> List[Dict[str, object]]:
+    """Same folders and graph entries as the .eml walk, read from the message store"""
+    folders: List[Dict[str, object]] = []
+    columns = ("source_dir", "from_header", "to_header", "subject", "date_header", "text_body", "html_body")
+
+    for mailbox in mailbox_names:
+        processed_prefix = f"{mailbox}/processed"
+        by_dir: Dict[str, Dict[str, object]] = {}
+        for row in iter_parsed_messages(db_path, columns=columns, source_dir_prefix=processed_prefix):
+            source_dir = row["source_dir"]
+            if source_dir != processed_prefix and not source_dir.startswith(processed_prefix + "/"):
+                continue
+            folder = by_dir.get(source_dir)
+            if folder is None:
+                relative_display = source_dir[len(processed_prefix):].lstrip("/")
+                folder = by_dir[source_dir] = {
+                    "mailbox": mailbox,
+                    "path": project_path / source_dir,
+                    "relative_path": Path(relative_display or "."),
+                    "relative_display": relative_display,
+                    "eml_count": 0,
+                    "emails": [],
+                }
+            folder["eml_count"] += 1
+            # The first body part, as getBody picks it: the text part when there is one
+            folder["emails"].extend(
+                _graph_entries(row["from_header"], [row["to_header"]] if row["to_header"] else [],
+                               row["subject"], row["date_header"], row["text_body"] or row["html_body"])
+            )
+        folders.extend(by_dir.values())
+
+    folders.sort(key=lambda item: (item["mailbox"], str(item["relative_path"])))
+    return folders
+
+
 def _build_graph(emails: List[Dict[str, str]]) -> Dict[str, object]:
     from collections import defaultdict
 
@@ -164,9 +214,20 @@ def _build_graph(emails: List[Dict[str, str]]) -> Dict[str, object]:
     return {"nodes": nodes, "edges": list(edges_map.values())}
 
 
-def generate_graphs_for_project(project_name: str, project_path: Path, mailbox_names: Iterable[str]) -> Dict[str, object]:
-    """Generate mailbox graphs for all folders under processed/ for each mailbox."""
-    processed_folders = _list_processed_folders(project_path, mailbox_names)
+def generate_graphs_for_project(project_name: str, project_path: Path, mailbox_names: Iterable[str],
+                                db_path: Optional[Path] = None) -> Dict[str, object]:
+    """Generate mailbox graphs for all folders under processed/ for each mailbox.
+
+    The messages are read from the message store of the project database when it is
+    complete, otherwise by parsing the .eml files of each folder.
+    """
+    project_path = Path(project_path)
+    mailbox_names = list(mailbox_names)
+    db_path = Path(db_path) if db_path else project_database_path(project_path)
+    if has_parsed_messages(db_path):
+        processed_folders = _emails_by_folder_from_store(db_path, project_path, mailbox_names)
+    else:
+        processed_folders = _list_processed_folders(project_path, mailbox_names)
     graphs_root = project_path / "Graphs"
 
     if graphs_root.exists():
@@ -178,7 +239,7 @@ def generate_graphs_for_project(project_name: str, project_path: Path, mailbox_n
     total_emails = 0
 
     for idx, folder in enumerate(processed_folders, start=1):
-        emails = _extract_emails_from_folder(folder["path"])
+        emails = folder.pop("emails") if "emails" in folder else _extract_emails_from_folder(folder["path"])
         if not emails:
             continue
 
@@ -0,0 +1,145 @@
+"""Direct ingestion of MBOX files: messages read in place from byte offsets.
+
+The two-step path writes every message of an MBOX file to its own .eml file
+(mbox_to_eml) and then reads them all back. Here the MBOX file is scanned once for the
+byte range of each message, and a message is read by seeking into the file, so no .eml
+file is ever written.
+
+A message is returned as the exact bytes mbox_to_eml would have written, and carries the
+path its .eml file would have had in the processed tree, so the mailbox and folder it is
+ingested into, and therefore every row built from it, are the same on both paths.
+"""
+
+import mailbox
+import os
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Tuple, Union
+
+from src.data.mbox_to_eml import mbox_folder_name
+
+# Separator between the MBOX path and the message number in manifest keys
+MBOX_KEY_SEPARATOR = "::"
+
+# Line separator of the MBOX files, as the mailbox module writes and reads them
+_LINESEP = os.linesep.encode('ascii')
+
+
+class MboxMessage(NamedTuple):
+    """A message of an MBOX file, located by its byte range"""
+    mbox_path: Path
+    start: int
+    stop: int
+    number: int
+    virtual_path: Path
+
+
+def find_mbox_files(directory: Union[str, Path]) -> List[Path]:
+    """Return every .mbox file below a directory (compressed .mbox.gz files are not read in place)"""
+    mbox_files = []
+    for root, _, files in os.walk(directory):
+        for file in files:
+            if file.endswith('.mbox'):
+                mbox_files.append(Path(root) / file)
+    return sorted(mbox_files)
+
+
+def mbox_message_offsets(mbox_path: Union[str, Path]) -> List[Tuple[int, int]]:
+    """
+    Byte range of every message of an MBOX file.
+
+    Same rules as mailbox.mbox: a message starts at a "From " line and stops before the
+    blank line that precedes the next one, so the ranges match the messages mbox_to_eml
+    iterates over.
+
+    Args:
+        mbox_path: Path to the MBOX file
+
+    Returns:
+        List of (start, stop) offsets, in file order
+    """
+    starts, stops = [], []
+    last_was_empty = False
+    with open(mbox_path, 'rb') as f:
+        while True:
+            line_pos = f.tell()
+            line = f.readline()
+            if line.startswith(b'From '):
+                if len(stops) < len(starts):
+                    stops.append(line_pos - len(_LINESEP) if last_was_empty else line_pos)
+                starts.append(line_pos)
+                last_was_empty = False
+            elif not line:
+                stops.append(line_pos - len(_LINESEP) if last_was_empty else line_pos)
+                break
+            else:
+                last_was_empty = line == _LINESEP
+    return list(zip(starts, stops))
+
+
+def virtual_eml_path(mbox_path: Union[str, Path], directory: Union[str, Path], number: int) -> Path:
+    """
+    Path, relative to directory, of the .eml file the two-step conversion writes for a message.
+
+    An MBOX file under <mailbox>/raw/ is converted into
+    <mailbox>/processed/<mailbox lowercased>/<folder>/message_<n>.eml (see convert_mbox_files
+    in the project page); any other MBOX file into <its folder>/<its stem>/message_<n>.eml,
+    as convert_folder_mbox_to_eml does.
+
+    Args:
+        mbox_path: Path to the MBOX file
+        directory: Root directory being ingested
+        number: Number of the message in the file, from 1
+
+    Returns:
+        The relative path
+    """
+    parts = list(Path(mbox_path).relative_to(directory).parts)
+    filename = f"message_{number}.eml"
+    if "raw" in parts[:-1] and parts.index("raw") > 0:
+        raw_idx = parts.index("raw")
+        mailbox_name = parts[raw_idx - 1]
+        return Path(*parts[:raw_idx], "processed", mailbox_name.lower(), mbox_folder_name(mbox_path), filename)
+    return Path(*parts[:-1], Path(parts[-1]).stem, filename)
+
+
+def iter_mbox_messages(mbox_path: Union[str, Path], directory: Union[str, Path]) -> Iterator[MboxMessage]:
+    """Locate the messages of an MBOX file, without reading their content"""
+    mbox_path = Path(mbox_path)
+    for idx, (start, stop) in enumerate(mbox_message_offsets(mbox_path)):
+        yield MboxMessage(mbox_path, start, stop, idx + 1, virtual_eml_path(mbox_path, directory, idx + 1))
+
+
+def read_mbox_message(message: MboxMessage) -> bytes:
+    """
+    Read a message of an MBOX file.
+
+    Mirrors mailbox.mbox.get_message followed by as_bytes(), so the result is byte for byte
+    the .eml file mbox_to_eml writes for it.
+
+    Args:
+        message: Message located by iter_mbox_messages
+
+    Returns:
+        The message bytes
+    """
+    with open(message.mbox_path, 'rb') as f:
+        f.seek(message.start)
+        from_line = f.readline().replace(_LINESEP, b'')
+        data = f.read(message.stop - f.tell())
+    msg = mailbox.mboxMessage(data.replace(_LINESEP, b'\n'))
+    msg.set_from(from_line[5:].decode('ascii'))
+    return msg.as_bytes()
+
+
+def mbox_manifest_prefix(mbox_path: Union[str, Path], directory: Union[str, Path]) -> str:
+    """Start of the manifest keys of the messages of an MBOX file"""
+    return Path(mbox_path).relative_to(directory).as_posix() + MBOX_KEY_SEPARATOR
+
+
+def mbox_manifest_key(message: MboxMessage, directory: Union[str, Path]) -> str:
+    """Manifest key of an MBOX message: the MBOX path relative to directory and the message number"""
+    return f"{mbox_manifest_prefix(message.mbox_path, directory)}{message.number}"
+
+
+def is_mbox_manifest_key(key: str) -> bool:
+    return MBOX_KEY_SEPARATOR in key
@@ -6,6 +6,32 @@ from email.parser import BytesParser
 from bs4 import BeautifulSoup
 import shutil
 
+# Folder created for the messages of an MBOX file, by its lowercased stem ("inbox.mbox" ->
+# "Boîte de réception"), the same names readpst gives the folders of a PST file
+MBOX_FOLDER_NAMES = {
+    'inbox': 'Boîte de réception',
+    'sent': 'Éléments envoyés',
+    'archive': 'Archive',
+    'drafts': 'Brouillons',
+    'trash': 'Éléments supprimés',
+    'spam': 'Courrier indésirable'
+}
+
+
+def mbox_folder_name(mbox_file):
+    """
+    Name of the folder holding the messages of an MBOX file in the processed tree.
+
+    Args:
+        mbox_file (str): Path to the MBOX file
+
+    Returns:
+        str: The mapped folder name for known folder types, else the file name without extension
+    """
+    mbox_filename = os.path.splitext(os.path.basename(mbox_file))[0]
+    return MBOX_FOLDER_NAMES.get(mbox_filename.lower(), mbox_filename)
+
+
 def mbox_to_eml(mbox_file, output_dir):
     """
     Convert a single MBOX file to individual EML files.
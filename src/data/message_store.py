@@ -0,0 +1,178 @@
+"""Canonical parsed-message store, filled once during ingestion.
+
+Every downstream stage (semantic search preparation, topic extraction, graph generation)
+used to walk the .eml tree and parse every file again, each with its own parser. The
+ingestion already parses every message: it now also writes one row per source file into
+the parsed_messages table of the project database, holding the headers, the text and HTML
+bodies and the attachment names. The stages read that table instead of the files, and
+only fall back to parsing the files for a database built before the table existed.
+"""
+
+import email.utils
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import duckdb
+
+PARSED_MESSAGES_TABLE = "parsed_messages"
+
+PARSED_MESSAGES_COLUMNS = (
+    "source_path",
+    "email_id",
+    "mailbox_name",
+    "folder",
+    "source_dir",
+    "file_name",
+    "message_id",
+    "date_header",
+    "from_header",
+    "to_header",
+    "cc_header",
+    "subject",
+    "text_body",
+    "html_body",
+    "attachment_names",
+)
+
+
+def _header(message, name: str) -> Optional[str]:
+    """Decoded value of a header, every occurrence joined with a comma"""
+    values = message.get_all(name)
+    if not values:
+        return None
+    return ", ".join(str(value) for value in values)
+
+
+def extract_canonical_fields(message, rel_path: Union[str, Path]) -> Dict[str, Any]:
+    """
+    Fields of a parsed message kept in the store.
+
+    The bodies are the text/plain and text/html parts that are not attachments, each kind
+    concatenated in message order.
+
+    Args:
+        message: Message parsed with the email package (policy.default)
+        rel_path: Path of its .eml file relative to the ingested directory (virtual path for
+            a message read from an MBOX file)
+
+    Returns:
+        Dictionary of the store columns, except source_path and the ingestion ids
+    """
+    text_parts: List[str] = []
+    html_parts: List[str] = []
+    attachment_names: List[str] = []
+    for part in message.walk():
+        if part.is_multipart():
+            continue
+        if part.get_content_disposition() == "attachment":
+            if part.get_filename():
+                attachment_names.append(part.get_filename())
+            continue
+        content_type = part.get_content_type()
+        if content_type not in ("text/plain", "text/html"):
+            continue
+        try:
+            content = part.get_content()
+        except Exception:
+            payload = part.get_payload(decode=True) or b""
+            content = payload.decode("utf-8", errors="replace")
+        (text_parts if content_type == "text/plain" else html_parts).append(content)
+
+    rel_path = Path(rel_path)
+    return {
+        "source_dir": rel_path.parent.as_posix(),
+        "file_name": rel_path.name,
+        "message_id": _header(message, "Message-ID"),
+        "date_header": _header(message, "Date"),
+        "from_header": _header(message, "From"),
+        "to_header": _header(message, "To"),
+        "cc_header": _header(message, "Cc"),
+        "subject": _header(message, "Subject"),
+        "text_body": "".join(text_parts),
+        "html_body": "".join(html_parts),
+        "attachment_names": json.dumps(attachment_names, ensure_ascii=False) if attachment_names else None,
+    }
+
+
+def project_database_path(project_path: Union[str, Path]) -> Path:
+    """DuckDB database of a project folder (data/Projects/<project>/<project>.duckdb)"""
+    project_path = Path(project_path)
+    return project_path / f"{project_path.name}.duckdb"
+
+
+def has_parsed_messages(db_path: Union[str, Path, None]) -> bool:
+    """
+    Whether a database holds a complete message store.
+
+    The store is complete when it has one row per ingested source file, which is not the
+    case for a database built before the store existed (its next incremental ingestion
+    fills it).
+    """
+    if db_path is None or not Path(db_path).exists():
+        return False
+    try:
+        conn = duckdb.connect(str(db_path), read_only=True)
+    except Exception:
+        return False
+    try:
+        stored, ingested = conn.execute(f"""
+            SELECT (SELECT COUNT(*) FROM {PARSED_MESSAGES_TABLE}), (SELECT COUNT(*) FROM ingest_manifest)
+        """).fetchone()
+        return stored > 0 and stored >= ingested
+    except duckdb.Error:
+        return False
+    finally:
+        conn.close()
+
+
+def iter_parsed_messages(db_path: Union[str, Path],
+                         columns: Optional[Sequence[str]] = None,
+                         source_dir_prefix: Optional[str] = None,
+                         limit: Optional[int] = None,
+                         batch_size: int = 5000) -> Iterator[Dict[str, Any]]:
+    """
+    Read the message store, in source path order, without loading it all in memory.
+
+    Args:
+        db_path: Project database
+        columns: Columns to read (default: every column)
+        source_dir_prefix: Only the messages whose source folder starts with this prefix
+        limit: Maximum number of messages
+        batch_size: Rows fetched at a time
+
+    Yields:
+        One dictionary per message
+    """
+    columns = list(columns or PARSED_MESSAGES_COLUMNS)
+    unknown = set(columns) - set(PARSED_MESSAGES_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown message store columns: {', '.join(sorted(unknown))}")
+
+    query = f"SELECT {', '.join(columns)} FROM {PARSED_MESSAGES_TABLE}"
+    params: List[Any] = []
+    if source_dir_prefix:
+        query += " WHERE starts_with(source_dir, ?)"
+        params.append(source_dir_prefix)
+    query += " ORDER BY source_path"
+    if limit:
+        query += f" LIMIT {int(limit)}"
+
+    conn = duckdb.connect(str(db_path), read_only=True)
+    try:
+        cursor = conn.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield dict(zip(columns, row))
+    finally:
+        conn.close()
+
+
+def parse_address_list(header: Optional[str]) -> List[Tuple[str, str]]:
+    """(name, address) pairs of an address header read from the store"""
+    if not header:
+        return []
+    return email.utils.getaddresses([header])
@@ -0,0 +1,316 @@
+"""Background, resumable runs of the project data preparation pipeline.
+
+A job is an ordered list of stages run in a daemon thread of the app server. Its record,
+data/Projects/<project>/pipeline_job.json, holds the status, timings, error and
+checkpoint values of every stage and is rewritten atomically after each transition, so
+the UI only has to poll it. Everything the stages print goes to pipeline_job.log next
+to it (and still to the server console).
+
+Running a job again skips the stages already completed and hands their checkpoints to
+the next ones: a failure, a closed tab or a server restart resumes from the last
+completed stage instead of starting over.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+JOB_RECORD_FILENAME = "pipeline_job.json"
+JOB_LOG_FILENAME = "pipeline_job.log"
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+# Recorded as running, but no thread of this server runs it (restart, crash)
+JOB_INTERRUPTED = "interrupted"
+
+STAGE_PENDING = "pending"
+STAGE_RUNNING = "running"
+STAGE_DONE = "done"
+STAGE_FAILED = "failed"
+
+_running_jobs: Dict[str, threading.Thread] = {}
+_jobs_lock = threading.Lock()
+_record_lock = threading.Lock()
+
+
+@dataclass
+class PipelineStage:
+    """One step of a job
+
+    func receives the job context (job params plus the checkpoints of the completed
+    stages) and may return a dict of checkpoint values; it fails by raising.
+    """
+    key: str
+    label: str
+    func: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]
+
+
+def job_record_path(project_path) -> Path:
+    return Path(project_path) / JOB_RECORD_FILENAME
+
+
+def job_log_path(project_path) -> Path:
+    return Path(project_path) / JOB_LOG_FILENAME
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+class _JobOutputRouter:
+    """sys.stdout/sys.stderr replacement sending the writes of job threads to their log"""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._logs = {}
+
+    def attach(self, log_file):
+        self._logs[threading.get_ident()] = log_file
+
+    def detach(self):
+        self._logs.pop(threading.get_ident(), None)
+
+    def current_log(self):
+        return self._logs.get(threading.get_ident())
+
+    def write(self, data):
+        log_file = self._logs.get(threading.get_ident())
+        if log_file is not None:
+            try:
+                log_file.write(data)
+                log_file.flush()
+            except ValueError:
+                pass
+        return self._stream.write(data)
+
+    def flush(self):
+        self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def _install_output_routers() -> Tuple[_JobOutputRouter, _JobOutputRouter]:
+    with _jobs_lock:
+        if not isinstance(sys.stdout, _JobOutputRouter):
+            sys.stdout = _JobOutputRouter(sys.stdout)
+        if not isinstance(sys.stderr, _JobOutputRouter):
+            sys.stderr = _JobOutputRouter(sys.stderr)
+    return sys.stdout, sys.stderr
+
+
+def in_job_thread() -> bool:
+    """Whether the calling thread runs a pipeline job (its output goes to the job log)"""
+    return isinstance(sys.stdout, _JobOutputRouter) and sys.stdout.current_log() is not None
+
+
+def _write_record(project_path, record: Dict[str, Any]) -> None:
+    record["updated_at"] = _now()
+    path = job_record_path(project_path)
+    tmp_path = path.with_suffix(".json.tmp")
+    with _record_lock:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+def load_job(project_path) -> Optional[Dict[str, Any]]:
+    """Read the job record of a project
+
+    A job recorded as running that no thread of this process runs any more is reported
+    as interrupted.
+
+    Returns:
+        The record, or None if the project never had a job
+    """
+    path = job_record_path(project_path)
+    if not path.exists():
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            record = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Warning: unreadable pipeline job record {path}: {e}")
+        return None
+    if record.get("status") == JOB_RUNNING and not job_is_running(record.get("project")):
+        record["status"] = JOB_INTERRUPTED
+    return record
+
+
+def job_is_running(project_name: Optional[str]) -> bool:
+    with _jobs_lock:
+        thread = _running_jobs.get(project_name)
+        return thread is not None and thread.is_alive()
+
+
+def job_progress(record: Dict[str, Any]) -> Tuple[int, int]:
+    """(completed stages, total stages) of a job record"""
+    stages = record.get("stages", [])
+    return sum(1 for stage in stages if stage["status"] == STAGE_DONE), len(stages)
+
+
+def read_job_log(project_path, max_lines: int = 200) -> str:
+    """Last lines of the job log"""
+    path = job_log_path(project_path)
+    if not path.exists():
+        return ""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        lines = f.readlines()
+    return "".join(lines[-max_lines:])
+
+
+def _new_record(project_name: str, stages: List[PipelineStage], params: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "project": project_name,
+        "status": JOB_PENDING,
+        "created_at": _now(),
+        "started_at": None,
+        "finished_at": None,
+        "current_stage": None,
+        "error": None,
+        "params": params,
+        "runs": 0,
+        "stages": [
+            {
+                "key": stage.key,
+                "label": stage.label,
+                "status": STAGE_PENDING,
+                "started_at": None,
+                "finished_at": None,
+                "duration_seconds": None,
+                "attempts": 0,
+                "error": None,
+                "checkpoint": {},
+            }
+            for stage in stages
+        ],
+    }
+
+
+def _merge_stage_list(record: Dict[str, Any], stages: List[PipelineStage]) -> None:
+    """Align a stored record with the current stage list (stages added or removed since)"""
+    stored = {stage["key"]: stage for stage in record.get("stages", [])}
+    fresh = _new_record(record.get("project"), stages, {})["stages"]
+    record["stages"] = [stored.get(stage["key"], stage) for stage in fresh]
+    for stage, definition in zip(record["stages"], stages):
+        stage["label"] = definition.label
+
+
+def run_pipeline_job(project_name: str, project_path, stages: List[PipelineStage],
+                     params: Optional[Dict[str, Any]] = None, restart: bool = False) -> bool:
+    """Run (or resume) a job in the calling thread
+
+    Args:
+        project_name: Project the job belongs to
+        project_path: Project directory, where the record and the log are kept
+        stages: Ordered stages of the pipeline
+        params: Job parameters, stored in the record and passed to every stage
+        restart: Forget the completed stages and run everything again
+
+    Returns:
+        True if every stage completed
+    """
+    record = None if restart else load_job(project_path)
+    if record is None:
+        record = _new_record(project_name, stages, params or {})
+    else:
+        _merge_stage_list(record, stages)
+        if params is not None:
+            record["params"] = params
+
+    record.update(status=JOB_RUNNING, started_at=_now(), finished_at=None, error=None)
+    record["runs"] = record.get("runs", 0) + 1
+    _write_record(project_path, record)
+
+    stdout_router, stderr_router = _install_output_routers()
+    log_file = open(job_log_path(project_path), "a" if not restart else "w", encoding="utf-8")
+    stdout_router.attach(log_file)
+    stderr_router.attach(log_file)
+
+    context: Dict[str, Any] = dict(record["params"])
+    try:
+        print(f"=== {_now()} pipeline run #{record['runs']} for project '{project_name}' ===")
+        for stage, stage_record in zip(stages, record["stages"]):
+            if stage_record["status"] == STAGE_DONE:
+                print(f"[{stage.key}] already completed, skipped")
+                context.update(stage_record.get("checkpoint") or {})
+                continue
+
+            stage_record.update(status=STAGE_RUNNING, started_at=_now(), finished_at=None, error=None)
+            stage_record["attempts"] = stage_record.get("attempts", 0) + 1
+            record["current_stage"] = stage.key
+            _write_record(project_path, record)
+            print(f"[{stage.key}] {stage.label}...")
+
+            start = time.perf_counter()
+            try:
+                checkpoint = stage.func(context) or {}
+            except Exception as e:
+                traceback.print_exc()
+                stage_record.update(
+                    status=STAGE_FAILED,
+                    finished_at=_now(),
+                    duration_seconds=round(time.perf_counter() - start, 3),
+                    error=str(e) or e.__class__.__name__,
+                )
+                record.update(status=JOB_FAILED, finished_at=_now(), error=f"{stage.label} : {stage_record['error']}")
+                _write_record(project_path, record)
+                print(f"[{stage.key}] failed: {stage_record['error']}")
+                return False
+
+            stage_record.update(
+                status=STAGE_DONE,
+                finished_at=_now(),
+                duration_seconds=round(time.perf_counter() - start, 3),
+                checkpoint=checkpoint,
+            )
+            context.update(checkpoint)
+            _write_record(project_path, record)
+            print(f"[{stage.key}] done in {stage_record['duration_seconds']:.1f}s")
+
+        record.update(status=JOB_COMPLETED, finished_at=_now(), current_stage=None)
+        _write_record(project_path, record)
+        print(f"=== {_now()} pipeline completed ===")
+        return True
+    finally:
+        stdout_router.detach()
+        stderr_router.detach()
+        log_file.close()
+
+
+def start_pipeline_job(project_name: str, project_path, stages: List[PipelineStage],
+                       params: Optional[Dict[str, Any]] = None, restart: bool = False) -> Tuple[bool, str]:
+    """Run (or resume) a job in a background thread
+
+    Returns:
+        (started, message): started is False if a job already runs for this project
+    """
+    with _jobs_lock:
+        thread = _running_jobs.get(project_name)
+        if thread is not None and thread.is_alive():
+            return False, f"Un pipeline est déjà en cours pour le projet '{project_name}'."
+
+        def _run():
+            try:
+                run_pipeline_job(project_name, project_path, stages, params=params, restart=restart)
+            except Exception as e:
+                # Only reached if the record itself cannot be written
+                print(f"Pipeline job for '{project_name}' aborted: {e}")
+            finally:
+                with _jobs_lock:
+                    if _running_jobs.get(project_name) is threading.current_thread():
+                        del _running_jobs[project_name]
+
+        thread = threading.Thread(target=_run, name=f"pipeline-{project_name}", daemon=True)
+        _running_jobs[project_name] = thread
+        thread.start()
+    return True, f"Pipeline lancé en arrière-plan pour le projet '{project_name}'."
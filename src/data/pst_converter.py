@@ -1,4 +1,19 @@
+import json
+import os
+import shutil
 import subprocess
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+
+# Conversion state kept in the output folder, one entry per PST file
+PST_STATE_FILENAME = "pst_conversions.json"
+# Each readpst process writes here first, its output is then moved into the output folder
+PST_STAGING_DIRNAME = ".pst_staging"
+
+# Total size of the PST files converted at the same time (a larger file still runs, alone)
+DEFAULT_DISK_BUDGET_BYTES = 8 * 1024 * 1024 * 1024
+
 
 def convert_pst_to_mbox(pst_file_path: str, output_path: str):
     """
@@ -25,6 +40,224 @@ def convert_pst_to_mbox(pst_file_path: str, output_path: str):
         print("readpst not found. Make sure it is installed and in your PATH.")
 
 
+def load_pst_state(output_dir: str) -> Dict[str, Any]:
+    """Conversion state of the PST files converted into output_dir (empty if there is none)"""
+    state_file = os.path.join(output_dir, PST_STATE_FILENAME)
+    try:
+        with open(state_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_pst_state(output_dir: str, state: Dict[str, Any]) -> None:
+    """Write the conversion state next to a temporary file then rename it, so it is never truncated"""
+    state_file = os.path.join(output_dir, PST_STATE_FILENAME)
+    tmp_file = f"{state_file}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, state_file)
+
+
+def _pst_signature(pst_file: str) -> Dict[str, int]:
+    stat = os.stat(pst_file)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def is_conversion_complete(entry: Optional[Dict[str, Any]], pst_file: str, output_dir: str) -> bool:
+    """
+    Whether a previous run fully converted a PST file that has not changed since.
+
+    Args:
+        entry: State entry of the PST file (None if it was never converted)
+        pst_file: Path to the PST file
+        output_dir: Folder the PST file was converted into
+
+    Returns:
+        True if the conversion succeeded, the PST file has the same size and mtime, and
+        every file it produced is still there
+    """
+    if not entry or entry.get("status") != "converted":
+        return False
+    signature = _pst_signature(pst_file)
+    if entry.get("size") != signature["size"] or entry.get("mtime_ns") != signature["mtime_ns"]:
+        return False
+    return all(os.path.exists(os.path.join(output_dir, rel_path)) for rel_path in entry.get("outputs", []))
+
+
+def _run_readpst(pst_file: str, staging_dir: str, readpst_cmd: str) -> float:
+    """Convert a PST file into its own staging folder, returning the time readpst took"""
+    os.makedirs(staging_dir, exist_ok=True)
+    start = time.perf_counter()
+    # -j 0: one process per PST file, the scheduler provides the parallelism
+    subprocess.run([readpst_cmd, "-j", "0", "-e", "-o", staging_dir, pst_file],
+                   check=True, capture_output=True, text=True)
+    return time.perf_counter() - start
+
+
+def _merge_staging(staging_dir: str, output_dir: str) -> List[str]:
+    """
+    Move the output of a readpst run into the output folder.
+
+    readpst numbers the messages of each folder from 1, so two PST files holding the same
+    folders would overwrite each other's messages: a name already taken gets a -2, -3...
+    suffix instead.
+
+    Returns:
+        Paths of the moved files, relative to output_dir
+    """
+    outputs = []
+    for root, _, files in os.walk(staging_dir):
+        rel_root = os.path.relpath(root, staging_dir)
+        target_root = output_dir if rel_root == "." else os.path.join(output_dir, rel_root)
+        os.makedirs(target_root, exist_ok=True)
+        for file in sorted(files):
+            base, ext = os.path.splitext(file)
+            target_name = file
+            suffix = 2
+            while os.path.exists(os.path.join(target_root, target_name)):
+                target_name = f"{base}-{suffix}{ext}"
+                suffix += 1
+            os.replace(os.path.join(root, file), os.path.join(target_root, target_name))
+            outputs.append(os.path.relpath(os.path.join(target_root, target_name), output_dir))
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    return outputs
+
+
+def _remove_outputs(entry: Optional[Dict[str, Any]], output_dir: str) -> None:
+    """Delete the files of a previous conversion before converting the PST file again"""
+    for rel_path in (entry or {}).get("outputs", []):
+        try:
+            os.remove(os.path.join(output_dir, rel_path))
+        except FileNotFoundError:
+            pass
+
+
+def run_pst_conversions(pst_files: List[str],
+                        output_dir: str,
+                        workers: Optional[int] = None,
+                        disk_budget_bytes: Optional[int] = None,
+                        force: bool = False,
+                        readpst_cmd: str = "readpst",
+                        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    Convert PST files to EML with several readpst processes at a time.
+
+    At most `workers` readpst processes run concurrently (CPU budget), and the PST files
+    being converted never add up to more than `disk_budget_bytes` (disk budget), except
+    for a single file larger than the budget, which then runs alone. The largest files
+    start first so that a big PST does not end up running alone at the end.
+
+    Each readpst process writes into its own staging folder; its output is moved into
+    output_dir once it succeeds, so a failed or interrupted conversion leaves no partial
+    output behind. The result of every PST file is kept in output_dir/PST_STATE_FILENAME,
+    and a PST file already converted by a previous run, unchanged since and with all its
+    output still present, is skipped.
+
+    Args:
+        pst_files: PST files to convert
+        output_dir: Folder receiving the natural mailbox structure created by readpst
+        workers: Concurrent readpst processes (default: PST_CONVERT_WORKERS env var, else the CPU count)
+        disk_budget_bytes: Total size of the PST files converted at once (default:
+            PST_CONVERT_DISK_BUDGET_MB env var, else DEFAULT_DISK_BUDGET_BYTES)
+        force: Convert every file again, even those already converted
+        readpst_cmd: readpst executable
+        progress_callback: Called with the result of each PST file as it completes
+
+    Returns:
+        Dictionary with the 'converted', 'skipped' and 'failed' counts, the total 'emails'
+        produced, the wall clock 'duration' and the per file 'results' (pst, status,
+        duration, emails, files, error)
+    """
+    if workers is None:
+        workers = int(os.getenv("PST_CONVERT_WORKERS") or os.cpu_count() or 1)
+    if disk_budget_bytes is None:
+        budget_mb = os.getenv("PST_CONVERT_DISK_BUDGET_MB")
+        disk_budget_bytes = int(budget_mb) * 1024 * 1024 if budget_mb else DEFAULT_DISK_BUDGET_BYTES
+    workers = max(1, workers)
+
+    os.makedirs(output_dir, exist_ok=True)
+    staging_root = os.path.join(output_dir, PST_STAGING_DIRNAME)
+    # Leftovers of an interrupted run
+    shutil.rmtree(staging_root, ignore_errors=True)
+
+    state = load_pst_state(output_dir)
+    stats = {"converted": 0, "skipped": 0, "failed": 0, "emails": 0, "duration": 0.0, "results": []}
+    start = time.perf_counter()
+
+    def _record(result):
+        stats[result["status"]] += 1
+        stats["emails"] += result.get("emails", 0)
+        stats["results"].append(result)
+        if progress_callback:
+            progress_callback(result)
+
+    pending = []
+    for pst_file in pst_files:
+        key = os.path.abspath(pst_file)
+        if not force and is_conversion_complete(state.get(key), pst_file, output_dir):
+            entry = state[key]
+            _record({"pst": pst_file, "status": "skipped", "duration": 0.0,
+                     "emails": entry.get("emails", 0), "files": len(entry.get("outputs", [])), "error": None})
+        else:
+            pending.append((os.path.getsize(pst_file), pst_file))
+    # Largest first
+    pending.sort(key=lambda job: -job[0])
+
+    running = {}
+    in_flight_bytes = 0
+    started = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while pending or running:
+                # Start every job the budgets allow, the largest that fits first
+                while pending and len(running) < workers:
+                    job = next((job for job in pending if not running or in_flight_bytes + job[0] <= disk_budget_bytes), None)
+                    if job is None:
+                        break
+                    pending.remove(job)
+                    size, pst_file = job
+                    key = os.path.abspath(pst_file)
+                    _remove_outputs(state.pop(key, None), output_dir)
+                    staging_dir = os.path.join(staging_root, f"{started:05d}")
+                    started += 1
+                    future = executor.submit(_run_readpst, pst_file, staging_dir, readpst_cmd)
+                    running[future] = (size, pst_file, staging_dir)
+                    in_flight_bytes += size
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    size, pst_file, staging_dir = running.pop(future)
+                    in_flight_bytes -= size
+                    key = os.path.abspath(pst_file)
+                    try:
+                        duration = future.result()
+                        # Moved here, one job at a time, so names never collide between jobs
+                        outputs = _merge_staging(staging_dir, output_dir)
+                    except Exception as e:
+                        shutil.rmtree(staging_dir, ignore_errors=True)
+                        error = e.stderr.strip() if isinstance(e, subprocess.CalledProcessError) and e.stderr else str(e)
+                        state[key] = {**_pst_signature(pst_file), "status": "failed", "error": error}
+                        save_pst_state(output_dir, state)
+                        _record({"pst": pst_file, "status": "failed", "duration": 0.0,
+                                 "emails": 0, "files": 0, "error": error})
+                        continue
+
+                    emails = sum(1 for rel_path in outputs if rel_path.lower().endswith(".eml"))
+                    state[key] = {**_pst_signature(pst_file), "status": "converted", "duration": duration,
+                                  "emails": emails, "outputs": outputs}
+                    save_pst_state(output_dir, state)
+                    _record({"pst": pst_file, "status": "converted", "duration": duration,
+                             "emails": emails, "files": len(outputs), "error": None})
+    finally:
+        shutil.rmtree(staging_root, ignore_errors=True)
+
+    stats["duration"] = time.perf_counter() - start
+    return stats
+
+
 # Example usage
 # convert_pst_to_mbox("emails.pst", "./output")
 
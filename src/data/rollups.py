@@ -0,0 +1,359 @@
+"""Email counts pre-aggregated for the dashboard and the timeline.
+
+activity_rollups counts the emails per day, week (starting on Monday) and month, by
+mailbox, folder, direction and sender domain, with the dates of the first and last ones.
+Rows whose topic_level is NULL count every email; rows with a topic_level count the emails
+of each topic cluster at that level.
+contact_rollups holds, per day, week, month and for the whole archive ('all') and the
+same dimensions, the distinct addresses seen as sender or "to"/"cc" recipient, for the
+unique contacts metric. Distinct counts do not add up across periods or dimension values
+(a contact writes in several months and mailboxes), so the contacts themselves are kept,
+deduplicated per period.
+
+Both tables are rebuilt from email_flat at the end of every ingestion and after a topic
+build, so the dashboard and the timeline read a bounded number of rows (periods times
+dimension values) instead of every email. A date range is answered from the week or month
+rows for the whole periods it covers and from the day rows for the partial periods at its
+edges; the unique contacts without a date range come from the 'all' rows.
+"""
+
+import datetime
+from typing import Any, Dict, Optional, Sequence
+
+import duckdb
+import pandas as pd
+
+from src.data.duckdb_utils import table_exists
+from src.data.filter_sql import is_active_filter, resolve_direction
+
+ACTIVITY_ROLLUPS_TABLE = 'activity_rollups'
+CONTACT_ROLLUPS_TABLE = 'contact_rollups'
+
+# Rollup granularity of each timeline time unit
+TIME_UNIT_GRANULARITIES = {'D': 'day', 'W': 'week', 'M': 'month'}
+
+# Filters answered by the rollups; any other active filter (sender, recipient, attachments,
+# mailing list...) needs the email rows
+ROLLUP_FILTER_KEYS = {'mailbox', 'direction', 'folder', 'topic_cluster', 'date_range'}
+
+ROLLUP_EMAILS_QUERY = """
+CREATE OR REPLACE TEMP TABLE rollup_emails AS
+SELECT
+    email_id,
+    message_id,
+    timestamp,
+    CAST(timestamp AS DATE) AS day,
+    COALESCE(mailbox_name, folder) AS mailbox,
+    folder,
+    direction,
+    NULLIF(lower(split_part(sender_email, '@', 2)), '') AS sender_domain,
+    sender_email,
+    recipient_emails
+FROM email_flat
+"""
+
+# Every email once without topic, plus once per topic level it was clustered at
+ROLLUP_MEMBERS_QUERY = """
+CREATE OR REPLACE TEMP TABLE rollup_members AS
+SELECT email_id, timestamp, day, mailbox, folder, direction, sender_domain,
+       CAST(NULL AS INTEGER) AS topic_level, CAST(NULL AS INTEGER) AS topic_cluster_id
+FROM rollup_emails
+{topic_members}
+"""
+
+TOPIC_MEMBERS_QUERY = """
+UNION ALL
+SELECT e.email_id, e.timestamp, e.day, e.mailbox, e.folder, e.direction, e.sender_domain,
+       t.level, t.cluster_id
+FROM rollup_emails e
+JOIN email_topic_clusters t ON t.message_id = e.message_id
+"""
+
+ACTIVITY_ROLLUPS_QUERY = f"""
+CREATE OR REPLACE TABLE {ACTIVITY_ROLLUPS_TABLE} AS
+WITH daily AS (
+    SELECT day AS period, mailbox, folder, direction, sender_domain, topic_level, topic_cluster_id,
+           COUNT(*) AS email_count, MIN(timestamp) AS first_timestamp, MAX(timestamp) AS last_timestamp
+    FROM rollup_members
+    GROUP BY ALL
+),
+periods AS (
+    SELECT 'day' AS granularity, * FROM daily
+    UNION ALL
+    SELECT 'week', CAST(date_trunc('week', period) AS DATE), mailbox, folder, direction, sender_domain,
+           topic_level, topic_cluster_id, CAST(SUM(email_count) AS BIGINT), MIN(first_timestamp),
+           MAX(last_timestamp)
+    FROM daily
+    GROUP BY ALL
+    UNION ALL
+    SELECT 'month', CAST(date_trunc('month', period) AS DATE), mailbox, folder, direction, sender_domain,
+           topic_level, topic_cluster_id, CAST(SUM(email_count) AS BIGINT), MIN(first_timestamp),
+           MAX(last_timestamp)
+    FROM daily
+    GROUP BY ALL
+)
+SELECT * FROM periods
+ORDER BY granularity, period
+"""
+
+CONTACT_ROLLUPS_QUERY = f"""
+CREATE OR REPLACE TABLE {CONTACT_ROLLUPS_TABLE} AS
+WITH contacts AS (
+    SELECT email_id, sender_email AS contact FROM rollup_emails
+    UNION ALL
+    SELECT email_id, trim(unnest(string_split(recipient_emails, ','))) FROM rollup_emails
+),
+daily AS (
+    SELECT DISTINCT m.day AS period, m.mailbox, m.folder, m.direction, m.topic_level, m.topic_cluster_id,
+           c.contact
+    FROM rollup_members m
+    JOIN contacts c ON c.email_id = m.email_id
+    WHERE c.contact <> ''
+),
+periods AS (
+    SELECT 'day' AS granularity, * FROM daily
+    UNION ALL
+    SELECT DISTINCT 'week', CAST(date_trunc('week', period) AS DATE), mailbox, folder, direction,
+           topic_level, topic_cluster_id, contact
+    FROM daily
+    UNION ALL
+    SELECT DISTINCT 'month', CAST(date_trunc('month', period) AS DATE), mailbox, folder, direction,
+           topic_level, topic_cluster_id, contact
+    FROM daily
+    UNION ALL
+    SELECT DISTINCT 'all', CAST(NULL AS DATE), mailbox, folder, direction, topic_level, topic_cluster_id,
+           contact
+    FROM daily
+)
+SELECT * FROM periods
+ORDER BY granularity, period
+"""
+
+
+def refresh_rollups(conn: duckdb.DuckDBPyConnection) -> int:
+    """Rebuild activity_rollups and contact_rollups from email_flat (and the topic clusters, if built)
+
+    Args:
+        conn: Read-write connection to the project database
+
+    Returns:
+        Number of activity rollup rows
+    """
+    conn.execute(ROLLUP_EMAILS_QUERY)
+    topic_members = TOPIC_MEMBERS_QUERY if table_exists(conn, 'email_topic_clusters') else ""
+    conn.execute(ROLLUP_MEMBERS_QUERY.format(topic_members=topic_members))
+    conn.execute(ACTIVITY_ROLLUPS_QUERY)
+    conn.execute(CONTACT_ROLLUPS_QUERY)
+    for temp_table in ('rollup_members', 'rollup_emails'):
+        conn.execute(f"DROP TABLE {temp_table}")
+    conn.commit()
+    return conn.execute(f"SELECT COUNT(*) FROM {ACTIVITY_ROLLUPS_TABLE}").fetchone()[0]
+
+
+def rollups_exist(conn: duckdb.DuckDBPyConnection) -> bool:
+    """Whether the rollup tables were built (databases ingested before they existed have none)
+
+    Contact rollups of the first layout, per day only, count as missing.
+    """
+    if not (table_exists(conn, ACTIVITY_ROLLUPS_TABLE) and table_exists(conn, CONTACT_ROLLUPS_TABLE)):
+        return False
+    return conn.execute(
+        "SELECT COUNT(*) FROM information_schema.columns WHERE table_name = ? AND column_name = 'granularity'",
+        [CONTACT_ROLLUPS_TABLE],
+    ).fetchone()[0] > 0
+
+
+def rollups_support(filters: Optional[Dict[str, Any]]) -> bool:
+    """Whether every active filter is a rollup dimension
+
+    Args:
+        filters: Filter dictionary as passed to EmailAnalyzer.get_app_dataframe_with_filters
+
+    Returns:
+        False when a filter needs the email rows (sender, recipient, attachments, mailing list...)
+    """
+    return all(key in ROLLUP_FILTER_KEYS or not is_active_filter(value) for key, value in (filters or {}).items())
+
+
+def _dimension_conditions(mailbox: Optional[str], filters: Dict[str, Any],
+                          topic_level: Optional[int]) -> tuple:
+    """WHERE conditions and parameters of the mailbox, direction, folder and topic filters"""
+    conditions, params = [], []
+    if mailbox and mailbox != "All Mailboxes":
+        conditions.append("mailbox = ?")
+        params.append(mailbox)
+
+    direction = resolve_direction(filters.get('direction'))
+    if direction:
+        conditions.append("direction = ?")
+        params.append(direction)
+
+    folder_value = filters.get('folder')
+    if is_active_filter(folder_value):
+        folder_part = folder_value
+        if isinstance(folder_value, str) and '→' in folder_value:
+            mailbox_part, folder_part = [part.strip() for part in folder_value.split('→', 1)]
+            conditions.append("mailbox = ?")
+            params.append(mailbox_part)
+        if folder_part == 'Racine':
+            conditions.append("(folder IS NULL OR folder = '' OR lower(folder) = 'root')")
+        else:
+            conditions.append("folder = ?")
+            params.append(folder_part)
+
+    cluster_id = None
+    topic_cluster = filters.get('topic_cluster')
+    if is_active_filter(topic_cluster):
+        try:
+            cluster_id = int(topic_cluster)
+        except (ValueError, TypeError):
+            cluster_id = None
+    if cluster_id is None:
+        conditions.append("topic_level IS NULL")
+    elif topic_level is None:
+        # No topic level selected: no email carries a cluster
+        conditions.append("FALSE")
+    else:
+        conditions.append("topic_level = ? AND topic_cluster_id = ?")
+        params.extend([int(topic_level), cluster_id])
+    return conditions, params
+
+
+def _date_bounds(date_range: Optional[Sequence[Any]]) -> Optional[tuple]:
+    """(first day, last day) of a date range, None unless it holds both ends"""
+    if not isinstance(date_range, (tuple, list)) or len(date_range) != 2:
+        return None
+    return pd.Timestamp(date_range[0]).date(), pd.Timestamp(date_range[1]).date()
+
+
+def _period_start(day: datetime.date, granularity: str) -> datetime.date:
+    if granularity == 'week':
+        return day - datetime.timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _next_period(start: datetime.date, granularity: str) -> datetime.date:
+    if granularity == 'week':
+        return start + datetime.timedelta(days=7)
+    if granularity == 'month':
+        return (start.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    return start + datetime.timedelta(days=1)
+
+
+def _period_rows(granularity: str, bounds: Optional[tuple]) -> tuple:
+    """Condition selecting the rollup rows that cover a date range at a granularity
+
+    Whole periods of the range come from their own rows, the days of the partial periods at
+    its edges from the day rows (their period is truncated to the granularity by the caller).
+    """
+    if bounds is None:
+        return "granularity = ?", [granularity]
+    start, end = bounds
+    if granularity == 'day':
+        return "granularity = 'day' AND period BETWEEN ? AND ?", [start, end]
+
+    first_whole = _period_start(start, granularity)
+    if first_whole < start:
+        first_whole = _next_period(first_whole, granularity)
+    # Periods starting before the one holding the day after the range end within the range
+    end_limit = _period_start(end + datetime.timedelta(days=1), granularity)
+    if first_whole >= end_limit:
+        return "granularity = 'day' AND period BETWEEN ? AND ?", [start, end]
+    return (
+        "((granularity = ? AND period >= ? AND period < ?)"
+        " OR (granularity = 'day' AND period BETWEEN ? AND ? AND (period < ? OR period >= ?)))",
+        [granularity, first_whole, end_limit, start, end, first_whole, end_limit],
+    )
+
+
+def activity_counts(conn: duckdb.DuckDBPyConnection,
+                    granularity: str = 'month',
+                    mailbox: Optional[str] = None,
+                    filters: Optional[Dict[str, Any]] = None,
+                    date_range: Optional[Sequence[Any]] = None,
+                    topic_level: Optional[int] = None) -> pd.DataFrame:
+    """Emails per period and direction
+
+    Args:
+        conn: Connection to the project database
+        granularity: 'day', 'week' or 'month'
+        mailbox: Optional mailbox, "All Mailboxes" for every one
+        filters: Direction, folder and topic_cluster filters (see rollups_support)
+        date_range: Optional (first day, last day)
+        topic_level: Topic level the topic_cluster filter refers to
+
+    Returns:
+        DataFrame with the columns date (first day of the period), direction and emails
+    """
+    if granularity not in TIME_UNIT_GRANULARITIES.values():
+        raise ValueError(f"Unknown rollup granularity: {granularity}")
+    conditions, params = _dimension_conditions(mailbox, filters or {}, topic_level)
+    period_condition, period_params = _period_rows(granularity, _date_bounds(date_range))
+    df = conn.execute(f"""
+    SELECT CAST(date_trunc('{granularity}', period) AS DATE) AS date, direction,
+           CAST(SUM(email_count) AS BIGINT) AS emails
+    FROM {ACTIVITY_ROLLUPS_TABLE}
+    WHERE {period_condition} AND period IS NOT NULL AND {' AND '.join(conditions)}
+    GROUP BY ALL
+    ORDER BY date, direction
+    """, period_params + params).df()
+    df['date'] = pd.to_datetime(df['date'])
+    return df
+
+
+def activity_bounds(conn: duckdb.DuckDBPyConnection,
+                    mailbox: Optional[str] = None,
+                    filters: Optional[Dict[str, Any]] = None,
+                    date_range: Optional[Sequence[Any]] = None,
+                    topic_level: Optional[int] = None) -> Optional[tuple]:
+    """Dates of the first and last emails under the filters, None when there are none"""
+    conditions, params = _dimension_conditions(mailbox, filters or {}, topic_level)
+    period_condition, period_params = _period_rows('day', _date_bounds(date_range))
+    first_date, last_date = conn.execute(f"""
+    SELECT MIN(first_timestamp), MAX(last_timestamp)
+    FROM {ACTIVITY_ROLLUPS_TABLE}
+    WHERE {period_condition} AND {' AND '.join(conditions)}
+    """, period_params + params).fetchone()
+    if first_date is None:
+        return None
+    return first_date, last_date
+
+
+def activity_totals(conn: duckdb.DuckDBPyConnection,
+                    mailbox: Optional[str] = None,
+                    filters: Optional[Dict[str, Any]] = None,
+                    date_range: Optional[Sequence[Any]] = None,
+                    topic_level: Optional[int] = None) -> Dict[str, int]:
+    """Email, sent, received and unique contact counts
+
+    Args:
+        conn: Connection to the project database
+        mailbox: Optional mailbox, "All Mailboxes" for every one
+        filters: Direction, folder and topic_cluster filters (see rollups_support)
+        date_range: Optional (first day, last day); emails without a date are only counted without it
+        topic_level: Topic level the topic_cluster filter refers to
+
+    Returns:
+        Dictionary with the keys total, sent, received and contacts
+    """
+    conditions, params = _dimension_conditions(mailbox, filters or {}, topic_level)
+    bounds = _date_bounds(date_range)
+    period_condition, period_params = _period_rows('month', bounds)
+    total, sent, received = conn.execute(f"""
+    SELECT COALESCE(SUM(email_count), 0),
+           COALESCE(SUM(email_count) FILTER (WHERE direction = 'sent'), 0),
+           COALESCE(SUM(email_count) FILTER (WHERE direction = 'received'), 0)
+    FROM {ACTIVITY_ROLLUPS_TABLE}
+    WHERE {period_condition} AND {' AND '.join(conditions)}
+    """, period_params + params).fetchone()
+
+    # Whole months plus the days at the edges of the range, or the whole archive at once
+    contact_condition, contact_params = _period_rows('month', bounds) if bounds else ("granularity = 'all'", [])
+    contacts = conn.execute(f"""
+    SELECT COUNT(DISTINCT contact)
+    FROM {CONTACT_ROLLUPS_TABLE}
+    WHERE {contact_condition} AND {' AND '.join(conditions)}
+    """, contact_params + params).fetchone()[0]
+    return {'total': int(total), 'sent': int(sent), 'received': int(received), 'contacts': int(contacts)}
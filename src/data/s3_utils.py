@@ -1,18 +1,48 @@
 import os
 import boto3
 from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from dotenv import load_dotenv
 from botocore.exceptions import ClientError
 import logging
-from typing import List, Dict, Any, Optional, Union, BinaryIO
+from typing import List, Dict, Any, Optional, Union, BinaryIO, Callable, Tuple
 import mimetypes
 
 import json
 import io
+import hashlib
 import math
 import sys
 import threading
 import time
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from src.data.eml_shards import (
+    DEFAULT_SHARD_BYTES,
+    MEMBER_MD5,
+    SHARD_INDEX_FILENAME,
+    SHARDS_DIRNAME,
+    file_md5,
+    is_packable,
+    load_shard_index,
+    member_range,
+    pack_directory,
+)
+
+# Objects transferred at the same time by upload_directory/download_directory
+DEFAULT_MAX_WORKERS = 16
+# Files above this size are sent in parts (parts of at least MIN_MULTIPART_CHUNKSIZE)
+MULTIPART_THRESHOLD = 8 * 1024 * 1024
+MIN_MULTIPART_CHUNKSIZE = 8 * 1024 * 1024
+MAX_MULTIPART_CHUNKSIZE = 5 * 1024 * 1024 * 1024
+MAX_MULTIPART_PARTS = 1000
+
+# skip_unchanged modes of the directory transfers
+SKIP_NONE = None
+SKIP_SIZE = "size"
+SKIP_CHECKSUM = "checksum"
 
 class UploadProgress:
     """Console progress reporter for S3 uploads."""
@@ -48,6 +78,89 @@ class UploadProgress:
             if self._seen_so_far >= self.filesize:
                 sys.stdout.write("\n")
 
+def multipart_chunksize(file_size: int) -> int:
+    """Part size used to upload a file of file_size bytes (at most MAX_MULTIPART_PARTS parts)"""
+    suggested_chunk = max(MIN_MULTIPART_CHUNKSIZE, math.ceil(file_size / MAX_MULTIPART_PARTS))
+    return min(suggested_chunk, MAX_MULTIPART_CHUNKSIZE)
+
+
+def expected_etag(file_path: str, file_size: Optional[int] = None) -> str:
+    """ETag S3 gives the object when S3Handler.upload_file sends this file
+
+    The MD5 of the content for a single-part upload, the MD5 of the concatenated part
+    digests followed by "-<parts>" for a multipart one.
+    """
+    if file_size is None:
+        file_size = os.path.getsize(file_path)
+    if file_size < MULTIPART_THRESHOLD:
+        digest = hashlib.md5()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    chunk_size = multipart_chunksize(file_size)
+    part_digests = []
+    with open(file_path, "rb") as f:
+        while True:
+            part = hashlib.md5()
+            remaining = chunk_size
+            while remaining:
+                block = f.read(min(remaining, 1024 * 1024))
+                if not block:
+                    break
+                part.update(block)
+                remaining -= len(block)
+            if remaining == chunk_size:
+                break
+            part_digests.append(part.digest())
+    return f"{hashlib.md5(b''.join(part_digests)).hexdigest()}-{len(part_digests)}"
+
+
+def is_unchanged(local_path: str, remote: Optional[Dict[str, Any]], mode: Optional[str]) -> bool:
+    """Whether a local file and a listed object hold the same content, as far as mode can tell
+
+    Args:
+        local_path: Local file
+        remote: Object as returned by S3Handler.list_objects, None if missing
+        mode: SKIP_SIZE (same size) or SKIP_CHECKSUM (same size and ETag), SKIP_NONE never skips
+    """
+    if mode is SKIP_NONE or remote is None or not os.path.isfile(local_path):
+        return False
+    local_size = os.path.getsize(local_path)
+    if local_size != remote.get('size'):
+        return False
+    if mode == SKIP_SIZE:
+        return True
+    return bool(remote.get('etag')) and expected_etag(local_path, local_size) == remote['etag']
+
+
+class DirectoryTransferProgress:
+    """Console progress reporter for directory transfers (counts files, not bytes)"""
+
+    def __init__(self, label: str, total_files: int, total_bytes: int, interval: float = 2.0):
+        self.label = label
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        self.interval = interval
+        self._start_time = time.time()
+        self._last_print = 0.0
+
+    def __call__(self, stats: Dict[str, Any], done: bool = False) -> None:
+        now = time.time()
+        if not done and now - self._last_print < self.interval:
+            return
+        self._last_print = now
+        handled = stats['transferred_files'] + stats['skipped_files'] + stats['failed_files']
+        elapsed = max(now - self._start_time, 1e-6)
+        print(
+            f"[{self.label}] {handled}/{self.total_files} files "
+            f"({stats['transferred_files']} transferred, {stats['skipped_files']} unchanged, "
+            f"{stats['failed_files']} failed)  {stats['total_size']/1e6:8.1f} / {self.total_bytes/1e6:8.1f} MB  "
+            f"{handled / elapsed:7.1f} files/s"
+        )
+
+
 class S3Handler:
     """
     A class to handle common S3 operations using boto3.
@@ -59,6 +172,7 @@ class S3Handler:
         - S3_REGION_NAME: The region name for the S3 service
         - SCW_ACCESS_KEY: Access key ID for authentication
         - SCW_SECRET_KEY: Secret access key for authentication
+        - S3_MAX_WORKERS: Objects transferred concurrently by the directory transfers
     Example usage:
         s3_handler = S3Handler()
         buckets = s3_handler.list_buckets()
@@ -75,10 +189,14 @@ class S3Handler:
     """
 
     def __init__(self, endpoint_url=None, region_name=None,
-                 access_key_id=None, secret_access_key=None):
+                 access_key_id=None, secret_access_key=None,
+                 max_workers: Optional[int] = None):
         """
         Initialize the S3 handler with optional credentials.
         If not provided, will use environment variables.
+
+        max_workers bounds the concurrent transfers of upload_directory and
+        download_directory (S3_MAX_WORKERS, default DEFAULT_MAX_WORKERS).
         """
         # Load environment variables if not done already
         load_dotenv()
@@ -88,6 +206,11 @@ class S3Handler:
         self.region_name = region_name or os.getenv("S3_REGION_NAME")
         self.access_key_id = access_key_id or os.getenv("SCW_ACCESS_KEY")
         self.secret_access_key = secret_access_key or os.getenv("SCW_SECRET_KEY")
+        self.max_workers = max(1, int(max_workers or os.getenv("S3_MAX_WORKERS") or DEFAULT_MAX_WORKERS))
+
+        # Every transfer thread (and the part threads of large files) needs its own
+        # HTTP connection, otherwise they queue on botocore's default pool of 10
+        client_config = Config(max_pool_connections=self.max_workers + 10)
 
         # Initialize S3 resource and client
         self.s3 = boto3.resource(
@@ -95,7 +218,8 @@ class S3Handler:
             endpoint_url=self.endpoint_url,
             region_name=self.region_name,
             aws_access_key_id=self.access_key_id,
-            aws_secret_access_key=self.secret_access_key
+            aws_secret_access_key=self.secret_access_key,
+            config=client_config
         )
 
         self.client = boto3.client(
@@ -103,15 +227,19 @@ class S3Handler:
             endpoint_url=self.endpoint_url,
             region_name=self.region_name,
             aws_access_key_id=self.access_key_id,
-            aws_secret_access_key=self.secret_access_key
+            aws_secret_access_key=self.secret_access_key,
+            config=client_config
         )
 
         # Configure multipart uploads to stay within S3 limits
         self.transfer_config = TransferConfig(
-            multipart_threshold=8 * 1024 * 1024,
+            multipart_threshold=MULTIPART_THRESHOLD,
             multipart_chunksize=128 * 1024 * 1024
         )
 
+        # Shard indexes of packed prefixes, by (bucket, shards prefix)
+        self._shard_indexes: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
         # Set up logging
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
@@ -193,7 +321,7 @@ class S3Handler:
             prefix: Prefix to filter objects by
 
         Returns:
-            List of objects with key, size, last_modified
+            List of objects with key, size, last_modified, etag
         """
         try:
             bucket = self.s3.Bucket(bucket_name)
@@ -203,7 +331,8 @@ class S3Handler:
                 objects.append({
                     'key': obj.key,
                     'size': obj.size,
-                    'last_modified': obj.last_modified
+                    'last_modified': obj.last_modified,
+                    'etag': (obj.e_tag or '').strip('"')
                 })
 
             return objects
@@ -281,12 +410,8 @@ class S3Handler:
                 extra_args['ContentType'] = content_type
 
         try:
-            file_size = os.path.getsize(file_path)
-            max_parts = 1000
-            min_chunk_size = 8 * 1024 * 1024
-            suggested_chunk = max(min_chunk_size, math.ceil(file_size / max_parts))
-            max_chunk_size = 5 * 1024 * 1024 * 1024
-            chunk_size = min(suggested_chunk, max_chunk_size)
+            # expected_etag() relies on this part size
+            chunk_size = multipart_chunksize(os.path.getsize(file_path))
 
             if chunk_size != self.transfer_config.multipart_chunksize:
                 transfer_config = TransferConfig(
@@ -328,16 +453,106 @@ class S3Handler:
             show_progress=show_progress,
         )
 
-    def upload_directory(self, local_dir, bucket_name, s3_prefix, show_progress: bool = True):
+    def _run_transfers(self, tasks: List[Tuple[str, str, int]], transfer: Callable[[str, str], bool],
+                       stats: Dict[str, Any], label: str, show_progress: bool = True,
+                       progress_callback: Optional[Callable[[int, int, str], None]] = None) -> None:
+        """
+        Run transfers on the worker pool, at most a few per worker queued at a time.
+
+        Bookkeeping and callbacks run in the calling thread only.
+
+        Args:
+            tasks: (object key, local path, size) of every object to transfer
+            transfer: Called as transfer(object_key, local_path) in a worker, returns success
+            stats: Statistics updated in place (transferred/failed counts, sizes and paths)
+            label: Name shown by the console progress
+            show_progress: Print aggregated progress lines
+            progress_callback: Called with (handled files, total files, object key)
+        """
+        total = stats['total_files']
+        handled = stats['skipped_files']
+        progress = DirectoryTransferProgress(
+            label, total, sum(size for _, _, size in tasks) + stats['total_size']
+        ) if show_progress else None
+
+        def _run(task):
+            key, local_path, _ = task
+            try:
+                return transfer(key, local_path), None
+            except Exception as e:  # S3UploadFailedError, connection errors...
+                return False, e
+
+        pending = {}
+        task_iter = iter(tasks)
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="s3-transfer") as pool:
+            while True:
+                for task in task_iter:
+                    pending[pool.submit(_run, task)] = task
+                    if len(pending) >= self.max_workers * 4:
+                        break
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key, local_path, size = pending.pop(future)
+                    success, error = future.result()
+                    if success:
+                        stats['transferred_files'] += 1
+                        stats['total_size'] += size
+                        stats['transferred_paths'].append(local_path)
+                    else:
+                        stats['failed_files'] += 1
+                        stats['failed_paths'].append(key)
+                        if error is not None:
+                            self.logger.error(f"Error transferring {key}: {error}")
+                    handled += 1
+                    if progress_callback:
+                        progress_callback(handled, total, key)
+                    if progress:
+                        progress(stats)
+        if progress:
+            progress(stats, done=True)
+
+    def upload_directory(self, local_dir, bucket_name, s3_prefix, show_progress: bool = True,
+                         skip_unchanged: Optional[str] = SKIP_CHECKSUM,
+                         progress_callback: Optional[Callable[[int, int, str], None]] = None,
+                         packed: bool = False,
+                         max_shard_bytes: int = DEFAULT_SHARD_BYTES) -> Dict[str, Any]:
         """
         Upload a directory and all its contents to S3, preserving the folder structure.
 
+        Files are sent concurrently (max_workers at a time), large ones in parts. Objects
+        already in the bucket with the same content are skipped, so running the upload
+        again after an interruption only sends what is missing.
+
+        With packed=True the EML files are sent as tar shards plus an index under
+        <s3_prefix>/_shards/ (see src/data/eml_shards.py) instead of one object each;
+        download_directory brings the shards back as they are.
+
         Args:
-            s3_handler: Instance of S3Handler class
             local_dir: Path to local directory
             bucket_name: Name of the S3 bucket
             s3_prefix: Prefix in S3 where files should be uploaded
+            show_progress: Print aggregated progress lines
+            skip_unchanged: SKIP_CHECKSUM (size and ETag), SKIP_SIZE or SKIP_NONE (upload everything)
+            progress_callback: Optional callback called with (handled files, total files, object key)
+            packed: Store the EML files in shards (packed layout)
+            max_shard_bytes: Size bound of a shard in the packed layout
+
+        Returns:
+            Dictionary with upload statistics (objects, i.e. shards in the packed layout,
+            plus 'packed_files', the EML files they hold): {
+                'total_files': int,
+                'transferred_files': int,
+                'skipped_files': int,
+                'failed_files': int,
+                'total_size': int,
+                'transferred_paths': List[str],
+                'failed_paths': List[str]
+            }
         """
+        tasks = []
         for root, dirs, files in os.walk(local_dir):
             for file in files:
                 local_file_path = os.path.join(root, file)
@@ -345,15 +560,218 @@ class S3Handler:
                 # Create S3 key by replacing local path with S3 prefix
                 relative_path = os.path.relpath(local_file_path, local_dir)
                 s3_key = os.path.join(s3_prefix, relative_path).replace("\\", "/")
+                tasks.append((s3_key, local_file_path, os.path.getsize(local_file_path)))
+
+        pack_dir = None
+        packed_files = 0
+        if packed and any(is_packable(task[1]) for task in tasks):
+            # Shards already in the directory (a downloaded packed prefix) are superseded
+            shards_prefix = self._shards_prefix(s3_prefix)
+            tasks = [task for task in tasks if not task[0].startswith(shards_prefix + '/')]
+            packable = [task for task in tasks if is_packable(task[1])]
+            tasks = [task for task in tasks if not is_packable(task[1])]
+            pack_dir = tempfile.mkdtemp(prefix="olkoa-shards-")
+            index = pack_directory(
+                local_dir, pack_dir,
+                [os.path.relpath(path, local_dir).replace("\\", "/") for _, path, _ in packable],
+                max_shard_bytes=max_shard_bytes,
+                shard_checksum=expected_etag,
+            )
+            packed_files = len(packable)
+            for name in [shard["name"] for shard in index["shards"]] + [SHARD_INDEX_FILENAME]:
+                path = os.path.join(pack_dir, name)
+                tasks.append((f"{shards_prefix}/{name}", path, os.path.getsize(path)))
+            self.logger.info(f"Packed {packed_files} EML files into {len(index['shards'])} shards")
 
-                # Upload the file
-                self.upload_file(
-                    file_path=local_file_path,
-                    bucket_name=bucket_name,
-                    object_key=s3_key,
-                    show_progress=show_progress
-                )
-                print(f"Uploaded {local_file_path} to {bucket_name}/{s3_key}")
+        stats = {
+            'total_files': len(tasks),
+            'packed_files': packed_files,
+            'transferred_files': 0,
+            'skipped_files': 0,
+            'failed_files': 0,
+            'total_size': 0,
+            'transferred_paths': [],
+            'failed_paths': []
+        }
+
+        remote = None
+        if (skip_unchanged is not SKIP_NONE or packed) and tasks:
+            remote = {obj['key']: obj for obj in self.list_objects(bucket_name, s3_prefix)}
+        if skip_unchanged is not SKIP_NONE and tasks:
+            to_send = []
+            for task in tasks:
+                if is_unchanged(task[1], remote.get(task[0]), skip_unchanged):
+                    stats['skipped_files'] += 1
+                else:
+                    to_send.append(task)
+            tasks = to_send
+
+        self.logger.info(
+            f"Uploading {len(tasks)} files from {local_dir} to {bucket_name}/{s3_prefix} "
+            f"({stats['skipped_files']} unchanged, {self.max_workers} workers)"
+        )
+        try:
+            self._run_transfers(
+                tasks,
+                lambda key, path: self.upload_file(path, bucket_name, key, show_progress=False),
+                stats,
+                label=f"upload {s3_prefix}",
+                show_progress=show_progress,
+                progress_callback=progress_callback,
+            )
+        finally:
+            if pack_dir:
+                shutil.rmtree(pack_dir, ignore_errors=True)
+
+        if pack_dir and remote and not stats['failed_files']:
+            # Shards of a previous, larger packing are no longer referenced by the index
+            shards_prefix = self._shards_prefix(s3_prefix) + '/'
+            kept = {f"{self._shards_prefix(s3_prefix)}/{name}"
+                    for name in [shard["name"] for shard in index["shards"]] + [SHARD_INDEX_FILENAME]}
+            stale = [key for key in remote if key.startswith(shards_prefix) and key not in kept]
+            if stale:
+                self.delete_objects(bucket_name, stale)
+            self._shard_indexes.pop((bucket_name, self._shards_prefix(s3_prefix)), None)
+
+        self.logger.info(f"Upload completed: {stats['transferred_files']} uploaded, "
+                         f"{stats['skipped_files']} unchanged, {stats['failed_files']} failed")
+        return stats
+
+    @staticmethod
+    def _shards_prefix(s3_prefix: str) -> str:
+        return f"{s3_prefix.rstrip('/')}/{SHARDS_DIRNAME}"
+
+    def get_shard_index(self, bucket_name: str, s3_prefix: str, refresh: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Shard index of a prefix stored in the packed layout.
+
+        Args:
+            bucket_name: Name of the bucket
+            s3_prefix: Prefix the directory was uploaded to
+            refresh: Fetch the index again instead of using the cached copy
+
+        Returns:
+            The index, or None if the prefix is not packed
+        """
+        cache_key = (bucket_name, self._shards_prefix(s3_prefix))
+        if refresh or cache_key not in self._shard_indexes:
+            try:
+                response = self.client.get_object(Bucket=bucket_name, Key=f"{cache_key[1]}/{SHARD_INDEX_FILENAME}")
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+                    return None
+                raise
+            self._shard_indexes[cache_key] = load_shard_index(response['Body'].read())
+        return self._shard_indexes[cache_key]
+
+    def get_packed_object(self, bucket_name: str, s3_prefix: str, relative_path: str) -> bytes:
+        """
+        Read one file of a packed prefix with a single ranged GET on its shard.
+
+        Args:
+            bucket_name: Name of the bucket
+            s3_prefix: Prefix the directory was uploaded to
+            relative_path: Path of the file relative to the uploaded directory ('/' separated)
+
+        Returns:
+            The file content
+        """
+        index = self.get_shard_index(bucket_name, s3_prefix)
+        location = member_range(index, relative_path) if index else None
+        if location is None:
+            raise KeyError(f"{relative_path} is not packed under {bucket_name}/{s3_prefix}")
+        shard, first_byte, last_byte = location
+        if last_byte < first_byte:
+            return b""
+        response = self.client.get_object(
+            Bucket=bucket_name,
+            Key=f"{self._shards_prefix(s3_prefix)}/{shard}",
+            Range=f"bytes={first_byte}-{last_byte}"
+        )
+        return response['Body'].read()
+
+    def verify_directory(self, local_dir, bucket_name: str, s3_prefix: str) -> Dict[str, Any]:
+        """
+        Check that every file of a local directory is in S3 with the same content, without downloading.
+
+        The ETag of each listed object is compared with the one computed from the local
+        file (MD5, or MD5 of the part digests for multipart uploads, see expected_etag),
+        so it only holds for objects sent by upload_file/upload_directory. For a packed
+        prefix, the EML files are checked against the MD5s of the shard index and the
+        shards against the ETags recorded in it.
+
+        Args:
+            local_dir: Path to the local directory that was uploaded
+            bucket_name: Name of the S3 bucket
+            s3_prefix: Prefix the directory was uploaded to
+
+        Returns:
+            Dictionary with verification statistics: {
+                'total_files': int,
+                'verified_files': int,
+                'total_size': int,
+                'missing_keys': List[str],
+                'mismatched_keys': List[str]
+            }
+        """
+        files = []
+        for root, dirs, names in os.walk(local_dir):
+            for name in names:
+                local_file_path = os.path.join(root, name)
+                relative_path = os.path.relpath(local_file_path, local_dir)
+                files.append((os.path.join(s3_prefix, relative_path).replace("\\", "/"), local_file_path))
+
+        remote = {obj['key']: obj for obj in self.list_objects(bucket_name, s3_prefix)} if files else {}
+        shards_prefix = self._shards_prefix(s3_prefix)
+        index = None
+        if f"{shards_prefix}/{SHARD_INDEX_FILENAME}" in remote:
+            index = self.get_shard_index(bucket_name, s3_prefix, refresh=True)
+        stats = {
+            'total_files': len(files),
+            'verified_files': 0,
+            'total_size': 0,
+            'missing_keys': [],
+            'mismatched_keys': []
+        }
+
+        bad_shards = set()
+        if index is not None:
+            for shard_no, shard in enumerate(index['shards']):
+                listed = remote.get(f"{shards_prefix}/{shard['name']}")
+                if listed is None or listed['etag'] != shard.get('etag') or listed['size'] != shard['size']:
+                    bad_shards.add(shard_no)
+                    stats['mismatched_keys'].append(f"{shards_prefix}/{shard['name']}")
+
+        def _check(item):
+            key, local_path = item
+            if index is not None and is_packable(local_path):
+                entry = index['members'].get(os.path.relpath(local_path, local_dir).replace("\\", "/"))
+                if entry is None:
+                    return key, None, 0
+                same = entry[0] not in bad_shards and os.path.getsize(local_path) == entry[2] \
+                    and file_md5(local_path) == entry[MEMBER_MD5]
+                return key, same, entry[2]
+            if key not in remote:
+                return key, None, 0
+            return key, is_unchanged(local_path, remote[key], SKIP_CHECKSUM), remote[key]['size']
+
+        # Hashing is the only cost here; hashlib releases the GIL on large reads
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, os.cpu_count() or 1)) as pool:
+            for key, same, size in pool.map(_check, files):
+                if same is None:
+                    stats['missing_keys'].append(key)
+                elif same:
+                    stats['verified_files'] += 1
+                    stats['total_size'] += size
+                else:
+                    stats['mismatched_keys'].append(key)
+
+        self.logger.info(
+            f"Verified {stats['verified_files']}/{stats['total_files']} files of {local_dir} against "
+            f"{bucket_name}/{s3_prefix} ({len(stats['missing_keys'])} missing, "
+            f"{len(stats['mismatched_keys'])} different)"
+        )
+        return stats
 
     def upload_fileobj(self, file_obj: BinaryIO, bucket_name: str,
                       object_key: str,
@@ -381,20 +799,30 @@ class S3Handler:
             return False
 
     def download_directory(self, bucket_name: str, s3_prefix: str, local_dir: str,
-                          progress_callback: Optional[callable] = None) -> Dict[str, Any]:
+                          progress_callback: Optional[callable] = None,
+                          skip_unchanged: Optional[str] = SKIP_CHECKSUM,
+                          show_progress: bool = False) -> Dict[str, Any]:
         """
         Download all files from an S3 prefix (directory) to a local directory, preserving structure.
 
+        Objects are fetched concurrently (max_workers at a time). Local files that already
+        hold the object content are kept, and every file is written under a temporary
+        name first, so running the download again after an interruption only fetches
+        what is missing.
+
         Args:
             bucket_name: Name of the S3 bucket
             s3_prefix: S3 prefix (directory path) to download from
             local_dir: Local directory to download files to
             progress_callback: Optional callback function for progress updates
+            skip_unchanged: SKIP_CHECKSUM (size and ETag), SKIP_SIZE or SKIP_NONE (download everything)
+            show_progress: Print aggregated progress lines
 
         Returns:
             Dictionary with download statistics: {
                 'total_files': int,
                 'downloaded_files': int,
+                'skipped_files': int,
                 'failed_files': int,
                 'total_size': int,
                 'downloaded_paths': List[str],
@@ -409,64 +837,57 @@ class S3Handler:
 
         stats = {
             'total_files': 0,
-            'downloaded_files': 0,
+            'transferred_files': 0,
+            'skipped_files': 0,
             'failed_files': 0,
             'total_size': 0,
-            'downloaded_paths': [],
+            'transferred_paths': [],
             'failed_paths': []
         }
 
         try:
-            # List all objects with the prefix
-            objects = self.list_objects(bucket_name, s3_prefix)
+            # List all objects with the prefix (pseudo-directory markers hold nothing)
+            objects = [obj for obj in self.list_objects(bucket_name, s3_prefix) if not obj['key'].endswith('/')]
             stats['total_files'] = len(objects)
 
             if stats['total_files'] == 0:
                 self.logger.warning(f"No files found in {bucket_name} with prefix '{s3_prefix}'")
-                return stats
-
-            self.logger.info(f"Starting download of {stats['total_files']} files from {bucket_name}/{s3_prefix} to {local_dir}")
-
-            for i, obj in enumerate(objects):
-                try:
-                    s3_key = obj['key']
+                return self._download_stats(stats)
+
+            tasks = []
+            for obj in objects:
+                s3_key = obj['key']
+
+                # Create local file path by removing the s3_prefix and joining with local_dir
+                if s3_key.startswith(s3_prefix + '/'):
+                    relative_path = s3_key[len(s3_prefix) + 1:]
+                elif s3_key == s3_prefix:
+                    relative_path = os.path.basename(s3_key)
+                else:
+                    # Handle case where s3_key contains the prefix but not as expected
+                    relative_path = s3_key.replace(s3_prefix, '').lstrip('/')
+
+                local_file_path = os.path.join(local_dir, relative_path)
+                if is_unchanged(local_file_path, obj, skip_unchanged):
+                    stats['skipped_files'] += 1
+                    stats['total_size'] += obj['size']
+                    continue
+                tasks.append((s3_key, local_file_path, obj['size']))
 
-                    # Create local file path by removing the s3_prefix and joining with local_dir
-                    if s3_key.startswith(s3_prefix + '/'):
-                        relative_path = s3_key[len(s3_prefix) + 1:]
-                    elif s3_key == s3_prefix:
-                        relative_path = os.path.basename(s3_key)
-                    else:
-                        # Handle case where s3_key contains the prefix but not as expected
-                        relative_path = s3_key.replace(s3_prefix, '').lstrip('/')
-
-                    local_file_path = os.path.join(local_dir, relative_path)
-
-                    # Create directory for the file if it doesn't exist
-                    os.makedirs(os.path.dirname(local_file_path), exist_ok=True)
-
-                    # Download the file
-                    success = self.download_file(bucket_name, s3_key, local_file_path)
-
-                    if success:
-                        stats['downloaded_files'] += 1
-                        stats['total_size'] += obj['size']
-                        stats['downloaded_paths'].append(local_file_path)
-                        self.logger.debug(f"Downloaded {s3_key} to {local_file_path}")
-                    else:
-                        stats['failed_files'] += 1
-                        stats['failed_paths'].append(s3_key)
-
-                    # Progress callback
-                    if progress_callback:
-                        progress_callback(i + 1, stats['total_files'], s3_key)
-
-                except Exception as e:
-                    stats['failed_files'] += 1
-                    stats['failed_paths'].append(obj['key'])
-                    self.logger.error(f"Error downloading {obj['key']}: {e}")
+            self.logger.info(
+                f"Starting download of {len(tasks)} files from {bucket_name}/{s3_prefix} to {local_dir} "
+                f"({stats['skipped_files']} unchanged, {self.max_workers} workers)"
+            )
+            self._run_transfers(
+                tasks,
+                lambda key, path: self.download_file(bucket_name, key, path),
+                stats,
+                label=f"download {s3_prefix}",
+                show_progress=show_progress,
+                progress_callback=progress_callback,
+            )
 
-            self.logger.info(f"Download completed: {stats['downloaded_files']}/{stats['total_files']} files downloaded successfully")
+            self.logger.info(f"Download completed: {stats['transferred_files'] + stats['skipped_files']}/{stats['total_files']} files downloaded successfully")
             if stats['failed_files'] > 0:
                 self.logger.warning(f"{stats['failed_files']} files failed to download")
 
@@ -474,7 +895,20 @@ class S3Handler:
             self.logger.error(f"Error listing objects for download: {e}")
             raise
 
-        return stats
+        return self._download_stats(stats)
+
+    @staticmethod
+    def _download_stats(stats: Dict[str, Any]) -> Dict[str, Any]:
+        """Name the transfer statistics as download_directory always did (unchanged files count as downloaded)"""
+        return {
+            'total_files': stats['total_files'],
+            'downloaded_files': stats['transferred_files'] + stats['skipped_files'],
+            'skipped_files': stats['skipped_files'],
+            'failed_files': stats['failed_files'],
+            'total_size': stats['total_size'],
+            'downloaded_paths': stats['transferred_paths'],
+            'failed_paths': stats['failed_paths'],
+        }
 
     def download_file(self, bucket_name: str, object_key: str,
                      file_path: str) -> bool:
@@ -489,17 +923,23 @@ class S3Handler:
         Returns:
             True if successful, False otherwise
         """
+        # Written under a temporary name, so an interrupted download never leaves a
+        # truncated file that looks complete
+        tmp_path = f"{file_path}.s3part"
         try:
             # Ensure directory exists
-            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
 
             self.s3.meta.client.download_file(
-                bucket_name, object_key, file_path
+                bucket_name, object_key, tmp_path, Config=self.transfer_config
             )
+            os.replace(tmp_path, file_path)
             self.logger.info(f"File {bucket_name}/{object_key} downloaded to {file_path}")
             return True
         except ClientError as e:
             self.logger.error(f"Error downloading file {bucket_name}/{object_key}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
             return False
 
     def get_object(self, bucket_name: str, object_key: str) -> Dict[str, Any]:
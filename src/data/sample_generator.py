@@ -313,7 +313,8 @@ def generate_email(sender: Dict[str, str], recipient: Dict[str, str],
 
 
 def create_email_message(from_addr: str, to_addr: str, subject: str, 
-                         body: str, date: datetime) -> EmailMessage:
+                         body: str, date: datetime, in_reply_to: str = None,
+                         references: str = None) -> EmailMessage:
     """
     Create an email.message.EmailMessage object.
     
@@ -323,6 +324,8 @@ def create_email_message(from_addr: str, to_addr: str, subject: str,
         subject: Email subject
         body: Email body
         date: Email date
+        in_reply_to: Message-ID of the email this one answers (optional)
+        references: References header of a reply (optional)
         
     Returns:
         EmailMessage object
@@ -333,14 +336,93 @@ def create_email_message(from_addr: str, to_addr: str, subject: str,
     msg['Subject'] = subject
     msg['Date'] = formatdate(date.timestamp())
     msg['Message-ID'] = make_msgid(domain="archives-vaucluse.fr")
+    if in_reply_to:
+        msg['In-Reply-To'] = in_reply_to
+        msg['References'] = references or in_reply_to
     msg.set_content(body)
     
     return msg
 
 
+def add_random_attachment(msg: EmailMessage, min_size: int = 512, max_size: int = 8192) -> None:
+    """Attach a small random PDF-like file to a message."""
+    size = random.randint(min_size, max_size)
+    content = b"%PDF-1.4\n" + random.randbytes(size)
+    filename = f"{random.choice(['rapport', 'inventaire', 'devis', 'convention', 'compte-rendu'])}_{random.randint(1, 9999)}.pdf"
+    msg.add_attachment(content, maintype="application", subtype="pdf", filename=filename)
+
+
+def iter_mailbox_emails(agent: Dict[str, str], num_sent: int = 5,
+                        num_received: int = 5, start_date: datetime = None,
+                        end_date: datetime = None, reply_ratio: float = 0.0,
+                        attachment_ratio: float = 0.0, thread_window: int = 200):
+    """
+    Generate the emails of an agent one by one, without keeping the mailbox in memory.
+
+    Args:
+        agent: Agent information dictionary
+        num_sent: Number of sent emails to generate
+        num_received: Number of received emails to generate
+        start_date: Start date for email generation
+        end_date: End date for email generation
+        reply_ratio: Share of emails generated as replies to a recent email (threads)
+        attachment_ratio: Share of emails carrying a small attachment
+        thread_window: Number of recent emails a reply can answer
+
+    Yields:
+        (EmailMessage, direction) tuples, sent emails first
+    """
+    if not start_date:
+        start_date = datetime(2023, 1, 1, tzinfo=pytz.UTC)
+    if not end_date:
+        end_date = datetime(2023, 12, 31, tzinfo=pytz.UTC)
+
+    # Recent emails as (message_id, references, subject, date, contact)
+    recent = []
+    agent_addr = f"{agent['name']} <{agent['email']}>"
+
+    for direction, count in (("sent", num_sent), ("received", num_received)):
+        for _ in range(count):
+            parent = random.choice(recent) if reply_ratio and recent and random.random() < reply_ratio else None
+            if parent:
+                contact = parent[4]
+                date = parent[3] + timedelta(hours=random.randint(1, 72))
+            else:
+                contact = random.choice(CONTACTS)
+                date = random_date(start_date, end_date)
+
+            sender, recipient = (agent, contact) if direction == "sent" else (contact, agent)
+            try:
+                subject, body, _ = generate_email(sender, recipient, date)
+            except Exception as e:
+                print(f"Error generating {direction} email: {e}")
+                # Use some default values
+                subject = f"Default {direction} email subject"
+                body = f"Default {direction} email body"
+
+            contact_addr = f"{contact['name']} <{contact['email']}>"
+            from_addr, to_addr = (agent_addr, contact_addr) if direction == "sent" else (contact_addr, agent_addr)
+            if parent:
+                subject = "RE: " + re.sub(r'^(RE:\s*)+', '', parent[2])
+                msg = create_email_message(from_addr, to_addr, subject, body, date,
+                                           in_reply_to=parent[0],
+                                           references=" ".join(filter(None, [parent[1], parent[0]])))
+            else:
+                msg = create_email_message(from_addr, to_addr, subject, body, date)
+            if attachment_ratio and random.random() < attachment_ratio:
+                add_random_attachment(msg)
+
+            recent.append((msg['Message-ID'], msg['References'], subject, date, contact))
+            if len(recent) > thread_window:
+                recent.pop(0)
+
+            yield msg, direction
+
+
 def generate_mailbox(agent: Dict[str, str], num_sent: int = 5, 
                     num_received: int = 5, start_date: datetime = None, 
-                    end_date: datetime = None) -> List[Tuple[EmailMessage, str]]:
+                    end_date: datetime = None, reply_ratio: float = 0.0,
+                    attachment_ratio: float = 0.0) -> List[Tuple[EmailMessage, str]]:
     """
     Generate a mailbox for an agent with sent and received emails.
     
@@ -350,60 +432,15 @@ def generate_mailbox(agent: Dict[str, str], num_sent: int = 5,
         num_received: Number of received emails to generate
         start_date: Start date for email generation
         end_date: End date for email generation
+        reply_ratio: Share of emails generated as replies (see iter_mailbox_emails)
+        attachment_ratio: Share of emails carrying a small attachment
         
     Returns:
         List of (EmailMessage, direction) tuples
     """
-    if not start_date:
-        start_date = datetime(2023, 1, 1, tzinfo=pytz.UTC)
-    if not end_date:
-        end_date = datetime(2023, 12, 31, tzinfo=pytz.UTC)
-    
-    emails = []
-    
-    # Generate sent emails
-    for _ in range(num_sent):
-        recipient = random.choice(CONTACTS)
-        date = random_date(start_date, end_date)
-        try:
-            subject, body, _ = generate_email(agent, recipient, date)
-        except Exception as e:
-            print(f"Error generating sent email: {e}")
-            # Use some default values
-            subject = "Default sent email subject"
-            body = "Default sent email body"
-            
-        msg = create_email_message(
-            f"{agent['name']} <{agent['email']}>",
-            f"{recipient['name']} <{recipient['email']}>",
-            subject, 
-            body,
-            date
-        )
-        
-        emails.append((msg, "sent"))
-    
-    # Generate received emails
-    for _ in range(num_received):
-        sender = random.choice(CONTACTS)
-        date = random_date(start_date, end_date)
-        try:
-            subject, body, _ = generate_email(sender, agent, date)
-        except Exception as e:
-            print(f"Error generating email: {e}")
-            # Use some default values
-            subject = "Default subject"
-            body = "Default body text"
-            
-        msg = create_email_message(
-            f"{sender['name']} <{sender['email']}>",
-            f"{agent['name']} <{agent['email']}>",
-            subject, 
-            body,
-            date
-        )
-        
-        emails.append((msg, "received"))
+    emails = list(iter_mailbox_emails(agent, num_sent=num_sent, num_received=num_received,
+                                      start_date=start_date, end_date=end_date,
+                                      reply_ratio=reply_ratio, attachment_ratio=attachment_ratio))
     
     # Sort by date
     emails.sort(key=lambda x: x[0]['Date'])
@@ -510,7 +547,8 @@ def save_as_eml(mailbox_name: str, emails: List[Tuple[EmailMessage, str]],
 
 def generate_test_mailboxes(output_dir: str,
                            num_sent: int = 5, num_received: int = 5,
-                           format_type: str = "mbox") -> None:
+                           format_type: str = "mbox", reply_ratio: float = 0.0,
+                           attachment_ratio: float = 0.0) -> None:
     """
     Generate test mailbox data for the three agents.
     
@@ -519,6 +557,8 @@ def generate_test_mailboxes(output_dir: str,
         num_sent: Number of sent emails per agent
         num_received: Number of received emails per agent
         format_type: Format to save emails ('mbox' or 'eml')
+        reply_ratio: Share of emails generated as replies, forming threads
+        attachment_ratio: Share of emails carrying a small attachment
     """
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
@@ -533,7 +573,9 @@ def generate_test_mailboxes(output_dir: str,
             num_sent=num_sent, 
             num_received=num_received,
             start_date=datetime(2023, 1, 1, tzinfo=pytz.UTC),
-            end_date=datetime(2023, 12, 31, tzinfo=pytz.UTC)
+            end_date=datetime(2023, 12, 31, tzinfo=pytz.UTC),
+            reply_ratio=reply_ratio,
+            attachment_ratio=attachment_ratio
         )
         
         # Save in the requested format
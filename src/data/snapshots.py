@@ -0,0 +1,205 @@
+"""Versioned snapshots of a project database, published by switching a pointer.
+
+Rebuilding a project (ingestion, topic persistence, compaction) used to write into the
+<project>.duckdb file the app was reading. Builds now write into a new file under
+<project>/snapshots/, starting from a copy of the current snapshot when they update it.
+Builds of a database run one at a time, under a lock file next to the snapshots.
+When a build finishes, its file is published by atomically replacing <project>.duckdb,
+which is a symbolic link to the current snapshot.
+
+Every path that opens <project>.duckdb keeps working. A connection opened before the
+switch keeps reading the previous snapshot until it reconnects. The shared connections of
+the app reconnect at their next checkout (see connection_pool).
+
+The latest DUCKDB_SNAPSHOT_RETENTION snapshots are kept, the current one included (3 by
+default; set in constants.py or the environment variable). Older files are deleted, which
+does not disturb a reader that still has one open, and so are the attachment blobs only
+they referenced. A database created before snapshots existed is moved under snapshots/
+by its first build.
+"""
+
+import fcntl
+import os
+import shutil
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, List, Optional, Union
+
+import duckdb
+
+import constants
+
+SNAPSHOT_DIR = "snapshots"
+BUILDING_SUFFIX = ".building.duckdb"
+
+
+def snapshot_retention() -> int:
+    """Number of snapshots kept per database, the current one included"""
+    retention = os.getenv("DUCKDB_SNAPSHOT_RETENTION") or getattr(constants, "DUCKDB_SNAPSHOT_RETENTION", 3)
+    return max(1, int(retention))
+
+
+def current_database(db_path: Union[str, Path]) -> Path:
+    """File of the current snapshot of a database (the path itself for a database without snapshots)"""
+    return Path(os.path.realpath(db_path))
+
+
+def project_folder(db_file: Union[str, Path]) -> Path:
+    """Folder of a database, the same for the database link and all its snapshots"""
+    parent = Path(db_file).parent
+    return parent.parent if parent.name == SNAPSHOT_DIR else parent
+
+
+def snapshot_dir(db_path: Union[str, Path]) -> Path:
+    return Path(db_path).parent / SNAPSHOT_DIR
+
+
+def list_snapshots(db_path: Union[str, Path]) -> List[Path]:
+    """Published snapshots of a database, oldest first"""
+    db_path = Path(db_path)
+    directory = snapshot_dir(db_path)
+    if not directory.is_dir():
+        return []
+    return sorted(path for path in directory.iterdir()
+                  if path.name.startswith(f"{db_path.stem}.") and path.name.endswith(".duckdb")
+                  and not path.name.endswith(BUILDING_SUFFIX))
+
+
+@contextmanager
+def snapshot_lock(db_path: Union[str, Path]) -> Iterator[None]:
+    """
+    Hold the build lock of a database, waiting for the build holding it to finish.
+
+    One build at a time copies, writes, publishes and prunes the snapshots of a database, in
+    every process: two builds starting from the same snapshot would each publish without the
+    changes of the other. The lock is not reentrant, a build must not start another one.
+    """
+    directory = snapshot_dir(db_path)
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / f".{Path(db_path).stem}.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _new_snapshot_path(db_path: Path) -> Path:
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    return snapshot_dir(db_path) / f"{db_path.stem}.{version}.duckdb"
+
+
+def _remove_database_file(path: Path):
+    for file in (path, path.with_name(f"{path.name}.wal")):
+        try:
+            file.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _remove_interrupted_builds(db_path: Path):
+    """Delete the files of builds that stopped without cleaning up (the lock must be held)"""
+    for building in snapshot_dir(db_path).glob(f"{db_path.stem}.*{BUILDING_SUFFIX}"):
+        _remove_database_file(building)
+
+
+def _point_to(db_path: Path, snapshot: Path):
+    """Atomically make db_path a link to a snapshot"""
+    link = db_path.with_name(f".{db_path.name}.{os.getpid()}.link")
+    if link.is_symlink() or link.exists():
+        link.unlink()
+    os.symlink(os.path.relpath(snapshot, db_path.parent), link)
+    os.replace(link, db_path)
+
+
+def _adopt_database_file(db_path: Path):
+    """Turn a database created before snapshots into the first snapshot"""
+    if db_path.is_symlink() or not db_path.exists():
+        return
+    if db_path.with_name(f"{db_path.name}.wal").exists():
+        # Fold the changes left in the write-ahead log into the file before moving it
+        with duckdb.connect(str(db_path)) as conn:
+            conn.execute("CHECKPOINT")
+    snapshot = _new_snapshot_path(db_path)
+    snapshot.parent.mkdir(parents=True, exist_ok=True)
+    # A hard link keeps the file readable under its old name until the link replaces it
+    try:
+        os.link(db_path, snapshot)
+    except OSError:
+        shutil.copy2(db_path, snapshot)
+    _point_to(db_path, snapshot)
+
+
+def prune_snapshots(db_path: Union[str, Path], keep: Optional[int] = None) -> List[Path]:
+    """
+    Delete the oldest snapshots of a database, never the current one.
+
+    A snapshot being built is not listed until it is published, so it is never pruned. The
+    attachment blobs none of the snapshots kept references anymore are removed with
+    them (see attachment_store.collect_garbage).
+
+    Args:
+        db_path: Path of the database (<project>.duckdb)
+        keep: Snapshots to keep, the current one included (default: snapshot_retention())
+
+    Returns:
+        The deleted snapshots
+    """
+    keep = snapshot_retention() if keep is None else max(1, keep)
+    current = current_database(db_path)
+    snapshots = [snapshot for snapshot in list_snapshots(db_path) if snapshot.resolve() != current]
+    deleted = snapshots[:max(0, len(snapshots) - (keep - 1))]
+    # Imported here, attachment_store builds its snapshots with this module
+    from src.data.attachment_store import collect_garbage
+    collect_garbage(db_path, dropped=deleted)
+    for snapshot in deleted:
+        _remove_database_file(snapshot)
+    return deleted
+
+
+def publish_snapshot(db_path: Union[str, Path], snapshot: Union[str, Path]):
+    """Make a snapshot the current database, then prune the old ones (the lock must be held)"""
+    _point_to(Path(db_path), Path(snapshot))
+    prune_snapshots(db_path)
+
+
+@contextmanager
+def build_snapshot(db_path: Union[str, Path], copy_current: bool = True) -> Iterator[Path]:
+    """
+    A new snapshot to build a database into, published when the block ends without error.
+
+    The build holds the lock of the database (see snapshot_lock) from the copy to the
+    pruning, so it waits for a build already running. The file is named *.building.duckdb
+    until it is published. Every connection to it must be closed by the end of the block. On error
+    the file is deleted and the current database is left as it was.
+
+    Args:
+        db_path: Path of the database (<project>.duckdb)
+        copy_current: Start from a copy of the current snapshot (updates), else from no file
+
+    Yields:
+        Path of the snapshot file being built
+    """
+    db_path = Path(db_path)
+    with snapshot_lock(db_path):
+        _remove_interrupted_builds(db_path)
+        _adopt_database_file(db_path)
+        snapshot = _new_snapshot_path(db_path)
+        building = snapshot.with_suffix(BUILDING_SUFFIX)
+        current = current_database(db_path)
+        if copy_current and current.exists():
+            shutil.copyfile(current, building)
+            current_wal = current.with_name(f"{current.name}.wal")
+            if current_wal.exists():
+                shutil.copyfile(current_wal, building.with_name(f"{building.name}.wal"))
+        try:
+            yield building
+        except BaseException:
+            _remove_database_file(building)
+            raise
+        building_wal = building.with_name(f"{building.name}.wal")
+        if building_wal.exists():
+            os.replace(building_wal, snapshot.with_name(f"{snapshot.name}.wal"))
+        os.replace(building, snapshot)
+        publish_snapshot(db_path, snapshot)
@@ -0,0 +1,157 @@
+"""Conversation threads, reconstructed once per ingestion with set-based joins.
+
+Each email gets a parent, searched in this order:
+
+1. the email whose Message-ID is its In-Reply-To header,
+2. the last email of its References header present in the database,
+3. for a reply or forward (Re:, TR:, Fwd:... subject) without either, the latest earlier
+   email with the same normalized subject.
+
+A parent in the same mailbox is preferred when a message was ingested into several. The
+threads table then holds, for every email, its thread (the id of the root email), parent,
+depth below the root and position in the thread by date, so that opening a conversation
+is a lookup on the thread_id index. email_children is rebuilt from the same parents.
+
+Header loops (two messages replying to each other) are cut at the link pointing to the
+later email, which makes it a root.
+"""
+
+import duckdb
+
+from src.data.duckdb_utils import table_exists
+
+# Reply and forward prefixes stripped from subjects, repeated ones included ("RE: TR: ...")
+SUBJECT_PREFIX_PATTERN = r'^\s*((re|fw|fwd|tr|aw|wg|réf|rép)\s*(\[\d+\])?\s*:\s*)+'
+
+# Message-ID without its angle brackets: the first <...> group, else the trimmed header
+MESSAGE_KEY_SQL = "NULLIF(COALESCE(NULLIF(regexp_extract({0}, '<([^>]+)>', 1), ''), trim({0}, ' <>')), '')"
+
+THREAD_EMAILS_QUERY = f"""
+CREATE OR REPLACE TEMP TABLE thread_emails AS
+SELECT
+    id,
+    mailbox_name,
+    timestamp AS ts,
+    {MESSAGE_KEY_SQL.format('message_id')} AS message_key,
+    {MESSAGE_KEY_SQL.format('in_reply_to')} AS reply_key,
+    regexp_extract_all(COALESCE("references", ''), '<([^>]+)>', 1) AS reference_keys,
+    lower(trim(regexp_replace(COALESCE(subject, ''), '{SUBJECT_PREFIX_PATTERN}', '', 'i'))) AS subject_key,
+    regexp_matches(COALESCE(subject, ''), '{SUBJECT_PREFIX_PATTERN}', 'i') AS is_reply
+FROM receiver_emails
+"""
+
+THREAD_LINKS_QUERY = """
+CREATE OR REPLACE TEMP TABLE thread_links AS
+WITH reference_links AS (
+    SELECT id, unnest(reference_keys) AS reference_key, generate_subscripts(reference_keys, 1) AS reference_pos
+    FROM thread_emails
+),
+header_candidates AS (
+    SELECT c.id, p.id AS parent_id, 0 AS source_rank, 0 AS reference_pos,
+           p.mailbox_name = c.mailbox_name AS same_mailbox
+    FROM thread_emails c
+    JOIN thread_emails p ON p.message_key = c.reply_key AND p.id <> c.id
+    UNION ALL
+    SELECT c.id, p.id, 1, r.reference_pos, p.mailbox_name = c.mailbox_name
+    FROM reference_links r
+    JOIN thread_emails c ON c.id = r.id
+    JOIN thread_emails p ON p.message_key = r.reference_key AND p.id <> c.id
+),
+header_parents AS (
+    SELECT id, parent_id
+    FROM header_candidates
+    QUALIFY row_number() OVER (
+        PARTITION BY id ORDER BY source_rank, reference_pos DESC, same_mailbox DESC, parent_id
+    ) = 1
+),
+subject_parents AS (
+    SELECT c.id, p.id AS parent_id
+    FROM (
+        SELECT * FROM thread_emails
+        WHERE is_reply AND subject_key <> '' AND ts IS NOT NULL
+        AND id NOT IN (SELECT id FROM header_parents)
+    ) c
+    ASOF JOIN (SELECT id, subject_key, ts FROM thread_emails WHERE ts IS NOT NULL) p
+        ON p.subject_key = c.subject_key AND c.ts > p.ts
+)
+SELECT e.id, COALESCE(h.parent_id, s.parent_id) AS parent_id
+FROM thread_emails e
+LEFT JOIN header_parents h ON h.id = e.id
+LEFT JOIN subject_parents s ON s.id = e.id
+"""
+
+# Every email reachable from a root (an email without parent), with its root and depth
+THREAD_WALK_QUERY = """
+CREATE OR REPLACE TEMP TABLE thread_walk AS
+WITH RECURSIVE walk(id, thread_id, depth) AS (
+    SELECT id, id, 0 FROM thread_links WHERE parent_id IS NULL
+    UNION ALL
+    SELECT l.id, w.thread_id, w.depth + 1
+    FROM thread_links l JOIN walk w ON l.parent_id = w.id
+)
+SELECT * FROM walk
+"""
+
+# Emails left unreached are on a loop: cut their links pointing to a later (or same date, higher id) email
+BREAK_LOOPS_QUERY = """
+UPDATE thread_links AS l
+SET parent_id = NULL
+FROM thread_emails c, thread_emails p
+WHERE c.id = l.id AND p.id = l.parent_id
+AND l.id NOT IN (SELECT id FROM thread_walk)
+AND (p.ts > c.ts OR p.ts IS NULL OR c.ts IS NULL OR (p.ts = c.ts AND p.id > c.id))
+"""
+
+THREADS_QUERY = """
+CREATE OR REPLACE TABLE threads AS
+SELECT
+    w.id AS email_id,
+    w.thread_id,
+    l.parent_id,
+    w.depth,
+    row_number() OVER (PARTITION BY w.thread_id ORDER BY e.ts, w.id) - 1 AS position,
+    COUNT(*) OVER (PARTITION BY w.thread_id) AS thread_size
+FROM thread_walk w
+JOIN thread_links l ON l.id = w.id
+JOIN thread_emails e ON e.id = w.id
+"""
+
+
+def refresh_threads(conn: duckdb.DuckDBPyConnection) -> int:
+    """Rebuild the threads table and email_children from receiver_emails
+
+    Args:
+        conn: Read-write connection to the project database
+
+    Returns:
+        Number of threads
+    """
+    conn.execute(THREAD_EMAILS_QUERY)
+    conn.execute(THREAD_LINKS_QUERY)
+    conn.execute(THREAD_WALK_QUERY)
+    # Each pass cuts at least one link of every loop, one pass is enough unless loops were chained
+    while conn.execute("SELECT (SELECT COUNT(*) FROM thread_links) - (SELECT COUNT(*) FROM thread_walk)").fetchone()[0]:
+        if not conn.execute(BREAK_LOOPS_QUERY).fetchone()[0]:
+            # Not expected, dates being totally ordered: make every unreached email a root
+            conn.execute("UPDATE thread_links SET parent_id = NULL WHERE id NOT IN (SELECT id FROM thread_walk)")
+        conn.execute(THREAD_WALK_QUERY)
+
+    conn.execute(THREADS_QUERY)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_threads_email_id ON threads(email_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_threads_thread_id ON threads(thread_id)')
+
+    conn.execute("DELETE FROM email_children")
+    conn.execute("""
+    INSERT INTO email_children (parent_id, child_id)
+    SELECT parent_id, email_id FROM threads WHERE parent_id IS NOT NULL
+    """)
+
+    for temp_table in ('thread_walk', 'thread_links', 'thread_emails'):
+        conn.execute(f"DROP TABLE {temp_table}")
+    conn.commit()
+    return conn.execute("SELECT COUNT(DISTINCT thread_id) FROM threads").fetchone()[0]
+
+
+def threads_exist(conn: duckdb.DuckDBPyConnection) -> bool:
+    """Whether the threads table was built (databases ingested before it existed have none)"""
+    return table_exists(conn, 'threads')
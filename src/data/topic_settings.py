@@ -0,0 +1,45 @@
+"""Topic level selected in the app, kept in a small JSON file next to the project database.
+
+The selection is a UI setting changed by a click: it is not written into the database, which
+would mean building and publishing a whole new snapshot of it (see snapshots). The topic
+persistence writes a default level into the topic_settings table and clears this file, so
+that a new topic tree starts from its default level.
+"""
+
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from src.data.snapshots import project_folder
+
+TOPIC_SELECTION_FILENAME = "topic_selection.json"
+
+
+def topic_selection_path(db_path: Union[str, Path]) -> Path:
+    return project_folder(db_path) / TOPIC_SELECTION_FILENAME
+
+
+def read_topic_selection(db_path: Union[str, Path]) -> Optional[Dict[str, Any]]:
+    """Selected 'level' and 'height' of a project, None if none was saved or the file is unreadable"""
+    try:
+        with open(topic_selection_path(db_path), encoding="utf-8") as f:
+            selection = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return selection if isinstance(selection, dict) and selection.get('level') is not None else None
+
+
+def write_topic_selection(db_path: Union[str, Path], level: int, height: Optional[float]) -> None:
+    """Save the selected level, replacing the file atomically"""
+    path = topic_selection_path(db_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({'level': int(level), 'height': height}, f)
+    os.replace(tmp_path, path)
+
+
+def clear_topic_selection(db_path: Union[str, Path]) -> None:
+    topic_selection_path(db_path).unlink(missing_ok=True)
@@ -5,6 +5,7 @@ import json
 import argparse
 import sys
 import logging
+import time
 from pathlib import Path
 from datetime import datetime
 from dotenv import load_dotenv
@@ -106,6 +107,13 @@ def parse_arguments():
         help='Nom de la région S3 (peut aussi être définie via S3_REGION_NAME)'
     )
     
+    parser.add_argument(
+        '--sync-every',
+        type=int,
+        default=1000,
+        help='Nombre d\'uploads entre deux synchronisations du journal sur disque (défaut: 1000)'
+    )
+    
     return parser.parse_args()
 
 def check_credentials(aws_access_key_id, aws_secret_access_key):
@@ -137,10 +145,13 @@ def check_credentials(aws_access_key_id, aws_secret_access_key):
 def load_state(state_file):
     """
     Charge l'état de progression depuis le fichier JSON
-    
+
+    Les EML déjà uploadés ne sont plus dans ce fichier mais dans son journal
+    (voir UploadJournal) ; une ancienne liste "processed_emls" y est reprise.
+
     Args:
         state_file (str): Chemin du fichier d'état
-        
+
     Returns:
         dict: État de progression
     """
@@ -152,24 +163,122 @@ def load_state(state_file):
             logging.error(f"Erreur lors du chargement de l'état : {e}")
     return {
         "last_zip_processed": None,
-        "processed_emls": [],
         "last_run": None
     }
 
 def save_state(state_file, state):
     """
     Sauvegarde l'état de progression dans le fichier JSON
-    
+
+    Le fichier est écrit à côté puis renommé : un arrêt brutal laisse l'ancien état
+    ou le nouveau, jamais un fichier tronqué.
+
     Args:
         state_file (str): Chemin du fichier d'état
         state (dict): État de progression à sauvegarder
     """
+    tmp_file = f"{state_file}.tmp"
     try:
-        with open(state_file, 'w') as f:
+        with open(tmp_file, 'w') as f:
             json.dump(state, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, state_file)
     except Exception as e:
         logging.error(f"Erreur lors de la sauvegarde de l'état : {e}")
 
+class UploadJournal:
+    """
+    Journal des EML déjà uploadés, en ajout seul à côté du fichier d'état
+
+    Une ligne par fichier uploadé (<state_file>.journal), chargée dans un set au
+    démarrage : le test "déjà uploadé" est en O(1) et chaque upload n'écrit qu'une
+    ligne. Les écritures sont synchronisées sur disque par lots (sync_every lignes ou
+    sync_interval secondes) ; après un arrêt brutal, seuls les fichiers du dernier lot
+    non synchronisé sont uploadés à nouveau (l'upload écrase l'objet à l'identique).
+    """
+
+    def __init__(self, state_file, sync_every=1000, sync_interval=5.0):
+        self.path = f"{state_file}.journal"
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.entries = set()
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+        self._load()
+        self._migrate_legacy_state(state_file)
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        # Une dernière ligne sans fin de ligne a été coupée par un arrêt brutal
+        complete = data[:data.rfind(b'\n') + 1]
+        if len(complete) != len(data):
+            logging.warning(f"Journal {self.path} : dernière ligne incomplète ignorée")
+            with open(self.path, 'r+b') as f:
+                f.truncate(len(complete))
+        self.entries.update(line for line in complete.decode('utf-8').split('\n') if line)
+
+    def _migrate_legacy_state(self, state_file):
+        """Reprend la liste "processed_emls" des anciens fichiers d'état dans le journal"""
+        state = load_state(state_file)
+        legacy = state.pop("processed_emls", None)
+        if legacy is None:
+            return
+        new_entries = [path for path in dict.fromkeys(legacy) if path not in self.entries]
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.writelines(f"{path}\n" for path in new_entries)
+            f.flush()
+            os.fsync(f.fileno())
+        self.entries.update(new_entries)
+        save_state(state_file, state)
+        logging.info(f"{len(new_entries)} EML de l'ancien fichier d'état repris dans {self.path}")
+
+    def __contains__(self, path):
+        return path in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, path):
+        """
+        Enregistre un fichier uploadé
+
+        Args:
+            path (str): Chemin du fichier EML
+        """
+        if path in self.entries:
+            return
+        self.entries.add(path)
+        self._file.write(f"{path}\n")
+        self._pending += 1
+        if self._pending >= self.sync_every or time.monotonic() - self._last_sync >= self.sync_interval:
+            self.sync()
+
+    def sync(self):
+        """Écrit sur disque les lignes en attente"""
+        self._file.flush()
+        if self._pending:
+            os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
 def unzip_all_folders(source_dir, state_file):
     """
     Dézippe tous les fichiers ZIP trouvés dans le dossier source
@@ -220,7 +329,7 @@ def unzip_all_folders(source_dir, state_file):
 
 def upload_eml_to_s3(source_dir, bucket_name, state_file, 
                     aws_access_key_id=None, aws_secret_access_key=None,
-                    endpoint_url=None, region_name=None):
+                    endpoint_url=None, region_name=None, sync_every=1000):
     """
     Upload tous les fichiers EML trouvés vers S3
     
@@ -232,14 +341,12 @@ def upload_eml_to_s3(source_dir, bucket_name, state_file,
         aws_secret_access_key (str): Clé secrète AWS (optionnel)
         endpoint_url (str): URL de l'endpoint S3 personnalisé (optionnel)
         region_name (str): Nom de la région S3 (optionnel)
+        sync_every (int): Nombre d'uploads entre deux synchronisations du journal sur disque
     """
     # Vérifier les identifiants
     if not check_credentials(aws_access_key_id, aws_secret_access_key):
         return
     
-    # Charger l'état
-    state = load_state(state_file)
-    
     # Configuration du client S3
     s3_config = {
         'aws_access_key_id': aws_access_key_id,
@@ -277,33 +384,41 @@ def upload_eml_to_s3(source_dir, bucket_name, state_file,
     total_files = len(eml_files)
     logging.info(f"Début de l'upload de {total_files} fichiers EML")
     
-    # Parcourir tous les fichiers EML
-    for eml_file in tqdm(eml_files, desc="Upload des fichiers EML"):
-        # Vérifier si le fichier a déjà été traité
-        if str(eml_file) in state["processed_emls"]:
-            logging.info(f"Déjà traité : {eml_file}")
-            continue
-            
-        try:
-            # Créer le chemin S3 en préservant la structure des dossiers
-            s3_key = str(eml_file.relative_to(source_path))
-            
-            # Upload le fichier
-            s3_client.upload_file(
-                str(eml_file),
-                bucket_name,
-                s3_key
-            )
-            
-            logging.info(f"Uploadé : {eml_file} -> s3://{bucket_name}/{s3_key}")
-            
-            # Mettre à jour l'état
-            state["processed_emls"].append(str(eml_file))
-            state["last_run"] = datetime.now().isoformat()
-            save_state(state_file, state)
-            
-        except Exception as e:
-            logging.error(f"Erreur lors de l'upload de {eml_file}: {e}")
+    with UploadJournal(state_file, sync_every=sync_every) as journal:
+        already_uploaded = 0
+
+        # Parcourir tous les fichiers EML
+        for eml_file in tqdm(eml_files, desc="Upload des fichiers EML"):
+            # Vérifier si le fichier a déjà été traité
+            if str(eml_file) in journal:
+                already_uploaded += 1
+                continue
+
+            try:
+                # Créer le chemin S3 en préservant la structure des dossiers
+                s3_key = str(eml_file.relative_to(source_path))
+
+                # Upload le fichier
+                s3_client.upload_file(
+                    str(eml_file),
+                    bucket_name,
+                    s3_key
+                )
+
+                logging.info(f"Uploadé : {eml_file} -> s3://{bucket_name}/{s3_key}")
+
+                # Mettre à jour le journal
+                journal.add(str(eml_file))
+
+            except Exception as e:
+                logging.error(f"Erreur lors de l'upload de {eml_file}: {e}")
+
+    if already_uploaded:
+        logging.info(f"Déjà traités : {already_uploaded} fichiers EML")
+
+    state = load_state(state_file)
+    state["last_run"] = datetime.now().isoformat()
+    save_state(state_file, state)
 
 def main():
     # Parser les arguments
@@ -329,7 +444,10 @@ def main():
     logging.info(f"S3 endpoint: {s3_endpoint_url or 'AWS S3 par défaut'}")
     logging.info(f"S3 region: {s3_region_name or 'région par défaut'}")
     
-    # Charger l'état actuel
+    # Charger l'état actuel (un ancien fichier d'état est repris dans le journal avant
+    # que le dézippage ne le réécrive)
+    with UploadJournal(args.state_file) as journal:
+        logging.info(f"EML déjà uploadés : {len(journal)}")
     state = load_state(args.state_file)
     if state["last_run"]:
         logging.info(f"Dernière exécution : {state['last_run']}")
@@ -347,7 +465,8 @@ def main():
         aws_access_key_id=aws_access_key_id,
         aws_secret_access_key=aws_secret_access_key,
         endpoint_url=s3_endpoint_url,
-        region_name=s3_region_name
+        region_name=s3_region_name,
+        sync_every=args.sync_every
     )
     
     logging.info("\nTraitement terminé!")
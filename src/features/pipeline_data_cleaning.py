@@ -1,9 +1,12 @@
 from pathlib import Path
 import mailparser
 import json
+import email.utils
+from datetime import timezone
 from tqdm import tqdm
 # from clean_data import extract_clean_text
 from src.features.clean_data import extract_clean_text
+from src.data.message_store import has_parsed_messages, iter_parsed_messages, parse_address_list
 
 import pandas as pd
 import numpy as np
@@ -16,7 +19,9 @@ base_dir = Path(__file__).resolve().parent.parent
 sys.path.append(str(base_dir))
 
 from cluster.embedding_chunk import chunk_text, embed_mails
-from topic.config import chunks_path, embeddings_path, vis_chunks_path, vis_labels_path, vis_emb_2d_path, STOPWORDS
+# Same module paths as src.topic.ann_index, which imports src.topic.config
+from src.topic.config import chunks_path, embeddings_path, vis_chunks_path, vis_labels_path, vis_emb_2d_path, STOPWORDS
+from src.topic.ann_index import build_ann_index
 
 from sklearn.decomposition import PCA
 from sklearn.manifold import TSNE
@@ -26,7 +31,29 @@ from collections import Counter
 # --------------------------
 # Étape 1 : Nettoyage des mails
 # --------------------------
-def automate_cleaning(input_folder, output_file, force=True, limit_mails=None):
+def _mail_from_store(row):
+    """Champs de mailparser (corps, expéditeur, destinataires, date) reconstitués depuis le magasin de messages"""
+    # mailparser joint les parties texte puis HTML avec ce séparateur
+    body = "\n--- mail_boundary ---\n".join(part for part in (row["text_body"], row["html_body"]) if part)
+    date = None
+    if row["date_header"]:
+        try:
+            date = email.utils.parsedate_to_datetime(row["date_header"])
+            # mailparser donne la date en UTC, sans fuseau
+            if date.tzinfo is not None:
+                date = date.astimezone(timezone.utc).replace(tzinfo=None)
+        except (TypeError, ValueError):
+            date = None
+    return body, parse_address_list(row["from_header"]), parse_address_list(row["to_header"]), date
+
+
+def automate_cleaning(input_folder, output_file, force=True, limit_mails=None, db_path=None):
+    """
+    Nettoie les mails d'un dossier et les sauvegarde en JSON.
+
+    Les mails sont lus depuis le magasin de messages de la base du projet (db_path) quand il
+    est complet, sinon en parsant les fichiers .eml du dossier.
+    """
     output_path = Path(output_file).expanduser().resolve()
     input_path = Path(input_folder).expanduser().resolve()
 
@@ -45,14 +72,38 @@ def automate_cleaning(input_folder, output_file, force=True, limit_mails=None):
 
 
 
-    eml_files = sorted(input_path.rglob("*.eml"))
-    if limit_mails:
-        eml_files = eml_files[:limit_mails]
-        print(f"[TEST MODE] Seuls les {len(eml_files)} premiers mails seront traités.")
-
     all_mails = []
     errors = 0
-    print(f"[INFO] Parsing de {len(eml_files)} mails...")
+
+    if has_parsed_messages(db_path):
+        print(f"[INFO] Lecture des mails depuis le magasin de messages : {db_path}")
+        for row in tqdm(iter_parsed_messages(db_path, limit=limit_mails), desc="Lecture mails"):
+            try:
+                body, from_, to, date = _mail_from_store(row)
+                cleaned_text = extract_clean_text(body)
+                if not cleaned_text:
+                    continue
+                all_mails.append({
+                    "file": row["file_name"],
+                    "folder": row["source_dir"],
+                    "from": from_,
+                    "to": to,
+                    "subject": row["subject"] or "",
+                    "date": date.isoformat() if date else None,
+                    "body": cleaned_text,
+                    "message_id": (row["message_id"] or "").strip(),
+                })
+            except Exception as e:
+                errors += 1
+                print(f"[ERREUR] {row['source_dir']}/{row['file_name']}: {e}")
+        eml_files = []
+    else:
+        eml_files = sorted(input_path.rglob("*.eml"))
+        if limit_mails:
+            eml_files = eml_files[:limit_mails]
+            print(f"[TEST MODE] Seuls les {len(eml_files)} premiers mails seront traités.")
+        print(f"[INFO] Parsing de {len(eml_files)} mails...")
+
     for eml_file in tqdm(eml_files, desc="Parsing mails"):
         try:
             mail = mailparser.parse_from_file(str(eml_file))
@@ -141,7 +192,7 @@ def chunk_mails(json_path, output_dir, chunk_size=200, overlap=20, force=True):
 # --------------------------
 # Étape 3 : Calcul des embeddings + clustering
 # --------------------------
-def compute_embeddings(chunk_csv_path, embeddings_dir, force=True):
+def compute_embeddings(chunk_csv_path, embeddings_dir, force=True, project=None):
     embeddings_dir = Path(embeddings_dir).resolve()
     embeddings_dir.mkdir(parents=True, exist_ok=True)
 
@@ -170,8 +221,8 @@ def compute_embeddings(chunk_csv_path, embeddings_dir, force=True):
     )
 
     # Sauvegarde embeddings bruts
-    np.save(embeddings_path(), embeddings)
-    np.save(chunks_path(), np.array(all_chunks, dtype=object))
+    np.save(embeddings_path(project), embeddings)
+    np.save(chunks_path(project), np.array(all_chunks, dtype=object))
 
     # --------------------------
     # Clustering DBSCAN pour filtrer les outliers (-1)
@@ -269,20 +320,30 @@ def compute_embeddings(chunk_csv_path, embeddings_dir, force=True):
     emb_2d = TSNE(n_components=2, perplexity=perplexity, random_state=42).fit_transform(embeddings_reduced)
 
     # Sauvegarde
-    np.save(vis_emb_2d_path(), emb_2d)
-    np.save(vis_labels_path(), labels_final_mapped)
-    with open(vis_chunks_path(), "wb") as f:
+    np.save(vis_emb_2d_path(project), emb_2d)
+    np.save(vis_labels_path(project), labels_final_mapped)
+    with open(vis_chunks_path(project), "wb") as f:
         pickle.dump(chunks_valid, f)
 
     print(f"[INFO] Embeddings 2D et labels finaux sauvegardés !")
+
+    # --------------------------
+    # Index ANN pour la recherche sémantique (mêmes lignes que chunks.pkl)
+    # --------------------------
+    try:
+        build_ann_index(embeddings_valid, project=project)
+    except Exception as e:
+        print(f"[WARN] Index ANN non construit, la recherche restera exacte : {e}")
+
     return all_chunks, embeddings
 
 # --------------------------
 # Pipeline complète
 # --------------------------
-def automate_full_process(input_folder, json_file, chunk_output_dir, compute_embeds=True, force=True, limit_mails=None):
+def automate_full_process(input_folder, json_file, chunk_output_dir, compute_embeds=True, force=True, limit_mails=None,
+                          db_path=None, project=None):
     print("\n--- Étape 1 : Nettoyage des mails ---")
-    json_path = automate_cleaning(input_folder, json_file, force=force, limit_mails=limit_mails)
+    json_path = automate_cleaning(input_folder, json_file, force=force, limit_mails=limit_mails, db_path=db_path)
 
     print("\n--- Étape 2 : Création des chunks ---")
     df_chunks = chunk_mails(json_path, chunk_output_dir, force=force)
@@ -291,7 +352,7 @@ def automate_full_process(input_folder, json_file, chunk_output_dir, compute_emb
     if compute_embeds:
         print("\n--- Étape 3 : Calcul des embeddings et clustering ---")
         csv_chunks_path = Path(chunk_output_dir) / "chunked_emails.csv"
-        all_chunks, embeddings = compute_embeddings(csv_chunks_path, chunk_output_dir, force=force)
+        all_chunks, embeddings = compute_embeddings(csv_chunks_path, chunk_output_dir, force=force, project=project)
 
     print("\n✅ Pipeline complète terminée !")
 
@@ -347,6 +408,8 @@ def prepare_semantic_search(
         compute_embeds=compute_embeds,
         force=force,
         limit_mails=limit_mails,
+        db_path=input_folder / f"{active_project}.duckdb",
+        project=active_project,
     )
     print(f"\n[INFO] Total chunks créés : {len(df_chunks)}")
     print("Pipeline complétée !")
@@ -4,9 +4,7 @@ from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional
 from datetime import datetime
 
-import asyncio
-import nest_asyncio
-from email_normalize import Normalizer
+from src.models.normalization import normalize_address
 
 class EmailAddress(BaseModel):
     email: str
@@ -25,19 +23,8 @@ class EmailAddress(BaseModel):
         if '@' not in cleaned or '.' not in cleaned.split('@')[1]:
             raise ValueError(f"Invalid email format: {cleaned}")
 
-        # Apply nest_asyncio to allow nested event loops
-        nest_asyncio.apply()
-
-        # Define the async function
-        async def normalize_email(mail_adress: str) -> str:
-            normalizer = Normalizer()
-            result = await normalizer.normalize(mail_adress)
-            # print(result)
-            return result.normalized_address
-
-        # Use the current event loop instead of asyncio.run()
-        loop = asyncio.get_event_loop()
-        cleaned = loop.run_until_complete(normalize_email(cleaned))
+        # Offline, memoized provider rules (no DNS lookups nor event loop per address)
+        cleaned = normalize_address(cleaned)
 
         return cleaned
 
@@ -0,0 +1,171 @@
+"""
+Offline email address normalization.
+
+Addresses are normalized with deterministic, domain based provider rules (no DNS/MX
+lookups, no event loop) and memoized, optionally in a per-project JSON cache so that
+re-ingesting a project never normalizes the same address twice.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+# Bump when the rules below change so that persisted caches are rebuilt
+RULES_VERSION = 1
+
+CACHE_FILENAME = "address_normalization_cache.json"
+
+# Consumer domains of the providers handled by email_normalize, with the aliasing
+# features they support. Only the provider's own domains are listed: custom domains
+# hosted by the same provider (Google Workspace, Microsoft 365...) are left untouched.
+PROVIDER_RULES = {
+    # Apple
+    'icloud.com': {'plus_addressing': True},
+    'me.com': {'plus_addressing': True, 'canonical_domain': 'icloud.com'},
+    'mac.com': {'plus_addressing': True, 'canonical_domain': 'icloud.com'},
+    # Fastmail
+    'fastmail.com': {'plus_addressing': True},
+    'fastmail.fm': {'plus_addressing': True},
+    # Google
+    'gmail.com': {'plus_addressing': True, 'strip_periods': True},
+    'googlemail.com': {'plus_addressing': True, 'strip_periods': True, 'canonical_domain': 'gmail.com'},
+    # Microsoft
+    'outlook.com': {'plus_addressing': True},
+    'outlook.fr': {'plus_addressing': True},
+    'hotmail.com': {'plus_addressing': True},
+    'hotmail.fr': {'plus_addressing': True},
+    'live.com': {'plus_addressing': True},
+    'live.fr': {'plus_addressing': True},
+    'msn.com': {'plus_addressing': True},
+    # ProtonMail
+    'proton.me': {'plus_addressing': True},
+    'protonmail.com': {'plus_addressing': True},
+    'protonmail.ch': {'plus_addressing': True},
+    'pm.me': {'plus_addressing': True},
+    # Yandex
+    'yandex.com': {'plus_addressing': True},
+    'yandex.ru': {'plus_addressing': True},
+    'ya.ru': {'plus_addressing': True},
+    # Zoho
+    'zoho.com': {'plus_addressing': True},
+    'zohomail.com': {'plus_addressing': True},
+}
+
+
+def apply_provider_rules(address: str) -> str:
+    """
+    Normalize an address with the provider rules, without any caching.
+
+    Args:
+        address: A syntactically valid email address
+
+    Returns:
+        The lowercased address with provider specific aliasing removed
+    """
+    address = address.strip().lower()
+    local_part, _, domain = address.rpartition('@')
+    rules = PROVIDER_RULES.get(domain)
+    if not local_part or not rules:
+        return address
+
+    if rules.get('plus_addressing') and '+' in local_part:
+        local_part = local_part.split('+', 1)[0] or local_part
+    if rules.get('strip_periods'):
+        local_part = local_part.replace('.', '') or local_part
+    domain = rules.get('canonical_domain', domain)
+
+    return f"{local_part}@{domain}"
+
+
+class AddressNormalizer:
+    """Memoizing front-end of apply_provider_rules with an optional JSON cache file"""
+
+    def __init__(self, cache_path: Optional[Union[str, Path]] = None):
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.cache: Dict[str, str] = {}
+        self.new_entries: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if self.cache_path:
+            self.load()
+
+    def normalize(self, address: str) -> str:
+        """Return the normalized form of an address, computing it at most once"""
+        normalized = self.cache.get(address)
+        if normalized is not None:
+            self.hits += 1
+            return normalized
+
+        normalized = apply_provider_rules(address)
+        with self._lock:
+            self.cache[address] = normalized
+            self.new_entries[address] = normalized
+        self.misses += 1
+        return normalized
+
+    def update(self, entries: Dict[str, str]) -> None:
+        """Merge entries computed elsewhere (e.g. by an ingestion worker process)"""
+        with self._lock:
+            for address, normalized in entries.items():
+                if address not in self.cache:
+                    self.cache[address] = normalized
+                    self.new_entries[address] = normalized
+
+    def drain_new_entries(self) -> Dict[str, str]:
+        """Return and forget the entries added since the last call"""
+        with self._lock:
+            entries, self.new_entries = self.new_entries, {}
+        return entries
+
+    def load(self) -> None:
+        """Load the persisted cache, ignoring it if it was built with other rules"""
+        if not self.cache_path or not self.cache_path.exists():
+            return
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('rules_version') == RULES_VERSION:
+                self.cache.update(data.get('addresses', {}))
+        except Exception as e:
+            print(f"Warning: could not load address normalization cache {self.cache_path}: {e}")
+
+    def save(self) -> None:
+        """Persist the cache next to the project data (atomic replace)"""
+        if not self.cache_path:
+            return
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'rules_version': RULES_VERSION, 'addresses': self.cache}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            print(f"Warning: could not save address normalization cache {self.cache_path}: {e}")
+
+
+_active_normalizer = AddressNormalizer()
+
+
+def get_normalizer() -> AddressNormalizer:
+    """Return the normalizer used by models.EmailAddress"""
+    return _active_normalizer
+
+
+def set_normalizer(normalizer: AddressNormalizer) -> AddressNormalizer:
+    """Install the normalizer used by models.EmailAddress and return the previous one"""
+    global _active_normalizer
+    previous, _active_normalizer = _active_normalizer, normalizer
+    return previous
+
+
+def project_cache_path(project_dir: Union[str, Path]) -> Path:
+    """Location of the persistent normalization cache of a project"""
+    return Path(project_dir) / CACHE_FILENAME
+
+
+def normalize_address(address: str) -> str:
+    """Normalize an address with the active normalizer"""
+    return _active_normalizer.normalize(address)
@@ -6,13 +6,19 @@ RAGAtouille library with ColBERTv2.0 retriever for email data.
 """
 
 import os
+import gc
 import time
+import threading
+from collections import OrderedDict
 # import mailbox
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional
 import pickle
 # from pathlib import Path
 import textwrap
 import sys
+import json
+
+import psutil
 
 
 # Quick fix to ensure AdamW is available
@@ -364,6 +370,12 @@ def initialize_colbert_rag(emails_data: List[Tuple[str, Dict[str, Any]]], output
         metadata_path = os.path.join(output_dir, "email_metadata.pkl")
         with open(metadata_path, "wb") as f:
             pickle.dump(email_metadata, f)
+        # The searchers of the app are keyed by the mode the index was built with
+        with open(os.path.join(output_dir, INDEX_INFO_FILENAME), "w") as f:
+            json.dump({"rag_mode": rag_mode}, f)
+
+        # Searchers loaded from the previous index must not be reused
+        _SEARCHER_REGISTRY.invalidate(_active_project(), rag_mode)
 
         return output_dir
 
@@ -390,14 +402,194 @@ def load_colbert_rag(ragatouille_index_path: str):
         print(f"🔧 Exception type: {type(e).__name__}")
         raise
 
-def search_with_colbert(query: str, path_to_metadata: str, ragatouille_index_path: str, top_k: int = 5) -> List[Dict[str, Any]]:
+INDEX_INFO_FILENAME = "index_info.json"
+
+
+def index_rag_mode(path_to_metadata: str) -> str:
+    """RAG mode an index was built with, read next to its metadata ("light" for older indexes)"""
+    try:
+        with open(os.path.join(path_to_metadata, INDEX_INFO_FILENAME)) as f:
+            return json.load(f).get("rag_mode") or "light"
+    except (OSError, ValueError, AttributeError):
+        return "light"
+
+
+def _load_email_metadata(path_to_metadata: str) -> List[Dict[str, Any]]:
+    """Unpickle the email metadata saved next to the index, or return an empty list"""
+    metadata_path = os.path.join(path_to_metadata, "email_metadata.pkl")
+    if not os.path.exists(metadata_path):
+        print(f"⚠️ Metadata file not found at {metadata_path}")
+        return []
+    try:
+        with open(metadata_path, "rb") as f:
+            return pickle.load(f)
+    except Exception as e:
+        print(f"❌ Error loading metadata: {e}")
+        return []
+
+
+def _index_fingerprint(ragatouille_index_path: str, path_to_metadata: str) -> Tuple:
+    """(path, size, mtime) of every index and metadata file: changes whenever the index is rebuilt"""
+    files = []
+    if os.path.isdir(ragatouille_index_path):
+        for root, _, names in os.walk(ragatouille_index_path):
+            files.extend(os.path.join(root, name) for name in names)
+    files.append(os.path.join(path_to_metadata, "email_metadata.pkl"))
+
+    fingerprint = []
+    for path in sorted(files):
+        try:
+            stat = os.stat(path)
+            fingerprint.append((path, stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            fingerprint.append((path, None, None))
+    return tuple(fingerprint)
+
+
+class ColbertSearcherRegistry:
+    """
+    Process-wide registry of loaded ColBERT searchers, keyed by (project, rag_mode).
+
+    Each entry keeps the model, its PLAID index and the email metadata resident, so only
+    the first query of a project pays the checkpoint and index load. An entry is reloaded
+    when its index or metadata files change on disk, and the least recently used entries
+    are evicted once the resident memory of the entries exceeds the budget.
+    """
+
+    def __init__(self, memory_budget_mb: Optional[float] = None):
+        if memory_budget_mb is None:
+            memory_budget_mb = float(os.getenv("COLBERT_SEARCHER_MEMORY_MB") or 4096)
+        self.memory_budget_bytes = int(memory_budget_mb * 1024 * 1024)
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        # Guards the entries only, never held while a searcher loads
+        self._lock = threading.RLock()
+        # One lock per key: a cold load waits for the same searcher, not for the others
+        self._loading: Dict[Tuple[str, str], threading.Lock] = {}
+
+    def get(self, project: str, rag_mode: str, ragatouille_index_path: str,
+            path_to_metadata: str) -> Tuple[Dict[str, Any], bool]:
+        """
+        Return the resident searcher of a project, loading it if needed.
+
+        Returns:
+            Tuple of (entry with 'model' and 'metadata', whether it was already warm)
+        """
+        key = (project, rag_mode)
+        fingerprint = _index_fingerprint(ragatouille_index_path, path_to_metadata)
+
+        entry = self._warm_entry(key, fingerprint, ragatouille_index_path, path_to_metadata)
+        if entry is not None:
+            return entry, True
+
+        with self._lock:
+            loading = self._loading.setdefault(key, threading.Lock())
+        with loading:
+            # Loaded by another session while this one waited
+            entry = self._warm_entry(key, fingerprint, ragatouille_index_path, path_to_metadata)
+            if entry is not None:
+                return entry, True
+
+            rss_before = psutil.Process().memory_info().rss
+            load_start = time.time()
+            model = load_colbert_rag(ragatouille_index_path=ragatouille_index_path)
+            metadata = _load_email_metadata(path_to_metadata)
+            load_time = time.time() - load_start
+
+            entry = {
+                'model': model,
+                'metadata': metadata,
+                'fingerprint': fingerprint,
+                'index_path': ragatouille_index_path,
+                'metadata_path': path_to_metadata,
+                'load_seconds': load_time,
+                # Approximate when other searchers load at the same time
+                'memory_bytes': max(0, psutil.Process().memory_info().rss - rss_before),
+                'hits': 0,
+                # Streamlit sessions share the searcher: one search at a time per model
+                'lock': threading.Lock(),
+            }
+            with self._lock:
+                self._entries[key] = entry
+                self._evict(keep=key)
+            return entry, False
+
+    def _warm_entry(self, key: Tuple[str, str], fingerprint: Tuple, ragatouille_index_path: str,
+                    path_to_metadata: str) -> Optional[Dict[str, Any]]:
+        """The resident entry of a key if it is still current, dropping it if its index changed"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if (entry['fingerprint'] == fingerprint
+                    and entry['index_path'] == ragatouille_index_path
+                    and entry['metadata_path'] == path_to_metadata):
+                self._entries.move_to_end(key)
+                entry['hits'] += 1
+                return entry
+            print(f"♻️ Index of {key[0]} ({key[1]}) changed on disk, reloading")
+            self._drop(key)
+            return None
+
+    def invalidate(self, project: Optional[str] = None, rag_mode: Optional[str] = None) -> None:
+        """Drop the entries of a project (and mode), or every entry when called without arguments"""
+        with self._lock:
+            for key in list(self._entries):
+                if (project is None or key[0] == project) and (rag_mode is None or key[1] == rag_mode):
+                    self._drop(key)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Load time, memory and hit count of every resident searcher, least recently used first"""
+        with self._lock:
+            return [
+                {
+                    'project': project,
+                    'rag_mode': rag_mode,
+                    'load_seconds': entry['load_seconds'],
+                    'memory_mb': entry['memory_bytes'] / (1024 * 1024),
+                    'hits': entry['hits'],
+                }
+                for (project, rag_mode), entry in self._entries.items()
+            ]
+
+    def _evict(self, keep: Tuple[str, str]) -> None:
+        """Drop least recently used entries until the budget is met (the entry just loaded stays)"""
+        total = sum(entry['memory_bytes'] for entry in self._entries.values())
+        for key in list(self._entries):
+            if total <= self.memory_budget_bytes:
+                break
+            if key == keep:
+                continue
+            total -= self._entries[key]['memory_bytes']
+            print(f"🧹 Evicting ColBERT searcher {key[0]} ({key[1]}) to stay under the memory budget")
+            self._drop(key)
+
+    def _drop(self, key: Tuple[str, str]) -> None:
+        self._entries.pop(key, None)
+        gc.collect()
+
+
+_SEARCHER_REGISTRY = ColbertSearcherRegistry()
+
+
+def get_searcher_registry() -> ColbertSearcherRegistry:
+    """Return the process-wide ColBERT searcher registry"""
+    return _SEARCHER_REGISTRY
+
+
+def search_with_colbert(query: str, path_to_metadata: str, ragatouille_index_path: str, top_k: int = 5,
+                        project_name: Optional[str] = None, rag_mode: str = "light") -> List[Dict[str, Any]]:
     """
     Search emails using the Colbert RAG model.
 
+    The model, index and metadata stay resident in the searcher registry between calls.
+
     Args:
         query: Query string
-        index_path: Path to the index directory
+        path_to_metadata: Directory holding email_metadata.pkl
+        ragatouille_index_path: Path to the RAGAtouille index directory
         top_k: Number of results to return
+        project_name: Project of the index (default: active project)
+        rag_mode: "light" or "heavy", as used to build the index
 
     Returns:
         List of search results with metadata
@@ -406,17 +598,24 @@ def search_with_colbert(query: str, path_to_metadata: str, ragatouille_index_pat
         print(f"🚀 Starting search for: '{query}'")
         print(f"📊 Requesting top {top_k} results")
 
-        # Load the RAG model with timing
-        print("⏳ Loading RAG model...")
+        project = project_name or _active_project()
+
+        # Get the resident searcher (loaded on the first query of the project only)
         load_start = time.time()
-        rag_model = load_colbert_rag(ragatouille_index_path=ragatouille_index_path)
+        searcher, warm = _SEARCHER_REGISTRY.get(project, rag_mode, ragatouille_index_path, path_to_metadata)
+        rag_model = searcher['model']
+        email_metadata = searcher['metadata']
         load_time = time.time() - load_start
-        print(f"✅ Model loaded in {load_time:.2f} seconds")
+        if warm:
+            print(f"✅ Warm searcher reused in {load_time:.3f} seconds")
+        else:
+            print(f"✅ Cold searcher loaded in {load_time:.2f} seconds ({len(email_metadata)} metadata items)")
 
         # Search with timing
         print("🔍 Executing search...")
         search_start = time.time()
-        results = rag_model.search(query=query, k=top_k, index_name=f"{_active_project()}_emails_index")
+        with searcher['lock']:
+            results = rag_model.search(query=query, k=top_k, index_name=f"{project}_emails_index")
         search_time = time.time() - search_start
         print(f"✅ Search completed in {search_time:.2f} seconds")
 
@@ -427,24 +626,6 @@ def search_with_colbert(query: str, path_to_metadata: str, ragatouille_index_pat
 
         print(f"📈 Found {len(results)} results")
 
-        # Load metadata with timing
-        print("📋 Loading metadata...")
-        metadata_start = time.time()
-        metadata_path = os.path.join(path_to_metadata, "email_metadata.pkl")
-
-        if os.path.exists(metadata_path):
-            try:
-                with open(metadata_path, "rb") as f:
-                    email_metadata = pickle.load(f)
-                metadata_time = time.time() - metadata_start
-                print(f"✅ Metadata loaded in {metadata_time:.3f} seconds ({len(email_metadata)} items)")
-            except Exception as e:
-                print(f"❌ Error loading metadata: {e}")
-                email_metadata = []
-        else:
-            print(f"⚠️ Metadata file not found at {metadata_path}")
-            email_metadata = []
-
         # Process results with progress
         print("🔄 Processing results...")
         enriched_results = []
@@ -600,7 +781,8 @@ def generate_answer(query: str, results: List[Dict[str, Any]]) -> str:
     return answer
 
 
-def colbert_rag_answer(query: str, path_to_metadata: str, ragatouille_index_path: str, top_k: int = 5) -> Tuple[str, List[str]]:
+def colbert_rag_answer(query: str, path_to_metadata: str, ragatouille_index_path: str, top_k: int = 5,
+                       project_name: Optional[str] = None, rag_mode: str = "light") -> Tuple[str, List[str]]:
     """
     Get an answer to a query using Colbert RAG.
 
@@ -608,6 +790,8 @@ def colbert_rag_answer(query: str, path_to_metadata: str, ragatouille_index_path
         query: User query
         index_path: Path to the index directory
         top_k: Number of results to consider
+        project_name: Project of the index (default: active project)
+        rag_mode: "light" or "heavy", as used to build the index
 
     Returns:
         Tuple of (answer, formatted source previews)
@@ -621,7 +805,9 @@ def colbert_rag_answer(query: str, path_to_metadata: str, ragatouille_index_path
             query=query,
             path_to_metadata=path_to_metadata,
             ragatouille_index_path=ragatouille_index_path,
-            top_k=top_k
+            top_k=top_k,
+            project_name=project_name,
+            rag_mode=rag_mode
         )
 
         # Generate answer
@@ -0,0 +1,168 @@
+"""Approximate nearest neighbour index over the chunk embeddings (FAISS HNSW).
+
+The index is built once at the end of compute_embeddings, over the same rows as the
+vectors searched by the semantic search page, and loaded lazily on the first query.
+Vectors are L2-normalized so the inner product is the cosine similarity, as in the
+exact search.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import weakref
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from src.topic.config import ann_index_info_path, ann_index_path
+
+# Below this size the exact search is as fast as the index, so none is built
+ANN_MIN_VECTORS = 2000
+
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 1024
+
+_index_cache: dict = {}
+_index_lock = threading.Lock()
+_normalized_cache: dict = {}
+
+
+def _faiss():
+    try:
+        import faiss
+    except ImportError:
+        return None
+    return faiss
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalized float32 copy of a matrix (zero rows stay zero)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def normalized_embeddings(embeddings: np.ndarray) -> np.ndarray:
+    """normalize_rows, memoized for the last matrix seen (the page searches the same one every time)"""
+    cached = _normalized_cache.get("last")
+    if cached is not None and cached[0]() is embeddings:
+        return cached[1]
+    normalized = normalize_rows(embeddings)
+    _normalized_cache["last"] = (weakref.ref(embeddings), normalized)
+    return normalized
+
+
+def exact_search(query_vec: np.ndarray, embeddings_norm: np.ndarray, top_k: int):
+    """Brute-force cosine search: scores every row, sorts only the top_k"""
+    sims = embeddings_norm @ query_vec
+    top_k = min(top_k, len(sims))
+    if top_k <= 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+    top_idx = np.argpartition(-sims, top_k - 1)[:top_k]
+    top_idx = top_idx[np.argsort(-sims[top_idx], kind="stable")]
+    return top_idx, sims[top_idx]
+
+
+def build_hnsw_index(embeddings: np.ndarray, m: int = HNSW_M, ef_construction: int = HNSW_EF_CONSTRUCTION):
+    """Build an in-memory HNSW inner-product index over the normalized embeddings"""
+    faiss = _faiss()
+    if faiss is None:
+        raise ImportError("faiss-cpu is required to build the ANN index")
+    vectors = normalize_rows(embeddings)
+    index = faiss.IndexHNSWFlat(vectors.shape[1], m, faiss.METRIC_INNER_PRODUCT)
+    index.hnsw.efConstruction = ef_construction
+    index.add(vectors)
+    return index
+
+
+def build_ann_index(embeddings: np.ndarray, project: str | None = None,
+                    m: int = HNSW_M, ef_construction: int = HNSW_EF_CONSTRUCTION) -> Path | None:
+    """
+    Build and persist the ANN index of a project.
+
+    Args:
+        embeddings: Vectors in the order the search page will query them
+        project: Project name (default: ACTIVE_PROJECT)
+        m: HNSW neighbours per node
+        ef_construction: HNSW build-time beam width
+
+    Returns:
+        Path of the index, or None if the set is too small or faiss is unavailable
+    """
+    index_path = ann_index_path(project)
+    info_path = ann_index_info_path(project)
+
+    # A stale index must never be served for new embeddings
+    for path in (index_path, info_path):
+        path.unlink(missing_ok=True)
+
+    if len(embeddings) < ANN_MIN_VECTORS:
+        print(f"[ANN] {len(embeddings)} vecteurs : recherche exacte suffisante, pas d'index construit.")
+        return None
+    faiss = _faiss()
+    if faiss is None:
+        print("[ANN] faiss-cpu indisponible : pas d'index construit, la recherche restera exacte.")
+        return None
+
+    index = build_hnsw_index(embeddings, m=m, ef_construction=ef_construction)
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    faiss.write_index(index, str(index_path))
+    with open(info_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "kind": "hnsw_flat_ip",
+            "count": int(index.ntotal),
+            "dim": int(index.d),
+            "m": m,
+            "ef_construction": ef_construction,
+            "ef_search": HNSW_EF_SEARCH,
+            "built_at": datetime.now().isoformat(timespec="seconds"),
+        }, f, indent=2)
+    print(f"[ANN] Index HNSW sauvegardé : {index_path} ({index.ntotal} vecteurs)")
+    return index_path
+
+
+def load_ann_index(project: str | None = None, expected_count: int | None = None):
+    """
+    Load the persisted ANN index of a project once, reloading it if the file changed.
+
+    Returns:
+        (index, info) or None when there is no usable index for these embeddings
+    """
+    try:
+        index_path = ann_index_path(project)
+        info_path = ann_index_info_path(project)
+    except RuntimeError:
+        return None
+    faiss = _faiss()
+    if faiss is None or not index_path.exists() or not info_path.exists():
+        return None
+
+    mtime = index_path.stat().st_mtime_ns
+    with _index_lock:
+        cached = _index_cache.get(index_path)
+        if cached is None or cached[0] != mtime:
+            with open(info_path, "r", encoding="utf-8") as f:
+                info = json.load(f)
+            cached = (mtime, faiss.read_index(str(index_path)), info)
+            _index_cache[index_path] = cached
+
+    _, index, info = cached
+    if expected_count is not None and index.ntotal != expected_count:
+        print(f"[ANN] Index ({index.ntotal} vecteurs) désaligné avec les embeddings ({expected_count}), recherche exacte.")
+        return None
+    return index, info
+
+
+def ann_search(index, query_vec: np.ndarray, top_k: int, ef_search: int = HNSW_EF_SEARCH):
+    """Search the HNSW index; the beam is widened to twice top_k (recall drops fast below)"""
+    top_k = min(top_k, index.ntotal)
+    if top_k <= 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+    index.hnsw.efSearch = max(ef_search, 2 * top_k)
+    scores, ids = index.search(np.asarray(query_vec, dtype=np.float32).reshape(1, -1), top_k)
+    keep = ids[0] >= 0
+    return ids[0][keep], scores[0][keep]
@@ -59,6 +59,24 @@ def chunk_metadata_path(project: str | None = None) -> Path:
     return topic_dir(project) / "chunk_metadata.pkl"
 
 
+def ann_index_path(project: str | None = None) -> Path:
+    return topic_dir(project) / "topics_ann.faiss"
+
+
+def ann_index_info_path(project: str | None = None) -> Path:
+    return topic_dir(project) / "topics_ann.json"
+
+
+# "approximate" uses the ANN index when one was built for the project, "exact" always
+# scores every chunk
+SEARCH_MODES = ("approximate", "exact")
+
+
+def default_search_mode() -> str:
+    mode = (os.getenv("SEMANTIC_SEARCH_MODE") or "approximate").strip().lower()
+    return mode if mode in SEARCH_MODES else "approximate"
+
+
 # Stopwords pour le Bag-of-Words
 STOPWORDS = [
     "alors",
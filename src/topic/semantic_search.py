@@ -1,28 +1,39 @@
 from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.preprocessing import normalize
 import nltk
 import numpy as np
 nltk.download("punkt")
 from nltk.tokenize import sent_tokenize
 
+from src.topic.ann_index import (
+    HNSW_EF_SEARCH, ann_search, exact_search, load_ann_index, normalize_rows, normalized_embeddings,
+)
+from src.topic.config import default_search_mode
+
 # Modèle polyvalent multilingue
 default_model = SentenceTransformer("paraphrase-multilingual-MiniLM-L12-v2")
 
-def semantic_search(query, embeddings, top_k=10, model=None):
+def semantic_search(query, embeddings, top_k=10, model=None, mode=None, project=None):
+    """
+    Cosine search of a query over the chunk embeddings.
+
+    mode="approximate" (default, see SEMANTIC_SEARCH_MODE) queries the project's HNSW index
+    when it was built for these embeddings, and falls back to the exact search otherwise.
+    """
     if model is None:
         model = default_model
-    
+    mode = mode or default_search_mode()
+
     query_emb = model.encode([query])
-    embeddings_norm = normalize(embeddings, axis=1)
-    query_emb_norm = normalize(query_emb.reshape(1, -1), axis=1)
+    query_emb_norm = normalize_rows(query_emb.reshape(1, -1))[0]
 
-    sims = embeddings_norm @ query_emb_norm.T
-    sims = sims.flatten()
+    if mode == "approximate":
+        loaded = load_ann_index(project, expected_count=len(embeddings))
+        if loaded is not None:
+            index, info = loaded
+            return ann_search(index, query_emb_norm, top_k, ef_search=info.get("ef_search", HNSW_EF_SEARCH))
 
-    top_idx = np.argsort(sims)[::-1][:top_k]
-    top_scores = sims[top_idx]
-    return top_idx, top_scores
+    return exact_search(query_emb_norm, normalized_embeddings(embeddings), top_k)
 
 def best_matching_segment(chunk, query, model=None):
     if model is None:
@@ -1,7 +1,7 @@
 # Initialize visualization module
 
 from .email_network import create_network_graph
-from .timeline import create_timeline
+from .timeline import create_timeline, create_timeline_from_counts, effective_time_unit
 from .mail_directory_tree import (
     generate_mermaid_folder_graph,
     get_folder_structure_from_project,
@@ -17,6 +17,8 @@ from .mermaid_display import (
 __all__ = [
     'create_network_graph',
     'create_timeline',
+    'create_timeline_from_counts',
+    'effective_time_unit',
     'generate_mermaid_folder_graph',
     'get_folder_structure_from_project',
     'save_mermaid_graph',
@@ -10,6 +10,46 @@ import plotly.express as px
 from typing import Dict, List, Optional
 
 
+def effective_time_unit(min_date, max_date, time_unit: str = "M") -> str:
+    """
+    Time unit actually plotted: monthly activity spanning a single month is shown daily.
+
+    Args:
+        min_date: First date with emails
+        max_date: Last date with emails
+        time_unit: Requested time unit ('D', 'W' or 'M')
+
+    Returns:
+        Time unit to aggregate by
+    """
+    min_date, max_date = pd.Timestamp(min_date), pd.Timestamp(max_date)
+    if time_unit == "M" and min_date.to_period('M') == max_date.to_period('M'):
+        return "D"
+    if time_unit == "M" and (max_date - min_date).days <= 31:
+        return "D"
+    return time_unit
+
+
+def _empty_timeline() -> go.Figure:
+    fig = go.Figure()
+    fig.add_annotation(
+        text="No data available for timeline",
+        showarrow=False,
+        font=dict(size=20),
+        xref="paper",
+        yref="paper",
+        x=0.5,
+        y=0.5
+    )
+    fig.update_layout(
+        title="Email Activity Over Time",
+        xaxis_title="Date",
+        yaxis_title="Number of Emails",
+        template="plotly_white"
+    )
+    return fig
+
+
 def create_timeline(df: pd.DataFrame, time_unit: str = "M") -> go.Figure:
     """
     Create a timeline visualization of email activity.
@@ -30,43 +70,39 @@ def create_timeline(df: pd.DataFrame, time_unit: str = "M") -> go.Figure:
 
     # Handle empty DataFrame
     if len(df_clean) == 0:
-        # Return empty figure with message
-        fig = go.Figure()
-        fig.add_annotation(
-            text="No data available for timeline",
-            showarrow=False,
-            font=dict(size=20),
-            xref="paper",
-            yref="paper",
-            x=0.5,
-            y=0.5
-        )
-        fig.update_layout(
-            title="Email Activity Over Time",
-            xaxis_title="Date",
-            yaxis_title="Number of Emails",
-            template="plotly_white"
-        )
-        return fig
+        return _empty_timeline()
 
-    min_date = df_clean['date'].min()
-    max_date = df_clean['date'].max()
-    effective_unit = time_unit
-    if time_unit == "M" and min_date.to_period('M') == max_date.to_period('M'):
-        effective_unit = "D"
-    elif time_unit == "M" and (max_date - min_date).days <= 31:
-        effective_unit = "D"
+    effective_unit = effective_time_unit(df_clean['date'].min(), df_clean['date'].max(), time_unit)
+    counts = df_clean[['date', 'direction']].assign(emails=1)
+    return create_timeline_from_counts(counts, effective_unit)
 
-    # Resample by effective time unit
-    sent_series = (df_clean[df_clean['direction'] == 'sent']
-                 .set_index('date')
-                 .resample(effective_unit)
-                 .size())
 
-    received_series = (df_clean[df_clean['direction'] == 'received']
-                     .set_index('date')
-                     .resample(effective_unit)
-                     .size())
+def create_timeline_from_counts(counts: pd.DataFrame, time_unit: str = "M") -> go.Figure:
+    """
+    Create the timeline visualization from email counts, such as the activity rollups.
+
+    Args:
+        counts: DataFrame with 'date', 'direction' and 'emails' (number of emails) columns
+        time_unit: Time unit to plot, used as is ('D' for daily, 'W' for weekly, 'M' for monthly)
+
+    Returns:
+        Plotly figure object
+    """
+    if len(counts) == 0:
+        return _empty_timeline()
+
+    counts = counts.assign(date=pd.to_datetime(counts['date']))
+
+    # Resample by time unit
+    sent_series = (counts[counts['direction'] == 'sent']
+                 .set_index('date')['emails']
+                 .resample(time_unit)
+                 .sum())
+
+    received_series = (counts[counts['direction'] == 'received']
+                     .set_index('date')['emails']
+                     .resample(time_unit)
+                     .sum())
 
     # Create common date range to ensure same length
     all_dates = pd.concat([sent_series.to_frame(), received_series.to_frame()]).index.unique()
@@ -105,7 +141,7 @@ def create_timeline(df: pd.DataFrame, time_unit: str = "M") -> go.Figure:
         'D': 'Daily',
         'W': 'Weekly',
         'M': 'Monthly'
-    }.get(effective_unit, effective_unit)
+    }.get(time_unit, time_unit)
 
     fig.update_layout(
         title=f'{time_unit_label} Email Activity',
@@ -0,0 +1,64 @@
+"""Synthetic project database shared by the tests and the benchmark scripts.
+
+The rows are generated directly in SQL (no .eml parsing), so databases of any size are
+built in seconds: emails spread over three mailboxes and seven folders, half sent and half
+received, with random recipients, a mailing list on every tenth email and attachments on
+every fifth one.
+"""
+
+from src.data.duckdb_utils import setup_database
+
+
+def build_synthetic_db(db_path, emails, entities, seed):
+    """Fill a fresh project database with random emails, recipients and attachments"""
+    conn = setup_database(db_path)
+    conn.execute(f"SELECT setseed({seed / 1000})")
+    conn.execute(f"""
+        INSERT INTO entities
+        SELECT 'entity-' || i, 'Person ' || i, 'person' || i || '@example.org', NULL, NULL, true
+        FROM range({entities}) t(i)
+    """)
+    conn.execute(f"""
+        INSERT INTO mailing_lists
+        SELECT 'list-' || i, 'List ' || i, 'Mailing list ' || i, 'list' || i || '@lists.example.org'
+        FROM range(20) t(i)
+    """)
+    conn.execute(f"""
+        CREATE TEMP TABLE synthetic AS
+        SELECT i,
+               'entity-' || CAST(floor(random() * {entities}) AS INTEGER) AS sender_id,
+               TIMESTAMP '2015-01-01' + to_seconds(CAST(floor(random() * 3e8) AS BIGINT)) AS ts
+        FROM range({emails}) t(i)
+    """)
+    conn.execute("""
+        INSERT INTO sender_emails
+        SELECT 'sender-' || i, sender_id, 'body ' || i, ts FROM synthetic
+    """)
+    conn.execute(f"""
+        INSERT INTO receiver_emails
+        SELECT 'email-' || i, 'sender-' || i, sender_id, NULL,
+               'mailbox_' || (i % 3), CASE WHEN i % 2 = 0 THEN 'sent' ELSE 'received' END, ts,
+               'Subject ' || i,
+               'Message body ' || i || CASE WHEN i % 50 = 0 THEN ' about the budget' ELSE '' END
+                   || repeat(' lorem ipsum', 40),
+               false, 'folder_' || (i % 7), false,
+               CASE WHEN i % 10 = 0 THEN 'list-' || (i % 20) END, 0, NULL,
+               '<' || i || '@example.org>', NULL, NULL
+        FROM synthetic
+    """)
+    for table, fanout in (("email_recipients_to", 3), ("email_recipients_cc", 2), ("email_recipients_bcc", 1)):
+        conn.execute(f"""
+            INSERT OR IGNORE INTO {table}
+            SELECT 'email-' || i, 'entity-' || CAST(floor(random() * {entities}) AS INTEGER)
+            FROM synthetic, range({fanout}) r(k)
+            WHERE (k = 0 AND '{table}' = 'email_recipients_to') OR random() < 0.4
+        """)
+    conn.execute("""
+        INSERT INTO attachments
+        SELECT 'attachment-' || i || '-' || k, 'email-' || i, 'document_' || k || '.pdf',
+               NULL, 'application/pdf', 1024 * (k + 1)
+        FROM synthetic, range(2) r(k)
+        WHERE i % 5 = 0 AND (k = 0 OR i % 10 = 0)
+    """)
+    conn.execute("DROP TABLE synthetic")
+    conn.close()
@@ -0,0 +1,119 @@
+"""The Arrow and pandas ingestion writers (create_batch_writer) write the same rows.
+
+A few .eml files whose Date headers are not in UTC are ingested once with each writer. Both
+databases must hold the same rows, and the sender and receiver timestamps of an email must
+both be the wall clock time of its Date header. A batch that fails to insert is raised,
+leaving neither rows nor cached entity ids behind.
+"""
+
+import contextlib
+import datetime
+import io
+import os
+import sys
+from email.message import EmailMessage
+
+import duckdb
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data.duckdb_utils import setup_database
+from src.data.eml_transformation import DuckDBBatchWriter, process_eml_to_duckdb
+
+PROJECT = "writers"
+CONFIG = {PROJECT: {"mailboxs": {"mailbox_1": {
+    "Positions": {},
+    "Entity": {"name": "Alice Martin", "alias_names": [], "is_physical_person": True,
+               "email_adress": "alice@example.org", "email_adress_aliases": []},
+    "Organisation": {"name": "Example", "description": ""},
+}}}}
+
+DATES = ["Tue, 14 Mar 2023 10:00:00 +0200", "Wed, 15 Mar 2023 23:30:00 -0500", "Thu, 16 Mar 2023 08:15:00 +0000"]
+TABLES = ["receiver_emails", "sender_emails", "entities", "email_recipients_to", "attachments"]
+
+
+@pytest.fixture(scope="module")
+def corpus_dir(tmp_path_factory):
+    root = tmp_path_factory.mktemp("writers")
+    inbox = root / "mailbox_1" / "processed" / "inbox"
+    inbox.mkdir(parents=True)
+    for number, date in enumerate(DATES):
+        message = EmailMessage()
+        message["From"] = "Bob Durand <bob@example.org>"
+        message["To"] = "Alice Martin <alice@example.org>"
+        message["Subject"] = f"Meeting {number}"
+        message["Date"] = date
+        message["Message-ID"] = f"<meeting-{number}@example.org>"
+        message.set_content(f"See you at the meeting number {number}")
+        message.add_attachment(b"agenda %d" % number, maintype="application", subtype="octet-stream",
+                               filename=f"agenda-{number}.bin")
+        (inbox / f"{number:04d}.eml").write_bytes(message.as_bytes())
+    return root
+
+
+def ingest(corpus_dir, db_path, writer):
+    conn = setup_database(str(db_path))
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            process_eml_to_duckdb(corpus_dir, conn, project_name=PROJECT, config_file=CONFIG,
+                                  batch_writer=writer)
+    finally:
+        conn.close()
+
+
+def rows(db_path):
+    with duckdb.connect(str(db_path), read_only=True) as conn:
+        return {table: sorted(conn.execute(f"SELECT * FROM {table}").fetchall(), key=repr) for table in TABLES}
+
+
+def test_arrow_and_pandas_writers_write_the_same_rows(corpus_dir, tmp_path):
+    ingest(corpus_dir, tmp_path / "arrow.duckdb", "arrow")
+    ingest(corpus_dir, tmp_path / "pandas.duckdb", "pandas")
+
+    arrow, pandas = rows(tmp_path / "arrow.duckdb"), rows(tmp_path / "pandas.duckdb")
+    assert len(arrow["receiver_emails"]) == len(DATES)
+    for table in TABLES:
+        assert arrow[table] == pandas[table], table
+
+
+@pytest.mark.parametrize("writer", ["arrow", "pandas"])
+def test_sender_and_receiver_timestamps_are_the_date_header_wall_clock(corpus_dir, tmp_path, writer):
+    db_path = tmp_path / f"{writer}.duckdb"
+    ingest(corpus_dir, db_path, writer)
+
+    with duckdb.connect(str(db_path), read_only=True) as conn:
+        timestamps = conn.execute("""
+            SELECT re.subject, re.timestamp, se.timestamp
+            FROM receiver_emails re JOIN sender_emails se ON se.id = re.sender_email_id
+            ORDER BY re.subject
+        """).fetchall()
+    assert timestamps == [
+        ("Meeting 0", datetime.datetime(2023, 3, 14, 10, 0), datetime.datetime(2023, 3, 14, 10, 0)),
+        ("Meeting 1", datetime.datetime(2023, 3, 15, 23, 30), datetime.datetime(2023, 3, 15, 23, 30)),
+        ("Meeting 2", datetime.datetime(2023, 3, 16, 8, 15), datetime.datetime(2023, 3, 16, 8, 15)),
+    ]
+
+
+@pytest.mark.parametrize("writer", ["arrow", "pandas"])
+def test_failed_batch_is_raised_and_rolled_back(corpus_dir, tmp_path, monkeypatch, writer):
+    insert_batch = DuckDBBatchWriter._insert_batch
+
+    def fail_on_attachments(self, table, source):
+        if table == 'attachments':
+            raise duckdb.ConstraintException("attachment rejected")
+        insert_batch(self, table, source)
+
+    monkeypatch.setattr(DuckDBBatchWriter, "_insert_batch", fail_on_attachments)
+    entity_cache = {}
+    conn = setup_database(str(tmp_path / f"{writer}.duckdb"))
+    try:
+        with pytest.raises(duckdb.ConstraintException), \
+                contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            process_eml_to_duckdb(corpus_dir, conn, project_name=PROJECT, config_file=CONFIG,
+                                  entity_cache=entity_cache, batch_writer=writer)
+        for table in ("receiver_emails", "entities", "ingest_manifest"):
+            assert conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone() == (0,), table
+    finally:
+        conn.close()
+    assert entity_cache == {}
@@ -0,0 +1,129 @@
+"""Packed layout of EML directories (src/data/eml_shards and S3Handler, src/data/s3_utils).
+
+The index gives the exact bytes range of every file in its tar shard: read locally or with
+a ranged GET, it returns the file content. A packed upload is verified without
+downloading anything, and the shards downloaded back unpack into the same tree. The S3
+cases run against moto and are skipped when it is not installed.
+"""
+
+import logging
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data.eml_shards import (
+    SHARD_INDEX_FILENAME, extract_shards, find_local_shards, member_range, pack_directory,
+)
+
+BUCKET = "olkoa-test-shards"
+PREFIX = "mailbox_1/raw"
+# Small shards, so that the tree spans several of them
+SHARD_BYTES = 8 * 1024
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """EML files of varied sizes (an empty one included) plus a file that stays a plain object"""
+    root = tmp_path / "raw"
+    for number in range(40):
+        path = root / f"folder_{number % 4}" / f"{number:04d}.eml"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(f"Subject: message {number}\n\n".encode() + os.urandom(number * 37))
+    (root / "folder_0" / "empty.eml").write_bytes(b"")
+    (root / "archive.mbox").write_bytes(b"From a@example.org\nSubject: kept whole\n\nbody\n")
+    return root
+
+
+def relative_files(root, packable_only=False):
+    files = {}
+    for folder, dirs, names in os.walk(root):
+        dirs[:] = [name for name in dirs if name != "_shards"]
+        for name in names:
+            if not packable_only or name.endswith(".eml"):
+                path = os.path.join(folder, name)
+                with open(path, "rb") as f:
+                    files[os.path.relpath(path, root).replace("\\", "/")] = f.read()
+    return files
+
+
+@pytest.fixture
+def handler(monkeypatch):
+    """S3Handler with four workers on a mocked S3 holding an empty bucket"""
+    moto = pytest.importorskip("moto")
+    from src.data.s3_utils import S3Handler
+
+    for name in ("S3_ENDPOINT_URL", "S3_REGION_NAME", "SCW_ACCESS_KEY", "SCW_SECRET_KEY", "S3_MAX_WORKERS"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with moto.mock_aws():
+        s3_handler = S3Handler(region_name="us-east-1", max_workers=4)
+        logging.getLogger("src.data.s3_utils").setLevel(logging.WARNING)
+        s3_handler.create_bucket(BUCKET)
+        yield s3_handler
+
+
+def test_member_ranges_hold_the_file_bytes(tree, tmp_path):
+    emls = relative_files(tree, packable_only=True)
+    pack_dir = tmp_path / "packed"
+    index = pack_directory(str(tree), str(pack_dir), emls, max_shard_bytes=SHARD_BYTES)
+    assert len(index["shards"]) > 1 and (pack_dir / SHARD_INDEX_FILENAME).is_file()
+
+    for rel_path, content in emls.items():
+        shard, first_byte, last_byte = member_range(index, rel_path)
+        with open(pack_dir / shard, "rb") as f:
+            f.seek(first_byte)
+            assert f.read(last_byte - first_byte + 1) == content
+    assert member_range(index, "archive.mbox") is None
+
+    # Packing the same tree again gives the same shards
+    repacked = tmp_path / "repacked"
+    pack_directory(str(tree), str(repacked), emls, max_shard_bytes=SHARD_BYTES)
+    for name in [shard["name"] for shard in index["shards"]] + [SHARD_INDEX_FILENAME]:
+        assert (repacked / name).read_bytes() == (pack_dir / name).read_bytes()
+
+    extracted = tmp_path / "extracted"
+    assert extract_shards(str(pack_dir), str(extracted)) == len(emls)
+    assert relative_files(extracted) == emls
+
+
+def test_ranged_get_returns_the_packed_file(handler, tree):
+    stats = handler.upload_directory(str(tree), BUCKET, PREFIX, show_progress=False,
+                                     packed=True, max_shard_bytes=SHARD_BYTES)
+    emls = relative_files(tree, packable_only=True)
+    assert stats['failed_files'] == 0 and stats['packed_files'] == len(emls)
+
+    for rel_path, content in emls.items():
+        assert handler.get_packed_object(BUCKET, PREFIX, rel_path) == content
+    with pytest.raises(KeyError):
+        handler.get_packed_object(BUCKET, PREFIX, "archive.mbox")
+
+
+def test_packed_upload_verifies_and_extracts(handler, tree, tmp_path):
+    handler.upload_directory(str(tree), BUCKET, PREFIX, show_progress=False,
+                             packed=True, max_shard_bytes=SHARD_BYTES)
+    files = relative_files(tree)
+
+    stats = handler.verify_directory(str(tree), BUCKET, PREFIX)
+    assert stats['verified_files'] == stats['total_files'] == len(files)
+    assert not stats['missing_keys'] and not stats['mismatched_keys']
+
+    changed = tree / "folder_2" / "0006.eml"
+    changed.write_bytes(changed.read_bytes()[::-1])
+    stats = handler.verify_directory(str(tree), BUCKET, PREFIX)
+    assert stats['mismatched_keys'] == [f"{PREFIX}/folder_2/0006.eml"]
+    changed.write_bytes(files["folder_2/0006.eml"])
+
+    # Downloaded as they are, the shards unpack into the uploaded tree
+    raw = tmp_path / "downloaded"
+    stats = handler.download_directory(BUCKET, PREFIX, str(raw))
+    assert stats['failed_files'] == 0
+    assert (raw / "archive.mbox").read_bytes() == files["archive.mbox"]
+    processed = tmp_path / "processed"
+    extracted = extract_shards(find_local_shards(str(raw)), str(processed))
+    assert extracted == len(files) - 1
+    assert relative_files(processed) == relative_files(tree, packable_only=True)
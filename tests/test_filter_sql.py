@@ -0,0 +1,195 @@
+"""The filters compiled to SQL (src/data/filter_sql) against the pandas filters of the app.
+
+A small synthetic project is loaded once without any filter, then every filter combination is
+applied both ways: in pandas as the pages did (EmailFilters.apply_filters, apply_date_filter,
+apply_contact_filter), and in DuckDB through get_app_dataframe_with_filters. Both must return
+the same emails.
+"""
+
+import contextlib
+import datetime
+import io
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
+
+from tests.synthetic_db import build_synthetic_db
+from src.data.duckdb_utils import refresh_email_flat
+from src.data.email_analyzer import EmailAnalyzer
+from src.data.filter_sql import EmailFilterState, date_bounds, resolve_direction
+from src.filters.email_filters import EmailFilters, apply_date_filter
+from components.email_viewer import apply_contact_filter
+
+EMAILS = 600
+TOPIC_LEVEL = 1
+
+
+@pytest.fixture(scope="module")
+def db_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("filters") / "filters.duckdb")
+    with contextlib.redirect_stdout(io.StringIO()):
+        build_synthetic_db(path, EMAILS, 40, 7)
+    analyzer = EmailAnalyzer(path)
+    conn = analyzer.connect()
+    conn.execute("""
+    CREATE TABLE email_topic_clusters (
+        project_name TEXT, message_id TEXT, topic_id INTEGER, level INTEGER, height DOUBLE,
+        cluster_id INTEGER, summary TEXT
+    )
+    """)
+    conn.execute("""
+    INSERT INTO email_topic_clusters
+    SELECT 'filters', message_id, 0, level, level, hash(message_id || level) % 3,
+           'Topic ' || (hash(message_id || level) % 3)
+    FROM receiver_emails, range(1, 3) t(level)
+    WHERE CAST(split_part(id, '-', 2) AS INTEGER) % 9 <> 0
+    """)
+    with contextlib.redirect_stdout(io.StringIO()):
+        refresh_email_flat(conn)
+    # Named mailboxes and root folders, which the synthetic data does not have
+    number = "CAST(split_part(email_id, '-', 2) AS INTEGER)"
+    conn.execute(f"UPDATE email_flat SET mailbox_name = 'Archive' WHERE {number} % 4 = 0")
+    conn.execute(f"UPDATE email_flat SET folder = '' WHERE {number} % 11 = 0")
+    conn.execute(f"UPDATE email_flat SET folder = 'ROOT' WHERE {number} % 13 = 0")
+    analyzer.close()
+    return path
+
+
+@pytest.fixture(scope="module")
+def analyzer(db_path):
+    analyzer = EmailAnalyzer(db_path)
+    yield analyzer
+    analyzer.close()
+
+
+@pytest.fixture(scope="module")
+def all_emails(analyzer):
+    df = analyzer.get_app_dataframe_with_filters(limit=None, topic_level=TOPIC_LEVEL)
+    assert len(df) == EMAILS
+    return df
+
+
+@pytest.fixture(scope="module")
+def email_filters(db_path):
+    return EmailFilters(db_path)
+
+
+@pytest.fixture(scope="module")
+def date_range(all_emails):
+    first, last = all_emails['date'].min(), all_emails['date'].max()
+    return (first + (last - first) / 4).date(), (last - (last - first) / 3).date()
+
+
+def pandas_filtered(df, email_filters, mailbox=None, filters=None, date_range=None, contact=None):
+    """The filters as the pages applied them to the loaded emails"""
+    if mailbox and mailbox != "All Mailboxes":
+        df = df[df['mailbox'] == mailbox]
+    df = email_filters.apply_filters(df, filters or {})
+    if date_range:
+        df = apply_date_filter(df.copy(), date_range)
+    if contact:
+        df = apply_contact_filter(df, contact)
+    return df
+
+
+def message_ids(df):
+    return sorted(df['message_id'])
+
+
+def busiest_contact(df):
+    recipients = df['recipient_email'].dropna().str.split(',').explode().str.strip()
+    return pd.concat([df['from'], recipients]).value_counts().index[0]
+
+
+SCENARIOS = [
+    ("no filter", {}),
+    ("mailbox", {"mailbox": "Archive"}),
+    ("all mailboxes", {"mailbox": "All Mailboxes"}),
+    ("sent", {"filters": {"direction": "Envoyé"}}),
+    ("received", {"filters": {"direction": "Reçus"}}),
+    ("direction all", {"filters": {"direction": "All"}}),
+    ("folder", {"filters": {"folder": "folder_3"}}),
+    ("mailbox and folder", {"filters": {"folder": "Archive → folder_2"}}),
+    ("root folder", {"filters": {"folder": "Racine"}}),
+    ("mailbox root folder", {"filters": {"folder": "Archive → Racine"}}),
+    ("topic cluster", {"filters": {"topic_cluster": "1"}}),
+    ("topic cluster all", {"filters": {"topic_cluster": "Tous"}}),
+    ("date range", {"date_range": True}),
+    ("contact", {"contact": True}),
+    ("everything", {"mailbox": "Archive", "filters": {"direction": "Envoyé", "topic_cluster": "2"},
+                    "date_range": True, "contact": True}),
+]
+
+
+@pytest.mark.parametrize("name, scenario", SCENARIOS, ids=[name for name, _ in SCENARIOS])
+def test_sql_filters_match_pandas(name, scenario, analyzer, all_emails, email_filters, date_range):
+    kwargs = dict(scenario)
+    if kwargs.get("date_range"):
+        kwargs["date_range"] = date_range
+    if kwargs.get("contact"):
+        kwargs["contact"] = busiest_contact(all_emails).upper()
+
+    expected = pandas_filtered(all_emails, email_filters, **kwargs)
+    actual = analyzer.get_app_dataframe_with_filters(limit=None, topic_level=TOPIC_LEVEL, **kwargs)
+    assert message_ids(actual) == message_ids(expected)
+    assert analyzer.count_emails_with_filters(topic_level=TOPIC_LEVEL, **kwargs) == len(expected)
+    assert len(expected) > 0
+    if name not in ("no filter", "all mailboxes", "direction all", "topic cluster all"):
+        assert len(expected) < EMAILS
+
+
+def test_topic_filter_applies_before_the_limit(analyzer, all_emails):
+    topic = all_emails[all_emails['topic_cluster_id'] == 1].sort_values('date', ascending=False)
+    df = analyzer.get_app_dataframe_with_filters(filters={"topic_cluster": "1"}, limit=20, topic_level=TOPIC_LEVEL)
+    assert message_ids(df) == message_ids(topic.head(20))
+
+
+def test_filters_the_pandas_path_ignored(analyzer, all_emails):
+    """sender, recipient, attachments and mailing lists were not applied by the pandas filters"""
+    sender = all_emails['from'].value_counts().index[0]
+    df = analyzer.get_app_dataframe_with_filters(filters={"sender": sender.upper()}, limit=None,
+                                                 topic_level=TOPIC_LEVEL)
+    assert message_ids(df) == message_ids(all_emails[all_emails['from'] == sender])
+
+    recipient = busiest_contact(all_emails)
+    df = analyzer.get_app_dataframe_with_filters(filters={"recipient": recipient}, limit=None, topic_level=TOPIC_LEVEL)
+    expected = all_emails[all_emails['recipient_email'].fillna('').apply(
+        lambda value: recipient in [part.strip() for part in value.split(',')])]
+    assert message_ids(df) == message_ids(expected)
+
+    df = analyzer.get_app_dataframe_with_filters(filters={"has_attachments": True}, limit=None,
+                                                 topic_level=TOPIC_LEVEL)
+    assert message_ids(df) == message_ids(all_emails[all_emails['attachments'].str.len() > 0])
+
+    df = analyzer.get_app_dataframe_with_filters(filters={"mailing_list_email": "None"}, limit=None,
+                                                 topic_level=TOPIC_LEVEL)
+    assert message_ids(df) == message_ids(all_emails[all_emails['mailing_list_email'].isna()])
+
+
+def test_topic_filter_without_topics_matches_nothing(analyzer):
+    state = EmailFilterState.build(filters={"topic_cluster": "1"}, topic_level=TOPIC_LEVEL)
+    assert state.where(topics_available=False) == ("FALSE", [])
+
+
+def test_filter_state_ignores_inactive_values():
+    state = EmailFilterState.build(mailbox="All Mailboxes", filters={"direction": "Tous", "folder": "All",
+                                                                     "sender": "", "has_attachments": False},
+                                   contact="  ", search=None)
+    assert state.filters == ()
+    assert state.where() == ("TRUE", [])
+    assert state.filters == EmailFilterState.build(filters={"direction": "all"}).filters
+
+
+def test_resolve_direction_and_date_bounds():
+    assert resolve_direction("Envoyé") == "sent"
+    assert resolve_direction("Reçus") == "received"
+    assert resolve_direction("Tous") is None
+    start, end = date_bounds((datetime.date(2020, 1, 1), datetime.date(2020, 1, 31)))
+    assert start == pd.Timestamp("2020-01-01")
+    assert end == pd.Timestamp("2020-01-31 23:59:59")
+    assert date_bounds(None) is None
@@ -0,0 +1,83 @@
+"""The full-text index (src/data/fulltext_index) follows the emails changed by a re-ingestion.
+
+Two .eml files are ingested and indexed, then one of them is rewritten with another body but
+the same Message-ID, so the email keeps its id. After the incremental ingestion and the index
+refresh, the search must match the new body only.
+"""
+
+import contextlib
+import io
+import os
+import sys
+from email.message import EmailMessage
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data.duckdb_utils import setup_database
+from src.data.eml_transformation import process_eml_to_duckdb
+from src.data.fulltext_index import refresh_fulltext_index, search_fulltext
+
+PROJECT = "fulltext"
+CONFIG = {PROJECT: {"mailboxs": {"mailbox_1": {
+    "Positions": {},
+    "Entity": {"name": "Alice Martin", "alias_names": [], "is_physical_person": True,
+               "email_adress": "alice@example.org", "email_adress_aliases": []},
+    "Organisation": {"name": "Example", "description": ""},
+}}}}
+
+
+def write_eml(path, message_id, subject, body):
+    message = EmailMessage()
+    message["From"] = "Bob Durand <bob@example.org>"
+    message["To"] = "Alice Martin <alice@example.org>"
+    message["Subject"] = subject
+    message["Date"] = "Tue, 14 Mar 2023 10:00:00 +0000"
+    message["Message-ID"] = message_id
+    message.set_content(body)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(message.as_bytes())
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    inbox = tmp_path / "corpus" / "mailbox_1" / "processed" / "inbox"
+    write_eml(inbox / "0001.eml", "<fruit@example.org>", "Market list", "apple banana")
+    write_eml(inbox / "0002.eml", "<other@example.org>", "Weekly news", "apple pie recipe")
+    return tmp_path / "corpus", inbox
+
+
+def ingest_and_index(corpus_dir, conn):
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        process_eml_to_duckdb(corpus_dir, conn, project_name=PROJECT, config_file=CONFIG)
+        refresh_fulltext_index(conn)
+
+
+def matches(conn, query):
+    return {conn.execute("SELECT message_id FROM receiver_emails WHERE id = ?", [email_id]).fetchone()[0]
+            for email_id, _ in search_fulltext(conn, query)}
+
+
+def test_changed_email_is_indexed_again(corpus, tmp_path):
+    corpus_dir, inbox = corpus
+    conn = setup_database(str(tmp_path / "fulltext.duckdb"))
+    try:
+        ingest_and_index(corpus_dir, conn)
+        assert matches(conn, "apple") == {"<fruit@example.org>", "<other@example.org>"}
+        email_id = conn.execute("SELECT id FROM receiver_emails WHERE message_id = '<fruit@example.org>'").fetchone()
+
+        write_eml(inbox / "0001.eml", "<fruit@example.org>", "Market list", "cherry durian")
+        ingest_and_index(corpus_dir, conn)
+
+        assert conn.execute("SELECT id FROM receiver_emails WHERE message_id = '<fruit@example.org>'").fetchone() \
+            == email_id
+        assert matches(conn, "apple") == {"<other@example.org>"}
+        assert matches(conn, "banana") == set()
+        assert matches(conn, "cherry") == {"<fruit@example.org>"}
+        assert matches(conn, '"cherry durian"') == {"<fruit@example.org>"}
+        # Document frequencies follow the change
+        assert conn.execute("SELECT df FROM fulltext_terms WHERE term = 'apple'").fetchone() == (1,)
+        assert conn.execute("SELECT COUNT(*) FROM fulltext_terms WHERE term = 'banana'").fetchone() == (0,)
+    finally:
+        conn.close()
@@ -0,0 +1,102 @@
+"""MBOX files ingested in place (process_eml_to_duckdb with include_mbox) write the same
+database as the two-step path: every message converted to an .eml file the way the project
+page does it (src.data.mbox_to_eml), then those files ingested.
+
+Rows are compared as in test_parallel_ingest, ids included. Ingesting again only reads the
+messages appended to an MBOX file since the previous run.
+"""
+
+import contextlib
+import io
+import mailbox
+import os
+import shutil
+import sys
+from datetime import datetime
+
+import duckdb
+import pytest
+import pytz
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data.duckdb_utils import setup_database
+from src.data.eml_transformation import find_eml_files, process_eml_to_duckdb
+from src.data.mbox_to_eml import mbox_folder_name, mbox_to_eml
+from src.data.sample_generator import AGENTS, generate_mailbox
+from tests.test_parallel_ingest import CONTENT_QUERIES, PROJECT, content, project_config
+
+
+@pytest.fixture(scope="module")
+def corpus_dir(tmp_path_factory):
+    """inbox.mbox and sent.mbox of each sample mailbox, under <mailbox>/raw/ as a project upload"""
+    path = tmp_path_factory.mktemp("mbox_corpus")
+    for idx, agent in enumerate(AGENTS):
+        raw_dir = path / f"mailbox_{idx + 1}" / "raw"
+        raw_dir.mkdir(parents=True)
+        messages = generate_mailbox(agent, num_sent=8, num_received=8,
+                                    start_date=datetime(2023, 1, 1, tzinfo=pytz.UTC),
+                                    end_date=datetime(2023, 12, 31, tzinfo=pytz.UTC),
+                                    reply_ratio=0.3, attachment_ratio=0.3)
+        for direction, name in (("received", "inbox"), ("sent", "sent")):
+            mbox = mailbox.mbox(str(raw_dir / f"{name}.mbox"))
+            for msg, msg_direction in messages:
+                if msg_direction == direction:
+                    mbox.add(msg)
+            mbox.close()
+    return path
+
+
+def convert(corpus_dir):
+    """The project page's MBOX conversion: one .eml file per message in the processed tree"""
+    for mailbox_dir in sorted(corpus_dir.iterdir()):
+        for mbox_file in sorted((mailbox_dir / "raw").glob("*.mbox")):
+            output_dir = mailbox_dir / "processed" / mailbox_dir.name.lower() / mbox_folder_name(str(mbox_file))
+            os.makedirs(output_dir, exist_ok=True)
+            mbox_to_eml(str(mbox_file), str(output_dir))
+
+
+def ingest(corpus_dir, db_path, include_mbox):
+    conn = setup_database(str(db_path))
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            process_eml_to_duckdb(corpus_dir, conn, project_name=PROJECT, config_file=project_config(),
+                                  workers=2, chunk_size=5, include_mbox=include_mbox)
+        return conn.execute("SELECT COUNT(*) FROM ingest_manifest").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_direct_mbox_ingest_writes_the_same_rows_as_two_step(corpus_dir, tmp_path):
+    two_step_dir, direct_dir = tmp_path / "two_step", tmp_path / "direct"
+    shutil.copytree(corpus_dir, two_step_dir)
+    shutil.copytree(corpus_dir, direct_dir)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        convert(two_step_dir)
+    ingest(two_step_dir, tmp_path / "two_step.duckdb", include_mbox=False)
+    ingest(direct_dir, tmp_path / "direct.duckdb", include_mbox=True)
+    # Read in place: no .eml file is written
+    assert not find_eml_files(direct_dir)
+
+    two_step, direct = content(tmp_path / "two_step.duckdb"), content(tmp_path / "direct.duckdb")
+    assert len(two_step["receiver_emails"]) == len(AGENTS) * 16
+    assert two_step["attachments"]
+    for table in CONTENT_QUERIES:
+        assert direct[table] == two_step[table], table
+
+
+def test_direct_mbox_ingest_reads_only_appended_messages(corpus_dir, tmp_path):
+    direct_dir = tmp_path / "direct"
+    shutil.copytree(corpus_dir, direct_dir)
+    db_path = tmp_path / "direct.duckdb"
+    ingested = ingest(direct_dir, db_path, include_mbox=True)
+    assert ingest(direct_dir, db_path, include_mbox=True) == ingested
+
+    inbox = mailbox.mbox(str(direct_dir / "mailbox_1" / "raw" / "inbox.mbox"))
+    for msg, _ in generate_mailbox(AGENTS[0], num_sent=0, num_received=3):
+        inbox.add(msg)
+    inbox.close()
+    assert ingest(direct_dir, db_path, include_mbox=True) == ingested + 3
+    with duckdb.connect(str(db_path), read_only=True) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM receiver_emails").fetchone()[0] == len(AGENTS) * 16 + 3
@@ -0,0 +1,104 @@
+"""Serial and parallel EML ingestion (process_eml_to_duckdb) write the same database.
+
+Sample mailboxes are generated once with src.data.sample_generator, then ingested with a
+single process and with a worker pool. Every table is compared on its content, ids included
+since they are derived from the content, and foreign keys replaced by the values they point to.
+"""
+
+import contextlib
+import io
+import os
+import sys
+
+import duckdb
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data.duckdb_utils import setup_database
+from src.data.eml_transformation import process_eml_to_duckdb
+from src.data.sample_generator import AGENTS, generate_test_mailboxes
+
+PROJECT = "parallel_ingest"
+
+CONTENT_QUERIES = {
+    "receiver_emails": """
+        SELECT re.id, re.mailbox_name, re.folder, re.direction, re.timestamp, re.subject, re.body,
+               re.message_id, re.in_reply_to, re."references", sender.email, reply_to.email
+        FROM receiver_emails re
+        LEFT JOIN entities sender ON re.sender_id = sender.id
+        LEFT JOIN entities reply_to ON re.reply_to_id = reply_to.id
+    """,
+    "sender_emails": """
+        SELECT se.id, e.email, se.body, se.timestamp
+        FROM sender_emails se LEFT JOIN entities e ON se.sender_id = e.id
+    """,
+    "entities": "SELECT id, name, email, alias_names, alias_emails, is_physical_person FROM entities",
+    "recipients": """
+        SELECT 'to', re.message_id, e.email FROM email_recipients_to r
+        JOIN receiver_emails re ON r.email_id = re.id JOIN entities e ON r.entity_id = e.id
+        UNION ALL
+        SELECT 'cc', re.message_id, e.email FROM email_recipients_cc r
+        JOIN receiver_emails re ON r.email_id = re.id JOIN entities e ON r.entity_id = e.id
+        UNION ALL
+        SELECT 'bcc', re.message_id, e.email FROM email_recipients_bcc r
+        JOIN receiver_emails re ON r.email_id = re.id JOIN entities e ON r.entity_id = e.id
+    """,
+    "attachments": """
+        SELECT a.id, re.message_id, a.filename, a.content_type, a.size, a.content_hash
+        FROM attachments a JOIN receiver_emails re ON a.email_id = re.id
+    """,
+}
+
+
+def project_config():
+    """Project config matching the mailboxes produced by generate_test_mailboxes"""
+    mailboxes = {}
+    for idx, agent in enumerate(AGENTS):
+        mailboxes[f"mailbox_{idx + 1}"] = {
+            "Positions": {},
+            "Entity": {
+                "name": agent["name"],
+                "alias_names": [],
+                "is_physical_person": True,
+                "email_adress": agent["email"],
+                "email_adress_aliases": [],
+            },
+            "Organisation": {"name": agent["department"], "description": agent["role"]},
+        }
+    return {PROJECT: {"mailboxs": mailboxes}}
+
+
+@pytest.fixture(scope="module")
+def corpus_dir(tmp_path_factory):
+    path = tmp_path_factory.mktemp("corpus")
+    with contextlib.redirect_stdout(io.StringIO()):
+        generate_test_mailboxes(str(path), num_sent=12, num_received=12, format_type="eml",
+                                reply_ratio=0.3, attachment_ratio=0.3)
+    return path
+
+
+def ingest(corpus_dir, db_path, workers):
+    conn = setup_database(str(db_path))
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            process_eml_to_duckdb(corpus_dir, conn, project_name=PROJECT, config_file=project_config(),
+                                  workers=workers, queue_depth=2, chunk_size=5)
+    finally:
+        conn.close()
+
+
+def content(db_path):
+    with duckdb.connect(str(db_path), read_only=True) as conn:
+        return {name: sorted(conn.execute(query).fetchall(), key=repr) for name, query in CONTENT_QUERIES.items()}
+
+
+def test_parallel_ingest_writes_the_same_rows_as_serial(corpus_dir, tmp_path):
+    ingest(corpus_dir, tmp_path / "serial.duckdb", workers=1)
+    ingest(corpus_dir, tmp_path / "parallel.duckdb", workers=3)
+
+    serial, parallel = content(tmp_path / "serial.duckdb"), content(tmp_path / "parallel.duckdb")
+    assert len(serial["receiver_emails"]) == len(AGENTS) * 24
+    assert serial["attachments"]
+    for table in CONTENT_QUERIES:
+        assert parallel[table] == serial[table], table
@@ -0,0 +1,127 @@
+"""Directory transfers of S3Handler (src/data/s3_utils) against an S3 mocked by moto.
+
+Files go through the worker pool both ways, objects already holding the local content are
+skipped, an upload interrupted by failures sends only what is missing when run again, and
+the ETag computed locally matches the one S3 gives a multipart upload.
+"""
+
+import logging
+import os
+import sys
+
+import pytest
+
+moto = pytest.importorskip("moto")
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data.s3_utils import MULTIPART_THRESHOLD, S3Handler, expected_etag
+
+BUCKET = "olkoa-test"
+PREFIX = "mailbox_1/raw"
+
+
+@pytest.fixture
+def handler(monkeypatch):
+    """S3Handler with four workers on a mocked S3 holding an empty bucket"""
+    for name in ("S3_ENDPOINT_URL", "S3_REGION_NAME", "SCW_ACCESS_KEY", "SCW_SECRET_KEY", "S3_MAX_WORKERS"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with moto.mock_aws():
+        s3_handler = S3Handler(region_name="us-east-1", max_workers=4)
+        logging.getLogger("src.data.s3_utils").setLevel(logging.WARNING)
+        s3_handler.create_bucket(BUCKET)
+        yield s3_handler
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """Directory of 30 small files spread over three folders"""
+    root = tmp_path / "raw"
+    for number in range(30):
+        path = root / f"folder_{number % 3}" / f"{number:04d}.eml"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(f"Message {number}\n".encode() * (number + 1))
+    return root
+
+
+def relative_files(root):
+    return {
+        os.path.relpath(os.path.join(folder, name), root): open(os.path.join(folder, name), "rb").read()
+        for folder, _, names in os.walk(root) for name in names
+    }
+
+
+def test_directory_round_trip(handler, tree, tmp_path):
+    stats = handler.upload_directory(str(tree), BUCKET, PREFIX, show_progress=False)
+    assert (stats['transferred_files'], stats['skipped_files'], stats['failed_files']) == (30, 0, 0)
+
+    target = tmp_path / "downloaded"
+    stats = handler.download_directory(BUCKET, PREFIX, str(target))
+    assert (stats['downloaded_files'], stats['skipped_files'], stats['failed_files']) == (30, 0, 0)
+    assert relative_files(target) == relative_files(tree)
+
+    # Files already downloaded are kept
+    stats = handler.download_directory(BUCKET, PREFIX, str(target))
+    assert (stats['downloaded_files'], stats['skipped_files']) == (30, 30)
+
+
+def test_unchanged_files_are_skipped(handler, tree):
+    handler.upload_directory(str(tree), BUCKET, PREFIX, show_progress=False)
+
+    stats = handler.upload_directory(str(tree), BUCKET, PREFIX, show_progress=False)
+    assert (stats['transferred_files'], stats['skipped_files']) == (0, 30)
+
+    # Same size, different content: only the checksum tells them apart
+    changed = tree / "folder_1" / "0004.eml"
+    changed.write_bytes(changed.read_bytes().upper())
+    stats = handler.upload_directory(str(tree), BUCKET, PREFIX, show_progress=False)
+    assert (stats['transferred_files'], stats['skipped_files']) == (1, 29)
+    assert stats['transferred_paths'] == [str(changed)]
+    assert handler.client.get_object(Bucket=BUCKET, Key=f"{PREFIX}/folder_1/0004.eml")['Body'].read() \
+        == changed.read_bytes()
+
+
+def test_upload_resumes_after_failures(handler, tree, monkeypatch):
+    upload_file = handler.upload_file
+    failing = {f"{PREFIX}/folder_0/0003.eml", f"{PREFIX}/folder_2/0017.eml"}
+
+    def flaky_upload(file_path, bucket_name, object_key=None, **kwargs):
+        if object_key == f"{PREFIX}/folder_2/0017.eml":
+            raise ConnectionError("connection reset")
+        if object_key in failing:
+            return False
+        return upload_file(file_path, bucket_name, object_key, **kwargs)
+
+    monkeypatch.setattr(handler, "upload_file", flaky_upload)
+    stats = handler.upload_directory(str(tree), BUCKET, PREFIX, show_progress=False)
+    assert (stats['transferred_files'], stats['failed_files']) == (28, 2)
+    assert sorted(stats['failed_paths']) == sorted(failing)
+
+    monkeypatch.setattr(handler, "upload_file", upload_file)
+    stats = handler.upload_directory(str(tree), BUCKET, PREFIX, show_progress=False)
+    assert (stats['transferred_files'], stats['skipped_files'], stats['failed_files']) == (2, 28, 0)
+    assert sorted(os.path.relpath(path, tree) for path in stats['transferred_paths']) \
+        == ["folder_0/0003.eml", "folder_2/0017.eml"]
+
+    stats = handler.verify_directory(str(tree), BUCKET, PREFIX)
+    assert stats['verified_files'] == 30
+
+
+def test_expected_etag_of_a_multipart_upload(handler, tmp_path):
+    large = tmp_path / "large" / "archive.mbox"
+    large.parent.mkdir()
+    large.write_bytes(os.urandom(MULTIPART_THRESHOLD + 1024 * 1024))
+    small = tmp_path / "large" / "note.eml"
+    small.write_bytes(b"Subject: note\n\nshort body\n")
+
+    handler.upload_directory(str(large.parent), BUCKET, "large", show_progress=False)
+    remote = {obj['key']: obj['etag'] for obj in handler.list_objects(BUCKET, "large")}
+    assert remote["large/archive.mbox"].endswith("-2")
+    assert remote["large/archive.mbox"] == expected_etag(str(large))
+    assert remote["large/note.eml"] == expected_etag(str(small))
+
+    stats = handler.upload_directory(str(large.parent), BUCKET, "large", show_progress=False)
+    assert (stats['transferred_files'], stats['skipped_files']) == (0, 2)
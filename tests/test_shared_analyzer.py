@@ -0,0 +1,92 @@
+"""Shared analyzers (EmailAnalyzer(shared=True)) never write into the database they read.
+
+A synthetic database is built without email_flat, as databases ingested before it existed.
+A shared analyzer that needs the table must build it into a new snapshot, published behind
+the database link, and leave the file the other sessions read untouched. The topic level
+selected in the app is saved next to the database, without a new snapshot.
+"""
+
+import contextlib
+import io
+import os
+import sys
+
+import duckdb
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data.connection_pool import configure_shared_connections
+from src.data.duckdb_utils import table_exists
+from src.data import email_analyzer
+from src.data.email_analyzer import EmailAnalyzer
+from src.data.snapshots import current_database, list_snapshots
+from tests.synthetic_db import build_synthetic_db
+
+EMAILS = 300
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "Shared" / "Shared.duckdb"
+    path.parent.mkdir()
+    with contextlib.redirect_stdout(io.StringIO()):
+        build_synthetic_db(str(path), EMAILS, 30, 3)
+    yield str(path)
+    configure_shared_connections()
+
+
+def test_missing_table_is_built_into_a_new_snapshot(db_path):
+    reader = EmailAnalyzer(db_path, shared=True)
+    reader.connect()
+    served_inode = os.stat(db_path).st_ino
+
+    analyzer = EmailAnalyzer(db_path, shared=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        conn = analyzer.connect_flat()
+    assert conn.execute("SELECT COUNT(*) FROM email_flat").fetchone()[0] == EMAILS
+    analyzer.close()
+
+    # Published behind the link; the file read until then became the first snapshot, unwritten
+    assert os.path.islink(db_path)
+    previous, published = list_snapshots(db_path)
+    assert current_database(db_path) == published
+    assert os.stat(previous).st_ino == served_inode
+    assert not table_exists(reader.conn, 'email_flat')
+    reader.close()
+    with duckdb.connect(str(previous), read_only=True) as conn:
+        assert not table_exists(conn, 'email_flat')
+
+
+def test_failed_write_publishes_nothing(db_path, monkeypatch):
+    analyzer = EmailAnalyzer(db_path, shared=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        analyzer.connect_flat()
+    before = list_snapshots(db_path)
+    served = current_database(db_path)
+
+    def fail(conn):
+        raise duckdb.IOException("disk full")
+
+    monkeypatch.setattr(email_analyzer, "refresh_rollups", fail)
+    with pytest.raises(duckdb.IOException), contextlib.redirect_stdout(io.StringIO()):
+        analyzer.connect_rollups()
+    assert current_database(db_path) == served
+    assert list_snapshots(db_path) == before
+    analyzer.close()
+
+
+def test_topic_level_is_saved_without_a_snapshot(db_path):
+    with duckdb.connect(db_path) as conn:
+        conn.execute("CREATE TABLE topic_clusters (project_name TEXT, level INTEGER, height DOUBLE, "
+                     "cluster_id INTEGER, summary TEXT)")
+        conn.execute("INSERT INTO topic_clusters VALUES ('Shared', 1, 0.5, 0, 'a'), ('Shared', 2, 0.8, 0, 'b')")
+    analyzer = EmailAnalyzer(db_path, shared=True)
+    served_inode = os.stat(db_path).st_ino
+
+    analyzer.set_selected_topic_level(2)
+    assert EmailAnalyzer(db_path, shared=True).get_selected_topic_level() == 2
+    assert analyzer.get_selected_topic_height() == 0.8
+    assert not os.path.islink(db_path) and os.stat(db_path).st_ino == served_inode
+    assert list_snapshots(db_path) == []
+    analyzer.close()
@@ -0,0 +1,192 @@
+"""Project database builds published as snapshots (src/data/snapshots).
+
+The attachment blobs are shared by every snapshot of a database: a blob released by a build
+must stay readable from the older snapshots kept, and be removed with the last one of them.
+A build that fails must not be published, and builds of one database run one at a time.
+Planning an ingestion (--plan) and the attachment report only read the published snapshot.
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+from email.message import EmailMessage
+
+import duckdb
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data import attachment_store
+from src.data.attachment_store import AttachmentStore, attachment_hash
+from src.data.duckdb_utils import setup_database
+from src.data import eml_transformation
+from src.data.eml_transformation import delete_ingested_emails, generate_duck_db, process_eml_to_duckdb
+from src.data.snapshots import build_snapshot, current_database, list_snapshots
+
+PROJECT = "archive"
+CONFIG = {PROJECT: {"mailboxs": {"mailbox_1": {
+    "Positions": {},
+    "Entity": {"name": "Alice Martin", "alias_names": [], "is_physical_person": True,
+               "email_adress": "alice@example.org", "email_adress_aliases": []},
+    "Organisation": {"name": "Example", "description": ""},
+}}}}
+
+KEPT, REMOVED = b"agenda kept", b"agenda removed"
+
+
+def write_eml(inbox, number, attachment):
+    message = EmailMessage()
+    message["From"] = "Bob Durand <bob@example.org>"
+    message["To"] = "Alice Martin <alice@example.org>"
+    message["Subject"] = f"Meeting {number}"
+    message["Date"] = "Tue, 14 Mar 2023 10:00:00 +0000"
+    message["Message-ID"] = f"<meeting-{number}@example.org>"
+    message.set_content(f"Agenda of the meeting number {number}")
+    message.add_attachment(attachment, maintype="application", subtype="octet-stream", filename="agenda.bin")
+    (inbox / f"{number:04d}.eml").write_bytes(message.as_bytes())
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """Project folder laid out as under data/Projects/, with two emails and the database path"""
+    monkeypatch.setenv("DUCKDB_SNAPSHOT_RETENTION", "2")
+    monkeypatch.setattr(eml_transformation, "project_root", str(tmp_path))
+    project_dir = tmp_path / "data" / "Projects" / PROJECT
+    inbox = project_dir / "mailbox_1" / "processed" / "inbox"
+    inbox.mkdir(parents=True)
+    (project_dir / "project_config_file.json").write_text(json.dumps(CONFIG))
+    for number, attachment in enumerate((KEPT, REMOVED)):
+        write_eml(inbox, number, attachment)
+    return project_dir, project_dir / f"{PROJECT}.duckdb"
+
+
+def build(db_path, write):
+    with build_snapshot(db_path) as snapshot_path:
+        conn = setup_database(str(snapshot_path))
+        try:
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                write(conn)
+        finally:
+            conn.close()
+
+
+def test_released_blob_is_removed_with_the_last_snapshot_referencing_it(project):
+    corpus_dir, db_path = project
+    store = AttachmentStore.for_database(db_path)
+    build(db_path, lambda conn: process_eml_to_duckdb(corpus_dir, conn, project_name=PROJECT, config_file=CONFIG))
+    assert store.exists(attachment_hash(KEPT)) and store.exists(attachment_hash(REMOVED))
+    ingested = list_snapshots(db_path)
+
+    build(db_path, lambda conn: delete_ingested_emails(conn, ["mailbox_1/processed/inbox/0001.eml"]))
+    # The previous snapshot still references the released blob
+    assert list_snapshots(db_path)[0] == ingested[-1]
+    assert store.get(attachment_hash(REMOVED)) == REMOVED
+
+    build(db_path, lambda conn: None)
+    assert ingested[-1] not in list_snapshots(db_path)
+    assert not store.exists(attachment_hash(REMOVED))
+    assert store.get(attachment_hash(KEPT)) == KEPT
+
+
+def test_failed_ingestion_is_not_published(project, monkeypatch):
+    project_dir, db_path = project
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        generate_duck_db(workers=1, project_name=PROJECT)
+    published, snapshots = current_database(db_path), list_snapshots(db_path)
+
+    def fail(conn):
+        raise duckdb.IOException("disk full")
+
+    # The new email is written into the build, which fails on the derived tables
+    write_eml(project_dir / "mailbox_1" / "processed" / "inbox", 2, b"agenda added")
+    monkeypatch.setattr(eml_transformation, "refresh_rollups", fail)
+    with pytest.raises(duckdb.IOException), \
+            contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        generate_duck_db(workers=1, project_name=PROJECT)
+
+    assert current_database(db_path) == published
+    assert list_snapshots(db_path) == snapshots
+    with duckdb.connect(str(db_path), read_only=True) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM receiver_emails").fetchone() == (2,)
+
+
+def test_builds_run_one_at_a_time(tmp_path, monkeypatch):
+    monkeypatch.setenv("DUCKDB_SNAPSHOT_RETENTION", "1")
+    db_path = tmp_path / PROJECT / f"{PROJECT}.duckdb"
+    db_path.parent.mkdir()
+    with duckdb.connect(str(db_path)) as conn:
+        conn.execute("CREATE TABLE changes (build VARCHAR)")
+
+    def write(snapshot_path, name):
+        with duckdb.connect(str(snapshot_path)) as conn:
+            conn.execute("INSERT INTO changes VALUES (?)", [name])
+
+    started = threading.Event()
+
+    def later_builds():
+        started.set()
+        for name in ("second", "third", "fourth"):
+            with build_snapshot(db_path) as snapshot_path:
+                write(snapshot_path, name)
+
+    with build_snapshot(db_path) as snapshot_path:
+        write(snapshot_path, "first")
+        thread = threading.Thread(target=later_builds)
+        thread.start()
+        started.wait()
+        thread.join(0.5)
+        # The other builds wait for this one, which pruning can not delete
+        assert thread.is_alive()
+        assert snapshot_path.exists() and snapshot_path not in list_snapshots(db_path)
+    thread.join()
+
+    # Each build started from the one published before it
+    with duckdb.connect(str(db_path), read_only=True) as conn:
+        assert sorted(row[0] for row in conn.execute("SELECT build FROM changes").fetchall()) \
+            == ["first", "fourth", "second", "third"]
+    assert list_snapshots(db_path) == [current_database(db_path)]
+
+
+def test_plan_reads_the_database_without_writing_it(project):
+    project_dir, db_path = project
+    with contextlib.redirect_stdout(io.StringIO()):
+        generate_duck_db(dry_run=True, project_name=PROJECT)
+    assert not db_path.exists() and not (project_dir / "snapshots").exists()
+
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        generate_duck_db(workers=1, project_name=PROJECT)
+    published = current_database(db_path)
+    before = (published.read_bytes(), published.stat().st_mtime_ns)
+
+    write_eml(project_dir / "mailbox_1" / "processed" / "inbox", 2, b"agenda added")
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        generate_duck_db(dry_run=True, project_name=PROJECT)
+    assert "new:       1" in output.getvalue()
+    assert current_database(db_path) == published
+    assert (published.read_bytes(), published.stat().st_mtime_ns) == before
+    assert not published.with_name(f"{published.name}.wal").exists()
+
+
+def test_attachment_report_reads_and_migrate_publishes(project, monkeypatch):
+    project_dir, db_path = project
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        generate_duck_db(workers=1, project_name=PROJECT)
+    published = current_database(db_path)
+    before = (published.read_bytes(), published.stat().st_mtime_ns)
+
+    output = io.StringIO()
+    monkeypatch.setattr(sys, "argv", ["attachment_store", "report", str(db_path)])
+    with contextlib.redirect_stdout(output):
+        assert attachment_store.main() == 0
+    assert output.getvalue().startswith("2 attachments, 2 distinct blobs")
+    assert (published.read_bytes(), published.stat().st_mtime_ns) == before
+
+    monkeypatch.setattr(sys, "argv", ["attachment_store", "migrate", str(db_path)])
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert attachment_store.main() == 0
+    assert current_database(db_path) != published
+    assert (published.read_bytes(), published.stat().st_mtime_ns) == before
@@ -0,0 +1,116 @@
+"""Upload journal of the upload_emls CLI (src/data/upload_emls).
+
+The EML files already uploaded are listed one per line in <state_file>.journal. A journal
+cut in the middle of a line by a crash is loaded without the partial line, and an upload
+run after it only sends the files whose entries were lost. The "processed_emls" list of
+the previous state files is moved into the journal.
+"""
+
+import json
+import logging
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data.upload_emls import UploadJournal, load_state, upload_eml_to_s3
+
+BUCKET = "olkoa-test-upload-emls"
+
+
+def write_tree(root, files):
+    for number in range(files):
+        path = root / f"folder_{number % 4}" / f"{number:04d}.eml"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"From: a@example.org\nSubject: message {number}\n\nBody of message {number}\n")
+    return sorted(str(path) for path in root.glob("**/*.eml"))
+
+
+def test_partial_line_is_dropped(tmp_path):
+    state_file = str(tmp_path / "upload_state.json")
+    with UploadJournal(state_file) as journal:
+        for number in range(3):
+            journal.add(f"/mail/{number}.eml")
+
+    with open(f"{state_file}.journal", "ab") as f:
+        f.write(b"/mail/3.e")
+    with UploadJournal(state_file) as journal:
+        assert journal.entries == {"/mail/0.eml", "/mail/1.eml", "/mail/2.eml"}
+        journal.add("/mail/3.eml")
+
+    with open(f"{state_file}.journal", encoding="utf-8") as f:
+        assert f.read().splitlines() == [f"/mail/{number}.eml" for number in range(4)]
+
+
+def test_legacy_state_is_moved_into_the_journal(tmp_path):
+    state_file = tmp_path / "upload_state.json"
+    legacy = ["/mail/0.eml", "/mail/1.eml", "/mail/0.eml"]
+    state_file.write_text(json.dumps({
+        "last_zip_processed": "/mail/archive.zip",
+        "processed_emls": legacy,
+        "last_run": "2024-05-02T10:00:00",
+    }))
+
+    with UploadJournal(str(state_file)) as journal:
+        assert journal.entries == {"/mail/0.eml", "/mail/1.eml"}
+    assert load_state(str(state_file)) == {
+        "last_zip_processed": "/mail/archive.zip",
+        "last_run": "2024-05-02T10:00:00",
+    }
+
+    # Opened again, nothing is migrated twice
+    with UploadJournal(str(state_file)) as journal:
+        assert len(journal) == 2
+    with open(f"{state_file}.journal", encoding="utf-8") as f:
+        assert f.read().splitlines() == ["/mail/0.eml", "/mail/1.eml"]
+
+
+def test_upload_resumes_from_a_cut_journal(tmp_path, monkeypatch):
+    moto = pytest.importorskip("moto")
+    import boto3
+
+    for name in ("AWS_ENDPOINT_URL", "AWS_PROFILE"):
+        monkeypatch.delenv(name, raising=False)
+    logging.disable(logging.CRITICAL)
+    monkeypatch.setattr("src.data.upload_emls.tqdm", lambda iterable, **kwargs: iterable)
+    source = tmp_path / "source"
+    paths = write_tree(source, 20)
+    state_file = str(tmp_path / "upload_state.json")
+
+    def upload():
+        upload_eml_to_s3(str(source), BUCKET, state_file, aws_access_key_id="testing",
+                         aws_secret_access_key="testing", region_name="us-east-1", sync_every=5)
+
+    def keys(client):
+        response = client.list_objects_v2(Bucket=BUCKET)
+        return sorted(str(source / obj["Key"]) for obj in response.get("Contents", []))
+
+    try:
+        with moto.mock_aws():
+            client = boto3.client("s3", region_name="us-east-1", aws_access_key_id="testing",
+                                  aws_secret_access_key="testing")
+            client.create_bucket(Bucket=BUCKET)
+            upload()
+            assert keys(client) == paths
+
+            # Crash in the middle of a journal write: half the entries and a partial line
+            journal_path = f"{state_file}.journal"
+            with open(journal_path, "rb") as f:
+                data = f.read()
+            with open(journal_path, "wb") as f:
+                f.write(data[:len(data) // 2])
+            with open(journal_path, "rb") as f:
+                kept = set(f.read().decode("utf-8").split("\n")[:-1])
+
+            # Only the files whose entries were lost are sent again
+            client.delete_objects(Bucket=BUCKET, Delete={"Objects": [
+                {"Key": os.path.relpath(path, source)} for path in paths]})
+            upload()
+            assert keys(client) == sorted(set(paths) - kept)
+    finally:
+        logging.disable(logging.NOTSET)
+
+    with open(f"{state_file}.journal", encoding="utf-8") as f:
+        assert sorted(f.read().splitlines()) == paths